@@ -0,0 +1,164 @@
+"""Admission control for heavy render requests (PDF and print jobs).
+
+Rendering all marked labels takes seconds of CPU and tens of megabytes per
+request. A few of them at once would otherwise take the CPU and memory that
+``/heartbeat``, the list API and print-mark toggles need, and the tray launcher
+shuts the app down when heartbeats stop arriving.
+
+Views decorated with ``render_slot`` run only while holding one of
+``RENDER_SLOTS`` slots. Excess renders wait in a bounded queue for up to
+``RENDER_QUEUE_TIMEOUT`` seconds. A render that finds the queue full is refused
+with 429 Too Many Requests, and one that waited too long with 503 Service
+Unavailable. Both responses carry a ``Retry-After`` estimated from recent render
+times. All other endpoints never wait for a slot, so they stay responsive
+however many renders are in flight.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypedDict
+
+from flask import Flask, current_app, jsonify
+from flask.typing import ResponseReturnValue
+
+logger = logging.getLogger(__name__)
+
+RENDER_SLOTS = 2
+RENDER_QUEUE = 4
+RENDER_QUEUE_TIMEOUT = 20.0
+# Bounds of the Retry-After estimate, in seconds
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 120
+# Render time assumed until the first render finished, in seconds
+_INITIAL_RENDER_SECONDS = 2.0
+# Weight of the latest render in the moving average of render times
+_AVERAGE_WEIGHT = 0.2
+
+
+class RenderRejected(Exception):
+    """No render slot was free in time; answered with status and Retry-After."""
+
+    def __init__(self, message: str, status: int, retry_after: int) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RenderStatsDict(TypedDict):
+    """Render slot usage, as reported by ``GET /health``."""
+
+    slots: int
+    active: int
+    waiting: int
+    rejected: int
+
+
+class RenderGate:
+    """Counting semaphore with a bounded, time-limited wait queue."""
+
+    def __init__(
+        self,
+        slots: int = RENDER_SLOTS,
+        queue_size: int = RENDER_QUEUE,
+        timeout: float = RENDER_QUEUE_TIMEOUT,
+    ) -> None:
+        self.slots = max(1, slots)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._average_seconds = _INITIAL_RENDER_SECONDS
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Take a render slot, waiting in the queue if all are busy.
+
+        Raises:
+            RenderRejected: The queue is full (429) or no slot freed up within
+                ``timeout`` (503).
+        """
+        with self._condition:
+            # Queued renders go first; a newcomer does not overtake them
+            if self.active < self.slots and self.waiting == 0:
+                self.active += 1
+                return
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise RenderRejected(
+                    "Too many label renders in progress", 429, self._retry_after()
+                )
+            self.waiting += 1
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self.active >= self.slots:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise RenderRejected(
+                            "Server is busy rendering labels", 503, self._retry_after()
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    def release(self, seconds: float) -> None:
+        """Free a slot taken by acquire(); seconds is how long the render took."""
+        with self._condition:
+            self.active -= 1
+            self._average_seconds += _AVERAGE_WEIGHT * (seconds - self._average_seconds)
+            self._condition.notify()
+
+    def stats(self) -> RenderStatsDict:
+        with self._condition:
+            return RenderStatsDict(
+                slots=self.slots,
+                active=self.active,
+                waiting=self.waiting,
+                rejected=self.rejected,
+            )
+
+    def _retry_after(self) -> int:
+        """Seconds until the queue has likely drained (caller holds the lock)."""
+        estimate = self._average_seconds * (self.waiting + 1) / self.slots
+        return max(RETRY_AFTER_MIN, min(RETRY_AFTER_MAX, math.ceil(estimate)))
+
+
+def render_slot(view: Callable[..., ResponseReturnValue]) -> Callable[..., Any]:
+    """Run view only while holding one of the app's render slots."""
+
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> ResponseReturnValue:
+        gate: RenderGate = current_app.extensions["render_gate"]
+        try:
+            gate.acquire()
+        except RenderRejected as e:
+            logger.warning(f"{e} ({e.status}), retry after {e.retry_after} s")
+            return (
+                jsonify({"error": str(e), "retry_after": e.retry_after}),
+                e.status,
+                {"Retry-After": str(e.retry_after)},
+            )
+        started = time.monotonic()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            gate.release(time.monotonic() - started)
+
+    return wrapper
+
+
+def init_admission(app: Flask) -> None:
+    """Attach the render gate to app."""
+    app.extensions["render_gate"] = RenderGate(
+        slots=int(app.config.get("RENDER_SLOTS", RENDER_SLOTS)),
+        queue_size=int(app.config.get("RENDER_QUEUE", RENDER_QUEUE)),
+        timeout=float(app.config.get("RENDER_QUEUE_TIMEOUT", RENDER_QUEUE_TIMEOUT)),
+    )
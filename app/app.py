@@ -36,6 +36,11 @@ def create_app(
     if shutdown_token:
         app.config["SHUTDOWN_TOKEN"] = shutdown_token
 
+    # Faster JSON encoding for jsonify() and the list payload cache
+    from app.json_provider import init_json_provider
+
+    init_json_provider(app)
+
     # Setup logging
     setup_logging(app)
     logger = logging.getLogger(__name__)
@@ -50,21 +55,77 @@ def create_app(
         db_file.parent.mkdir(parents=True, exist_ok=True)
         logger.info("Database directory ensured: %s", db_file.parent)
 
-    # Initialize database
+    # Initialize database; route writes go through the single-writer queue
     db.init_app(app)
 
+    from app.write_queue import init_write_queue
+
+    init_write_queue(app)
+
+    # Bounded concurrency for PDF and print-job renders
+    from app.admission import init_admission
+
+    init_admission(app)
+
     with app.app_context():
         # Import all models so db.create_all() knows about them
         from app import models  # noqa: F401
 
+        # Register session events that invalidate cached list payloads
+        from app import payload_cache  # noqa: F401
+
         db.create_all()
         logger.info("Database tables created/verified")
 
+        # Add columns introduced after the database file was created
+        from app.schema import upgrade_schema
+
+        with db.engine.begin() as connection:
+            upgrade_schema(connection, db.metadata)
+
+        # Full-text product search index (FTS5) and its rebuild command
+        from app.search import init_search
+
+        init_search(app)
+
+        # Online database snapshots: ``flask backup create|list|verify|restore``
+        from app.backup import init_backup
+
+        init_backup(app)
+
+        # Supplier price files: ``flask ingest FILE...``
+        from app.ingest import init_ingest
+
+        init_ingest(app)
+
+        # Change log for branch sync: ``flask sync status|run``
+        from app.sync import init_sync
+
+        init_sync(app)
+
+        # One database per store behind this server: ``flask stores ...``
+        from app.stores import init_stores
+
+        init_stores(app)
+
+        # Drop cached payloads other worker processes made stale; checked
+        # before each request, after the request's store is selected
+        from app.coherence import init_coherence
+
+        init_coherence(app)
+
+        # Trigram index for near-duplicate detection; catch up on rows
+        # written outside the ORM since the last start
+        from app.duplicates import index_missing_labels
+
+        index_missing_labels()
+
     # Register blueprints
     logger.info("Registering application blueprints")
     from app.routes.forms.forms_routes import bp as forms_bp
     from app.routes.labels.label_routes import bp as labels_bp
     from app.routes.routes import bp as main_bp
+    from app.routes.sync.sync_routes import bp as sync_bp
 
     app.register_blueprint(main_bp)
     logger.debug("Registered 'main' blueprint")
@@ -72,8 +133,17 @@ def create_app(
     logger.debug("Registered 'forms' blueprint")
     app.register_blueprint(labels_bp)
     logger.debug("Registered 'labels' blueprint")
+    app.register_blueprint(sync_bp)
+    logger.debug("Registered 'sync' blueprint")
     logger.info("All blueprints registered successfully")
 
+    # Fingerprinted static URLs, precompressed assets and response compression
+    from app.compression import init_compression
+    from app.static_assets import init_static_assets
+
+    init_static_assets(app)
+    init_compression(app)
+
     # Register Jinja2 template filters for Czech number formatting
     @app.template_filter("czech_number")
     def czech_number_filter(value: float, decimals: int = 2) -> str:
@@ -0,0 +1,409 @@
+"""Online backups of the SQLite database with rotation and verified restore.
+
+Copying ``labelmaker.db`` while the app runs can produce a torn copy (the file
+and its ``-wal`` are written independently). Backups here use SQLite's online
+backup API instead: pages are copied in small steps with a short sleep after
+each step, so the copy never holds a lock for long. If writers keep changing
+the database, SQLite restarts the copy; after a few restarts the rest is copied
+in one step, which under WAL journaling only holds a read transaction and does
+not block writers either.
+
+Every snapshot is switched to a self-contained rollback journal, checked with
+``PRAGMA integrity_check`` and ``foreign_key_check``, and only then renamed to
+its final name, so a listed snapshot is always complete. Old snapshots are
+rotated out.
+
+Restoring copies a verified snapshot back with the backup API in a single step,
+i.e. in one write transaction on the live database: other connections see
+either the old or the restored catalogue, and a crash leaves the old one. A
+safety snapshot of the current database is taken first.
+
+The launcher runs ``BackupScheduler``; ``flask backup`` creates, lists, verifies
+and restores snapshots by hand.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import click
+
+from app.db import SQLITE_BUSY_TIMEOUT_MS
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+# 1 MiB per step at SQLite's default 4 KiB page size
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.02
+BACKUP_KEEP = 14
+BACKUP_INTERVAL_HOURS = 24.0
+# Restarts caused by concurrent writes before the rest is copied in one step
+MAX_BACKUP_RESTARTS = 3
+# Let the app finish starting before the first scheduled backup
+BACKUP_START_DELAY = 60.0
+BACKUP_RETRY_DELAY = 600.0
+
+SNAPSHOT_PREFIX = "labelmaker-"
+_SNAPSHOT_RE = re.compile(
+    r"^labelmaker-(?P<stamp>\d{8}-\d{6})(?:-(?P<counter>\d+))?(?:-pre-restore)?\.db$"
+)
+
+
+class BackupError(Exception):
+    """A snapshot could not be created, verified or restored."""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path(uri: str) -> Path | None:
+    """File path of an SQLite database URI, or None for other databases."""
+    if not uri.startswith("sqlite:///") or uri.endswith(":memory:"):
+        return None
+    return Path(uri.removeprefix("sqlite:///"))
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    # Autocommit: the backup API manages its own transactions
+    return sqlite3.connect(
+        path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None
+    )
+
+
+def _copy(
+    source: sqlite3.Connection,
+    dest: sqlite3.Connection,
+    pages: int,
+    step_sleep: float,
+) -> None:
+    """Copy source into dest in steps of pages, sleeping between steps."""
+    last_remaining: int | None = None
+    restarts = 0
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal last_remaining, restarts
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_BACKUP_RESTARTS:
+                raise _TooManyRestarts
+        last_remaining = remaining
+        if remaining:
+            time.sleep(step_sleep)
+
+    try:
+        source.backup(dest, pages=pages, progress=progress)
+    except _TooManyRestarts:
+        logger.info("Database kept changing during backup, copying the rest at once")
+        source.backup(dest)
+
+
+def _fsync(path: Path) -> None:
+    with open(path, "rb") as file:
+        os.fsync(file.fileno())
+
+
+def _fsync_dir(path: Path) -> None:
+    # Makes the rename durable; directories cannot be opened on Windows
+    if os.name == "posix":
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def verify_snapshot(path: Path) -> None:
+    """Check a snapshot's integrity and foreign keys.
+
+    Raises:
+        BackupError: The file is missing, not a database, or damaged.
+    """
+    if not path.is_file():
+        raise BackupError(f"Snapshot not found: {path}")
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            orphans = conn.execute("PRAGMA foreign_key_check").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"{path.name} is not a readable database: {e}") from e
+    if problems != ["ok"]:
+        raise BackupError(f"{path.name} failed the integrity check: {problems[:5]}")
+    if orphans:
+        raise BackupError(f"{path.name} has {len(orphans)} broken foreign keys")
+
+
+def list_backups(backup_dir: Path) -> list[Path]:
+    """Snapshots in backup_dir, newest first."""
+    if not backup_dir.is_dir():
+        return []
+    snapshots: list[tuple[str, int, Path]] = []
+    for path in backup_dir.iterdir():
+        match = _SNAPSHOT_RE.match(path.name)
+        if match:
+            counter = int(match["counter"] or 1)
+            snapshots.append((match["stamp"], counter, path))
+    return [path for _stamp, _counter, path in sorted(snapshots, reverse=True)]
+
+
+def rotate_backups(backup_dir: Path, keep: int) -> list[Path]:
+    """Delete all but the newest keep snapshots; returns the deleted ones."""
+    removed = list_backups(backup_dir)[keep:]
+    for path in removed:
+        path.unlink(missing_ok=True)
+        logger.info(f"Removed old backup {path.name}")
+    return removed
+
+
+def create_backup(
+    db_path: Path,
+    backup_dir: Path,
+    keep: int | None = BACKUP_KEEP,
+    *,
+    suffix: str = "",
+    pages: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP,
+) -> Path:
+    """Take a verified snapshot of the live database.
+
+    Args:
+        db_path: Live database file.
+        backup_dir: Directory of the snapshots; created if missing.
+        keep: Snapshots to keep after this one; None skips rotation.
+        suffix: Appended to the timestamp in the file name.
+        pages: Pages copied per step.
+        step_sleep: Seconds to sleep after each step.
+
+    Returns:
+        Path of the new snapshot.
+
+    Raises:
+        BackupError: The copy failed verification.
+        sqlite3.Error: The database could not be read.
+    """
+    if not db_path.is_file():
+        raise BackupError(f"Database not found: {db_path}")
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    stamp = f"{SNAPSHOT_PREFIX}{datetime.now():%Y%m%d-%H%M%S}"
+    final = backup_dir / f"{stamp}{suffix}.db"
+    counter = 1
+    while final.exists():
+        counter += 1
+        final = backup_dir / f"{stamp}-{counter}{suffix}.db"
+    name = final.name
+    partial = backup_dir / f".{name}.partial"
+    started = time.perf_counter()
+
+    try:
+        source, dest = _connect(db_path), _connect(partial)
+        try:
+            _copy(source, dest, pages, step_sleep)
+            # A snapshot is one file: no -wal / -shm next to it
+            dest.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            source.close()
+            dest.close()
+        verify_snapshot(partial)
+        _fsync(partial)
+        os.replace(partial, final)
+        _fsync_dir(backup_dir)
+    finally:
+        partial.unlink(missing_ok=True)
+
+    logger.info(
+        f"Backup {final.name} created ({final.stat().st_size / 1024:.0f} KiB "
+        f"in {time.perf_counter() - started:.2f}s)"
+    )
+    if keep is not None:
+        rotate_backups(backup_dir, keep)
+    return final
+
+
+def restore_backup(snapshot: Path, db_path: Path, backup_dir: Path) -> Path:
+    """Replace the live database's contents with a verified snapshot.
+
+    The snapshot is copied in one backup step, a single write transaction on
+    the live database, so the swap is atomic for every other connection.
+
+    Returns:
+        The safety snapshot of the database as it was before the restore.
+
+    Raises:
+        BackupError: The snapshot is missing or damaged.
+    """
+    verify_snapshot(snapshot)
+    safety = create_backup(db_path, backup_dir, keep=None, suffix="-pre-restore")
+    source, dest = _connect(snapshot), _connect(db_path)
+    try:
+        source.backup(dest)
+    finally:
+        source.close()
+        dest.close()
+    logger.warning(f"Database restored from {snapshot.name} (previous: {safety.name})")
+    return safety
+
+
+class BackupScheduler:
+    """Takes a snapshot every interval on a daemon thread."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        backup_dir: Path,
+        interval_hours: float = BACKUP_INTERVAL_HOURS,
+        keep: int = BACKUP_KEEP,
+        start_delay: float = BACKUP_START_DELAY,
+    ) -> None:
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = interval_hours * 3600
+        self.keep = keep
+        self.start_delay = start_delay
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="db-backup", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the schedule; a running backup finishes first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_now(self) -> Path | None:
+        """Take a snapshot now; returns None if it failed (the error is logged)."""
+        with self._lock:
+            try:
+                return create_backup(self.db_path, self.backup_dir, self.keep)
+            except (BackupError, sqlite3.Error, OSError) as e:
+                logger.error(f"Scheduled backup failed: {e}", exc_info=True)
+                return None
+
+    def seconds_until_due(self) -> float:
+        """Time until the newest snapshot is one interval old."""
+        snapshots = list_backups(self.backup_dir)
+        if not snapshots:
+            return 0.0
+        age = time.time() - snapshots[0].stat().st_mtime
+        return max(0.0, self.interval - age)
+
+    def _run(self) -> None:
+        delay = max(self.start_delay, self.seconds_until_due())
+        while not self._stop.wait(delay):
+            succeeded = self.run_now() is not None
+            delay = self.seconds_until_due()
+            if not succeeded:
+                delay = max(delay, BACKUP_RETRY_DELAY)
+
+
+def backup_settings(app: Flask) -> tuple[Path, Path] | None:
+    """(database path, backup directory) of app, or None if it has no file DB."""
+    db_path = database_path(app.config.get("SQLALCHEMY_DATABASE_URI", ""))
+    if db_path is None:
+        return None
+    configured = app.config.get("BACKUP_DIR") or ""
+    return db_path, Path(configured) if configured else db_path.parent / "backups"
+
+
+def create_scheduler(app: Flask) -> BackupScheduler | None:
+    """Backup scheduler configured for app, or None when backups are off."""
+    settings = backup_settings(app)
+    interval = float(app.config.get("BACKUP_INTERVAL_HOURS", BACKUP_INTERVAL_HOURS))
+    if settings is None or interval <= 0:
+        return None
+    return BackupScheduler(
+        *settings,
+        interval_hours=interval,
+        keep=int(app.config.get("BACKUP_KEEP", BACKUP_KEEP)),
+    )
+
+
+def init_backup(app: Flask) -> None:
+    """Register the ``flask backup`` CLI commands."""
+
+    def settings() -> tuple[Path, Path]:
+        resolved = backup_settings(app)
+        if resolved is None:
+            raise click.ClickException("Backups need an SQLite database file.")
+        return resolved
+
+    def resolve(name: str) -> Path:
+        path = Path(name)
+        return path if path.is_absolute() or path.exists() else settings()[1] / name
+
+    def report(action: Callable[[], Path], message: str) -> None:
+        try:
+            path = action()
+        except (BackupError, sqlite3.Error, OSError) as e:
+            raise click.ClickException(str(e)) from e
+        click.echo(message.format(name=path.name))
+
+    @click.group("backup")
+    def backup_group() -> None:
+        """Create, list, verify and restore database snapshots."""
+
+    @backup_group.command("create")
+    def create_command() -> None:
+        """Take a snapshot of the database now."""
+        db_path, backup_dir = settings()
+        keep = int(app.config.get("BACKUP_KEEP", BACKUP_KEEP))
+        report(lambda: create_backup(db_path, backup_dir, keep), "Created {name}.")
+
+    @backup_group.command("list")
+    def list_command() -> None:
+        """List snapshots, newest first."""
+        for path in list_backups(settings()[1]):
+            modified = datetime.fromtimestamp(path.stat().st_mtime)
+            size = path.stat().st_size / 1024
+            click.echo(f"{path.name}  {modified:%Y-%m-%d %H:%M}  {size:.0f} KiB")
+
+    @backup_group.command("verify")
+    @click.argument("name")
+    def verify_command(name: str) -> None:
+        """Check a snapshot's integrity."""
+        path = resolve(name)
+
+        def verify() -> Path:
+            verify_snapshot(path)
+            return path
+
+        report(verify, "{name} is OK.")
+
+    @backup_group.command("restore")
+    @click.argument("name")
+    @click.confirmation_option(
+        prompt="Replace the current catalogue with this snapshot?"
+    )
+    def restore_command(name: str) -> None:
+        """Replace the database contents with a snapshot."""
+        db_path, backup_dir = settings()
+        snapshot = resolve(name)
+        report(
+            lambda: restore_backup(snapshot, db_path, backup_dir),
+            f"Restored {snapshot.name}; the previous state was saved as {{name}}. "
+            "Restart LabelMaker.",
+        )
+
+    app.cli.add_command(backup_group)
@@ -0,0 +1,163 @@
+"""Cache coherence across processes sharing one SQLite database.
+
+Several gunicorn workers (or the launcher and ``render_batch.py``) can serve
+the same database. Each process keeps its own list payload cache
+(``app.payload_cache``), which its own commits invalidate, but a write made by
+another process would otherwise go unnoticed until the next local write.
+
+Triggers on ``label`` and ``form`` count writes per table in ``cache_epoch``,
+whatever the write path. Once per request the process asks a dedicated
+connection for ``PRAGMA data_version``, which changes only when another
+connection committed. Only then are the epochs read, and the payloads of the
+tables whose epoch moved are dropped from the current database's cache. An
+unchanged database costs one pragma per request.
+
+Font settings live in a shared file that is read on every use, and thumbnails
+are cached by label content, so neither needs invalidating.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+
+from flask import current_app, request
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db import current_store, db
+from app.payload_cache import current_cache
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+# Tables whose writes invalidate cached payloads
+CACHED_TABLES = ("label", "form")
+
+_EXTENSION_KEY = "cache_coherence"
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS cache_epoch (
+        name TEXT PRIMARY KEY,
+        epoch INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    *(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_epoch_{suffix}
+        AFTER {operation} ON {table} BEGIN
+            UPDATE cache_epoch SET epoch = epoch + 1 WHERE name = '{table}';
+        END
+        """
+        for table in CACHED_TABLES
+        for suffix, operation in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+    ),
+)
+
+_SEED_SQL = text("INSERT OR IGNORE INTO cache_epoch (name) VALUES (:name)")
+
+
+def ensure_cache_epochs(connection: Connection) -> None:
+    """Create the epoch table and its triggers if missing.
+
+    Args:
+        connection: Connection to the application database, after ``create_all``.
+    """
+    for statement in _DDL:
+        connection.execute(text(statement))
+    connection.execute(_SEED_SQL, [{"name": table} for table in CACHED_TABLES])
+
+
+class CoherenceMonitor:
+    """Reports tables that other connections changed since the last check."""
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        # In-memory databases are private to this process
+        self.enabled = engine.dialect.name == "sqlite" and engine.url.database not in (
+            None,
+            "",
+            ":memory:",
+        )
+        self._connection: Any = None
+        self._data_version: int | None = None
+        self._epochs: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def changed_tables(self) -> set[str]:
+        """Tables changed since the previous call; all of them on the first call."""
+        if not self.enabled:
+            return set()
+        with self._lock:
+            if self._connection is None:
+                # Kept out of the pool: data_version is per connection
+                self._connection = self.engine.raw_connection()
+                self._connection.detach()
+            cursor = self._connection.cursor()
+            try:
+                (data_version,) = cursor.execute("PRAGMA data_version").fetchone()
+                if data_version == self._data_version:
+                    return set()
+                epochs: dict[str, int] = dict(
+                    cursor.execute("SELECT name, epoch FROM cache_epoch").fetchall()
+                )
+            finally:
+                cursor.close()
+            self._data_version = data_version
+            changed = {
+                name
+                for name in CACHED_TABLES
+                if name not in self._epochs or epochs.get(name) != self._epochs[name]
+            }
+            self._epochs = epochs
+            return changed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+                self._data_version = None
+
+
+def current_monitor() -> CoherenceMonitor | None:
+    """Monitor of the current store's database, or of the default one."""
+    store = current_store()
+    if store is not None:
+        return store.coherence
+    monitor: CoherenceMonitor | None = current_app.extensions.get(_EXTENSION_KEY)
+    return monitor
+
+
+def check_coherence() -> set[str]:
+    """Drop cached payloads of tables other processes changed; returns them."""
+    monitor = current_monitor()
+    if monitor is None:
+        return set()
+    changed = monitor.changed_tables()
+    if changed:
+        current_cache().bump(changed)
+        logger.debug("Payload cache invalidated for changed tables: %s", changed)
+    return changed
+
+
+def init_coherence(app: Flask) -> None:
+    """Create the epoch triggers and check them before each request.
+
+    Must be called inside an application context after ``db.create_all()``,
+    and after ``init_stores`` so the request's store is selected first.
+    """
+    monitor = CoherenceMonitor(db.engine)
+    if monitor.enabled:
+        with db.engine.begin() as connection:
+            ensure_cache_epochs(connection)
+    app.extensions[_EXTENSION_KEY] = monitor
+
+    @app.before_request
+    def invalidate_changed() -> None:
+        if request.endpoint != "static":
+            check_coherence()
@@ -0,0 +1,92 @@
+"""HTTP response compression (gzip, and brotli when installed).
+
+JSON and HTML responses above ``COMPRESS_MIN_SIZE`` bytes are compressed in an
+``after_request`` hook when the client accepts it. Responses that already carry a
+``Content-Encoding`` (precompressed static files, cached list payloads) and
+streamed/file responses are left untouched.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+from typing import TYPE_CHECKING
+
+from flask import Request, Response, current_app, request
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = frozenset(
+    {
+        "application/json",
+        "text/html",
+        "text/css",
+        "text/javascript",
+        "application/javascript",
+        "image/svg+xml",
+        "text/plain",
+    }
+)
+
+# Encodings in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body: bytes, encoding: str, level: int = 6) -> bytes:
+    """Compress body with the given content encoding ('br' or 'gzip')."""
+    if encoding == "br":
+        assert brotli is not None
+        # Brotli quality 0-11; map the gzip-style level onto it
+        return bytes(brotli.compress(body, quality=min(11, level + 3)))
+    # mtime=0 keeps the output deterministic (stable ETags and caches)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def negotiate_encoding(req: Request) -> str | None:
+    """Pick the preferred encoding the client accepts, or None."""
+    accepted = req.accept_encodings
+    for encoding in ENCODINGS:
+        if accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def _compress_response(response: Response) -> Response:
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < int(current_app.config.get("COMPRESS_MIN_SIZE", 1024)):
+        return response
+
+    level = int(current_app.config.get("COMPRESS_LEVEL", 6))
+    response.set_data(compress(body, encoding, level))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # Compressed bytes differ from the identity representation
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """Register the response compression hook on the app."""
+    app.after_request(_compress_response)
+    logger.info("Response compression enabled (%s)", ", ".join(ENCODINGS))
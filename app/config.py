@@ -22,6 +22,60 @@ class Config:
     # If LOG_LEVEL not set, use DEBUG when DEBUG=true, otherwise INFO
     LOG_LEVEL: str = os.getenv("LOG_LEVEL") or ("DEBUG" if DEBUG else "INFO")
 
+    # JSON encoder for API responses: "auto" (orjson if installed), "orjson", "stdlib"
+    JSON_ENCODER: str = os.getenv("JSON_ENCODER", "auto")
+
+    # Compress JSON/HTML responses larger than this many bytes (gzip/brotli)
+    COMPRESS_MIN_SIZE: int = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_LEVEL: int = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+    # Single-writer queue (app.write_queue): writes committed per transaction,
+    # and how long a request waits for its write before giving up
+    WRITE_QUEUE_MAX_BATCH: int = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+    WRITE_QUEUE_TIMEOUT: float = float(os.getenv("WRITE_QUEUE_TIMEOUT", "30"))
+
+    # Concurrent PDF/print-job renders (app.admission); further renders wait up
+    # to RENDER_QUEUE_TIMEOUT seconds in a queue of RENDER_QUEUE, then get 429/503
+    RENDER_SLOTS: int = int(os.getenv("RENDER_SLOTS", "2"))
+    RENDER_QUEUE: int = int(os.getenv("RENDER_QUEUE", "4"))
+    RENDER_QUEUE_TIMEOUT: float = float(os.getenv("RENDER_QUEUE_TIMEOUT", "20"))
+
+    # Database snapshots taken by the launcher (app.backup); the directory
+    # defaults to "backups" next to the database, an interval of 0 turns them off
+    BACKUP_DIR: str = os.getenv("BACKUP_DIR", "")
+    BACKUP_INTERVAL_HOURS: float = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+    BACKUP_KEEP: int = int(os.getenv("BACKUP_KEEP", "14"))
+
+    # Watch folder for supplier price files (app.ingest), polled by the launcher;
+    # empty turns it off
+    INGEST_DIR: str = os.getenv("INGEST_DIR", "")
+    INGEST_POLL_SECONDS: float = float(os.getenv("INGEST_POLL_SECONDS", "30"))
+
+    # One database per store, <STORES_DIR>/<name>.db, selected per request with
+    # the /s/<name> URL prefix or the X-LabelMaker-Store header (app.stores);
+    # empty serves only the default database
+    STORES_DIR: str = os.getenv("STORES_DIR", "")
+    STORES_MAX_OPEN: int = int(os.getenv("STORES_MAX_OPEN", "16"))
+    STORES_IDLE_MINUTES: float = float(os.getenv("STORES_IDLE_MINUTES", "10"))
+    # Copy the default database's forms into each store when it is opened
+    STORES_SHARE_FORMS: bool = os.getenv("STORES_SHARE_FORMS", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+
+    # Branch sync (app.sync): peers must share SYNC_TOKEN, which also enables
+    # the /api/sync endpoints; the tray launcher syncs with SYNC_PEER_URL
+    SYNC_TOKEN: str = os.getenv("SYNC_TOKEN", "")
+    SYNC_PEER_URL: str = os.getenv("SYNC_PEER_URL", "")
+    SYNC_INTERVAL_SECONDS: float = float(os.getenv("SYNC_INTERVAL_SECONDS", "300"))
+
+    # Thermal roll printer for direct print jobs, e.g. "tcp://192.168.1.50:9100"
+    LABEL_PRINTER_URL: str = os.getenv("LABEL_PRINTER_URL", "")
+    # Job format for that printer: "zpl" or "raster" (see app.label_output)
+    LABEL_PRINTER_FORMAT: str = os.getenv("LABEL_PRINTER_FORMAT", "zpl")
+    LABEL_PRINTER_DPI: int = int(os.getenv("LABEL_PRINTER_DPI", "203"))
+
     # SQLAlchemy configuration
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     SQLALCHEMY_ECHO: bool = DEBUG  # Log SQL queries in debug mode
@@ -6,6 +6,9 @@ All domain/business constants are defined here as the single source of truth.
 # ── HTTP error messages ────────────────────────────────────────────────────────
 
 LABEL_NOT_FOUND = "Label not found"
+LABEL_VERSION_CONFLICT = (
+    "Cenovku mezitím změnil někdo jiný. Načtěte ji znovu a zopakujte úpravu."
+)
 
 # ── PDF font size bounds ───────────────────────────────────────────────────────
 
@@ -1,16 +1,71 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy import event
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+
+if TYPE_CHECKING:
+    from app.stores import Store
+
+
+def current_store() -> Store | None:
+    """Store selected for the current request or writer thread (see app.stores).
+
+    None means the default database.
+    """
+    if not has_app_context():
+        return None
+    store: Store | None = g.get("store")
+    return store
+
 
-db = SQLAlchemy()
+def use_store(store: Store | None) -> None:
+    """Route db.session in the current application context to store's database."""
+    if store is None:
+        g.pop("store", None)
+    else:
+        g.store = store
+
+
+class StoreSession(Session):
+    """Session that runs on the current store's engine when one is selected."""
+
+    def get_bind(
+        self,
+        mapper: Any | None = None,
+        clause: Any | None = None,
+        bind: Engine | Connection | None = None,
+        **kwargs: Any,
+    ) -> Engine | Connection:
+        if bind is None:
+            store = current_store()
+            if store is not None:
+                return store.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": StoreSession})
+
+# How long a connection waits for another writer (e.g. render_batch.py) before
+# failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = 5000
 
 
 @event.listens_for(Engine, "connect")
 def _set_sqlite_pragma(dbapi_connection: object, connection_record: object) -> None:
-    """Enable foreign key enforcement for every SQLite connection."""
+    """Enable foreign keys, lock waiting and WAL for every SQLite connection.
+
+    WAL lets reads run while the single writer (app.write_queue) commits.
+    """
     import sqlite3
 
     if isinstance(dbapi_connection, sqlite3.Connection):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode = WAL")
         cursor.close()
@@ -0,0 +1,284 @@
+"""Near-duplicate label detection over a trigram index of product names.
+
+The ``unique_label`` constraint only rejects exact ``(product_name, form, amount)``
+matches, so "Paralen 500 mg" and "Paralen 500mg" can both exist and get printed
+twice. Product names are normalized (case, diacritics, spaces and punctuation
+removed) and split into trigrams, which are stored in ``label_trigram``. The
+similarity of two names is the Dice coefficient of their trigram sets.
+
+Two labels are near-duplicates when they share form and amount, contain the same
+numbers (strength such as "500" must not be fuzzy-matched against "125") and
+their name similarity reaches the threshold.
+
+Candidate lookup for a single name only reads the posting lists of its own
+trigrams, so its cost does not grow with the whole catalogue. The index is
+maintained by ORM mapper events; labels written outside the ORM (Core bulk
+inserts, imports) are picked up by ``index_missing_labels()``.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import TypedDict
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper
+
+from app.db import db
+from app.label_snapshot import LabelRow, load_label_rows, select_label_rows
+from app.models import Label, LabelDict, LabelTrigram
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_THRESHOLD = 0.75
+# Upper bound on candidates scored exactly per lookup
+MAX_CANDIDATES = 50
+
+_TRIGRAM_TABLE = LabelTrigram.__table__
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+
+class SimilarLabelDict(LabelDict):
+    """Label dict with its similarity to the looked-up name."""
+
+    similarity: float
+
+
+class DuplicateClusterDict(TypedDict):
+    """Group of labels that are near-duplicates of each other."""
+
+    similarity: float
+    labels: list[LabelDict]
+
+
+# ── Name normalization ────────────────────────────────────────────────────────
+
+
+def normalize_name(name: str) -> str:
+    """Fold case and diacritics and drop everything but letters and digits."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM_RE.sub("", stripped)
+
+
+def name_trigrams(name: str) -> set[str]:
+    """Return the trigram set of the normalized name (padded like pg_trgm)."""
+    key = normalize_name(name)
+    if not key:
+        return set()
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def name_numbers(name: str) -> tuple[str, ...]:
+    """Return the digit groups of a name, e.g. ('500',) for 'Paralen 500 mg'."""
+    return tuple(_NUMBER_RE.findall(name))
+
+
+def dice(a: set[str], b: set[str]) -> float:
+    """Dice coefficient of two trigram sets (1.0 = identical)."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _min_shared(size: int, threshold: float) -> int:
+    """Fewest shared trigrams any name needs to reach threshold against size.
+
+    From dice = 2s / (|A| + |B|) and s <= |B| it follows s >= t|A| / (2 - t).
+    """
+    return max(1, math.ceil(threshold * size / (2 - threshold)))
+
+
+# ── Index maintenance ─────────────────────────────────────────────────────────
+
+
+def index_label(connection: Connection, label_id: int, product_name: str) -> None:
+    """(Re)write the trigram postings of one label."""
+    connection.execute(delete(LabelTrigram).where(LabelTrigram.label_id == label_id))
+    grams = name_trigrams(product_name)
+    if grams:
+        connection.execute(
+            insert(_TRIGRAM_TABLE),
+            [{"trigram": gram, "label_id": label_id} for gram in grams],
+        )
+
+
+@event.listens_for(Label, "after_insert")
+def _index_inserted_label(
+    mapper: Mapper[Label], connection: Connection, target: Label
+) -> None:
+    index_label(connection, target.id, target.product_name)
+
+
+@event.listens_for(Label, "after_update")
+def _index_updated_label(
+    mapper: Mapper[Label], connection: Connection, target: Label
+) -> None:
+    if inspect(target).attrs.product_name.history.has_changes():
+        index_label(connection, target.id, target.product_name)
+
+
+def index_missing_labels() -> int:
+    """Index labels that have no trigram postings yet; returns how many."""
+    indexed = select(LabelTrigram.label_id).distinct()
+    stmt = select(Label.id, Label.product_name).where(Label.id.not_in(indexed))
+    rows = db.session.execute(stmt).all()
+    if not rows:
+        return 0
+    # Inserting in primary key order keeps B-tree writes sequential
+    postings = [
+        {"trigram": gram, "label_id": label_id}
+        for gram, label_id in sorted(
+            (gram, label_id)
+            for label_id, product_name in rows
+            for gram in name_trigrams(product_name)
+        )
+    ]
+    # Plain Core executemany: the ORM bulk path costs ~10x more per row here
+    db.session.connection().execute(insert(_TRIGRAM_TABLE), postings)
+    db.session.commit()
+    logger.info(f"Indexed trigrams for {len(rows)} labels")
+    return len(rows)
+
+
+# ── Lookups ───────────────────────────────────────────────────────────────────
+
+
+def find_similar_labels(
+    product_name: str,
+    form: str,
+    amount: float,
+    exclude_id: int | None = None,
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> list[SimilarLabelDict]:
+    """Find existing labels that look like duplicates of the given one.
+
+    Args:
+        product_name: Product name to compare.
+        form: Form short name; only labels of the same form are compared.
+        amount: Package amount; only labels of the same amount are compared.
+        exclude_id: Label id to leave out (the label itself after creation).
+        threshold: Minimum Dice similarity of the normalized names.
+
+    Returns:
+        Similar labels, most similar first.
+    """
+    grams = name_trigrams(product_name)
+    if not grams:
+        return []
+
+    shared = func.count().label("shared")
+    candidates = (
+        select(LabelTrigram.label_id)
+        .join(Label, Label.id == LabelTrigram.label_id)
+        .where(
+            LabelTrigram.trigram.in_(grams),
+            Label.form == form,
+            Label.amount == amount,
+        )
+        .group_by(LabelTrigram.label_id)
+        .having(shared >= _min_shared(len(grams), threshold))
+        .order_by(shared.desc())
+        .limit(MAX_CANDIDATES)
+    )
+    if exclude_id is not None:
+        candidates = candidates.where(LabelTrigram.label_id != exclude_id)
+    candidate_ids = list(db.session.execute(candidates).scalars())
+    if not candidate_ids:
+        return []
+
+    numbers = name_numbers(product_name)
+    similar: list[SimilarLabelDict] = []
+    for row in db.session.execute(
+        select_label_rows().where(Label.id.in_(candidate_ids))
+    ):
+        label = LabelRow(*row)
+        if name_numbers(label.product_name) != numbers:
+            continue
+        score = dice(grams, name_trigrams(label.product_name))
+        if score >= threshold:
+            similar.append(
+                SimilarLabelDict(**label.to_dict(), similarity=round(score, 3))
+            )
+    similar.sort(key=lambda item: item["similarity"], reverse=True)
+    return similar
+
+
+def find_duplicate_clusters(
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> list[DuplicateClusterDict]:
+    """Scan the whole catalogue for groups of near-duplicate labels.
+
+    Labels are first blocked by (form, amount, numbers) — only labels in the same
+    block can be duplicates — and compared pairwise inside each block.
+
+    Args:
+        threshold: Minimum Dice similarity of the normalized names.
+
+    Returns:
+        Clusters of two or more labels, largest first.
+    """
+    blocks: defaultdict[tuple[str, float, tuple[str, ...]], list[LabelRow]] = (
+        defaultdict(list)
+    )
+    for label in load_label_rows("name"):
+        blocks[(label.form, label.amount, name_numbers(label.product_name))].append(
+            label
+        )
+
+    clusters: list[DuplicateClusterDict] = []
+    for block in blocks.values():
+        if len(block) > 1:
+            clusters.extend(_cluster_block(block, threshold))
+    clusters.sort(key=lambda c: (-len(c["labels"]), c["labels"][0]["product_name"]))
+    return clusters
+
+
+def _cluster_block(
+    labels: list[LabelRow], threshold: float
+) -> Iterable[DuplicateClusterDict]:
+    """Single-linkage clustering of one block using union-find."""
+    grams = [name_trigrams(label.product_name) for label in labels]
+    parent = list(range(len(labels)))
+    weakest: dict[int, float] = {}
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Sorting by set size lets the length bound stop each inner loop early
+    order = sorted(range(len(labels)), key=lambda i: len(grams[i]))
+    for pos, i in enumerate(order):
+        for j in order[pos + 1 :]:
+            if len(grams[j]) > len(grams[i]) * (2 - threshold) / threshold:
+                break
+            score = dice(grams[i], grams[j])
+            if score < threshold:
+                continue
+            root_i, root_j = find(i), find(j)
+            if root_i == root_j:
+                continue
+            link = min(score, weakest.get(root_i, 1.0), weakest.get(root_j, 1.0))
+            parent[root_j] = root_i
+            weakest[root_i] = link
+
+    members: defaultdict[int, list[LabelRow]] = defaultdict(list)
+    for i, label in enumerate(labels):
+        members[find(i)].append(label)
+    for root, group in members.items():
+        if len(group) > 1:
+            yield DuplicateClusterDict(
+                similarity=round(weakest.get(root, 1.0), 3),
+                labels=[label.to_dict() for label in group],
+            )
@@ -0,0 +1,222 @@
+"""Set-based form rename and merge with label reassignment.
+
+``label.form`` references ``form.short_name`` without ON UPDATE CASCADE, so a
+short name that labels use cannot simply be changed, and moving labels to
+another form used to mean editing them one by one. Both operations here move
+all affected labels with one UPDATE inside the caller's write transaction
+(``app.write_queue.run_write``) and report how many labels they touched.
+
+Moved labels count as changed: their printed form text differs, so they get a
+new version, ``updated_at`` and a recomputed layout.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import TypedDict
+
+from sqlalchemy import and_, delete, func, select, text, true, update
+from sqlalchemy.orm import aliased
+
+from app.db import db
+from app.label_layout import refresh_layouts
+from app.models import Form, FormDict, Label, LabelArchive
+
+logger = logging.getLogger(__name__)
+
+# How merge_forms resolves labels that exist in both forms (same product name
+# and amount, which unique_label allows only once per form)
+MERGE_POLICIES = ("fail", "keep_target", "keep_source", "newest")
+
+
+class FormChangeDict(TypedDict):
+    """Result of a form rename or merge."""
+
+    form: FormDict
+    moved: int
+    deleted: int
+
+
+class MergeConflict(Exception):
+    """Labels of both forms collide and the merge policy is "fail"."""
+
+    def __init__(self, product_names: list[str]) -> None:
+        super().__init__(f"{len(product_names)} labels exist in both forms")
+        self.product_names = product_names
+
+
+@contextmanager
+def _deferred_foreign_keys() -> Iterator[None]:
+    """Check foreign keys at commit while a form and its labels disagree.
+
+    Switched off again before leaving, so the rest of the transaction (other
+    queued writes) is checked immediately as usual.
+    """
+    db.session.execute(text("PRAGMA defer_foreign_keys = ON"))
+    try:
+        yield
+    finally:
+        db.session.execute(text("PRAGMA defer_foreign_keys = OFF"))
+
+
+def _move_archived(old_short_name: str, short_name: str) -> None:
+    """Keep archived labels restorable (see app/label_archive.py)."""
+    db.session.execute(
+        update(LabelArchive)
+        .where(LabelArchive.form == old_short_name)
+        .values(form=short_name)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rename_form(name: str, short_name: str, unit: str) -> FormChangeDict | None:
+    """Change a form's short name and unit, moving its labels along.
+
+    Returns:
+        The updated form and how many labels were moved, or None when the
+        form does not exist.
+    """
+    form = db.session.get(Form, name)
+    if form is None:
+        return None
+    old_short_name, old_unit = form.short_name, form.unit
+    renamed = short_name != old_short_name
+
+    label_values: dict[str, object] = {}
+    if renamed:
+        label_values.update(form=short_name, version=Label.version + 1)
+    if label_values or unit != old_unit:
+        # Short name and unit are printed on the labels, so they count as changed
+        label_values["updated_at"] = datetime.now(UTC)
+
+    touched = 0
+    with _deferred_foreign_keys():
+        db.session.execute(
+            update(Form)
+            .where(Form.name == name)
+            .values(short_name=short_name, unit=unit)
+            .execution_options(synchronize_session=False)
+        )
+        if label_values:
+            result = db.session.execute(
+                update(Label)
+                .where(Label.form == old_short_name)
+                .values(label_values)
+                .execution_options(synchronize_session=False)
+            )
+            touched = int(result.rowcount)  # type: ignore[attr-defined]
+    if renamed:
+        _move_archived(old_short_name, short_name)
+    refresh_layouts(Label.form == short_name)
+
+    logger.info(f"Form {name}: {old_short_name} -> {short_name}, {touched} labels")
+    return FormChangeDict(
+        form=FormDict(name=name, short_name=short_name, unit=unit),
+        moved=touched if renamed else 0,
+        deleted=0,
+    )
+
+
+def merge_forms(
+    source_name: str, target_name: str, policy: str = "fail"
+) -> FormChangeDict | None:
+    """Move every label of the source form to the target form and delete the source.
+
+    A label that exists in both forms keeps one copy, chosen by policy:
+    "keep_target", "keep_source" or "newest" (last changed; the target on a
+    tie). The kept copy stays marked for printing if the dropped one was.
+
+    Returns:
+        The target form and the moved / deleted label counts, or None when
+        either form does not exist.
+
+    Raises:
+        MergeConflict: Labels collide and policy is "fail".
+        ValueError: Unknown policy, or source and target are the same form.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy: {policy}")
+    if source_name == target_name:
+        raise ValueError("Cannot merge a form into itself")
+    source = db.session.get(Form, source_name)
+    target = db.session.get(Form, target_name)
+    if source is None or target is None:
+        return None
+    target_dict = target.to_dict()
+
+    src, dst = aliased(Label), aliased(Label)
+    collisions = db.session.execute(
+        select(
+            src.id,
+            dst.id,
+            src.product_name,
+            src.marked_to_print,
+            dst.marked_to_print,
+            func.coalesce(src.updated_at, src.created_at)
+            > func.coalesce(dst.updated_at, dst.created_at),
+        )
+        .join(
+            dst,
+            and_(
+                dst.form == target.short_name,
+                dst.product_name == src.product_name,
+                dst.amount == src.amount,
+            ),
+        )
+        .where(src.form == source.short_name)
+    ).all()
+    if collisions and policy == "fail":
+        raise MergeConflict([row[2] for row in collisions])
+
+    losers: list[int] = []
+    inherit_mark: list[int] = []
+    for src_id, dst_id, _name, src_marked, dst_marked, src_newer in collisions:
+        keep_source = policy == "keep_source" or (policy == "newest" and src_newer)
+        winner, loser = (src_id, dst_id) if keep_source else (dst_id, src_id)
+        winner_marked, loser_marked = (
+            (src_marked, dst_marked) if keep_source else (dst_marked, src_marked)
+        )
+        losers.append(loser)
+        if loser_marked and not winner_marked:
+            inherit_mark.append(winner)
+
+    if inherit_mark:
+        db.session.execute(
+            update(Label)
+            .where(Label.id.in_(inherit_mark))
+            .values(marked_to_print=true(), version=Label.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    if losers:
+        db.session.execute(
+            delete(Label)
+            .where(Label.id.in_(losers))
+            .execution_options(synchronize_session=False)
+        )
+    result = db.session.execute(
+        update(Label)
+        .where(Label.form == source.short_name)
+        .values(
+            form=target.short_name,
+            version=Label.version + 1,
+            updated_at=datetime.now(UTC),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    moved = int(result.rowcount)  # type: ignore[attr-defined]
+    _move_archived(source.short_name, target.short_name)
+    db.session.execute(
+        delete(Form)
+        .where(Form.name == source_name)
+        .execution_options(synchronize_session=False)
+    )
+    refresh_layouts(Label.form == target.short_name)
+
+    logger.info(
+        f"Merged form {source_name} into {target_name} ({policy}): "
+        f"{moved} labels moved, {len(losers)} duplicates deleted"
+    )
+    return FormChangeDict(form=target_dict, moved=moved, deleted=len(losers))
@@ -0,0 +1,576 @@
+"""Supplier price files: watch folder and incremental ingestion.
+
+Suppliers send full price lists, but only a few rows change between two
+lists. Files dropped into ``INGEST_DIR`` (or passed to ``flask ingest``) are
+applied like this:
+
+- The SHA-256 of the file is recorded in ``ingest_file``; the same contents
+  are never applied twice, whatever the file is called.
+- Every row is keyed by label id, barcode, or product name + form + amount
+  (first available) and hashed over its amount and price. ``ingest_row`` keeps
+  the hash of the last applied row per key, so rows repeated from an earlier
+  list are skipped without comparing them to the catalogue.
+- The remaining rows are compared to the labels they match. Only real price or
+  amount changes are written, with one executemany UPDATE that also marks the
+  labels for printing; rows for products we do not stock are counted as
+  unmatched.
+
+A list of 20k rows with 200 changes therefore writes 200 labels. Each file gets
+a report (``IngestReportDict``), saved as JSON in ``reports/`` of the watch
+folder. Rows changed by hand in LabelMaker keep their value until the supplier
+changes that row again.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple, TypedDict
+
+import click
+from flask import Flask
+from sqlalchemy import bindparam, insert, select, true, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.barcodes import normalize_barcode
+from app.db import db
+from app.label_layout import refresh_layouts
+from app.models import IngestedFile, IngestRow, Label
+from app.utils import calculate_unit_price
+from app.write_queue import run_write
+
+logger = logging.getLogger(__name__)
+
+INGEST_SUFFIXES = (".csv", ".json")
+INGEST_POLL_SECONDS = 30.0
+# Files modified more recently may still be being copied into the folder
+INGEST_SETTLE_SECONDS = 5.0
+REPORT_DIR_NAME = "reports"
+MAX_REPORTED_ERRORS = 100
+
+# Keys per IN (...) lookup of stored row hashes
+_KEY_CHUNK = 500
+
+_label_table = Label.__table__
+_row_table = IngestRow.__table__
+
+_APPLY_CHANGE = (
+    update(_label_table)
+    .where(_label_table.c.id == bindparam("b_id"))
+    .values(
+        amount=bindparam("b_amount"),
+        price=bindparam("b_price"),
+        unit_price=bindparam("b_unit_price"),
+        marked_to_print=true(),
+        updated_at=bindparam("b_updated_at"),
+        version=_label_table.c.version + 1,
+    )
+)
+
+_upsert = sqlite_insert(_row_table)
+_STORE_HASH = _upsert.on_conflict_do_update(
+    index_elements=[_row_table.c.row_key],
+    set_={"content_hash": _upsert.excluded.content_hash},
+)
+
+# Errors that fail a single file; the watcher logs them and moves on
+INGEST_ERRORS = (OSError, ValueError, csv.Error, SQLAlchemyError)
+
+
+class IngestReportDict(TypedDict):
+    """Outcome of ingesting one price file."""
+
+    file: str
+    sha256: str
+    ingested_at: str
+    rows: int
+    seen: int
+    unchanged: int
+    updated: int
+    unmatched: int
+    conflicts: int
+    invalid: int
+    label_ids: list[int]
+    errors: list[str]
+
+
+class PriceRow(NamedTuple):
+    """A validated price-file row."""
+
+    record: int
+    key: str
+    label_id: int | None
+    barcode: str | None
+    product_name: str
+    form: str
+    amount: float
+    price: float
+    content_hash: str
+
+
+@dataclass(slots=True)
+class _LabelState:
+    id: int
+    product_name: str
+    form: str
+    amount: float
+    price: float
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+
+
+def read_records(path: Path) -> list[dict[str, Any]]:
+    """Read the rows of a CSV or JSON label file as dicts.
+
+    CSV needs a header row; the delimiter is detected ("," ";" or tab). JSON
+    may be a list of objects or the ``{"labels": [...]}`` payload of
+    ``GET /labels/api/labels``.
+
+    Raises:
+        ValueError: Malformed JSON or an unexpected JSON structure.
+        csv.Error: The CSV delimiter cannot be detected.
+    """
+    if path.suffix.lower() == ".json":
+        data = json.loads(path.read_text(encoding="utf-8-sig"))
+        records = data.get("labels") if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            raise ValueError("JSON must be a list of labels or {'labels': [...]}")
+        return records
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        # Excel exports use ";" in Czech locales
+        dialect = csv.Sniffer().sniff(f.read(4096), delimiters=",;\t")
+        f.seek(0)
+        return list(csv.DictReader(f, dialect=dialect))
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents, as hex."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _number(record: dict[str, Any], field: str) -> float:
+    raw = record.get(field)
+    text = str(raw if raw is not None else "").strip()
+    if not text:
+        raise ValueError(f"missing {field}")
+    try:
+        # "1 234,50" from Czech spreadsheets
+        value = float(text.replace("\xa0", "").replace(" ", "").replace(",", "."))
+    except ValueError:
+        raise ValueError(f"invalid {field} {text!r}") from None
+    if not math.isfinite(value):
+        raise ValueError(f"invalid {field} {text!r}")
+    return value
+
+
+def _label_id(record: dict[str, Any]) -> int | None:
+    raw = str(record.get("id") or "").strip()
+    if not raw:
+        return None
+    if not raw.isdigit():
+        raise ValueError(f"invalid id {raw!r}")
+    return int(raw)
+
+
+def parse_row(record: dict[str, Any], number: int) -> PriceRow:
+    """Validate one price-file row.
+
+    Raises:
+        ValueError: A missing or invalid value, or no way to find the label.
+    """
+    amount = _number(record, "amount")
+    price = _number(record, "price")
+    if amount <= 0:
+        raise ValueError("amount must be greater than 0")
+    if price < 0:
+        raise ValueError("price must not be negative")
+    label_id = _label_id(record)
+    barcode = normalize_barcode(record.get("barcode"))
+    product_name = str(record.get("product_name") or "").strip()
+    form = str(record.get("form") or "").strip()
+    if label_id is not None:
+        key = f"id:{label_id}"
+    elif barcode is not None:
+        key = f"ean:{barcode}"
+    elif product_name and form:
+        key = f"name:{product_name}\x1f{form}\x1f{amount!r}"
+    else:
+        raise ValueError("needs id, barcode, or product_name and form")
+    content_hash = hashlib.blake2b(
+        f"{amount!r}\x1f{price!r}".encode(), digest_size=16
+    ).hexdigest()
+    return PriceRow(
+        number,
+        key,
+        label_id,
+        barcode,
+        product_name,
+        form,
+        amount,
+        price,
+        content_hash,
+    )
+
+
+def parse_rows(
+    records: Iterable[dict[str, Any]],
+) -> tuple[list[PriceRow], list[str]]:
+    """Validate rows; returns (valid rows, one error message per invalid row).
+
+    A later row with the key of an earlier one is invalid.
+    """
+    rows: list[PriceRow] = []
+    errors: list[str] = []
+    first_record: dict[str, int] = {}
+    for number, record in enumerate(records, 1):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("not an object")
+            row = parse_row(record, number)
+        except ValueError as e:
+            errors.append(f"Record {number}: {e}")
+            continue
+        if row.key in first_record:
+            errors.append(
+                f"Record {number}: same label as record {first_record[row.key]}"
+            )
+            continue
+        first_record[row.key] = number
+        rows.append(row)
+    return rows, errors
+
+
+# ── Applying ──────────────────────────────────────────────────────────────────
+
+
+def _stored_hashes(keys: Sequence[str]) -> dict[str, str]:
+    stored: dict[str, str] = {}
+    for start in range(0, len(keys), _KEY_CHUNK):
+        chunk = keys[start : start + _KEY_CHUNK]
+        for row_key, content_hash in db.session.execute(
+            select(IngestRow.row_key, IngestRow.content_hash).where(
+                IngestRow.row_key.in_(chunk)
+            )
+        ):
+            stored[row_key] = content_hash
+    return stored
+
+
+def is_ingested(digest: str) -> bool:
+    """Whether a file with this SHA-256 was applied before."""
+    found = db.session.scalar(
+        select(IngestedFile.id).where(IngestedFile.sha256 == digest)
+    )
+    return found is not None
+
+
+def apply_rows(
+    name: str, digest: str, rows: Sequence[PriceRow], errors: Sequence[str]
+) -> IngestReportDict | None:
+    """Apply parsed rows of one file in the current write transaction.
+
+    Returns:
+        The file's report, or None when its contents were applied before.
+    """
+    if is_ingested(digest):
+        return None
+    now = datetime.now(UTC)
+    stored = _stored_hashes([row.key for row in rows])
+    candidates = [row for row in rows if stored.get(row.key) != row.content_hash]
+
+    states: dict[int, _LabelState] = {}
+    by_barcode: dict[str, list[int]] = {}
+    by_name: dict[tuple[str, str, float], int] = {}
+    if candidates:
+        for label_id, barcode, product_name, form, amount, price in db.session.execute(
+            select(
+                Label.id,
+                Label.barcode,
+                Label.product_name,
+                Label.form,
+                Label.amount,
+                Label.price,
+            )
+        ):
+            states[label_id] = _LabelState(label_id, product_name, form, amount, price)
+            if barcode:
+                by_barcode.setdefault(barcode, []).append(label_id)
+            by_name[(product_name, form, amount)] = label_id
+
+    messages = list(errors)
+    changes: dict[int, dict[str, Any]] = {}
+    hashes: list[dict[str, str]] = []
+    unchanged = unmatched = conflicts = 0
+    for row in candidates:
+        if row.label_id is not None:
+            label = states.get(row.label_id)
+        elif row.barcode is not None:
+            matches = by_barcode.get(row.barcode, [])
+            if len(matches) > 1:
+                conflicts += 1
+                messages.append(
+                    f"Record {row.record}: barcode {row.barcode} is on "
+                    f"{len(matches)} labels"
+                )
+                continue
+            label = states[matches[0]] if matches else None
+        else:
+            label_id = by_name.get((row.product_name, row.form, row.amount))
+            label = states[label_id] if label_id is not None else None
+        if label is None:
+            unmatched += 1
+            continue
+
+        if row.amount == label.amount and row.price == label.price:
+            unchanged += 1
+            hashes.append({"row_key": row.key, "content_hash": row.content_hash})
+            continue
+        if row.amount != label.amount:
+            taken = by_name.get((label.product_name, label.form, row.amount))
+            if taken is not None and taken != label.id:
+                # Unique (product_name, form, amount); not hashed, so retried
+                conflicts += 1
+                messages.append(
+                    f"Record {row.record}: label {label.id} cannot get amount "
+                    f"{row.amount:g}, label {taken} already has it"
+                )
+                continue
+            del by_name[(label.product_name, label.form, label.amount)]
+            by_name[(label.product_name, label.form, row.amount)] = label.id
+        label.amount, label.price = row.amount, row.price
+        changes[label.id] = {
+            "b_id": label.id,
+            "b_amount": row.amount,
+            "b_price": row.price,
+            "b_unit_price": calculate_unit_price(row.amount, row.price),
+            "b_updated_at": now,
+        }
+        hashes.append({"row_key": row.key, "content_hash": row.content_hash})
+
+    label_ids = sorted(changes)
+    if changes:
+        db.session.execute(_APPLY_CHANGE, list(changes.values()))
+        refresh_layouts(Label.id.in_(label_ids))
+    if hashes:
+        db.session.execute(_STORE_HASH, hashes)
+
+    report = IngestReportDict(
+        file=name,
+        sha256=digest,
+        ingested_at=now.isoformat(timespec="seconds"),
+        rows=len(rows) + len(errors),
+        seen=len(rows) - len(candidates),
+        unchanged=unchanged,
+        updated=len(label_ids),
+        unmatched=unmatched,
+        conflicts=conflicts,
+        invalid=len(errors),
+        label_ids=label_ids,
+        errors=messages[:MAX_REPORTED_ERRORS],
+    )
+    db.session.execute(
+        insert(IngestedFile).values(
+            sha256=digest,
+            name=name,
+            ingested_at=now,
+            rows=report["rows"],
+            seen=report["seen"],
+            unchanged=unchanged,
+            updated=report["updated"],
+            unmatched=unmatched,
+            conflicts=conflicts,
+            invalid=report["invalid"],
+        )
+    )
+    return report
+
+
+def ingest_file(path: Path) -> IngestReportDict | None:
+    """Apply a price file; None when the same contents were applied before.
+
+    Raises:
+        OSError, ValueError, csv.Error: The file cannot be read.
+        SQLAlchemyError: The write failed.
+    """
+    digest = file_digest(path)
+    if is_ingested(digest):
+        logger.info(f"Price file {path.name} was already ingested, skipping")
+        return None
+    rows, errors = parse_rows(read_records(path))
+    report = run_write(lambda: apply_rows(path.name, digest, rows, errors))
+    if report is not None:
+        logger.info(f"Ingested {path.name}: {summarize(report)}")
+    return report
+
+
+def summarize(report: IngestReportDict) -> str:
+    """One-line summary of a report."""
+    return (
+        f"{report['rows']} rows, {report['updated']} updated, "
+        f"{report['unchanged']} unchanged, {report['seen']} seen before, "
+        f"{report['unmatched']} unmatched, {report['conflicts']} conflicts, "
+        f"{report['invalid']} invalid"
+    )
+
+
+def write_report(report_dir: Path, report: IngestReportDict) -> Path:
+    """Save a report as ``<file stem>-<timestamp>.json``; returns its path."""
+    report_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.fromisoformat(report["ingested_at"]).strftime("%Y%m%d-%H%M%S")
+    path = report_dir / f"{Path(report['file']).stem}-{stamp}.json"
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+# ── Watch folder ──────────────────────────────────────────────────────────────
+
+
+def pending_files(directory: Path) -> list[Path]:
+    """Price files directly in directory, oldest first."""
+    if not directory.is_dir():
+        return []
+    files = [
+        path
+        for path in directory.iterdir()
+        if path.suffix.lower() in INGEST_SUFFIXES
+        and path.is_file()
+        # Office lock files and hidden files
+        and not path.name.startswith(("~$", "."))
+    ]
+    return sorted(files, key=lambda path: path.stat().st_mtime)
+
+
+class IngestWatcher:
+    """Polls a directory for new price files on a daemon thread."""
+
+    def __init__(
+        self,
+        app: Flask,
+        directory: Path,
+        poll_seconds: float = INGEST_POLL_SECONDS,
+        settle_seconds: float = INGEST_SETTLE_SECONDS,
+    ) -> None:
+        self.app = app
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        # (size, mtime) of files already handled, so they are hashed only once
+        self._handled: dict[Path, tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def report_dir(self) -> Path:
+        return self.directory / REPORT_DIR_NAME
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="price-ingest", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching; a file being applied finishes first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def scan_now(self) -> list[IngestReportDict]:
+        """Apply new or changed files in the directory; failures are logged."""
+        reports: list[IngestReportDict] = []
+        with self._lock:
+            for path in pending_files(self.directory):
+                stat = path.stat()
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self._handled.get(path) == signature:
+                    continue
+                if time.time() - stat.st_mtime < self.settle_seconds:
+                    continue
+                try:
+                    with self.app.app_context():
+                        report = ingest_file(path)
+                except (ValueError, csv.Error) as e:
+                    # The file itself is broken; wait until it is replaced
+                    self._handled[path] = signature
+                    logger.error(
+                        f"Ingesting price file {path.name} failed: {e}", exc_info=True
+                    )
+                    continue
+                except (OSError, SQLAlchemyError) as e:
+                    # E.g. a locked database: retried on the next poll, which
+                    # is safe because applied files are recognized by hash
+                    logger.error(
+                        f"Ingesting price file {path.name} failed, will retry: {e}",
+                        exc_info=True,
+                    )
+                    continue
+                self._handled[path] = signature
+                if report is not None:
+                    try:
+                        write_report(self.report_dir, report)
+                    except OSError as e:
+                        logger.error(f"Writing report for {path.name} failed: {e}")
+                    reports.append(report)
+        return reports
+
+    def _run(self) -> None:
+        while True:
+            self.scan_now()
+            if self._stop.wait(self.poll_seconds):
+                return
+
+
+def create_watcher(app: Flask) -> IngestWatcher | None:
+    """Watch folder configured for app, or None when INGEST_DIR is not set."""
+    configured = app.config.get("INGEST_DIR") or ""
+    if not configured:
+        return None
+    directory = Path(configured)
+    directory.mkdir(parents=True, exist_ok=True)
+    return IngestWatcher(
+        app,
+        directory,
+        poll_seconds=float(app.config.get("INGEST_POLL_SECONDS", INGEST_POLL_SECONDS)),
+    )
+
+
+def init_ingest(app: Flask) -> None:
+    """Register the ``flask ingest`` CLI command."""
+
+    @click.command("ingest")
+    @click.argument(
+        "paths",
+        nargs=-1,
+        required=True,
+        type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    )
+    def ingest_command(paths: tuple[Path, ...]) -> None:
+        """Apply supplier price files now, like dropping them in INGEST_DIR."""
+        for path in paths:
+            try:
+                report = ingest_file(path)
+            except INGEST_ERRORS as e:
+                raise click.ClickException(f"{path.name}: {e}") from e
+            if report is None:
+                click.echo(f"{path.name}: already ingested, skipped.")
+                continue
+            click.echo(f"{path.name}: {summarize(report)}.")
+            for message in report["errors"]:
+                click.echo(f"  {message}")
+
+    app.cli.add_command(ingest_command)
@@ -0,0 +1,80 @@
+"""Pluggable JSON provider backed by a faster encoder when available.
+
+``orjson`` is an optional dependency. When it is installed, ``jsonify`` and
+``current_app.json`` serialize through it; otherwise the standard library encoder
+is used exactly as Flask does by default. The encoder can be forced with the
+``JSON_ENCODER`` config key ('auto', 'orjson' or 'stdlib').
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+
+from flask.json.provider import DefaultJSONProvider
+
+if TYPE_CHECKING:
+    from flask import Flask, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider that encodes with orjson when it is available."""
+
+    def __init__(self, app: Flask, use_orjson: bool | None = None) -> None:
+        super().__init__(app)
+        if use_orjson is None:
+            use_orjson = orjson is not None
+        if use_orjson and orjson is None:
+            logger.warning("orjson requested but not installed, using stdlib json")
+            use_orjson = False
+        self.use_orjson = use_orjson
+
+    def _orjson_options(self, indent: bool) -> int:
+        assert orjson is not None
+        # Datetimes go through self.default so output matches Flask's encoder
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """Serialize obj to UTF-8 JSON bytes without an intermediate str."""
+        if self.use_orjson:
+            assert orjson is not None
+            return orjson.dumps(
+                obj, default=self.default, option=self._orjson_options(indent)
+            )
+        if indent:
+            return self.dumps(obj, indent=2).encode()
+        return self.dumps(obj, separators=(",", ":")).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.use_orjson and not kwargs.keys() - {"indent", "separators"}:
+            return self.dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        response: Response = self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
+        return response
+
+
+def init_json_provider(app: Flask) -> None:
+    """Install FastJSONProvider according to the JSON_ENCODER config key."""
+    choice = str(app.config.get("JSON_ENCODER", "auto")).lower()
+    use_orjson = {"orjson": True, "stdlib": False}.get(choice)
+    provider = FastJSONProvider(app, use_orjson=use_orjson)
+    app.json = provider
+    logger.info("JSON provider: %s", "orjson" if provider.use_orjson else "stdlib json")
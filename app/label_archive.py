@@ -0,0 +1,316 @@
+"""Bulk delete, cold archive and restore of labels.
+
+Discontinued products stay in ``label`` forever otherwise, and every list,
+search and print query pays for them. Bulk operations select labels by ids and
+/ or a filter (see ``parse_selection``) and act on all of them with set-based
+statements inside one write transaction (``app.write_queue.run_write``):
+
+- delete: one ``DELETE``; triggers and foreign keys drop the search and
+  trigram index entries.
+- archive: ``INSERT INTO label_archive ... SELECT`` followed by a ``DELETE`` with
+  the same condition. Labels marked for printing are never archived.
+- restore: one ``INSERT INTO label ... SELECT`` from the archive, then the
+  archive rows are deleted. Labels get their old id back when it is still free.
+
+``label_archive`` only keeps what is needed to restore a label; layouts and
+index entries are rebuilt on restore. Archived labels are searched with a plain
+substring match, which is fine for a table that is rarely queried.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import UTC, datetime
+from typing import Any, Literal, TypedDict
+
+from sqlalchemy import (
+    DateTime,
+    and_,
+    case,
+    delete,
+    exists,
+    false,
+    func,
+    insert,
+    literal,
+    not_,
+    null,
+    or_,
+    select,
+)
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db import db
+from app.duplicates import index_label
+from app.label_layout import refresh_layouts
+from app.models import ArchivedLabelDict, Form, Label, LabelArchive
+from app.search import query_terms
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on ids per request; SQLite binds each id as its own parameter
+MAX_BULK_IDS = 10000
+ARCHIVE_SEARCH_LIMIT_DEFAULT = 50
+ARCHIVE_SEARCH_LIMIT_MAX = 500
+
+# Columns copied between label and label_archive
+_COPIED_COLUMNS = (
+    "product_name",
+    "form",
+    "amount",
+    "price",
+    "unit_price",
+    "barcode",
+    "created_at",
+    "updated_at",
+    "printed_price",
+    "printed_amount",
+    "printed_form",
+    "printed_unit",
+    "printed_at",
+)
+
+SkipReason = Literal["not_found", "form_missing", "exists"]
+
+
+class SkippedRestoreDict(TypedDict):
+    """An archived label that was not restored, and why."""
+
+    id: int
+    reason: SkipReason
+
+
+class RestoreResultDict(TypedDict):
+    """Result of restore_labels()."""
+
+    restored: int
+    label_ids: list[int]
+    skipped: list[SkippedRestoreDict]
+
+
+def parse_ids(value: Any, field: str = "ids") -> list[int]:
+    """Validate a JSON list of row ids.
+
+    Raises:
+        ValueError: Not a non-empty list of at most MAX_BULK_IDS integers.
+    """
+    if (
+        not isinstance(value, list)
+        or not value
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in value)
+    ):
+        raise ValueError(f"{field} must be a non-empty list of ids")
+    if len(value) > MAX_BULK_IDS:
+        raise ValueError(f"{field} may list at most {MAX_BULK_IDS} ids")
+    return value
+
+
+def _parse_date(data: dict[str, Any], field: str) -> datetime | None:
+    value = data.get(field)
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{field} must be an ISO date, e.g. 2025-01-31") from None
+    if parsed.tzinfo is not None:
+        # Stored timestamps are UTC without an offset
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed
+
+
+def parse_selection(data: dict[str, Any]) -> ColumnElement[bool]:
+    """Build the label condition of a bulk operation from its JSON body.
+
+    All given criteria must match:
+
+    - ``ids``: list of label ids
+    - ``form``: form short name
+    - ``not_updated_since``: ISO date; labels whose printed values have not
+      changed since then
+    - ``not_printed_since``: ISO date; labels not printed since then (or never)
+
+    Raises:
+        ValueError: No criteria, or a malformed one.
+    """
+    clauses: list[ColumnElement[bool]] = []
+    if data.get("ids") is not None:
+        clauses.append(Label.id.in_(parse_ids(data["ids"])))
+    form = data.get("form")
+    if form is not None:
+        if not isinstance(form, str) or not form.strip():
+            raise ValueError("form must be a form short name")
+        clauses.append(Label.form == form.strip())
+    updated_before = _parse_date(data, "not_updated_since")
+    if updated_before is not None:
+        clauses.append(
+            func.coalesce(Label.updated_at, Label.created_at) < updated_before
+        )
+    printed_before = _parse_date(data, "not_printed_since")
+    if printed_before is not None:
+        clauses.append(
+            or_(Label.printed_at.is_(None), Label.printed_at < printed_before)
+        )
+    if not clauses:
+        raise ValueError("Specify ids, form, not_updated_since or not_printed_since")
+    return and_(*clauses)
+
+
+def delete_labels(selection: ColumnElement[bool]) -> int:
+    """Delete the selected labels with one statement; returns how many."""
+    result = db.session.execute(
+        delete(Label).where(selection).execution_options(synchronize_session=False)
+    )
+    count = int(result.rowcount)  # type: ignore[attr-defined]
+    logger.info(f"Deleted {count} labels")
+    return count
+
+
+def archive_labels(selection: ColumnElement[bool]) -> int:
+    """Move the selected labels that are not marked for printing to the archive.
+
+    Returns:
+        Number of archived labels.
+    """
+    selection = and_(selection, not_(func.coalesce(Label.marked_to_print, false())))
+    archived_at = literal(datetime.now(UTC), DateTime)
+    db.session.execute(
+        insert(LabelArchive).from_select(
+            ["label_id", *_COPIED_COLUMNS, "version", "archived_at"],
+            select(
+                Label.id,
+                *(getattr(Label, name) for name in _COPIED_COLUMNS),
+                Label.version,
+                archived_at,
+            ).where(selection),
+        )
+    )
+    # Same condition in the same write transaction: exactly the copied rows
+    result = db.session.execute(
+        delete(Label).where(selection).execution_options(synchronize_session=False)
+    )
+    count = int(result.rowcount)  # type: ignore[attr-defined]
+    logger.info(f"Archived {count} labels")
+    return count
+
+
+def restore_labels(archive_ids: list[int]) -> RestoreResultDict:
+    """Move archived labels back to the label table.
+
+    A label is skipped when its form no longer exists or an equal label
+    (product name, form, amount) exists again; of several archived copies of
+    the same label only the newest is restored. Restored labels get a new
+    version, so clients holding the archived one cannot overwrite them.
+    """
+    candidates = db.session.execute(
+        select(
+            LabelArchive.id,
+            LabelArchive.label_id,
+            LabelArchive.product_name,
+            LabelArchive.form,
+            LabelArchive.amount,
+            exists().where(Form.short_name == LabelArchive.form),
+            exists().where(
+                Label.product_name == LabelArchive.product_name,
+                Label.form == LabelArchive.form,
+                Label.amount == LabelArchive.amount,
+            ),
+        )
+        .where(LabelArchive.id.in_(archive_ids))
+        .order_by(LabelArchive.id.desc())
+    ).all()
+
+    found = {row[0] for row in candidates}
+    skipped = [
+        SkippedRestoreDict(id=archive_id, reason="not_found")
+        for archive_id in dict.fromkeys(archive_ids)
+        if archive_id not in found
+    ]
+    taken_ids = set(
+        db.session.scalars(
+            select(Label.id).where(Label.id.in_({row[1] for row in candidates}))
+        )
+    )
+    eligible: list[int] = []
+    keep_id: list[int] = []
+    keys: set[tuple[str, str, float]] = set()
+    for archive_id, label_id, name, form, amount, form_exists, equal in candidates:
+        if not form_exists:
+            skipped.append(SkippedRestoreDict(id=archive_id, reason="form_missing"))
+        elif equal or (name, form, amount) in keys:
+            skipped.append(SkippedRestoreDict(id=archive_id, reason="exists"))
+        else:
+            keys.add((name, form, amount))
+            eligible.append(archive_id)
+            if label_id not in taken_ids:
+                taken_ids.add(label_id)
+                keep_id.append(archive_id)
+
+    label_ids: list[int] = []
+    if eligible:
+        rows = db.session.execute(
+            insert(Label)
+            .from_select(
+                ["id", *_COPIED_COLUMNS, "version"],
+                select(
+                    # NULL lets SQLite assign a new id when the old one is taken
+                    case(
+                        (LabelArchive.id.in_(keep_id), LabelArchive.label_id),
+                        else_=null(),
+                    ),
+                    *(getattr(LabelArchive, name) for name in _COPIED_COLUMNS),
+                    LabelArchive.version + 1,
+                ).where(LabelArchive.id.in_(eligible)),
+            )
+            .returning(Label.id, Label.product_name)
+        ).all()
+        db.session.execute(
+            delete(LabelArchive)
+            .where(LabelArchive.id.in_(eligible))
+            .execution_options(synchronize_session=False)
+        )
+        # Set-based inserts skip the ORM events that maintain the trigram index
+        connection = db.session.connection()
+        for label_id, product_name in rows:
+            index_label(connection, label_id, product_name)
+        label_ids = sorted(label_id for label_id, _name in rows)
+        refresh_layouts(Label.id.in_(label_ids))
+
+    logger.info(f"Restored {len(label_ids)} labels, skipped {len(skipped)}")
+    return RestoreResultDict(
+        restored=len(label_ids), label_ids=label_ids, skipped=skipped
+    )
+
+
+def purge_archived(archive_ids: list[int]) -> int:
+    """Delete archived labels for good; returns how many."""
+    result = db.session.execute(
+        delete(LabelArchive)
+        .where(LabelArchive.id.in_(archive_ids))
+        .execution_options(synchronize_session=False)
+    )
+    count = int(result.rowcount)  # type: ignore[attr-defined]
+    logger.info(f"Purged {count} archived labels")
+    return count
+
+
+def count_archived() -> int:
+    """Number of labels in the archive."""
+    count: int = db.session.execute(
+        select(func.count()).select_from(LabelArchive)
+    ).scalar_one()
+    return count
+
+
+def search_archive(
+    query: str = "", limit: int = ARCHIVE_SEARCH_LIMIT_DEFAULT
+) -> list[ArchivedLabelDict]:
+    """Archived labels whose product name contains every query word.
+
+    Without query words the most recently archived labels are returned.
+    """
+    stmt = select(LabelArchive)
+    for term in query_terms(query):
+        stmt = stmt.where(LabelArchive.product_name.icontains(term, autoescape=True))
+    stmt = stmt.order_by(LabelArchive.archived_at.desc(), LabelArchive.id.desc())
+    return [label.to_dict() for label in db.session.scalars(stmt.limit(limit))]
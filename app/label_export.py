@@ -0,0 +1,314 @@
+"""Streaming CSV and XLSX export of the label catalogue.
+
+Exports read labels with ``yield_per`` in chunks of ``EXPORT_CHUNK_ROWS`` and
+encode each chunk as soon as it arrives, so memory use does not grow with the
+catalogue and the download starts before the last row is read. They accept the
+same sort key, print filter and search query as the label list.
+
+CSV uses ";" and decimal commas like Czech Excel, and is readable by
+``render_batch.py --input``. XLSX is written directly as a zip stream of
+SpreadsheetML with inline strings: spreadsheet libraries would hold the whole
+workbook (or a temporary file) before sending the first byte.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import re
+import zipfile
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+from xml.sax.saxutils import escape
+
+from sqlalchemy import Row, Select, String, false, func, not_, select, type_coerce
+
+from app.db import db
+from app.label_snapshot import DEFAULT_UNIT, sort_order
+from app.models import Form, Label
+from app.search import search_condition
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_ROWS = 1000
+
+# Format -> mimetype
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+PRINT_FILTERS = ("all", "marked", "unmarked")
+
+EXPORT_COLUMNS = (
+    "id",
+    "product_name",
+    "form",
+    "unit",
+    "amount",
+    "price",
+    "unit_price",
+    "barcode",
+    "marked_to_print",
+    "created_at",
+)
+
+
+def select_export_rows(
+    sort_by: str = "name", print_filter: str = "all", query: str = ""
+) -> Select[Any]:
+    """SELECT of the exported columns, filtered and sorted like the list.
+
+    Args:
+        sort_by: List sort key ('name', 'date' or 'marked').
+        print_filter: 'all', 'marked' or 'unmarked'.
+        query: Search text; every word must match the product name.
+    """
+    stmt = (
+        select(
+            Label.id,
+            Label.product_name,
+            Label.form,
+            func.coalesce(Form.unit, DEFAULT_UNIT),
+            Label.amount,
+            Label.price,
+            Label.unit_price,
+            Label.barcode,
+            func.coalesce(Label.marked_to_print, false()),
+            # Raw stored text, shortened to seconds below
+            type_coerce(Label.created_at, String),
+        )
+        .outerjoin(Form, Form.short_name == Label.form)
+        .order_by(*sort_order(sort_by))
+    )
+    if print_filter == "marked":
+        stmt = stmt.where(Label.marked_to_print.is_(True))
+    elif print_filter == "unmarked":
+        stmt = stmt.where(not_(func.coalesce(Label.marked_to_print, false())))
+    if query.strip():
+        condition = search_condition(query)
+        if condition is not None:
+            stmt = stmt.where(condition)
+    return stmt
+
+
+def iter_export_chunks(
+    stmt: Select[Any], chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[Sequence[Row[Any]]]:
+    """Run stmt and yield its rows in chunks of at most chunk_rows."""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_rows))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+# ── CSV ───────────────────────────────────────────────────────────────────────
+
+
+def _czech_number(value: float | None) -> str:
+    if value is None:
+        return ""
+    text = repr(value)
+    if text.endswith(".0"):
+        text = text[:-2]
+    return text.replace(".", ",")
+
+
+def _csv_row(row: Row[Any]) -> tuple[Any, ...]:
+    label_id, name, form, unit, amount, price, unit_price, barcode, marked, created = (
+        tuple(row)
+    )
+    return (
+        label_id,
+        name,
+        form,
+        unit,
+        _czech_number(amount),
+        _czech_number(price),
+        _czech_number(unit_price),
+        barcode or "",
+        int(bool(marked)),
+        (created or "")[:19],
+    )
+
+
+def stream_csv(chunks: Iterable[Sequence[Row[Any]]]) -> Iterator[bytes]:
+    """Encode rows as CSV, one bytes chunk per row chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\r\n")
+    # The BOM makes Excel read the file as UTF-8
+    writer.writerow(EXPORT_COLUMNS)
+    yield ("\ufeff" + buffer.getvalue()).encode()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_csv_row(row) for row in chunk)
+        yield buffer.getvalue().encode()
+
+
+# ── XLSX ──────────────────────────────────────────────────────────────────────
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Cenovky" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/styles" Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    # Cell styles: 0 default, 1 bold header, 2 prices with two decimals
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border>'
+        "</borders>"
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+        "</cellStyleXfs>"
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+        '<xf numFmtId="2" fontId="0" fillId="0" borderId="0" xfId="0" '
+        'applyNumberFormat="1"/></cellXfs>'
+        "</styleSheet>"
+    ),
+}
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    "</sheetView></sheetViews>"
+    '<cols><col min="1" max="1" width="8" customWidth="1"/>'
+    '<col min="2" max="2" width="40" customWidth="1"/>'
+    '<col min="10" max="10" width="20" customWidth="1"/></cols>'
+    "<sheetData>"
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _text_cell(value: str | None, style: int = 0) -> str:
+    if not value:
+        return "<c/>"
+    text = escape(_INVALID_XML_RE.sub("", value))
+    attrs = f' s="{style}"' if style else ""
+    return f'<c t="inlineStr"{attrs}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _number_cell(value: float | None, style: int = 0) -> str:
+    if value is None:
+        return "<c/>"
+    attrs = f' s="{style}"' if style else ""
+    return f"<c{attrs}><v>{value!r}</v></c>"
+
+
+def _xlsx_row(row: Row[Any]) -> str:
+    label_id, name, form, unit, amount, price, unit_price, barcode, marked, created = (
+        tuple(row)
+    )
+    return (
+        "<row>"
+        f"<c><v>{label_id}</v></c>"
+        f"{_text_cell(name)}{_text_cell(form)}{_text_cell(unit)}"
+        f"{_number_cell(amount)}{_number_cell(price, 2)}{_number_cell(unit_price, 2)}"
+        f"{_text_cell(barcode)}"
+        f'<c t="b"><v>{int(bool(marked))}</v></c>'
+        f"{_text_cell((created or '')[:19])}"
+        "</row>"
+    )
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the zip writer produces."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_xlsx(chunks: Iterable[Sequence[Row[Any]]]) -> Iterator[bytes]:
+    """Encode rows as a one-sheet XLSX workbook, streamed as it is zipped."""
+    sink = _ChunkSink()
+    # Not seekable: zipfile writes sizes in data descriptors after each part
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:  # type: ignore[call-overload]
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            header = "".join(_text_cell(column, 1) for column in EXPORT_COLUMNS)
+            sheet.write(f"{_SHEET_HEAD}<row>{header}</row>".encode())
+            yield sink.drain()
+            for chunk in chunks:
+                sheet.write("".join(_xlsx_row(row) for row in chunk).encode())
+                data = sink.drain()
+                if data:
+                    yield data
+            sheet.write(_SHEET_TAIL.encode())
+    yield sink.drain()
+
+
+def stream_export(fmt: str, stmt: Select[Any]) -> Iterator[bytes]:
+    """Stream the rows of stmt (see select_export_rows) in the given format."""
+    encode = stream_xlsx if fmt == "xlsx" else stream_csv
+    rows = 0
+
+    def counted() -> Iterator[Sequence[Row[Any]]]:
+        nonlocal rows
+        for chunk in iter_export_chunks(stmt):
+            rows += len(chunk)
+            yield chunk
+
+    try:
+        yield from encode(counted())
+    except Exception as e:
+        # Headers are already sent; the client sees a truncated download
+        logger.error(f"Export ({fmt}) failed after {rows} rows: {e}", exc_info=True)
+        raise
+    logger.info(f"Exported {rows} labels as {fmt}")
@@ -0,0 +1,170 @@
+"""Storage of precomputed PDF label layouts (``Label.layout_json``).
+
+Line breaks, formatted price strings and the fitted font sizes only depend on
+the label values, the form unit and the global font settings. They are computed
+when a label or form is written, so printing only has to place text. A change
+of the font settings does not refit the whole catalogue: a label gets the new
+fitted sizes stored when it is next printed or written. The renderer falls back
+to computing a layout itself when the stored one is missing, lacks the fit for
+the current settings or no longer matches the label.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Sequence
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db import db
+from app.label_snapshot import LabelRow
+from app.models import Form, Label
+from app.pdf_generator import (
+    LabelLayout,
+    LabelPDFGenerator,
+    build_layout,
+    fit_key,
+    layout_key,
+)
+from app.utils import FontSettings, load_font_settings
+
+logger = logging.getLogger(__name__)
+
+# Fitted sizes are kept for this many font-settings combinations per label,
+# so switching back to a recent setting needs no recompute
+MAX_FIT_VARIANTS = 4
+
+_label_table = Label.__table__
+
+_UPDATE_LAYOUT = (
+    update(_label_table)
+    .where(_label_table.c.id == bindparam("b_id"))
+    .values(layout_json=bindparam("b_layout"))
+)
+
+
+def compute_layout_json(
+    product_name: str,
+    form: str,
+    amount: float,
+    price: float,
+    unit_price: float | None,
+    unit: str,
+    previous_json: str | None = None,
+    font_settings: FontSettings | None = None,
+) -> str:
+    """Return the layout JSON of a label, fitted for the current font settings.
+
+    Fits from previous_json are kept when the label values did not change.
+
+    Args:
+        product_name: Label product name.
+        form: Form short name.
+        amount: Package amount.
+        price: Price.
+        unit_price: Unit price.
+        unit: Unit of the label's form.
+        previous_json: Currently stored layout, if any.
+        font_settings: Font settings to fit for; defaults to the saved ones.
+
+    Returns:
+        Compact JSON of a LabelLayout.
+    """
+    settings = font_settings or load_font_settings()
+    key = layout_key(product_name, form, amount, price, unit_price, unit)
+    layout: LabelLayout | None = json.loads(previous_json) if previous_json else None
+    if layout is None or layout.get("key") != key:
+        layout = build_layout(product_name, form, amount, price, unit_price, unit)
+
+    price_size, text_size = settings["price_font_size"], settings["text_font_size"]
+    current = fit_key(price_size, text_size)
+    if current in layout["fits"]:
+        # Most recently used combination goes last
+        layout["fits"][current] = layout["fits"].pop(current)
+    else:
+        LabelPDFGenerator().fit_layout(layout, price_size, text_size)
+    while len(layout["fits"]) > MAX_FIT_VARIANTS:
+        del layout["fits"][next(iter(layout["fits"]))]
+
+    return json.dumps(layout, ensure_ascii=False, separators=(",", ":"))
+
+
+def refresh_label_layout(label: Label, unit: str) -> None:
+    """Recompute the stored layout of an ORM label before it is committed.
+
+    Args:
+        label: Label being created or updated.
+        unit: Unit of the label's form.
+    """
+    label.layout_json = compute_layout_json(
+        label.product_name,
+        label.form,
+        label.amount,
+        label.price,
+        label.unit_price,
+        unit,
+        label.layout_json,
+    )
+
+
+def refresh_layouts(where: ColumnElement[bool] | None = None) -> int:
+    """Recompute stored layouts in bulk; only changed rows are written.
+
+    Used after a form edit (its labels' unit or short name changed) and after
+    bulk writes that bypass the ORM. The caller commits.
+
+    Args:
+        where: Optional filter on Label; all labels when None.
+
+    Returns:
+        Number of labels whose layout was rewritten.
+    """
+    settings = load_font_settings()
+    stmt = select(
+        Label.id,
+        Label.product_name,
+        Label.form,
+        Label.amount,
+        Label.price,
+        Label.unit_price,
+        Form.unit,
+        Label.layout_json,
+    ).join(Form, Form.short_name == Label.form)
+    if where is not None:
+        stmt = stmt.where(where)
+
+    changes = []
+    for row in db.session.execute(stmt):
+        layout = compute_layout_json(*row[1:], font_settings=settings)
+        if layout != row.layout_json:
+            changes.append({"b_id": row.id, "b_layout": layout})
+    if changes:
+        db.session.execute(_UPDATE_LAYOUT, changes)
+    logger.info(f"Recomputed {len(changes)} label layouts")
+    return len(changes)
+
+
+def refresh_printed_layouts(rows: Sequence[LabelRow]) -> int:
+    """Store fitted sizes for the current font settings in printed labels.
+
+    Only labels whose stored layout lacks them are recomputed, so printing with
+    unchanged settings writes nothing. The caller commits.
+
+    Args:
+        rows: Label snapshots that were just printed.
+
+    Returns:
+        Number of labels whose layout was rewritten.
+    """
+    settings = load_font_settings()
+    current = fit_key(settings["price_font_size"], settings["text_font_size"])
+    stale = [
+        row.id
+        for row in rows
+        if not row.layout_json or current not in json.loads(row.layout_json)["fits"]
+    ]
+    if not stale:
+        return 0
+    return refresh_layouts(Label.id.in_(stale))
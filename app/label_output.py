@@ -0,0 +1,312 @@
+"""Pluggable label output backends: A4 PDF sheets and thermal roll printers.
+
+Every backend prints the same three-zone layout (``LabelPDFGenerator.place_label``);
+they differ only in how the placed strings are encoded:
+
+- ``pdf``: the A4 sheet of 32 labels from ``LabelPDFGenerator``.
+- ``zpl``: one ZPL II ``^XA ... ^XZ`` format per label, drawn by the printer's
+  scalable font. Smallest jobs, but glyph shapes differ slightly from the PDF.
+- ``raster``: each label rendered to a 1-bit image with Pillow and the same
+  DejaVu fonts as the PDF, streamed as binary PBM (P4) frames.
+
+Thermal labels keep the PDF label size (48 x 35 mm) at 203 or 300 dpi. Jobs are
+written to any binary sink; ``open_sink`` opens a file or a raw TCP printer port
+(``tcp://host:9100``).
+"""
+
+from __future__ import annotations
+
+import logging
+import socket
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, ClassVar
+from urllib.parse import urlsplit
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.barcodes import barcode_bars
+from app.pdf_generator import (
+    FONT_BOLD,
+    BarcodePlacement,
+    LabelPDFGenerator,
+    PdfLabelSource,
+    TextPlacement,
+    get_font_path,
+)
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DPI = (203, 300)
+DEFAULT_DPI = 203
+RAW_PRINTER_PORT = 9100
+SINK_TIMEOUT = 10.0
+
+# Top of a ZPL font-0 character cell above its baseline, as a fraction of height
+_ZPL_ASCENT = 0.8
+# Characters with a special meaning in ZPL field data, sent as ^FH hex escapes
+_ZPL_ESCAPED = {ord(c): f"_{ord(c):02X}" for c in "_^~"}
+# Pillow font files for the fonts registered with ReportLab
+_TTF_FILES = {True: "DejaVuSans-Bold.ttf", False: "DejaVuSans.ttf"}
+
+
+class LabelOutputBackend(ABC):
+    """Encodes labels into one print job format."""
+
+    name: ClassVar[str]
+    mimetype: ClassVar[str]
+    extension: ClassVar[str]
+
+    def __init__(self, price_font_size: int = 34, text_font_size: int = 10) -> None:
+        self.generator = LabelPDFGenerator(price_font_size, text_font_size)
+
+    @abstractmethod
+    def write(self, labels: Iterable[PdfLabelSource], sink: BinaryIO) -> int:
+        """Stream the print job for labels to sink.
+
+        Returns:
+            Number of labels written.
+        """
+
+    def render(self, labels: Iterable[PdfLabelSource]) -> bytes:
+        """Return the whole print job as bytes."""
+        buffer = BytesIO()
+        self.write(labels, buffer)
+        return buffer.getvalue()
+
+
+class PdfBackend(LabelOutputBackend):
+    """A4 sheets of 32 labels (the original output format)."""
+
+    name = "pdf"
+    mimetype = "application/pdf"
+    extension = "pdf"
+
+    def write(self, labels: Iterable[PdfLabelSource], sink: BinaryIO) -> int:
+        labels = list(labels)
+        pdf_buffer = self.generator.generate_pdf(labels)
+        if pdf_buffer is None:
+            return 0
+        sink.write(pdf_buffer.getvalue())
+        return len(labels)
+
+
+class ThermalBackend(LabelOutputBackend):
+    """Base for roll printers: one label per printer format, streamed as it goes."""
+
+    def __init__(
+        self,
+        price_font_size: int = 34,
+        text_font_size: int = 10,
+        dpi: int = DEFAULT_DPI,
+    ) -> None:
+        if dpi not in SUPPORTED_DPI:
+            raise ValueError(f"Unsupported printer resolution: {dpi} dpi")
+        super().__init__(price_font_size, text_font_size)
+        self.dpi = dpi
+        # PDF points (1/72 inch) to printer dots
+        self.scale = dpi / 72
+        self.width = self.dots(LabelPDFGenerator.LABEL_WIDTH)
+        self.height = self.dots(LabelPDFGenerator.LABEL_HEIGHT)
+
+    def dots(self, points: float) -> int:
+        """Convert a length in points to printer dots."""
+        return round(points * self.scale)
+
+    @abstractmethod
+    def encode_label(
+        self, placements: list[TextPlacement], barcode: BarcodePlacement | None
+    ) -> bytes:
+        """Encode one placed label."""
+
+    def write(self, labels: Iterable[PdfLabelSource], sink: BinaryIO) -> int:
+        count = 0
+        for label in labels:
+            placements = self.generator.place_label(label)
+            barcode = self.generator.place_barcode(label)
+            sink.write(self.encode_label(placements, barcode))
+            count += 1
+        logger.debug(f"Wrote {count} {self.name} labels at {self.dpi} dpi")
+        return count
+
+
+def _zpl_field(text: str) -> str:
+    """Escape field data for a ``^FH_`` field."""
+    return text.translate(_ZPL_ESCAPED)
+
+
+class ZplBackend(ThermalBackend):
+    """ZPL II text formats using the printer's scalable font."""
+
+    name = "zpl"
+    mimetype = "application/vnd.zebra-zpl"
+    extension = "zpl"
+
+    def encode_label(
+        self, placements: list[TextPlacement], barcode: BarcodePlacement | None
+    ) -> bytes:
+        padding = self.dots(LabelPDFGenerator.LABEL_PADDING)
+        field_width = self.width - 2 * padding
+        commands = [f"^XA^CI28^PW{self.width}^LL{self.height}^LH0,0"]
+        for text, _font_name, font_size, baseline in placements:
+            height = self.dots(font_size)
+            top = self.height - self.dots(baseline) - round(height * _ZPL_ASCENT)
+            commands.append(
+                f"^FO{padding},{max(top, 0)}^A0N,{height},{height}"
+                f"^FB{field_width},1,0,C^FH_^FD{_zpl_field(text)}^FS"
+            )
+        if barcode is not None:
+            commands.append(self._barcode_command(barcode))
+        commands.append("^XZ\n")
+        return "\n".join(commands).encode("utf-8")
+
+    def _barcode_command(self, barcode: BarcodePlacement) -> str:
+        """Printer-drawn EAN barcode; the printer adds the check digit itself."""
+        modules, _bars = barcode_bars(barcode.code)
+        module = _module_pixels(barcode, self.scale)
+        left = (self.width - modules * module) // 2
+        top = self.height - self.dots(barcode.y + barcode.height)
+        symbol = "^BE" if len(barcode.code) == 13 else "^B8"
+        return (
+            f"^FO{left},{top}^BY{module}{symbol}N,{self.dots(barcode.height)},N,N"
+            f"^FD{barcode.code[:-1]}^FS"
+        )
+
+
+@lru_cache(maxsize=64)
+def _truetype(bold: bool, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """Load a DejaVu font for Pillow, or Pillow's default font if it is missing."""
+    try:
+        return ImageFont.truetype(get_font_path(_TTF_FILES[bold]), size)
+    except OSError:
+        logger.warning("DejaVu fonts not found, raster labels use the default font")
+        return ImageFont.load_default(size)
+
+
+def _module_pixels(barcode: BarcodePlacement, scale: float) -> int:
+    """Whole dots per barcode module, so every bar keeps its exact width ratio."""
+    return max(1, round(barcode.module_width * scale))
+
+
+def render_label_image(
+    placements: list[TextPlacement],
+    scale: float,
+    mode: str = "1",
+    barcode: BarcodePlacement | None = None,
+) -> Image.Image:
+    """Rasterize a placed label with the PDF fonts.
+
+    Args:
+        placements: Output of ``LabelPDFGenerator.place_label``.
+        scale: Pixels per PDF point (dpi / 72).
+        mode: Pillow image mode, "1" for printer bitmaps or "L" for
+            anti-aliased previews.
+        barcode: Output of ``LabelPDFGenerator.place_barcode``.
+
+    Returns:
+        A white image of the label size with black text.
+    """
+    width = round(LabelPDFGenerator.LABEL_WIDTH * scale)
+    height = round(LabelPDFGenerator.LABEL_HEIGHT * scale)
+    image = Image.new(mode, (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for text, font_name, font_size, baseline in placements:
+        font = _truetype(font_name == FONT_BOLD, round(font_size * scale))
+        draw.text(
+            (width / 2, height - baseline * scale),
+            text,
+            font=font,
+            fill="black",
+            anchor="ms",
+        )
+    if barcode is not None:
+        modules, bars = barcode_bars(barcode.code)
+        module = _module_pixels(barcode, scale)
+        left = (width - modules * module) // 2
+        top = height - round((barcode.y + barcode.height) * scale)
+        bottom = height - round(barcode.y * scale) - 1
+        for start, bar_width in bars:
+            x0 = left + start * module
+            draw.rectangle((x0, top, x0 + bar_width * module - 1, bottom), fill="black")
+    return image
+
+
+class RasterBackend(ThermalBackend):
+    """1-bit bitmaps rendered with the PDF fonts, streamed as PBM (P4) frames."""
+
+    name = "raster"
+    mimetype = "image/x-portable-bitmap"
+    extension = "pbm"
+
+    def label_image(
+        self,
+        placements: list[TextPlacement],
+        barcode: BarcodePlacement | None = None,
+    ) -> Image.Image:
+        """Render a placed label to a 1-bit image (0 = black dot)."""
+        return render_label_image(placements, self.scale, barcode=barcode)
+
+    def encode_label(
+        self, placements: list[TextPlacement], barcode: BarcodePlacement | None
+    ) -> bytes:
+        image = self.label_image(placements, barcode)
+        header = f"P4\n{self.width} {self.height}\n".encode("ascii")
+        # PBM uses 1 for black, Pillow's "1" mode uses 1 for white
+        return header + image.tobytes("raw", "1;I")
+
+
+BACKENDS: dict[str, type[LabelOutputBackend]] = {
+    backend.name: backend for backend in (PdfBackend, ZplBackend, RasterBackend)
+}
+
+
+def get_backend(
+    name: str,
+    price_font_size: int = 34,
+    text_font_size: int = 10,
+    dpi: int = DEFAULT_DPI,
+) -> LabelOutputBackend:
+    """Create the output backend registered under name.
+
+    Raises:
+        ValueError: Unknown backend name or unsupported resolution.
+    """
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Unknown output format: {name}")
+    if issubclass(backend_class, ThermalBackend):
+        return backend_class(price_font_size, text_font_size, dpi)
+    return backend_class(price_font_size, text_font_size)
+
+
+@contextmanager
+def open_sink(target: str, timeout: float = SINK_TIMEOUT) -> Iterator[BinaryIO]:
+    """Open a print job destination for writing.
+
+    Args:
+        target: ``tcp://host[:port]`` for a raw printer port (default 9100),
+            anything else is a file path.
+        timeout: Connect and send timeout in seconds for TCP targets.
+
+    Raises:
+        OSError: The file or the printer connection cannot be opened.
+    """
+    if not target.startswith("tcp://"):
+        with Path(target).open("wb") as file:
+            yield file
+        return
+
+    parts = urlsplit(target)
+    if not parts.hostname:
+        raise OSError(f"Invalid printer address: {target}")
+    address = (parts.hostname, parts.port or RAW_PRINTER_PORT)
+    with socket.create_connection(address, timeout=timeout) as connection:
+        with connection.makefile("wb") as stream:
+            yield stream
+        # Signal the end of the job so the printer does not wait for more data
+        connection.shutdown(socket.SHUT_WR)
+    logger.info(f"Print job sent to {address[0]}:{address[1]}")
@@ -0,0 +1,193 @@
+"""Read-optimized label snapshots for the list and print hot paths.
+
+Instead of hydrating ORM ``Label`` objects, building ``LabelDict`` via ``to_dict()``
+and copying it into ``PdfLabelData``, the hot paths select only the needed columns
+(joined with the form unit) as Core row tuples and keep them in compact
+``__slots__`` records. These records are passed straight to the PDF renderer and
+serialized straight to the JSON list payload.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable
+
+from sqlalchemy import Select, String, select, type_coerce
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db import db
+from app.models import Form, Label, LabelDict
+
+# Same fallback unit as the PDF enrichment used before snapshots existed
+DEFAULT_UNIT = "ks"
+
+# Mapping of sort parameter to ORDER BY clauses (mirrors the list page sort keys)
+_SORT_ORDER: dict[str, tuple[ColumnElement[Any], ...]] = {
+    "name": (Label.product_name, Label.id),
+    "date": (Label.created_at.desc(),),
+    "marked": (Label.marked_to_print.desc(), Label.product_name),
+}
+
+_COLUMNS = (
+    Label.id,
+    Label.product_name,
+    Label.form,
+    Label.amount,
+    Label.price,
+    Label.unit_price,
+    Label.marked_to_print,
+    # Raw stored text: skips datetime parsing and isoformat() per row
+    type_coerce(Label.created_at, String),
+    Form.unit,
+    Label.layout_json,
+    Label.barcode,
+    Label.version,
+)
+
+_encode_str = json.encoder.encode_basestring_ascii
+
+
+class LabelRow:
+    """Compact, read-only label record with the form unit attached."""
+
+    __slots__ = (
+        "id",
+        "product_name",
+        "form",
+        "amount",
+        "price",
+        "unit_price",
+        "marked_to_print",
+        "created_at_raw",
+        "unit",
+        "layout_json",
+        "barcode",
+        "version",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        product_name: str,
+        form: str,
+        amount: float,
+        price: float,
+        unit_price: float | None,
+        marked_to_print: bool | None,
+        created_at_raw: str | None,
+        unit: str | None,
+        layout_json: str | None = None,
+        barcode: str | None = None,
+        version: int = 1,
+    ) -> None:
+        self.id = id
+        self.product_name = product_name
+        self.form = form
+        self.amount = amount
+        self.price = price
+        self.unit_price = unit_price
+        self.marked_to_print = bool(marked_to_print)
+        self.created_at_raw = created_at_raw
+        self.unit = unit or DEFAULT_UNIT
+        self.layout_json = layout_json
+        self.barcode = barcode
+        self.version = version
+
+    def __repr__(self) -> str:
+        return f"<LabelRow(id={self.id}, product='{self.product_name}', form='{self.form}')>"
+
+    @property
+    def created_at(self) -> str:
+        """ISO 8601 timestamp, identical to ``Label.to_dict()['created_at']``."""
+        return _iso_from_sqlite(self.created_at_raw)
+
+    def to_dict(self) -> LabelDict:
+        """Return the same dict as ``Label.to_dict()``."""
+        return LabelDict(
+            id=self.id,
+            product_name=self.product_name,
+            price=self.price,
+            form=self.form,
+            amount=self.amount,
+            unit_price=self.unit_price,
+            barcode=self.barcode,
+            marked_to_print=self.marked_to_print,
+            created_at=self.created_at,
+            version=self.version,
+        )
+
+    def to_json(self) -> str:
+        """Serialize to the same JSON object as ``Label.to_dict()``."""
+        unit_price = "null" if self.unit_price is None else repr(self.unit_price)
+        barcode = "null" if self.barcode is None else f'"{self.barcode}"'
+        return (
+            f'{{"amount":{self.amount!r},"barcode":{barcode},'
+            f'"created_at":"{self.created_at}",'
+            f'"form":{_encode_str(self.form)},"id":{self.id},'
+            f'"marked_to_print":{"true" if self.marked_to_print else "false"},'
+            f'"price":{self.price!r},"product_name":{_encode_str(self.product_name)},'
+            f'"unit_price":{unit_price},"version":{self.version}}}'
+        )
+
+
+def _iso_from_sqlite(raw: str | None) -> str:
+    """Turn SQLite's 'YYYY-MM-DD HH:MM:SS.ffffff' into datetime.isoformat() text."""
+    if not raw:
+        return ""
+    iso = raw.replace(" ", "T", 1)
+    if iso.endswith(".000000"):
+        iso = iso[:-7]
+    return iso
+
+
+def select_label_rows() -> Select[Any]:
+    """Return the snapshot SELECT (label columns joined with the form unit).
+
+    Callers add their own WHERE / ORDER BY clauses and wrap each result row
+    in ``LabelRow``.
+    """
+    return select(*_COLUMNS).outerjoin(Form, Form.short_name == Label.form)
+
+
+def sort_order(sort_by: str) -> tuple[ColumnElement[Any], ...]:
+    """ORDER BY clauses of a list sort key; unknown keys sort by name."""
+    return _SORT_ORDER.get(sort_by, _SORT_ORDER["name"])
+
+
+def load_label_rows(
+    sort_by: str = "name",
+    marked_only: bool = False,
+    offset: int = 0,
+    limit: int | None = None,
+) -> list[LabelRow]:
+    """Load label snapshots in the requested order.
+
+    Args:
+        sort_by: Sort key ('name', 'date' or 'marked'); unknown keys sort by name.
+        marked_only: Only return labels marked for printing.
+        offset: Number of leading rows to skip.
+        limit: Maximum number of rows, None for all.
+
+    Returns:
+        List of LabelRow records.
+    """
+    stmt = select_label_rows().order_by(*sort_order(sort_by))
+    if marked_only:
+        stmt = stmt.where(Label.marked_to_print.is_(True))
+    if offset or limit is not None:
+        stmt = stmt.offset(offset).limit(limit)
+    result = db.session.execute(stmt)
+    return [LabelRow(*row) for row in result]
+
+
+def load_label_row(label_id: int) -> LabelRow | None:
+    """Load a single label snapshot by id, or None if it does not exist."""
+    stmt = select_label_rows().where(Label.id == label_id)
+    row = db.session.execute(stmt).first()
+    return LabelRow(*row) if row is not None else None
+
+
+def dumps_label_list(rows: Iterable[LabelRow]) -> str:
+    """Serialize rows to the ``{"count": N, "labels": [...]}`` list payload."""
+    items = [row.to_json() for row in rows]
+    return f'{{"count":{len(items)},"labels":[{",".join(items)}]}}'
@@ -0,0 +1,156 @@
+"""Single-statement label writes with optimistic concurrency.
+
+Every change of a label's printed values or print mark increments
+``Label.version``. Clients send the version they last saw (If-Match header or
+``version`` field); the write is a conditional ``UPDATE ... RETURNING`` that
+only matches that version, so a stale write is rejected with a conflict instead
+of silently overwriting someone else's change. Without an expected version the
+write still happens in a single statement, so concurrent toggles never lose an
+update.
+
+These functions run inside a write transaction (``app.write_queue.run_write``).
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import false, func, not_, select, update
+
+from app.db import db
+from app.duplicates import index_label
+from app.label_layout import compute_layout_json
+from app.label_snapshot import DEFAULT_UNIT
+from app.models import Form, Label, LabelDict
+from app.utils import calculate_unit_price
+
+logger = logging.getLogger(__name__)
+
+
+class VersionConflict(Exception):
+    """The label changed since the client read it."""
+
+    def __init__(self, label_id: int, current_version: int) -> None:
+        super().__init__(
+            f"Label {label_id} is at version {current_version}, not the expected one"
+        )
+        self.label_id = label_id
+        self.current_version = current_version
+
+
+def _current_version(label_id: int) -> int | None:
+    version: int | None = db.session.scalar(
+        select(Label.version).where(Label.id == label_id)
+    )
+    return version
+
+
+def toggle_print_mark(
+    label_id: int, expected_version: int | None = None
+) -> tuple[bool, int] | None:
+    """Flip the print mark in one statement.
+
+    Returns:
+        (new mark, new version), or None when the label does not exist.
+
+    Raises:
+        VersionConflict: expected_version is given and no longer current.
+    """
+    stmt = (
+        update(Label)
+        .where(Label.id == label_id)
+        .values(
+            marked_to_print=not_(func.coalesce(Label.marked_to_print, false())),
+            version=Label.version + 1,
+        )
+        .returning(Label.marked_to_print, Label.version)
+        .execution_options(synchronize_session=False)
+    )
+    if expected_version is not None:
+        stmt = stmt.where(Label.version == expected_version)
+    row = db.session.execute(stmt).one_or_none()
+    if row is not None:
+        return bool(row.marked_to_print), int(row.version)
+
+    current = _current_version(label_id)
+    if current is None:
+        return None
+    raise VersionConflict(label_id, current)
+
+
+def update_label(
+    label_id: int, changes: dict[str, Any], expected_version: int | None = None
+) -> LabelDict | None:
+    """Apply validated field changes with one conditional UPDATE ... RETURNING.
+
+    The stored layout and unit price depend on the merged values, so the
+    current row is read first; the UPDATE only matches the version that was
+    read, which is also the version the client expects.
+
+    Args:
+        label_id: Label to change.
+        changes: New column values (name, form, amount, price, barcode, mark).
+        expected_version: Version the client last saw; None skips the check.
+
+    Returns:
+        The updated label, or None when it does not exist.
+
+    Raises:
+        VersionConflict: The label is no longer at expected_version.
+    """
+    current = db.session.execute(
+        select(
+            Label.product_name,
+            Label.form,
+            Label.amount,
+            Label.price,
+            Label.unit_price,
+            Label.layout_json,
+            Label.version,
+        ).where(Label.id == label_id)
+    ).one_or_none()
+    if current is None:
+        return None
+    if expected_version is not None and current.version != expected_version:
+        raise VersionConflict(label_id, current.version)
+
+    values: dict[str, Any] = dict(changes)
+    merged = {**current._asdict(), **changes}
+    if "price" in changes or "amount" in changes:
+        values["unit_price"] = merged["unit_price"] = calculate_unit_price(
+            merged["amount"], merged["price"]
+        )
+    if set(changes) - {"marked_to_print"}:
+        values["updated_at"] = datetime.now(UTC)
+        unit = db.session.scalar(
+            select(Form.unit).where(Form.short_name == merged["form"])
+        )
+        values["layout_json"] = compute_layout_json(
+            merged["product_name"],
+            merged["form"],
+            merged["amount"],
+            merged["price"],
+            merged["unit_price"],
+            unit or DEFAULT_UNIT,
+            current.layout_json,
+        )
+
+    stmt = (
+        update(Label)
+        .where(Label.id == label_id, Label.version == current.version)
+        .values(**values, version=Label.version + 1)
+        .returning(Label)
+    )
+    label = db.session.scalars(stmt).one_or_none()
+    if label is None:
+        # Changed or deleted by another process between the read and the write
+        latest = _current_version(label_id)
+        if latest is None:
+            return None
+        raise VersionConflict(label_id, latest)
+    if "product_name" in changes:
+        # Bulk UPDATEs skip the ORM events that maintain the trigram index
+        index_label(db.session.connection(), label_id, label.product_name)
+    return label.to_dict()
@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 from datetime import UTC, datetime
 from typing import TypedDict
+from uuid import uuid4
 
 from app.db import db
 
@@ -18,8 +19,25 @@ class LabelDict(TypedDict):
     form: str
     amount: float
     unit_price: float | None
+    barcode: str | None
     marked_to_print: bool
     created_at: str
+    version: int
+
+
+class ArchivedLabelDict(TypedDict):
+    """Typed dict returned by LabelArchive.to_dict()."""
+
+    id: int
+    label_id: int
+    product_name: str
+    price: float
+    form: str
+    amount: float
+    unit_price: float | None
+    barcode: str | None
+    created_at: str | None
+    archived_at: str
 
 
 class FormDict(TypedDict):
@@ -39,8 +57,39 @@ class Label(db.Model):  # type: ignore[misc, name-defined]
     amount = db.Column(db.Float, nullable=False)
     price = db.Column(db.Float, nullable=False)
     unit_price = db.Column(db.Float, nullable=True)
+    # Optional EAN-8/EAN-13 code with check digit (see app/barcodes.py)
+    barcode = db.Column(db.String(13), nullable=True)
     marked_to_print = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    # Last change of a printed value (name, form, amount, price, form unit);
+    # print marks and bookkeeping columns do not touch it
+    updated_at = db.Column(
+        db.DateTime, nullable=True, default=lambda: datetime.now(UTC)
+    )
+
+    # Values the label was last printed with (see app/print_history.py)
+    printed_price = db.Column(db.Float, nullable=True)
+    printed_amount = db.Column(db.Float, nullable=True)
+    printed_form = db.Column(db.String(50), nullable=True)
+    printed_unit = db.Column(db.String(20), nullable=True)
+    printed_at = db.Column(db.DateTime, nullable=True)
+
+    # Precomputed PDF text layout (see app/label_layout.py)
+    layout_json = db.Column(db.Text, nullable=True)
+
+    # Incremented on every change of a printed value or the print mark; the
+    # API rejects writes based on an older version (see app/label_writes.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    # Identity of the label across synced instances (see app/sync.py); rows
+    # inserted without one get it from a trigger
+    uid = db.Column(
+        db.String(32),
+        nullable=True,
+        unique=True,
+        index=True,
+        default=lambda: uuid4().hex,
+    )
 
     # Unique constraint on combination
     __table_args__ = (
@@ -58,8 +107,10 @@ class Label(db.Model):  # type: ignore[misc, name-defined]
             form=self.form,
             amount=self.amount,
             unit_price=self.unit_price,
+            barcode=self.barcode,
             marked_to_print=self.marked_to_print,
             created_at=self.created_at.isoformat(),
+            version=self.version,
         )
 
 
@@ -79,3 +130,161 @@ class Form(db.Model):  # type: ignore[misc, name-defined]
             short_name=self.short_name,
             unit=self.unit,
         )
+
+
+class LabelArchive(db.Model):  # type: ignore[misc, name-defined]
+    """Label moved out of the ``label`` table (see app/label_archive.py)."""
+
+    __tablename__ = "label_archive"
+
+    # Own key: SQLite may hand an archived label's id to a new label
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    label_id = db.Column(db.Integer, nullable=False, index=True)
+    product_name = db.Column(db.String(255), nullable=False)
+    # No foreign key: the form may be deleted while the label is archived
+    form = db.Column(db.String(50), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(db.Float, nullable=True)
+    barcode = db.Column(db.String(13), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    printed_price = db.Column(db.Float, nullable=True)
+    printed_amount = db.Column(db.Float, nullable=True)
+    printed_form = db.Column(db.String(50), nullable=True)
+    printed_unit = db.Column(db.String(20), nullable=True)
+    printed_at = db.Column(db.DateTime, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    archived_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(UTC), index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"<LabelArchive(id={self.id}, label_id={self.label_id}, product='{self.product_name}')>"
+
+    def to_dict(self) -> ArchivedLabelDict:
+        return ArchivedLabelDict(
+            id=self.id,
+            label_id=self.label_id,
+            product_name=self.product_name,
+            price=self.price,
+            form=self.form,
+            amount=self.amount,
+            unit_price=self.unit_price,
+            barcode=self.barcode,
+            created_at=self.created_at.isoformat() if self.created_at else None,
+            archived_at=self.archived_at.isoformat(),
+        )
+
+
+class IngestedFile(db.Model):  # type: ignore[misc, name-defined]
+    """Price file applied by the watch folder (see app/ingest.py)."""
+
+    __tablename__ = "ingest_file"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # SHA-256 of the file contents; the same contents are never applied twice
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    name = db.Column(db.String(255), nullable=False)
+    ingested_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(UTC)
+    )
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    seen = db.Column(db.Integer, nullable=False, default=0)
+    unchanged = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    unmatched = db.Column(db.Integer, nullable=False, default=0)
+    conflicts = db.Column(db.Integer, nullable=False, default=0)
+    invalid = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<IngestedFile(id={self.id}, name='{self.name}', updated={self.updated})>"
+        )
+
+
+class IngestRow(db.Model):  # type: ignore[misc, name-defined]
+    """Content hash of the last applied price-file row per label key."""
+
+    __tablename__ = "ingest_row"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    # "id:<label id>", "ean:<barcode>" or "name:<product>\x1f<form>\x1f<amount>"
+    row_key = db.Column(db.String(400), primary_key=True)
+    content_hash = db.Column(db.String(32), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<IngestRow(row_key='{self.row_key}')>"
+
+
+class ChangeLog(db.Model):  # type: ignore[misc, name-defined]
+    """Latest change of each synced label and form (see app/sync.py)."""
+
+    __tablename__ = "change_log"
+    __table_args__ = (
+        db.UniqueConstraint("entity", "entity_key", name="unique_change"),
+    )
+
+    # Renumbered on every change, so "seq > cursor" finds everything new
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # "label" or "form"
+    entity = db.Column(db.String(10), nullable=False)
+    # Label uid or form name
+    entity_key = db.Column(db.String(100), nullable=False)
+    # "upsert" or "delete"
+    op = db.Column(db.String(10), nullable=False)
+    # Instance that made the change; "" for this one
+    origin = db.Column(db.String(32), nullable=False, default="")
+    # UTC, ISO 8601 with milliseconds; the newer change wins
+    changed_at = db.Column(db.String(24), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ChangeLog(seq={self.seq}, {self.entity}='{self.entity_key}', op='{self.op}')>"
+
+
+class SyncNode(db.Model):  # type: ignore[misc, name-defined]
+    """The one row naming this instance to its sync peers."""
+
+    __tablename__ = "sync_node"
+
+    id = db.Column(db.Integer, primary_key=True)
+    instance_id = db.Column(db.String(32), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SyncNode(instance_id='{self.instance_id}')>"
+
+
+class SyncCursor(db.Model):  # type: ignore[misc, name-defined]
+    """Change-log position received so far from each peer instance."""
+
+    __tablename__ = "sync_cursor"
+
+    instance_id = db.Column(db.String(32), primary_key=True)
+    received_seq = db.Column(db.Integer, nullable=False, default=0)
+    synced_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(UTC)
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<SyncCursor(instance_id='{self.instance_id}', seq={self.received_seq})>"
+        )
+
+
+class LabelTrigram(db.Model):  # type: ignore[misc, name-defined]
+    """Trigram posting list of normalized product names (see app/duplicates.py)."""
+
+    __tablename__ = "label_trigram"
+    # The (trigram, label_id) primary key is the whole row: one B-tree, no rowid
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    trigram = db.Column(db.String(3), primary_key=True)
+    label_id = db.Column(
+        db.Integer,
+        db.ForeignKey("label.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    def __repr__(self) -> str:
+        return f"<LabelTrigram(trigram='{self.trigram}', label_id={self.label_id})>"
@@ -0,0 +1,232 @@
+"""Versioned cache of pre-encoded JSON list payloads with ETag support.
+
+Full-list endpoints (labels, forms) rarely change between calls, yet every open
+tab re-requests them. Encoded bodies are cached per key together with the data
+version they were built from and the tables they were read from. List pages
+embed the same cached body (``CachedPayload.embedded``) instead of loading the
+data twice, once for the HTML and once for the script's API call. Any committed
+write through the ORM session bumps the version, which invalidates every cached
+payload at once; writes made by other processes invalidate only the payloads of
+the tables they changed (see ``app.coherence``). Responses carry an ETag so
+unchanged lists are answered with 304 Not Modified.
+
+Each store (``app.stores``) has its own cache, so lists never cross stores and a
+write in one store does not invalidate the others.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+
+from flask import Response, current_app, request
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+
+from app.compression import compress, negotiate_encoding
+from app.db import current_store
+
+logger = logging.getLogger(__name__)
+
+_DIRTY_KEY = "payload_cache_dirty"
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """Encoded response body with the data version it was built from."""
+
+    version: int
+    body: bytes
+    etag: str
+    # Tables the payload was read from; None depends on every table
+    tables: frozenset[str] | None = None
+    # Compressed bodies per content encoding, filled on first request
+    encoded: dict[str, bytes] = field(default_factory=dict, compare=False)
+
+    def body_for(self, encoding: str | None, min_size: int) -> tuple[bytes, str | None]:
+        """Return (body, applied encoding) for the negotiated encoding."""
+        if encoding is None or len(self.body) < min_size:
+            return self.body, None
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.body, encoding)
+        return self.encoded[encoding], encoding
+
+    def embedded(self) -> Markup:
+        """Body for a ``<script type="application/json">`` element of a page.
+
+        ``<``, ``>`` and ``&`` only occur inside JSON strings, where their
+        escapes mean the same, so ``</script>`` in a product name cannot end
+        the element.
+        """
+        text = self.body.decode()
+        for char, escape in (("&", "\\u0026"), ("<", "\\u003c"), (">", "\\u003e")):
+            text = text.replace(char, escape)
+        return Markup(text)
+
+
+class PayloadCache:
+    """Thread-safe LRU of encoded payloads, invalidated by a version counter."""
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CachedPayload] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        # Version of the last full bump and of the last bump of each table
+        self._cleared = 0
+        self._bumped: dict[str, int] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self, tables: Iterable[str] | None = None) -> int:
+        """Invalidate cached payloads and return the new version.
+
+        Args:
+            tables: Invalidate only payloads read from these tables; None
+                invalidates all of them.
+        """
+        with self._lock:
+            self._version += 1
+            if tables is None:
+                self._cleared = self._version
+                self._entries.clear()
+                return self._version
+            changed = frozenset(tables)
+            for table in changed:
+                self._bumped[table] = self._version
+            for key, entry in list(self._entries.items()):
+                if entry.tables is None or entry.tables & changed:
+                    del self._entries[key]
+            return self._version
+
+    def get(self, key: Hashable) -> CachedPayload | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self,
+        key: Hashable,
+        version: int,
+        body: bytes,
+        tables: Iterable[str] | None = None,
+    ) -> CachedPayload:
+        """Store body built at version; stale builds are returned but not kept."""
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        entry = CachedPayload(
+            version=version,
+            body=body,
+            etag=f"v{version}-{digest}",
+            tables=None if tables is None else frozenset(tables),
+        )
+        with self._lock:
+            if not self._is_stale(entry):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _is_stale(self, entry: CachedPayload) -> bool:
+        """Whether a bump since the entry's version covers it (caller holds the lock)."""
+        if entry.version < self._cleared:
+            return True
+        if entry.tables is None:
+            return entry.version < self._version
+        return any(self._bumped.get(table, 0) > entry.version for table in entry.tables)
+
+
+# Cache of the default database, shared by all app instances in this process
+payload_cache = PayloadCache()
+
+
+def current_cache() -> PayloadCache:
+    """Payload cache of the current store's database."""
+    store = current_store()
+    return store.payload_cache if store is not None else payload_cache
+
+
+def cached_payload(
+    key: Hashable,
+    build: Callable[[], bytes | str],
+    tables: Iterable[str] | None = None,
+) -> CachedPayload:
+    """Cached JSON payload for key, building it on a miss.
+
+    Args:
+        key: Cache key, e.g. ("labels", sort_by).
+        build: Callable returning the encoded JSON body.
+        tables: Tables the body is read from; changes to other tables made
+            by other processes keep it cached. None depends on every table.
+    """
+    cache = current_cache()
+    entry = cache.get(key)
+    if entry is None:
+        version = cache.version
+        body = build()
+        entry = cache.put(
+            key, version, body.encode() if isinstance(body, str) else body, tables
+        )
+        logger.debug("Payload cache miss for %s (version %d)", key, version)
+    return entry
+
+
+def json_payload_response(entry: CachedPayload) -> Response:
+    """Serve a cached payload to the current request.
+
+    Returns:
+        200 response with ETag, or 304 if the client's If-None-Match matches.
+        Bodies are compressed once per encoding and reused from the cache.
+    """
+    encoding = negotiate_encoding(request)
+    body, applied = entry.body_for(
+        encoding, int(current_app.config.get("COMPRESS_MIN_SIZE", 1024))
+    )
+    if request.if_none_match.contains_weak(entry.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(
+            body, status=200, mimetype="application/json"
+        )
+        if applied is not None:
+            response.headers["Content-Encoding"] = applied
+    response.vary.add("Accept-Encoding")
+    # Compressed representations get a weak ETag, like the compression hook
+    response.set_etag(entry.etag, weak=applied is not None)
+    # Let browsers keep the body but always revalidate it with the ETag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_dirty_on_flush(session: Session, flush_context: UOWTransaction) -> None:
+    if session.new or session.dirty or session.deleted:
+        session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dirty_on_execute(orm_execute_state: ORMExecuteState) -> None:
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        current_cache().bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import json
 import logging
 import sys
+from collections import Counter
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
-from typing import TypedDict
+from typing import NamedTuple, Protocol, Sequence, TypedDict, Union
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
@@ -12,6 +15,8 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas as pdf_canvas
 
+from app.barcodes import barcode_bars
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +34,66 @@ class PdfLabelData(_PdfLabelDataRequired, total=False):
     unit: str
     price_font_size: int
     text_font_size: int
+    layout_json: str | None
+    barcode: str | None
+
+
+class PdfLabel(Protocol):
+    """Attribute-style label record accepted by the renderer.
+
+    Implemented by ``app.label_snapshot.LabelRow`` so print jobs can be rendered
+    without building an intermediate PdfLabelData dict per label.
+    """
+
+    product_name: str
+    form: str
+    amount: float
+    price: float
+    unit_price: float | None
+    unit: str
+    layout_json: str | None
+    barcode: str | None
+
+
+class LabelLayout(TypedDict):
+    """Precomputed text layout of one label (stored in ``Label.layout_json``).
+
+    ``fits`` maps a font-settings key ("price/text", see ``fit_key``) to the
+    fitted font sizes: one per line, then the price and the unit price size.
+    ``key`` identifies the label values the strings were built from.
+    """
+
+    key: str
+    lines: list[str]
+    price_text: str
+    unit_price_text: str
+    fits: dict[str, list[float]]
+
+
+class TextPlacement(NamedTuple):
+    """One centred string of a placed label.
+
+    ``baseline`` is measured in points from the bottom edge of the label; the
+    string is centred on the label's vertical axis.
+    """
+
+    text: str
+    font_name: str
+    font_size: float
+    baseline: float
+
+
+class BarcodePlacement(NamedTuple):
+    """Position of a label's EAN barcode, in points from the label's bottom-left."""
+
+    code: str
+    x: float
+    y: float
+    module_width: float
+    height: float
+
+
+PdfLabelSource = Union[PdfLabelData, PdfLabel]
 
 
 def _format_czech_number(value: float, decimals: int = 2) -> str:
@@ -45,6 +110,75 @@ def _format_czech_price(value: float) -> str:
     return f"{value:.2f}".replace(".", ",") + " Kč"
 
 
+MAX_CHARS_PER_LINE = 25
+
+
+def layout_key(
+    product_name: str,
+    form: str,
+    amount: float,
+    price: float,
+    unit_price: float | None,
+    unit: str,
+) -> str:
+    """Identify the label values a stored layout was built from."""
+    return "\x1f".join(
+        (product_name, form, repr(amount), repr(price), repr(unit_price), unit)
+    )
+
+
+def fit_key(price_font_size: int, text_font_size: int) -> str:
+    """Key of a font-settings combination in ``LabelLayout.fits``."""
+    return f"{price_font_size}/{text_font_size}"
+
+
+def _split_name(product_name: str, form_info: str) -> list[str]:
+    """Break the product name and form info into the two top-zone lines."""
+    if len(product_name) <= MAX_CHARS_PER_LINE:
+        return [product_name, form_info]
+    split_idx = product_name.rfind(" ", 0, MAX_CHARS_PER_LINE)
+    if split_idx == -1:
+        line1 = product_name[:MAX_CHARS_PER_LINE]
+        line2 = product_name[MAX_CHARS_PER_LINE:]
+    else:
+        line1 = product_name[:split_idx]
+        line2 = product_name[split_idx + 1 :]
+    second_line = (
+        (line2.strip() + "  " + form_info).strip() if line2.strip() else form_info
+    )
+    return [line1, second_line]
+
+
+def build_layout(
+    product_name: str,
+    form: str,
+    amount: float,
+    price: float,
+    unit_price: float | None,
+    unit: str,
+) -> LabelLayout:
+    """Build the formatted strings and line breaks of a label (no fitting yet)."""
+    form_info = f"{form} {_format_czech_number(amount)} {unit}"
+    return LabelLayout(
+        key=layout_key(product_name, form, amount, price, unit_price, unit),
+        lines=_split_name(product_name, form_info),
+        price_text=_format_czech_price(price),
+        unit_price_text=f"1 {unit} = {unit_price:.2f} Kč".replace(".", ","),
+        fits={},
+    )
+
+
+@lru_cache(maxsize=4096)
+def _barcode_operators(code: str, module_width: float, height: float) -> str:
+    """PDF path operators filling the bars of a code (reused across documents)."""
+    _modules, bars = barcode_bars(code)
+    rects = " ".join(
+        f"{start * module_width:.3f} 0 {width * module_width:.3f} {height:.3f} re"
+        for start, width in bars
+    )
+    return f"{rects} f"
+
+
 def get_font_path(font_name: str) -> str:
     """Find path to font."""
     if getattr(sys, "frozen", False):
@@ -91,11 +225,23 @@ class LabelPDFGenerator:
     MARGIN_TOP = 8 * mm
     MARGIN_BETWEEN = 0 * mm  # No space between labels - they share borders
 
-    def __init__(self) -> None:
-        """Initialize PDF generator."""
+    def __init__(self, price_font_size: int = 34, text_font_size: int = 10) -> None:
+        """Initialize PDF generator.
+
+        Args:
+            price_font_size: Price font size for labels that do not set their own.
+            text_font_size: Text font size for labels that do not set their own.
+        """
         self.page_width: float
         self.page_height: float
         self.page_width, self.page_height = A4
+        self.price_font_size = price_font_size
+        self.text_font_size = text_font_size
+        # Barcode form XObjects already defined in the canvas being drawn
+        self._forms_canvas: pdf_canvas.Canvas | None = None
+        self._barcode_forms: set[str] = set()
+        # Codes printed more than once in the current job; only these get a form
+        self._shared_barcodes: set[str] = set()
         logger.debug(
             f"PDF Generator initialized (Page: {self.page_width}x{self.page_height})"
         )
@@ -130,6 +276,10 @@ class LabelPDFGenerator:
 
     # Padding inside label boundary
     LABEL_PADDING = 2.5 * mm
+    # EAN bar width (~80 % of the nominal 0.33 mm) and the top of the barcode
+    # zone as a fraction of the label height; the text zones above move up
+    BARCODE_MODULE_WIDTH = 0.26 * mm
+    BARCODE_ZONE_TOP = 0.27
     # Maximum iterations for auto-fit loop
     _MAX_SHRINK_ITERATIONS = 20
     _MIN_FONT_SIZE = 5
@@ -154,28 +304,193 @@ class LabelPDFGenerator:
         Returns:
             The (possibly reduced) font size that makes text fit.
         """
+        return self._fit_width(text, font_name, font_size, max_width)
+
+    def _fit_width(
+        self, text: str, font_name: str, font_size: float, max_width: float
+    ) -> float:
+        """Canvas-free variant of _fit_text_width (same font metrics)."""
         for _ in range(self._MAX_SHRINK_ITERATIONS):
-            width = canvas.stringWidth(text, font_name, font_size)
+            width = pdfmetrics.stringWidth(text, font_name, font_size)
             if width <= max_width or font_size <= self._MIN_FONT_SIZE:
                 break
             font_size -= 0.5
         return max(font_size, self._MIN_FONT_SIZE)
 
+    def fit_layout(
+        self, layout: LabelLayout, price_font_size: int, text_font_size: int
+    ) -> list[float]:
+        """Fit the layout's strings for one font-settings combination.
+
+        The result is also stored in ``layout["fits"]``.
+
+        Returns:
+            Fitted sizes: one per line, then the price and unit price sizes.
+        """
+        usable_width = self.LABEL_WIDTH - 2 * self.LABEL_PADDING
+        sizes = [
+            self._fit_width(line, FONT_BOLD, text_font_size, usable_width)
+            for line in layout["lines"]
+        ]
+        sizes.append(
+            self._fit_width(
+                layout["price_text"], FONT_BOLD, price_font_size, usable_width
+            )
+        )
+        sizes.append(
+            self._fit_width(
+                layout["unit_price_text"], FONT_REGULAR, text_font_size, usable_width
+            )
+        )
+        layout["fits"][fit_key(price_font_size, text_font_size)] = sizes
+        return sizes
+
+    def _unpack_label(
+        self, label_data: PdfLabelSource
+    ) -> tuple[str, str, float, float, float | None, str, int, int, str | None]:
+        """Read the fields draw_label needs from a dict or an attribute record."""
+        if isinstance(label_data, dict):
+            return (
+                label_data["product_name"],
+                label_data["form"],
+                label_data["amount"],
+                label_data["price"],
+                label_data["unit_price"],
+                label_data.get("unit", "ml"),
+                int(label_data.get("price_font_size", self.price_font_size)),
+                int(label_data.get("text_font_size", self.text_font_size)),
+                label_data.get("layout_json"),
+            )
+        return (
+            label_data.product_name,
+            label_data.form,
+            label_data.amount,
+            label_data.price,
+            label_data.unit_price,
+            label_data.unit,
+            self.price_font_size,
+            self.text_font_size,
+            label_data.layout_json,
+        )
+
+    @staticmethod
+    def _label_barcode(label_data: PdfLabelSource) -> str | None:
+        if isinstance(label_data, dict):
+            return label_data.get("barcode")
+        return label_data.barcode
+
+    def place_barcode(self, label_data: PdfLabelSource) -> BarcodePlacement | None:
+        """Position the label's barcode centred in the bottom zone, if it has one."""
+        code = self._label_barcode(label_data)
+        if not code:
+            return None
+        modules, _bars = barcode_bars(code)
+        width = modules * self.BARCODE_MODULE_WIDTH
+        return BarcodePlacement(
+            code=code,
+            x=(self.LABEL_WIDTH - width) / 2,
+            y=self.LABEL_PADDING,
+            module_width=self.BARCODE_MODULE_WIDTH,
+            height=self.LABEL_HEIGHT * self.BARCODE_ZONE_TOP - self.LABEL_PADDING,
+        )
+
+    def place_label(self, label_data: PdfLabelSource) -> list[TextPlacement]:
+        """Position the strings of one label in its three layout zones.
+
+        Layout zones (top to bottom):
+        - Top ~30%: product name + form info (1–2 lines)
+        - Middle ~40%: large price
+        - Bottom ~30%: unit price
+
+        Labels with a barcode keep the bottom ~27% for it (see place_barcode);
+        the price and unit price zones are narrowed above it.
+
+        Shared by the PDF renderer and the thermal output backends
+        (``app.label_output``), so every format prints the same layout.
+
+        Returns:
+            The name lines, then the price and the unit price placement.
+        """
+        (
+            product_name,
+            form,
+            amount,
+            price,
+            unit_price,
+            unit,
+            price_font_size,
+            text_font_size,
+            layout_json,
+        ) = self._unpack_label(label_data)
+
+        # Use the layout stored at write time when it still matches the label;
+        # otherwise (edited outside the app, new font settings) compute it here
+        layout: LabelLayout | None = json.loads(layout_json) if layout_json else None
+        if layout is None or layout["key"] != layout_key(
+            product_name, form, amount, price, unit_price, unit
+        ):
+            layout = build_layout(product_name, form, amount, price, unit_price, unit)
+        sizes = layout["fits"].get(fit_key(price_font_size, text_font_size))
+        if sizes is None:
+            sizes = self.fit_layout(layout, price_font_size, text_font_size)
+        lines = layout["lines"]
+
+        # --- Zone boundaries (relative to label bottom edge) ---
+        top_zone_top = self.LABEL_HEIGHT - self.LABEL_PADDING
+        top_zone_bottom = self.LABEL_HEIGHT * 0.70
+        mid_zone_top = top_zone_bottom
+        mid_zone_bottom = self.LABEL_HEIGHT * 0.30
+        bot_zone_top = mid_zone_bottom
+        bot_zone_bottom = self.LABEL_PADDING
+        if self._label_barcode(label_data):
+            mid_zone_bottom = bot_zone_top = self.LABEL_HEIGHT * 0.42
+            bot_zone_bottom = self.LABEL_HEIGHT * self.BARCODE_ZONE_TOP
+
+        # === TOP ZONE: Product name + form info ===
+        line_height = text_font_size * 1.3
+        total_text_height = line_height * len(lines)
+        zone_height = top_zone_top - top_zone_bottom
+        start_y = (
+            top_zone_top - (zone_height - total_text_height) / 2 - text_font_size * 0.8
+        )
+
+        placements = []
+        for line, fitted_size in zip(lines, sizes):
+            placements.append(TextPlacement(line, FONT_BOLD, fitted_size, start_y))
+            start_y -= line_height
+
+        # === MIDDLE ZONE: Large price ===
+        fitted_price_size = sizes[-2]
+        mid_center_y = (mid_zone_top + mid_zone_bottom) / 2 - fitted_price_size * 0.35
+        placements.append(
+            TextPlacement(
+                layout["price_text"], FONT_BOLD, fitted_price_size, mid_center_y
+            )
+        )
+
+        # === BOTTOM ZONE: Unit price ===
+        fitted_unit_size = sizes[-1]
+        bot_center_y = (bot_zone_top + bot_zone_bottom) / 2 - fitted_unit_size * 0.35
+        placements.append(
+            TextPlacement(
+                layout["unit_price_text"], FONT_REGULAR, fitted_unit_size, bot_center_y
+            )
+        )
+        return placements
+
     def draw_label(
         self,
         pdf_canvas: pdf_canvas.Canvas,
         x: float,
         y: float,
-        label_data: PdfLabelData,
+        label_data: PdfLabelSource,
     ) -> None:
         """Draw a single pharmacy price label with auto-scaling and clipping.
 
-        Layout zones (top to bottom):
-        - Top ~30%: product name + form info (1–2 lines)
-        - Middle ~40%: large price
-        - Bottom ~30%: unit price
+        The text positions come from ``place_label``.
         """
-        logger.debug(f"Drawing label at ({x}, {y}): {label_data['product_name']}")
+        placements = self.place_label(label_data)
+        logger.debug(f"Drawing label at ({x}, {y}): {placements[0].text}")
 
         pdf_canvas.saveState()
 
@@ -191,95 +506,68 @@ class LabelPDFGenerator:
 
         # Center X for all text
         text_x = x + self.LABEL_WIDTH / 2
-        usable_width = self.LABEL_WIDTH - 2 * self.LABEL_PADDING
-
-        # Prepare data
-        product_name = label_data["product_name"]
-        unit = label_data.get("unit", "ml")
-        amount = label_data["amount"]
-        form = label_data["form"]
-        price_font_size = int(label_data.get("price_font_size", 34))
-        text_font_size = int(label_data.get("text_font_size", 10))
-
-        # --- Zone boundaries (relative to label bottom-left y) ---
-        top_zone_top = y + self.LABEL_HEIGHT - self.LABEL_PADDING
-        top_zone_bottom = y + self.LABEL_HEIGHT * 0.70
-        mid_zone_top = top_zone_bottom
-        mid_zone_bottom = y + self.LABEL_HEIGHT * 0.30
-        bot_zone_top = mid_zone_bottom
-        bot_zone_bottom = y + self.LABEL_PADDING
-
-        # === TOP ZONE: Product name + form info ===
         pdf_canvas.setFillColorRGB(0, 0, 0)
-        form_info = f"{form} {_format_czech_number(amount)} {unit}"
-        MAX_CHARS_PER_LINE = 25
-
-        if len(product_name) <= MAX_CHARS_PER_LINE:
-            lines = [product_name, form_info]
-        else:
-            split_idx = product_name.rfind(" ", 0, MAX_CHARS_PER_LINE)
-            if split_idx == -1:
-                line1 = product_name[:MAX_CHARS_PER_LINE]
-                line2 = product_name[MAX_CHARS_PER_LINE:]
+        for text, font_name, font_size, baseline in placements:
+            pdf_canvas.setFont(font_name, font_size)
+            pdf_canvas.drawCentredString(text_x, y + baseline, text)
+
+        barcode = self.place_barcode(label_data)
+        if barcode is not None:
+            # A form XObject carries its own resources and stream object, which
+            # only pays off when the code is repeated; single codes go inline.
+            shared = barcode.code in self._shared_barcodes
+            form_name = self._barcode_form(pdf_canvas, barcode) if shared else ""
+            pdf_canvas.translate(x + barcode.x, y + barcode.y)
+            if shared:
+                pdf_canvas.doForm(form_name)
             else:
-                line1 = product_name[:split_idx]
-                line2 = product_name[split_idx + 1 :]
-            second_line = (
-                (line2.strip() + "  " + form_info).strip()
-                if line2.strip()
-                else form_info
-            )
-            lines = [line1, second_line]
+                pdf_canvas.addLiteral(
+                    _barcode_operators(
+                        barcode.code, barcode.module_width, barcode.height
+                    )
+                )
 
-        # Auto-fit each line
-        line_height = text_font_size * 1.3
-        total_text_height = line_height * len(lines)
-        zone_height = top_zone_top - top_zone_bottom
-        start_y = (
-            top_zone_top - (zone_height - total_text_height) / 2 - text_font_size * 0.8
-        )
+        pdf_canvas.restoreState()
 
-        for line in lines:
-            fitted_size = self._fit_text_width(
-                pdf_canvas, line, FONT_BOLD, text_font_size, usable_width
-            )
-            pdf_canvas.setFont(FONT_BOLD, fitted_size)
-            pdf_canvas.drawCentredString(text_x, start_y, line)
-            start_y -= line_height
+    def _barcode_form(
+        self, pdf_canvas: pdf_canvas.Canvas, barcode: BarcodePlacement
+    ) -> str:
+        """Name of the barcode's form XObject, defining it on first use.
 
-        # === MIDDLE ZONE: Large price ===
-        price_text = _format_czech_price(label_data["price"])
-        fitted_price_size = self._fit_text_width(
-            pdf_canvas, price_text, FONT_BOLD, price_font_size, usable_width
+        Each code is drawn once per document; every further label with the same
+        code only references the form.
+        """
+        if pdf_canvas is not self._forms_canvas:
+            self._forms_canvas = pdf_canvas
+            self._barcode_forms.clear()
+        form_name = f"ean{barcode.code}"
+        if form_name in self._barcode_forms:
+            return form_name
+
+        modules, _bars = barcode_bars(barcode.code)
+        pdf_canvas.beginForm(
+            form_name, 0, 0, modules * barcode.module_width, barcode.height
         )
-        pdf_canvas.setFont(FONT_BOLD, fitted_price_size)
-        mid_center_y = (mid_zone_top + mid_zone_bottom) / 2 - fitted_price_size * 0.35
-        pdf_canvas.drawCentredString(text_x, mid_center_y, price_text)
-
-        # === BOTTOM ZONE: Unit price ===
-        unit_price = label_data["unit_price"]
-        unit_price_text = f"1 {unit} = {unit_price:.2f} Kč".replace(".", ",")
-        fitted_unit_size = self._fit_text_width(
-            pdf_canvas, unit_price_text, FONT_REGULAR, text_font_size, usable_width
+        pdf_canvas.setFillColorRGB(0, 0, 0)
+        pdf_canvas.addLiteral(
+            _barcode_operators(barcode.code, barcode.module_width, barcode.height)
         )
-        pdf_canvas.setFont(FONT_REGULAR, fitted_unit_size)
-        bot_center_y = (bot_zone_top + bot_zone_bottom) / 2 - fitted_unit_size * 0.35
-        pdf_canvas.drawCentredString(text_x, bot_center_y, unit_price_text)
+        pdf_canvas.endForm()
+        self._barcode_forms.add(form_name)
+        return form_name
 
-        pdf_canvas.restoreState()
-
-    def generate_pdf(self, labels: list[PdfLabelData]) -> BytesIO | None:
+    def generate_pdf(self, labels: Sequence[PdfLabelSource]) -> BytesIO | None:
         """
         Generate PDF with all labels marked for printing.
 
         Args:
-            labels: List of label dictionaries with keys:
+            labels: Label dictionaries or attribute records (LabelRow) with:
                    - product_name
                    - form
                    - amount
                    - price
                    - unit_price
-                   - unit (optional, defaults to 'ml')
+                   - unit (optional for dicts, defaults to 'ml')
 
         Returns:
             BytesIO: PDF file in memory
@@ -296,6 +584,11 @@ class LabelPDFGenerator:
         pdf.setTitle("Pharmacy Price Labels")
         pdf.setAuthor("LabelMaker 2.0")
 
+        codes = Counter(self._label_barcode(label) for label in labels)
+        self._shared_barcodes = {
+            code for code, count in codes.items() if code and count > 1
+        }
+
         # Calculate label positions on page
         positions = self.calculate_label_positions()
         labels_per_page = len(positions)
@@ -329,15 +622,21 @@ class LabelPDFGenerator:
         return pdf_buffer
 
 
-def generate_labels_pdf(labels: list[PdfLabelData]) -> BytesIO | None:
+def generate_labels_pdf(
+    labels: Sequence[PdfLabelSource],
+    price_font_size: int = 34,
+    text_font_size: int = 10,
+) -> BytesIO | None:
     """
     Convenience function to generate PDF from label list.
 
     Args:
-        labels: List of PdfLabelData dicts (from _enrich_label_with_unit).
+        labels: PdfLabelData dicts or LabelRow snapshots (with unit attached).
+        price_font_size: Price font size for labels that do not set their own.
+        text_font_size: Text font size for labels that do not set their own.
 
     Returns:
         BytesIO: PDF file in memory, or None if labels list is empty.
     """
-    generator = LabelPDFGenerator()
+    generator = LabelPDFGenerator(price_font_size, text_font_size)
     return generator.generate_pdf(labels)
@@ -0,0 +1,118 @@
+"""Last-printed snapshots and the "changed since last print" selector.
+
+Every label remembers the price, amount, form and unit it was last printed
+with (``Label.printed_*``). The PDF endpoints record them when they deliver a
+job, so reprinting can be limited to labels whose printed values are out of
+date instead of staff guessing and over-printing whole batches.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Sequence
+from datetime import UTC, datetime
+
+from sqlalchemy import and_, bindparam, false, not_, or_, select, true, update
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db import db
+from app.label_snapshot import LabelRow
+from app.models import Form, Label
+
+logger = logging.getLogger(__name__)
+
+_label_table = Label.__table__
+
+_RECORD_PRINTED = (
+    update(_label_table)
+    .where(_label_table.c.id == bindparam("b_id"))
+    .values(
+        printed_price=bindparam("b_price"),
+        printed_amount=bindparam("b_amount"),
+        printed_form=bindparam("b_form"),
+        printed_unit=bindparam("b_unit"),
+        printed_at=bindparam("b_printed_at"),
+    )
+)
+
+
+def record_printed(rows: Sequence[LabelRow]) -> None:
+    """Store the values the given labels were just printed with.
+
+    The snapshot values are stored rather than copied in SQL, so a label edited
+    while the PDF was rendering still counts as changed. The caller commits.
+
+    Args:
+        rows: Label snapshots that went into the delivered PDF.
+    """
+    if not rows:
+        return
+    printed_at = datetime.now(UTC)
+    db.session.execute(
+        _RECORD_PRINTED,
+        [
+            {
+                "b_id": row.id,
+                "b_price": row.price,
+                "b_amount": row.amount,
+                "b_form": row.form,
+                "b_unit": row.unit,
+                "b_printed_at": printed_at,
+            }
+            for row in rows
+        ],
+    )
+    logger.debug(f"Recorded print snapshot for {len(rows)} labels")
+
+
+def changed_since_print(include_unprinted: bool = True) -> ColumnElement[bool]:
+    """SQL condition: the label differs from what was last printed.
+
+    Args:
+        include_unprinted: Also match labels that were never printed.
+    """
+    current_unit = (
+        select(Form.unit)
+        .where(Form.short_name == Label.form)
+        .correlate_except(Form)
+        .scalar_subquery()
+    )
+    printed = Label.printed_at.is_not(None)
+    differs = or_(
+        Label.price.is_distinct_from(Label.printed_price),
+        Label.amount.is_distinct_from(Label.printed_amount),
+        Label.form.is_distinct_from(Label.printed_form),
+        current_unit.is_distinct_from(Label.printed_unit),
+    )
+    if include_unprinted:
+        return or_(~printed, differs)
+    return and_(printed, differs)
+
+
+def mark_changed_labels(replace: bool = False, include_unprinted: bool = True) -> int:
+    """Mark every label that changed since its last print, set-based.
+
+    Args:
+        replace: Clear existing print marks first, so the queue holds exactly
+            the changed labels.
+        include_unprinted: Also mark labels that were never printed.
+
+    Returns:
+        Number of labels newly marked because they changed; labels that were
+        already marked are left alone and not counted. The caller commits.
+    """
+    changed = changed_since_print(include_unprinted)
+    if replace:
+        db.session.execute(
+            update(Label)
+            .where(Label.marked_to_print.is_(True), not_(changed))
+            .values(marked_to_print=false(), version=Label.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    result = db.session.execute(
+        update(Label)
+        .where(changed, Label.marked_to_print.is_not(True))
+        .values(marked_to_print=true(), version=Label.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return int(result.rowcount)  # type: ignore[attr-defined]
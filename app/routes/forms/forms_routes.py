@@ -1,13 +1,16 @@
 import logging
 from typing import cast
 
-from flask import Blueprint, jsonify, render_template, request
+from flask import Blueprint, current_app, jsonify, render_template, request
 from flask.typing import ResponseReturnValue
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app.db import db
-from app.models import Form, Label
+from app.form_writes import MergeConflict, merge_forms, rename_form
+from app.models import Form, FormDict, Label
+from app.payload_cache import CachedPayload, cached_payload, json_payload_response
 from app.utils import translate_db_error
+from app.write_queue import run_write
 
 logger = logging.getLogger(__name__)
 bp = Blueprint("forms", __name__)
@@ -32,15 +35,28 @@ def _get_sorted_forms(sort_by: str) -> list[Form]:
     return cast(list[Form], Form.query.order_by(column.asc()).all())
 
 
+def _form_list_payload(sort_by: str) -> CachedPayload:
+    """Cached ``{"forms": [...]}`` list payload, shared by the page and API."""
+
+    def build() -> str:
+        forms = _get_sorted_forms(sort_by)
+        logger.debug(f"Found {len(forms)} forms in database")
+        forms_list = [form.to_dict() for form in forms]
+        return current_app.json.dumps({"forms": forms_list})
+
+    return cached_payload(("forms", sort_by), build, ("form",))
+
+
 @bp.route("/forms", methods=["GET"])
 def list_forms() -> str:
-    """Render forms management page."""
+    """Render forms management page with the form list embedded for its script."""
     logger.info("Rendering forms management page")
     sort_by = request.args.get("sort", "name")
-    forms = _get_sorted_forms(sort_by)
-    logger.debug(f"Loaded {len(forms)} forms for listing")
     return render_template(
-        "forms/list_forms.html", forms=forms, sort_by=sort_by, active_page="forms"
+        "forms/list_forms.html",
+        forms_payload=_form_list_payload(sort_by),
+        sort_by=sort_by,
+        active_page="forms",
     )
 
 
@@ -67,25 +83,25 @@ def create_form() -> ResponseReturnValue:
                 {"error": f"Missing required fields: {', '.join(missing_fields)}"}
             ), 400
 
-        form = Form(name=name, short_name=short_name, unit=unit)
-        db.session.add(form)
-        db.session.commit()
+        def write() -> FormDict:
+            form = Form(name=name, short_name=short_name, unit=unit)
+            db.session.add(form)
+            db.session.flush()
+            return form.to_dict()
+
+        created = run_write(write)
         logger.info(
             f"Form created successfully: {name} (short_name: {short_name}, unit: {unit})"
         )
 
-        return jsonify(
-            {"message": "Form created successfully", "form": form.to_dict()}
-        ), 201
+        return jsonify({"message": "Form created successfully", "form": created}), 201
 
     except IntegrityError as e:
         logger.error(f"Integrity error creating form: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
     except SQLAlchemyError as e:
         logger.error(f"Database error creating form: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
@@ -113,29 +129,72 @@ def update_form() -> ResponseReturnValue:
                 {"error": f"Missing required fields: {', '.join(missing_fields)}"}
             ), 400
 
-        form = db.session.get(Form, name)
-        if not form:
+        logger.debug(f"Updating form {name}: short_name={short_name}, unit={unit}")
+        # A new short name moves the form's labels along (see app/form_writes.py)
+        updated = run_write(lambda: rename_form(name, short_name, unit))
+        if updated is None:
             logger.warning(f"Form not found: {name}")
             return jsonify({"error": "Form not found"}), 404
-
-        logger.debug(f"Updating form {name}: short_name={short_name}, unit={unit}")
-        form.short_name = short_name
-        form.unit = unit
-        db.session.commit()
         logger.info(f"Form updated successfully: {name}")
 
         return jsonify(
-            {"message": "Form updated successfully", "form": form.to_dict()}
+            {
+                "message": "Form updated successfully",
+                "form": updated["form"],
+                "moved": updated["moved"],
+            }
         ), 200
 
     except IntegrityError as e:
         logger.error(f"Integrity error updating form: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
     except SQLAlchemyError as e:
         logger.error(f"Database error updating form: {e}", exc_info=True)
-        db.session.rollback()
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/form/merge", methods=["POST"])
+def merge_forms_api() -> ResponseReturnValue:
+    """Move all labels of one form to another and delete the first form."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        source = str(data.get("source", "")).strip()
+        target = str(data.get("target", "")).strip()
+        policy = data.get("on_conflict", "fail")
+        if not source or not target:
+            return jsonify({"error": "source and target are required"}), 400
+        logger.info(f"Merging form {source} into {target} (on_conflict={policy})")
+
+        merged = run_write(lambda: merge_forms(source, target, policy))
+        if merged is None:
+            logger.warning(f"Form not found for merge: {source} -> {target}")
+            return jsonify({"error": "Form not found"}), 404
+
+        return jsonify(
+            {
+                "message": "Forms merged successfully",
+                **merged,
+            }
+        ), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except MergeConflict as e:
+        logger.warning(f"Form merge refused: {e}")
+        return jsonify(
+            {
+                "error": "Některé cenovky existují v obou formách. Zvolte, "
+                "kterou z nich ponechat.",
+                "conflicts": e.product_names,
+            }
+        ), 409
+    except SQLAlchemyError as e:
+        logger.error(f"Database error merging forms: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
@@ -146,10 +205,7 @@ def get_forms() -> ResponseReturnValue:
     try:
         logger.info("Fetching all forms")
         sort_by = request.args.get("sort", "name")
-        forms = _get_sorted_forms(sort_by)
-        logger.debug(f"Found {len(forms)} forms in database")
-        forms_list = [form.to_dict() for form in forms]
-        return jsonify({"forms": forms_list}), 200
+        return json_payload_response(_form_list_payload(sort_by))
     except SQLAlchemyError as e:
         logger.error(f"Error fetching forms: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
@@ -164,12 +220,20 @@ def delete_form() -> ResponseReturnValue:
         form_name = data.get("name")
         logger.info(f"Deleting form: {form_name}")
 
-        form = db.session.get(Form, form_name)
-        if not form:
+        def write() -> int | None:
+            """Delete the form unless labels use it; returns that label count."""
+            form = db.session.get(Form, form_name)
+            if not form:
+                return None
+            label_count: int = Label.query.filter_by(form=form.short_name).count()
+            if label_count == 0:
+                db.session.delete(form)
+            return label_count
+
+        label_count = run_write(write)
+        if label_count is None:
             logger.warning(f"Form not found for deletion: {form_name}")
             return jsonify({"error": "Form not found"}), 404
-
-        label_count = Label.query.filter_by(form=form.short_name).count()
         if label_count > 0:
             logger.warning(
                 f"Cannot delete form '{form_name}': used by {label_count} label(s)"
@@ -181,13 +245,10 @@ def delete_form() -> ResponseReturnValue:
                 }
             ), 409
 
-        db.session.delete(form)
-        db.session.commit()
         logger.info(f"Form deleted successfully: {form_name}")
         return jsonify({"message": "Form deleted successfully"}), 200
 
     except SQLAlchemyError as e:
         logger.error(f"Error deleting form: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
@@ -1,55 +1,133 @@
 import logging
-from collections.abc import Callable
-from typing import cast
-
-from flask import Blueprint, jsonify, render_template, request, send_file
+from io import BytesIO
+from typing import Any
+
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    render_template,
+    request,
+    send_file,
+    stream_with_context,
+)
 from flask.typing import ResponseReturnValue
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+from app import label_writes
+from app.admission import render_slot
+from app.barcodes import normalize_barcode
 from app.constants import (
     LABEL_NOT_FOUND,
+    LABEL_VERSION_CONFLICT,
     PRICE_FONT_SIZE_MAX,
     PRICE_FONT_SIZE_MIN,
     TEXT_FONT_SIZE_MAX,
     TEXT_FONT_SIZE_MIN,
 )
 from app.db import db
+from app.duplicates import (
+    DUPLICATE_THRESHOLD,
+    find_duplicate_clusters,
+    find_similar_labels,
+)
+from app.label_archive import (
+    ARCHIVE_SEARCH_LIMIT_DEFAULT,
+    ARCHIVE_SEARCH_LIMIT_MAX,
+    archive_labels,
+    count_archived,
+    delete_labels,
+    parse_ids,
+    parse_selection,
+    purge_archived,
+    restore_labels,
+    search_archive,
+)
+from app.label_export import (
+    EXPORT_FORMATS,
+    PRINT_FILTERS,
+    select_export_rows,
+    stream_export,
+)
+from app.label_layout import refresh_label_layout, refresh_printed_layouts
+from app.label_output import BACKENDS, DEFAULT_DPI, get_backend, open_sink
+from app.label_snapshot import (
+    dumps_label_list,
+    load_label_row,
+    load_label_rows,
+)
+from app.label_writes import VersionConflict
 from app.models import Form, Label, LabelDict
-from app.pdf_generator import PdfLabelData, generate_labels_pdf
+from app.payload_cache import CachedPayload, cached_payload, json_payload_response
+from app.pdf_generator import generate_labels_pdf
+from app.print_history import mark_changed_labels, record_printed
+from app.search import SEARCH_LIMIT_DEFAULT, SEARCH_LIMIT_MAX, search_labels
+from app.static_assets import IMMUTABLE_MAX_AGE
+from app.thumbnails import (
+    PREVIEW_COLUMNS,
+    PREVIEW_PAGE_SIZE,
+    count_preview_pages,
+    load_preview_page,
+    preview_labels,
+    thumbnail_cache,
+)
 from app.utils import (
     calculate_unit_price,
     load_font_settings,
     save_font_settings,
     translate_db_error,
 )
+from app.write_queue import run_write
 
 bp = Blueprint("labels", __name__, url_prefix="/labels")
 logger = logging.getLogger(__name__)
 
-# Mapping of sort parameter to Label query ordering
-_LABEL_SORT_OPTIONS: dict[str, Callable[[], list[Label]]] = {
-    "name": lambda: cast(list[Label], Label.query.order_by(Label.product_name).all()),
-    "date": lambda: cast(
-        list[Label], Label.query.order_by(Label.created_at.desc()).all()
-    ),
-    "marked": lambda: cast(
-        list[Label],
-        Label.query.order_by(Label.marked_to_print.desc(), Label.product_name).all(),
-    ),
-}
 
-
-def _get_sorted_labels(sort_by: str) -> list[Label]:
-    """Return labels sorted by the given column key.
+def _label_list_payload(sort_by: str) -> CachedPayload:
+    """Cached ``{"count", "labels"}`` list payload, shared by the page and API.
 
     Args:
         sort_by: Sort key from query string ('name', 'date', or 'marked').
+    """
 
-    Returns:
-        List of Label records in requested order.
+    def build() -> str:
+        rows = load_label_rows(sort_by)
+        logger.info(f"Encoded {len(rows)} labels.")
+        return dumps_label_list(rows)
+
+    return cached_payload(("labels", sort_by), build, ("label",))
+
+
+def _expected_version(data: dict[str, Any] | None = None) -> int | None:
+    """Label version the client based its write on, if it sent one.
+
+    Taken from the If-Match header (the label's ETag) or a ``version`` field.
+
+    Raises:
+        ValueError: Not a single label version.
     """
-    query_fn = _LABEL_SORT_OPTIONS.get(sort_by, _LABEL_SORT_OPTIONS["name"])
-    return query_fn()
+    if request.if_match.star_tag:
+        return None
+    tags = request.if_match.as_set(include_weak=True)
+    if tags:
+        tag = tags.pop()
+        if tags or not tag.isdigit():
+            raise ValueError("If-Match must name one label version")
+        return int(tag)
+    version = (data or {}).get("version")
+    if version is None:
+        return None
+    if isinstance(version, bool) or not isinstance(version, int):
+        raise ValueError("version must be an integer")
+    return version
+
+
+def _version_conflict(e: VersionConflict) -> ResponseReturnValue:
+    logger.warning(f"Stale write rejected: {e}")
+    response = jsonify({"error": LABEL_VERSION_CONFLICT, "version": e.current_version})
+    response.set_etag(str(e.current_version))
+    return response, 409
 
 
 def _clamp(value: int, min_val: int, max_val: int) -> int:
@@ -66,41 +144,19 @@ def _clamp(value: int, min_val: int, max_val: int) -> int:
     return max(min_val, min(max_val, value))
 
 
-def _enrich_label_with_unit(
-    label_dict: LabelDict, form_short_name: str
-) -> PdfLabelData:
-    """Enrich a label dict with unit from its form.
-
-    Args:
-        label_dict: Label data dictionary.
-        form_short_name: The form's short_name to look up.
-
-    Returns:
-        PdfLabelData with 'unit' field added.
-    """
-    form = Form.query.filter_by(short_name=form_short_name).first()
-    unit: str = form.unit if form else "ks"
-    if not unit:
-        logger.warning(
-            "Form not found for short_name '%s', defaulting to 'ks'", form_short_name
-        )
-        unit = "ks"
-    return cast(PdfLabelData, {**label_dict, "unit": unit})
-
-
 # Route for /labels (list labels)
 @bp.route("/", methods=["GET"])
 def list_labels() -> str:
-    """Show labels list page."""
+    """Show labels list page with the label list embedded for its script."""
     logger.info("Rendering labels list page")
     sort_by = request.args.get("sort", "name")
-    labels = _get_sorted_labels(sort_by)
+    labels_payload = _label_list_payload(sort_by)
     forms = Form.query.all()
-    logger.debug(f"Loaded {len(forms)} forms and {len(labels)} labels for listing")
+    logger.debug(f"Loaded {len(forms)} forms for listing")
     return render_template(
         "labels/list_labels.html",
         forms=forms,
-        labels=labels,
+        labels_payload=labels_payload,
         sort_by=sort_by,
         active_page="labels",
     )
@@ -163,6 +219,12 @@ def create_label() -> ResponseReturnValue:
             logger.warning(f"Invalid number format: {e}")
             return jsonify({"error": "Price and amount must be valid numbers"}), 400
 
+        try:
+            barcode = normalize_barcode(data.get("barcode"))
+        except ValueError as e:
+            logger.warning(f"Invalid barcode: {data.get('barcode')!r}")
+            return jsonify({"error": str(e)}), 400
+
         # Validate form exists
         form_record = Form.query.filter_by(short_name=form).first()
         if not form_record:
@@ -175,33 +237,52 @@ def create_label() -> ResponseReturnValue:
             f"Calculated unit_price: {unit_price} for amount={amount}, price={price}"
         )
 
-        # Create label
-        label = Label(
-            product_name=product_name,
-            price=price,
-            form=form,
-            amount=amount,
-            unit_price=unit_price,
-            marked_to_print=marked_to_print,
-        )
-        db.session.add(label)
-        db.session.commit()
+        unit = form_record.unit
+
+        def write() -> LabelDict:
+            label = Label(
+                product_name=product_name,
+                price=price,
+                form=form,
+                amount=amount,
+                unit_price=unit_price,
+                barcode=barcode,
+                marked_to_print=marked_to_print,
+            )
+            refresh_label_layout(label, unit)
+            db.session.add(label)
+            db.session.flush()
+            return label.to_dict()
+
+        label = run_write(write)
         logger.info(
-            f"Created label: {product_name} (ID: {label.id}, form: {form}, marked: {marked_to_print})"
+            f"Created label: {product_name} (ID: {label['id']}, form: {form}, marked: {marked_to_print})"
+        )
+
+        # Warn (but do not block) when the catalogue already has a near-duplicate
+        similar = find_similar_labels(
+            product_name, form, amount, exclude_id=label["id"]
         )
+        if similar:
+            logger.warning(
+                f"Label {label['id']} '{product_name}' looks like a duplicate of "
+                f"{[item['id'] for item in similar]}"
+            )
 
         return jsonify(
-            {"message": "Label created successfully", "label": label.to_dict()}
+            {
+                "message": "Label created successfully",
+                "label": label,
+                "possible_duplicates": similar,
+            }
         ), 201
 
     except IntegrityError as e:
         logger.error(f"Integrity error creating label: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
     except SQLAlchemyError as e:
         logger.error(f"Database error creating label: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
@@ -212,106 +293,231 @@ def get_labels_api() -> ResponseReturnValue:
     try:
         logger.info("Fetching all labels")
         sort_by = request.args.get("sort", "name")
-        labels = _get_sorted_labels(sort_by)
-        logger.debug(f"Found {len(labels)} labels in database")
-        labels_data = [label.to_dict() for label in labels]
-        logger.info(f"Returning {len(labels_data)} labels.")
-        return jsonify({"count": len(labels_data), "labels": labels_data}), 200
+        return json_payload_response(_label_list_payload(sort_by))
     except SQLAlchemyError as e:
         logger.error(f"Error fetching labels: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
 
+@bp.route("/api/labels/search", methods=["GET"])
+def search_labels_api() -> ResponseReturnValue:
+    """Ranked prefix search over product names (API)."""
+    query = request.args.get("q", "").strip()
+    limit = _clamp(
+        request.args.get("limit", SEARCH_LIMIT_DEFAULT, type=int),
+        1,
+        SEARCH_LIMIT_MAX,
+    )
+    try:
+        logger.info(f"Searching labels for '{query}'")
+        rows = search_labels(query, limit)
+        logger.debug(f"Search for '{query}' returned {len(rows)} labels")
+        return current_app.response_class(
+            dumps_label_list(rows), mimetype="application/json"
+        )
+    except SQLAlchemyError as e:
+        logger.error(f"Error searching labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/export/<fmt>", methods=["GET"])
+def export_labels(fmt: str) -> ResponseReturnValue:
+    """Stream the label catalogue as CSV or XLSX.
+
+    Takes the list's sort key (``sort``), print filter (``print``: all, marked
+    or unmarked) and search query (``q``).
+    """
+    mimetype = EXPORT_FORMATS.get(fmt)
+    if mimetype is None:
+        return jsonify({"error": f"Unknown export format: {fmt}"}), 400
+    print_filter = request.args.get("print", "all")
+    if print_filter not in PRINT_FILTERS:
+        return jsonify({"error": f"Unknown print filter: {print_filter}"}), 400
+    stmt = select_export_rows(
+        request.args.get("sort", "name"), print_filter, request.args.get("q", "")
+    )
+    logger.info(f"Exporting labels as {fmt}")
+    response = current_app.response_class(
+        stream_with_context(stream_export(fmt, stmt)), mimetype=mimetype
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="labels.{fmt}"'
+    return response
+
+
+@bp.route("/api/labels/duplicates", methods=["GET"])
+def list_duplicate_labels() -> ResponseReturnValue:
+    """List clusters of near-duplicate labels (API)."""
+    threshold = request.args.get("threshold", DUPLICATE_THRESHOLD, type=float)
+    if not 0 < threshold <= 1:
+        return jsonify({"error": "threshold must be between 0 and 1"}), 400
+    try:
+        logger.info(f"Scanning labels for duplicates (threshold={threshold})")
+        clusters = find_duplicate_clusters(threshold)
+        logger.info(f"Found {len(clusters)} duplicate clusters")
+        return jsonify({"count": len(clusters), "clusters": clusters}), 200
+    except SQLAlchemyError as e:
+        logger.error(f"Error scanning for duplicate labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/merge", methods=["POST"])
+def merge_labels() -> ResponseReturnValue:
+    """Merge duplicate labels into one: keep one label, delete the others."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        keep_id = data.get("keep_id")
+        merge_ids = data.get("merge_ids")
+        if not isinstance(keep_id, int) or not isinstance(merge_ids, list):
+            return jsonify({"error": "keep_id and merge_ids are required"}), 400
+        merge_ids = [i for i in merge_ids if i != keep_id]
+        if not merge_ids or not all(isinstance(i, int) for i in merge_ids):
+            return jsonify({"error": "merge_ids must list other label ids"}), 400
+
+        logger.info(f"Merging labels {merge_ids} into {keep_id}")
+
+        def write() -> LabelDict | None:
+            keep = db.session.get(Label, keep_id)
+            merged = Label.query.filter(Label.id.in_(merge_ids)).all()
+            if keep is None or len(merged) != len(set(merge_ids)):
+                return None
+            # A label stays queued for printing if any of the merged copies was
+            if not keep.marked_to_print and any(
+                label.marked_to_print for label in merged
+            ):
+                keep.marked_to_print = True
+                keep.version += 1
+            for label in merged:
+                db.session.delete(label)
+            db.session.flush()
+            return keep.to_dict()
+
+        kept = run_write(write)
+        if kept is None:
+            logger.warning(f"{LABEL_NOT_FOUND} for merge: {keep_id} <- {merge_ids}")
+            return jsonify({"error": LABEL_NOT_FOUND}), 404
+        merged_count = len(set(merge_ids))
+        logger.info(f"Merged {merged_count} labels into label {keep_id}")
+
+        return jsonify(
+            {
+                "message": f"{merged_count} duplicitních cenovek sloučeno",
+                "label": kept,
+                "merged": merged_count,
+            }
+        ), 200
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error merging labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
 @bp.route("/api/label/<int:label_id>", methods=["PUT"])
 def update_label(label_id: int) -> ResponseReturnValue:
-    """Update label information."""
+    """Update label information (409 when If-Match / version is stale)."""
     try:
         logger.info(f"Updating label ID: {label_id}")
-        label = db.session.get(Label, label_id)
-        if not label:
-            logger.warning(f"{LABEL_NOT_FOUND}: ID {label_id}")
-            return jsonify({"error": LABEL_NOT_FOUND}), 404
-
         data = request.get_json()
         if not data:
             logger.warning("No JSON data provided for label update")
             return jsonify({"error": "No JSON data provided"}), 400
 
-        # Update fields if provided
-        updated_fields = []
+        # Validate the provided fields before queueing the write
+        changes: dict[str, object] = {}
         if "product_name" in data:
-            label.product_name = data["product_name"].strip()
-            updated_fields.append("product_name")
+            changes["product_name"] = data["product_name"].strip()
         if "form" in data:
             new_form = data["form"].strip()
             form_record = Form.query.filter_by(short_name=new_form).first()
             if not form_record:
                 logger.warning(f"Form not found: short_name={new_form}")
                 return jsonify({"error": f"Léková forma '{new_form}' neexistuje."}), 400
-            label.form = new_form
-            updated_fields.append("form")
+            changes["form"] = new_form
         if "amount" in data:
-            label.amount = float(data["amount"])
-            updated_fields.append("amount")
+            changes["amount"] = float(data["amount"])
         if "price" in data:
-            label.price = float(data["price"])
-            updated_fields.append("price")
-
-        # Recalculate unit price if price or amount changed
-        if "price" in data or "amount" in data:
-            label.unit_price = calculate_unit_price(label.amount, label.price)
-
+            changes["price"] = float(data["price"])
+        if "barcode" in data:
+            try:
+                changes["barcode"] = normalize_barcode(data["barcode"])
+            except ValueError as e:
+                logger.warning(f"Invalid barcode: {data['barcode']!r}")
+                return jsonify({"error": str(e)}), 400
         if "marked_to_print" in data:
-            label.marked_to_print = data["marked_to_print"]
-            updated_fields.append("marked_to_print")
+            changes["marked_to_print"] = data["marked_to_print"]
+        try:
+            expected_version = _expected_version(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        db.session.commit()
+        updated = run_write(
+            lambda: label_writes.update_label(label_id, changes, expected_version)
+        )
+        if updated is None:
+            logger.warning(f"{LABEL_NOT_FOUND}: ID {label_id}")
+            return jsonify({"error": LABEL_NOT_FOUND}), 404
         logger.info(
-            f"Label {label_id} updated successfully. Fields: {', '.join(updated_fields)}"
+            f"Label {label_id} updated to version {updated['version']}. "
+            f"Fields: {', '.join(changes)}"
         )
-        return jsonify(
-            {"message": "Label updated successfully", "label": label.to_dict()}
-        ), 200
+        response = jsonify({"message": "Label updated successfully", "label": updated})
+        response.set_etag(str(updated["version"]))
+        return response, 200
+
+    except VersionConflict as e:
+        return _version_conflict(e)
 
     except IntegrityError as e:
         logger.error(f"Integrity error updating label {label_id}: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
     except SQLAlchemyError as e:
         logger.error(f"Database error updating label {label_id}: {e}", exc_info=True)
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
 
 @bp.route("/api/label/<int:label_id>/toggle-print", methods=["POST"])
 def toggle_print_mark(label_id: int) -> ResponseReturnValue:
-    """Toggle print mark for a label."""
+    """Toggle print mark for a label (409 when If-Match / version is stale)."""
     try:
         logger.info(f"Toggling print mark for label ID: {label_id}")
-        label = db.session.get(Label, label_id)
-        if not label:
+        try:
+            expected_version = _expected_version(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        toggled = run_write(
+            lambda: label_writes.toggle_print_mark(label_id, expected_version)
+        )
+        if toggled is None:
             logger.warning(f"{LABEL_NOT_FOUND} for toggle: ID {label_id}")
             return jsonify({"error": LABEL_NOT_FOUND}), 404
-
-        old_value = label.marked_to_print
-        label.marked_to_print = not label.marked_to_print
-        db.session.commit()
-        logger.info(
-            f"Label {label_id} print mark toggled: {old_value} -> {label.marked_to_print}"
+        marked, version = toggled
+        logger.info(f"Label {label_id} print mark toggled: {not marked} -> {marked}")
+
+        response = jsonify(
+            {
+                "message": "Print mark toggled",
+                "marked_to_print": marked,
+                "version": version,
+            }
         )
+        response.set_etag(str(version))
+        return response, 200
 
-        return jsonify(
-            {"message": "Print mark toggled", "marked_to_print": label.marked_to_print}
-        ), 200
-
+    except VersionConflict as e:
+        return _version_conflict(e)
     except SQLAlchemyError as e:
         logger.error(
             f"Error toggling print mark for label {label_id}: {e}", exc_info=True
         )
-        db.session.rollback()
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
@@ -321,13 +527,17 @@ def unmark_all_labels() -> ResponseReturnValue:
     """Unmark all labels from printing."""
     try:
         logger.debug("Unmarking all labels from printing")
-        marked_labels = Label.query.filter_by(marked_to_print=True).all()
-        count = len(marked_labels)
 
-        for label in marked_labels:
-            label.marked_to_print = False
+        def write() -> int:
+            result = db.session.execute(
+                update(Label)
+                .where(Label.marked_to_print.is_(True))
+                .values(marked_to_print=False, version=Label.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            return int(result.rowcount)  # type: ignore[attr-defined]
 
-        db.session.commit()
+        count = run_write(write)
         logger.debug(f"Successfully unmarked {count} labels from printing")
 
         return jsonify(
@@ -336,7 +546,31 @@ def unmark_all_labels() -> ResponseReturnValue:
 
     except SQLAlchemyError as e:
         logger.error(f"Error unmarking all labels: {e}", exc_info=True)
-        db.session.rollback()
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/mark-changed", methods=["POST"])
+def mark_changed_labels_api() -> ResponseReturnValue:
+    """Mark labels whose price, amount, form or unit changed since last print."""
+    try:
+        data = request.get_json(silent=True) or {}
+        replace = bool(data.get("replace", False))
+        include_unprinted = bool(data.get("include_unprinted", True))
+        logger.info(
+            f"Marking changed labels (replace={replace}, "
+            f"include_unprinted={include_unprinted})"
+        )
+
+        count = run_write(lambda: mark_changed_labels(replace, include_unprinted))
+        logger.info(f"Marked {count} changed labels for printing")
+
+        return jsonify(
+            {"message": f"{count} změněných cenovek označeno k tisku", "count": count}
+        ), 200
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error marking changed labels: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
@@ -346,21 +580,134 @@ def delete_label(label_id: int) -> ResponseReturnValue:
     """Delete a label."""
     try:
         logger.info(f"Deleting label ID: {label_id}")
-        label = db.session.get(Label, label_id)
-        if not label:
+
+        def write() -> str | None:
+            label = db.session.get(Label, label_id)
+            if not label:
+                return None
+            db.session.delete(label)
+            return str(label.product_name)
+
+        label_name = run_write(write)
+        if label_name is None:
             logger.warning(f"{LABEL_NOT_FOUND} for deletion: ID {label_id}")
             return jsonify({"error": LABEL_NOT_FOUND}), 404
-
-        label_name = label.product_name
-        db.session.delete(label)
-        db.session.commit()
         logger.info(f"Label deleted successfully: ID {label_id}, Name: {label_name}")
 
         return jsonify({"message": "Label deleted successfully"}), 200
 
     except SQLAlchemyError as e:
         logger.error(f"Error deleting label {label_id}: {e}", exc_info=True)
-        db.session.rollback()
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/delete", methods=["POST"])
+def delete_labels_bulk() -> ResponseReturnValue:
+    """Delete all labels matching ids and / or a filter (see parse_selection)."""
+    try:
+        data = request.get_json(silent=True) or {}
+        selection = parse_selection(data)
+        logger.info(f"Bulk deleting labels: {data}")
+
+        count = run_write(lambda: delete_labels(selection))
+        logger.info(f"Bulk deleted {count} labels")
+
+        return jsonify({"message": f"{count} cenovek smazáno", "count": count}), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Error bulk deleting labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/archive", methods=["POST"])
+def archive_labels_bulk() -> ResponseReturnValue:
+    """Move matching labels not marked for printing to the archive."""
+    try:
+        data = request.get_json(silent=True) or {}
+        selection = parse_selection(data)
+        logger.info(f"Archiving labels: {data}")
+
+        count = run_write(lambda: archive_labels(selection))
+        logger.info(f"Archived {count} labels")
+
+        return jsonify(
+            {"message": f"{count} cenovek přesunuto do archivu", "count": count}
+        ), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Error archiving labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/archive", methods=["GET"])
+def search_archive_api() -> ResponseReturnValue:
+    """Search archived labels by product name; newest archived first."""
+    query = request.args.get("q", "").strip()
+    limit = _clamp(
+        request.args.get("limit", ARCHIVE_SEARCH_LIMIT_DEFAULT, type=int),
+        1,
+        ARCHIVE_SEARCH_LIMIT_MAX,
+    )
+    try:
+        labels = search_archive(query, limit)
+        logger.debug(f"Archive search for '{query}' returned {len(labels)} labels")
+        return jsonify({"total": count_archived(), "labels": labels}), 200
+    except SQLAlchemyError as e:
+        logger.error(f"Error searching archive: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/archive/restore", methods=["POST"])
+def restore_archived_labels() -> ResponseReturnValue:
+    """Move archived labels back to the label list."""
+    try:
+        data = request.get_json(silent=True) or {}
+        archive_ids = parse_ids(data.get("ids"))
+        logger.info(f"Restoring archived labels {archive_ids}")
+
+        result = run_write(lambda: restore_labels(archive_ids))
+
+        return jsonify(
+            {
+                "message": f"{result['restored']} cenovek obnoveno z archivu",
+                **result,
+            }
+        ), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Error restoring archived labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/archive/delete", methods=["POST"])
+def purge_archived_labels() -> ResponseReturnValue:
+    """Delete archived labels for good."""
+    try:
+        data = request.get_json(silent=True) or {}
+        archive_ids = parse_ids(data.get("ids"))
+        logger.info(f"Purging archived labels {archive_ids}")
+
+        count = run_write(lambda: purge_archived(archive_ids))
+
+        return jsonify(
+            {"message": f"{count} archivovaných cenovek smazáno", "count": count}
+        ), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Error purging archived labels: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
 
@@ -375,7 +722,9 @@ def get_label(label_id: int) -> ResponseReturnValue:
             logger.warning(f"{LABEL_NOT_FOUND}: ID {label_id}")
             return jsonify({"error": LABEL_NOT_FOUND}), 404
         logger.debug(f"Found label: {label.product_name}")
-        return jsonify(label.to_dict()), 200
+        response = jsonify(label.to_dict())
+        response.set_etag(str(label.version))
+        return response, 200
     except SQLAlchemyError as e:
         logger.error(f"Error fetching label {label_id}: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
@@ -384,20 +733,97 @@ def get_label(label_id: int) -> ResponseReturnValue:
 
 @bp.route("/print", methods=["GET"])
 def print_labels_page() -> str:
-    """Show print labels page with preview."""
+    """Show print labels page; the preview pages are loaded while scrolling."""
     logger.info("Rendering print labels page")
-    # Get all labels marked for printing
-    marked_labels = Label.query.filter_by(marked_to_print=True).all()
-    logger.debug(f"Found {len(marked_labels)} labels marked for printing")
+    marked_count, page_count = count_preview_pages()
+    logger.debug(f"Found {marked_count} labels marked for printing")
     font_settings = load_font_settings()
     return render_template(
         "labels/print_labels.html",
-        labels=marked_labels,
+        marked_count=marked_count,
+        page_count=page_count,
+        page_size=PREVIEW_PAGE_SIZE,
+        preview_columns=PREVIEW_COLUMNS,
+        tile_width=thumbnail_cache.tile_width,
+        tile_height=thumbnail_cache.tile_height,
         active_page="print",
         **font_settings,
     )
 
 
+def _preview_font_sizes() -> tuple[int, int]:
+    """Font sizes for preview requests: query parameters or the saved settings."""
+    font_settings = load_font_settings()
+    price_font_size = request.args.get(
+        "price_font_size", font_settings["price_font_size"], type=int
+    )
+    text_font_size = request.args.get(
+        "text_font_size", font_settings["text_font_size"], type=int
+    )
+    return (
+        _clamp(price_font_size, PRICE_FONT_SIZE_MIN, PRICE_FONT_SIZE_MAX),
+        _clamp(text_font_size, TEXT_FONT_SIZE_MIN, TEXT_FONT_SIZE_MAX),
+    )
+
+
+@bp.route("/api/print-preview", methods=["GET"])
+def print_preview_page() -> ResponseReturnValue:
+    """Manifest of one print preview page: its labels and sprite sheet URL."""
+    page = max(0, request.args.get("page", 0, type=int))
+    price_font_size, text_font_size = _preview_font_sizes()
+    try:
+        marked_count, page_count = count_preview_pages()
+        preview = load_preview_page(page, price_font_size, text_font_size)
+    except SQLAlchemyError as e:
+        logger.error(f"Error loading print preview page {page}: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+    sprite_url = (
+        f"{request.script_root}/labels/api/print-preview/{page}.png"
+        f"?v={preview.sprite_key}"
+        f"&price_font_size={price_font_size}&text_font_size={text_font_size}"
+    )
+    return jsonify(
+        {
+            "page": page,
+            "pages": page_count,
+            "count": marked_count,
+            "columns": PREVIEW_COLUMNS,
+            "tile_width": thumbnail_cache.tile_width,
+            "tile_height": thumbnail_cache.tile_height,
+            "sprite": sprite_url if preview.rows else None,
+            "labels": preview_labels(preview),
+        }
+    ), 200
+
+
+@bp.route("/api/print-preview/<int:page>.png", methods=["GET"])
+def print_preview_sprite(page: int) -> ResponseReturnValue:
+    """Sprite sheet of one preview page (immutable when ``v`` is current)."""
+    price_font_size, text_font_size = _preview_font_sizes()
+    try:
+        preview = load_preview_page(page, price_font_size, text_font_size)
+    except SQLAlchemyError as e:
+        logger.error(f"Error loading print preview page {page}: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+    if not preview.rows:
+        return jsonify({"error": "Preview page not found"}), 404
+
+    body = thumbnail_cache.sprite(preview, price_font_size, text_font_size)
+    response = current_app.response_class(body, mimetype="image/png")
+    response.set_etag(preview.sprite_key)
+    if request.args.get("v") == preview.sprite_key:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # An outdated key still gets the current sheet, just not cached forever
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @bp.route("/api/pdf-font-settings", methods=["POST"])
 def update_pdf_font_settings() -> ResponseReturnValue:
     """Update and persist PDF font size settings."""
@@ -419,6 +845,7 @@ def update_pdf_font_settings() -> ResponseReturnValue:
                 }
             ), 400
 
+        # Stored layouts are refit lazily, when their labels are next printed
         save_font_settings(price_font_size, text_font_size)
         return jsonify({"message": "Font settings updated."}), 200
     except (ValueError, TypeError) as e:
@@ -427,13 +854,14 @@ def update_pdf_font_settings() -> ResponseReturnValue:
 
 
 @bp.route("/api/labels/pdf", methods=["GET"])
+@render_slot
 def generate_pdf_all_marked() -> ResponseReturnValue:
     """Generate PDF with all labels marked for printing."""
     try:
         logger.info("Generating PDF for all marked labels")
 
-        # Get all labels marked for printing
-        marked_labels = Label.query.filter_by(marked_to_print=True).all()
+        # Get all labels marked for printing (compact snapshots with form units)
+        marked_labels = load_label_rows(marked_only=True)
 
         if not marked_labels:
             logger.warning("No labels marked for printing")
@@ -455,24 +883,24 @@ def generate_pdf_all_marked() -> ResponseReturnValue:
             TEXT_FONT_SIZE_MAX,
         )
 
-        # Keep the latest validated values persistent so they are reloaded
-        # on the next print page visit.
-        save_font_settings(price_font_size, text_font_size)
-
-        label_data: list[PdfLabelData] = []
-        for label in marked_labels:
-            data = _enrich_label_with_unit(label.to_dict(), label.form)
-            data["price_font_size"] = price_font_size
-            data["text_font_size"] = text_font_size
-            label_data.append(data)
-
         # Generate PDF
-        pdf_buffer = generate_labels_pdf(label_data)
+        pdf_buffer = generate_labels_pdf(marked_labels, price_font_size, text_font_size)
 
         if not pdf_buffer:
             logger.error("PDF generation failed")
             return jsonify({"error": "Failed to generate PDF"}), 500
 
+        def write() -> None:
+            # Keep the latest validated values persistent so they are reloaded
+            # on the next print page visit.
+            save_font_settings(price_font_size, text_font_size)
+            # Store the fits for these settings in the printed labels only
+            refresh_printed_layouts(marked_labels)
+            # Remember what was printed for the "changed since last print" selector
+            record_printed(marked_labels)
+
+        run_write(write)
+
         logger.info("PDF generated successfully, sending file")
 
         # Send PDF file
@@ -495,24 +923,27 @@ def generate_pdf_single(label_id: int) -> ResponseReturnValue:
     try:
         logger.info(f"Generating PDF for single label ID: {label_id}")
 
-        label = db.session.get(Label, label_id)
+        # Snapshot already carries the form unit
+        label = load_label_row(label_id)
         if not label:
             logger.warning(f"{LABEL_NOT_FOUND}: ID {label_id}")
             return jsonify({"error": LABEL_NOT_FOUND}), 404
 
-        # Enrich label with form unit information
-        data = _enrich_label_with_unit(label.to_dict(), label.form)
         font_settings = load_font_settings()
-        data["price_font_size"] = font_settings["price_font_size"]
-        data["text_font_size"] = font_settings["text_font_size"]
 
         # Generate PDF
-        pdf_buffer = generate_labels_pdf([data])
+        pdf_buffer = generate_labels_pdf(
+            [label],
+            font_settings["price_font_size"],
+            font_settings["text_font_size"],
+        )
 
         if not pdf_buffer:
             logger.error(f"PDF generation failed for label {label_id}")
             return jsonify({"error": "Failed to generate PDF"}), 500
 
+        run_write(lambda: record_printed([label]))
+
         logger.info(f"PDF generated successfully for label {label_id}")
 
         # Send PDF file
@@ -527,3 +958,82 @@ def generate_pdf_single(label_id: int) -> ResponseReturnValue:
         logger.error(f"Error generating PDF for label {label_id}: {e}", exc_info=True)
         message, status_code = translate_db_error(e)
         return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/output/<fmt>", methods=["GET"])
+@render_slot
+def download_marked_output(fmt: str) -> ResponseReturnValue:
+    """Download all marked labels as a print job (pdf, zpl or raster)."""
+    if fmt not in BACKENDS:
+        return jsonify({"error": f"Unknown output format: {fmt}"}), 400
+    try:
+        font_settings = load_font_settings()
+        backend = get_backend(
+            fmt,
+            font_settings["price_font_size"],
+            font_settings["text_font_size"],
+            request.args.get("dpi", DEFAULT_DPI, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        marked_labels = load_label_rows(marked_only=True)
+        if not marked_labels:
+            return jsonify({"error": "No labels marked for printing"}), 400
+
+        job = backend.render(marked_labels)
+        run_write(lambda: record_printed(marked_labels))
+        logger.info(f"Rendered {len(marked_labels)} labels as {fmt}")
+
+        return send_file(
+            BytesIO(job),
+            mimetype=backend.mimetype,
+            as_attachment=True,
+            download_name=f"price_labels.{backend.extension}",
+        )
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error rendering {fmt} labels: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/api/labels/print-job", methods=["POST"])
+@render_slot
+def send_print_job() -> ResponseReturnValue:
+    """Stream all marked labels straight to the configured thermal printer."""
+    target = current_app.config.get("LABEL_PRINTER_URL")
+    if not target:
+        return jsonify({"error": "No label printer configured"}), 400
+    try:
+        font_settings = load_font_settings()
+        backend = get_backend(
+            current_app.config.get("LABEL_PRINTER_FORMAT", "zpl"),
+            font_settings["price_font_size"],
+            font_settings["text_font_size"],
+            int(current_app.config.get("LABEL_PRINTER_DPI", DEFAULT_DPI)),
+        )
+    except ValueError as e:
+        logger.error(f"Invalid label printer configuration: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    try:
+        marked_labels = load_label_rows(marked_only=True)
+        if not marked_labels:
+            return jsonify({"error": "No labels marked for printing"}), 400
+
+        with open_sink(target) as sink:
+            count = backend.write(marked_labels, sink)
+        run_write(lambda: record_printed(marked_labels))
+
+        logger.info(f"Sent {count} labels to {target} as {backend.name}")
+        return jsonify({"printed": count, "format": backend.name}), 200
+
+    except OSError as e:
+        logger.error(f"Label printer {target} unreachable: {e}")
+        return jsonify({"error": "Label printer is not reachable"}), 502
+    except SQLAlchemyError as e:
+        logger.error(f"Error sending print job: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
@@ -4,6 +4,8 @@ from typing import Callable, cast
 from flask import Blueprint, current_app, jsonify, render_template, request
 from flask.typing import ResponseReturnValue
 
+from app.admission import RenderGate
+
 logger = logging.getLogger(__name__)
 
 # Create Blueprint
@@ -15,7 +17,10 @@ bp = Blueprint("main", __name__)
 def health() -> ResponseReturnValue:
     """Health check endpoint."""
     logger.debug("Health check endpoint accessed")
-    return jsonify({"status": "healthy", "service": "labelmaker"}), 200
+    gate: RenderGate = current_app.extensions["render_gate"]
+    return jsonify(
+        {"status": "healthy", "service": "labelmaker", "renders": gate.stats()}
+    ), 200
 
 
 @bp.route("/", methods=["GET"])
@@ -0,0 +1,85 @@
+import hmac
+import logging
+
+from flask import Blueprint, current_app, jsonify, request
+from flask.typing import ResponseReturnValue
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.sync import (
+    SYNC_BATCH_MAX,
+    SYNC_BATCH_SIZE,
+    SYNC_TOKEN_HEADER,
+    apply_changes,
+    decode_body,
+    export_changes,
+    parse_batch,
+    sync_info,
+)
+from app.utils import translate_db_error
+from app.write_queue import run_write
+
+logger = logging.getLogger(__name__)
+bp = Blueprint("sync", __name__, url_prefix="/api/sync")
+
+
+@bp.before_request
+def check_token() -> ResponseReturnValue | None:
+    """Only peers that know SYNC_TOKEN may read or write changes."""
+    expected = current_app.config.get("SYNC_TOKEN", "")
+    if not expected:
+        return jsonify({"error": "Sync is not enabled (SYNC_TOKEN)"}), 403
+    provided = request.headers.get(SYNC_TOKEN_HEADER, "")
+    if not hmac.compare_digest(provided.encode(), expected.encode()):
+        logger.warning(f"Sync request with a wrong token from {request.remote_addr}")
+        return jsonify({"error": "forbidden"}), 403
+    return None
+
+
+@bp.route("", methods=["GET"])
+def get_sync_info() -> ResponseReturnValue:
+    """Instance id, change-log position and what we received from ?peer=."""
+    try:
+        return jsonify(sync_info(request.args.get("peer", "")))
+    except SQLAlchemyError as e:
+        logger.error(f"Database error reading sync info: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+
+
+@bp.route("/changes", methods=["GET"])
+def get_changes() -> ResponseReturnValue:
+    """Changes after ?since=, without those of ?peer= (compressed by the app)."""
+    since = request.args.get("since", 0, type=int)
+    limit = request.args.get("limit", SYNC_BATCH_SIZE, type=int)
+    if since < 0 or not 1 <= limit <= SYNC_BATCH_MAX:
+        return jsonify(
+            {"error": f"since must be >= 0 and limit 1 to {SYNC_BATCH_MAX}"}
+        ), 400
+    try:
+        batch = export_changes(since, request.args.get("peer", ""), limit)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error exporting changes: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+    logger.info(
+        f"Sending {len(batch['forms'])} form and {len(batch['labels'])} label "
+        f"changes after {since}"
+    )
+    return jsonify(batch)
+
+
+@bp.route("/changes", methods=["POST"])
+def post_changes() -> ResponseReturnValue:
+    """Apply a peer's batch (JSON, optionally gzip-compressed)."""
+    try:
+        batch = parse_batch(
+            decode_body(request.get_data(), request.headers.get("Content-Encoding"))
+        )
+        report = run_write(lambda: apply_changes(batch))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SQLAlchemyError as e:
+        logger.error(f"Database error applying changes: {e}", exc_info=True)
+        message, status_code = translate_db_error(e)
+        return jsonify({"error": message}), status_code
+    return jsonify(report)
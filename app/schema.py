@@ -0,0 +1,56 @@
+"""In-place schema upgrades for existing SQLite databases.
+
+``db.create_all()`` only creates missing tables; it never touches tables that
+already exist. Installations keep their ``instance/labelmaker.db`` across
+versions, so columns added to a model later are added here with
+``ALTER TABLE ... ADD COLUMN`` and missing indexes are created.
+
+New columns must be nullable or carry a ``server_default`` (an SQLite limit on
+``ADD COLUMN``).
+"""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(connection: Connection, metadata: MetaData) -> list[str]:
+    """Add columns and indexes that the models define but the database lacks.
+
+    Args:
+        connection: Connection to the application database.
+        metadata: Model metadata (``db.metadata``).
+
+    Returns:
+        Names of the added columns as 'table.column'.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    preparer = connection.dialect.identifier_preparer
+    added: list[str] = []
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(
+                text(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"
+                )
+            )
+            added.append(f"{table.name}.{column.name}")
+            logger.info(f"Schema upgrade: added column {table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+    return added
@@ -0,0 +1,212 @@
+"""Full-text product search backed by an SQLite FTS5 index.
+
+``label_fts`` is an external-content FTS5 table over ``label.product_name``: it
+stores only the token index, the text itself stays in ``label``. Triggers on
+``label`` keep it in sync for every write path (ORM, Core bulk inserts, raw SQL).
+The ``unicode61 remove_diacritics 2`` tokenizer folds case and Czech diacritics,
+so "kapky" finds "Kápky" and vice versa. Every query term is matched as a
+prefix and results are ranked with bm25.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import TYPE_CHECKING
+
+import click
+from flask import current_app
+from sqlalchemy import Float, Integer, and_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db import db
+from app.label_snapshot import LabelRow, select_label_rows
+from app.models import Label
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+SEARCH_LIMIT_DEFAULT = 50
+SEARCH_LIMIT_MAX = 500
+# Longer queries add nothing for product names and only slow MATCH down
+MAX_QUERY_TERMS = 8
+
+_EXTENSION_KEY = "label_search"
+
+_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS label_fts USING fts5(
+        product_name,
+        content='label',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS label_fts_ai AFTER INSERT ON label BEGIN
+        INSERT INTO label_fts(rowid, product_name) VALUES (new.id, new.product_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS label_fts_ad AFTER DELETE ON label BEGIN
+        INSERT INTO label_fts(label_fts, rowid, product_name)
+        VALUES ('delete', old.id, old.product_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS label_fts_au AFTER UPDATE OF product_name ON label
+    BEGIN
+        INSERT INTO label_fts(label_fts, rowid, product_name)
+        VALUES ('delete', old.id, old.product_name);
+        INSERT INTO label_fts(rowid, product_name) VALUES (new.id, new.product_name);
+    END
+    """,
+)
+
+# label_fts_docsize holds one row per indexed document
+_OUT_OF_SYNC_SQL = text(
+    "SELECT (SELECT count(*) FROM label) != (SELECT count(*) FROM label_fts_docsize)"
+)
+
+_MATCH_SQL = text(
+    "SELECT rowid AS label_id, bm25(label_fts) AS rank FROM label_fts "
+    "WHERE label_fts MATCH :query ORDER BY rank LIMIT :limit"
+).columns(label_id=Integer, rank=Float)
+
+_MATCH_IDS_SQL = text("SELECT rowid FROM label_fts WHERE label_fts MATCH :query")
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def query_terms(query: str) -> list[str]:
+    """Words of a search query, at most MAX_QUERY_TERMS of them."""
+    return _TERM_RE.findall(query)[:MAX_QUERY_TERMS]
+
+
+def build_match_query(query: str) -> str | None:
+    """Turn free user input into an FTS5 MATCH expression.
+
+    Each word becomes a quoted prefix term ("para"*), and all terms must match.
+    Quoting keeps FTS5 operators (AND, NEAR, "-", ":") in user input literal.
+
+    Args:
+        query: Raw search text as typed by the user.
+
+    Returns:
+        MATCH expression, or None if the query has no searchable words.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def rebuild_index(connection: Connection) -> int:
+    """Re-index every label from scratch and return the number of labels."""
+    connection.execute(text("INSERT INTO label_fts(label_fts) VALUES ('rebuild')"))
+    connection.execute(text("INSERT INTO label_fts(label_fts) VALUES ('optimize')"))
+    count = connection.execute(text("SELECT count(*) FROM label")).scalar_one()
+    return int(count)
+
+
+def ensure_search_index(connection: Connection) -> bool:
+    """Create the FTS table and triggers if missing; rebuild if out of sync.
+
+    Args:
+        connection: Connection to the application database.
+
+    Returns:
+        True if full-text search is available, False if SQLite lacks FTS5.
+    """
+    try:
+        for statement in _DDL:
+            connection.execute(text(statement))
+    except OperationalError as e:
+        logger.warning(f"FTS5 not available, falling back to LIKE search: {e}")
+        return False
+
+    # Covers databases created before the index existed, and restored copies
+    if connection.execute(_OUT_OF_SYNC_SQL).scalar_one():
+        count = rebuild_index(connection)
+        logger.info(f"Search index rebuilt for {count} labels")
+    return True
+
+
+def search_labels(query: str, limit: int = SEARCH_LIMIT_DEFAULT) -> list[LabelRow]:
+    """Return labels whose product name matches query, best matches first.
+
+    Args:
+        query: Raw search text; every word is matched as a word prefix.
+        limit: Maximum number of results.
+
+    Returns:
+        List of LabelRow records ordered by relevance.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    if not current_app.extensions.get(_EXTENSION_KEY, False):
+        return _like_search(query, limit)
+
+    matches = _MATCH_SQL.bindparams(query=match, limit=limit).subquery("matches")
+    stmt = select_label_rows().join(matches, matches.c.label_id == Label.id)
+    stmt = stmt.order_by(matches.c.rank, Label.product_name)
+    return [LabelRow(*row) for row in db.session.execute(stmt)]
+
+
+def search_condition(query: str) -> ColumnElement[bool] | None:
+    """WHERE clause matching every label search_labels() can find, unranked.
+
+    Used where all matches are needed in another order (exports). Returns None
+    if the query has no searchable words.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return None
+    if not current_app.extensions.get(_EXTENSION_KEY, False):
+        return and_(
+            *(
+                Label.product_name.icontains(term, autoescape=True)
+                for term in query_terms(query)
+            )
+        )
+    ids = _MATCH_IDS_SQL.bindparams(query=match).columns(rowid=Integer)
+    condition: ColumnElement[bool] = Label.id.in_(ids)
+    return condition
+
+
+def _like_search(query: str, limit: int) -> list[LabelRow]:
+    """Substring fallback without ranking or diacritic folding."""
+    stmt = select_label_rows()
+    for term in query_terms(query):
+        stmt = stmt.where(Label.product_name.icontains(term, autoescape=True))
+    stmt = stmt.order_by(Label.product_name).limit(limit)
+    return [LabelRow(*row) for row in db.session.execute(stmt)]
+
+
+def init_search(app: Flask) -> None:
+    """Set up the search index and register the ``rebuild-search`` CLI command.
+
+    Must be called inside an application context after ``db.create_all()``.
+    """
+    available = False
+    if db.engine.dialect.name == "sqlite":
+        with db.engine.begin() as connection:
+            available = ensure_search_index(connection)
+    app.extensions[_EXTENSION_KEY] = available
+
+    @click.command("rebuild-search")
+    def rebuild_search_command() -> None:
+        """Rebuild the full-text product search index."""
+        if not app.extensions.get(_EXTENSION_KEY, False):
+            raise click.ClickException("Full-text search (FTS5) is not available.")
+        with app.app_context(), db.engine.begin() as connection:
+            count = rebuild_index(connection)
+        click.echo(f"Search index rebuilt for {count} labels.")
+
+    app.cli.add_command(rebuild_search_command)
@@ -0,0 +1,191 @@
+"""Content-hash fingerprinting and precompressed serving of static assets.
+
+``url_for('static', filename='js/shared.js')`` (as used by ``templates/base.html``)
+is rewritten through a ``url_defaults`` hook to ``js/shared.<hash>.js``. Such
+fingerprinted URLs change whenever the file content changes, so they are served
+with a one-year ``immutable`` cache lifetime and never re-validated. Text assets
+are gzip/brotli-compressed once at startup and served from memory; a file that
+is edited while the app runs is hashed and compressed again on its next use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from stat import S_ISREG
+from typing import TYPE_CHECKING, Any
+
+from flask import Response, current_app, request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from app.compression import (
+    COMPRESSIBLE_MIMETYPES,
+    ENCODINGS,
+    compress,
+    negotiate_encoding,
+)
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 10
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_FINGERPRINT_RE = re.compile(
+    rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^./]+)$"
+)
+
+
+@dataclass
+class StaticAsset:
+    """A static file with its content hash and precompressed variants."""
+
+    filename: str
+    digest: str
+    mimetype: str
+    # (st_size, st_mtime_ns) of the file the entry was built from
+    signature: tuple[int, int] = (0, 0)
+    body: bytes | None = None
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def fingerprinted(self) -> str:
+        stem, dot, ext = self.filename.rpartition(".")
+        if not dot:
+            return f"{self.filename}.{self.digest}"
+        return f"{stem}.{self.digest}.{ext}"
+
+
+class StaticAssets:
+    """Manifest of fingerprinted static files for one static folder."""
+
+    def __init__(self, static_folder: str | Path) -> None:
+        self.static_folder = Path(static_folder)
+        self._assets: dict[str, StaticAsset] = {}
+        self._lock = threading.Lock()
+
+    def _load(
+        self, filename: str, path: Path, signature: tuple[int, int]
+    ) -> StaticAsset:
+        content = path.read_bytes()
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        asset = StaticAsset(
+            filename=filename,
+            digest=hashlib.sha256(content).hexdigest()[:HASH_LENGTH],
+            mimetype=mimetype,
+            signature=signature,
+        )
+        if mimetype in COMPRESSIBLE_MIMETYPES:
+            asset.body = content
+            for encoding in ENCODINGS:
+                asset.encoded[encoding] = compress(content, encoding, level=9)
+        return asset
+
+    def get(self, filename: str) -> StaticAsset | None:
+        """Return the manifest entry for filename, hashing it on first use.
+
+        The file is checked on every call (one stat), so an edited file gets a
+        new fingerprint and freshly compressed bodies without a restart.
+        """
+        path_str = safe_join(str(self.static_folder), filename)
+        if path_str is None:
+            return None
+        try:
+            stat = Path(path_str).stat()
+        except OSError:
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        asset = self._assets.get(filename)
+        if asset is None or asset.signature != signature:
+            asset = self._load(filename, Path(path_str), signature)
+            with self._lock:
+                self._assets[filename] = asset
+        return asset
+
+    def precompute(self) -> int:
+        """Fingerprint and precompress all text assets; returns how many."""
+        count = 0
+        for path in sorted(self.static_folder.rglob("*")):
+            mimetype = mimetypes.guess_type(path.name)[0]
+            if path.is_file() and mimetype in COMPRESSIBLE_MIMETYPES:
+                self.get(path.relative_to(self.static_folder).as_posix())
+                count += 1
+        return count
+
+    # ── Flask hooks ──────────────────────────────────────────────────────────
+
+    def url_defaults(self, endpoint: str, values: dict[str, Any]) -> None:
+        """Rewrite url_for('static', filename=...) to the fingerprinted name."""
+        if endpoint != "static" or "filename" not in values:
+            return
+        asset = self.get(values["filename"])
+        if asset is not None:
+            values["filename"] = asset.fingerprinted
+
+    def serve(self, filename: str) -> Response:
+        """Static view: fingerprinted names are immutable, others revalidate."""
+        match = _FINGERPRINT_RE.match(filename)
+        immutable = False
+        if match:
+            original = match["stem"] + match["ext"]
+            asset = self.get(original)
+            if asset is not None:
+                filename = original
+                # An old hash still gets the current file, just not cached forever
+                immutable = asset.digest == match["hash"]
+
+        asset = self.get(filename)
+        if asset is None:
+            raise NotFound()
+
+        if asset.body is not None:
+            response = self._in_memory_response(asset, immutable)
+        else:
+            response = send_from_directory(
+                str(self.static_folder),
+                filename,
+                max_age=current_app.get_send_file_max_age(filename),
+            )
+
+        if immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    def _in_memory_response(self, asset: StaticAsset, immutable: bool) -> Response:
+        encoding = negotiate_encoding(request)
+        body = asset.body if encoding is None else asset.encoded.get(encoding)
+        if body is None:
+            encoding, body = None, asset.body
+        response = current_app.response_class(body, mimetype=asset.mimetype)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(asset.digest + (f"-{encoding}" if encoding else ""))
+        if not immutable:
+            response.cache_control.no_cache = True
+        response.make_conditional(request)
+        return response
+
+
+def init_static_assets(app: Flask) -> StaticAssets:
+    """Install fingerprinted URLs and the precompressed static view on app."""
+    assert app.static_folder is not None
+    assets = StaticAssets(app.static_folder)
+    count = assets.precompute()
+    app.url_defaults(assets.url_defaults)
+    app.view_functions["static"] = assets.serve
+    app.extensions["static_assets"] = assets
+    logger.info("Fingerprinted and precompressed %d static assets", count)
+    return assets
@@ -0,0 +1,478 @@
+"""Multi-store routing: one SQLite database per store behind one server.
+
+Each store keeps its catalogue in ``<STORES_DIR>/<name>.db``. A request selects
+its store with a URL prefix (``/s/<name>/labels``, for browsers) or the
+``X-LabelMaker-Store`` header (for API clients); requests without either use
+the app's default database as before.
+
+For the duration of the request ``db.session`` runs on the store's engine (see
+``app.db.StoreSession``), writes go through the store's own write queue and
+list payloads are cached per store, so nothing crosses stores. The PDF
+pipeline reads through the same session. Thumbnails are cached by label
+content, which is safe to share.
+
+Stores are opened on first use: engine with a small connection pool, writer
+thread, payload cache (kept coherent with other processes by
+``app.coherence``), and on the first open in this process the schema, search
+and trigram indexes. At most ``STORES_MAX_OPEN`` stores stay open; the least
+recently used idle store is closed to make room, and stores idle for
+``STORES_IDLE_MINUTES`` are closed on the next request.
+
+With ``STORES_SHARE_FORMS`` the form catalogue of the default database is
+copied into each store when it is opened (missing forms are added, changed
+units updated); ``flask stores sync-forms`` pushes it to all stores at once.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+import click
+from flask import Flask, jsonify, request
+from flask.typing import ResponseReturnValue
+from sqlalchemy import bindparam, create_engine, insert, select, update
+from sqlalchemy.engine import Engine
+
+from app.coherence import CoherenceMonitor, ensure_cache_epochs
+from app.db import current_store, db, use_store
+from app.duplicates import index_missing_labels
+from app.label_layout import refresh_layouts
+from app.models import Form, FormDict, Label
+from app.payload_cache import PayloadCache
+from app.schema import upgrade_schema
+from app.search import ensure_search_index
+from app.sync import ensure_change_log
+from app.write_queue import WRITE_QUEUE_MAX_BATCH, WRITE_QUEUE_TIMEOUT, WriteQueue
+
+logger = logging.getLogger(__name__)
+
+STORE_HEADER = "X-LabelMaker-Store"
+STORE_PREFIX = "/s/"
+STORE_NAME_RE = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+STORES_MAX_OPEN = 16
+STORES_IDLE_MINUTES = 10.0
+# Connections kept per store; a few writers and readers per store at a time
+STORE_POOL_SIZE = 2
+STORE_MAX_OVERFLOW = 8
+STORE_PAYLOAD_CACHE_ENTRIES = 16
+
+# WSGI environ key set by StorePrefixMiddleware
+_ENVIRON_KEY = "labelmaker.store"
+
+_form_table = Form.__table__
+
+_UPDATE_UNIT = (
+    update(_form_table)
+    .where(_form_table.c.short_name == bindparam("b_short_name"))
+    .values(unit=bindparam("b_unit"))
+)
+
+
+class UnknownStore(LookupError):
+    """No store database with that name exists."""
+
+
+def valid_store_name(name: str) -> bool:
+    """Lowercase letters, digits, "-" and "_"; safe as a file name."""
+    return STORE_NAME_RE.fullmatch(name) is not None
+
+
+class Store:
+    """An open store database with its engine, writer and payload cache."""
+
+    def __init__(self, app: Flask, name: str, path: Path) -> None:
+        self.name = name
+        self.path = path
+        self.engine: Engine = create_engine(
+            f"sqlite:///{path}",
+            pool_size=STORE_POOL_SIZE,
+            max_overflow=STORE_MAX_OVERFLOW,
+            echo=bool(app.config.get("SQLALCHEMY_ECHO", False)),
+        )
+        self.write_queue = WriteQueue(
+            app,
+            max_batch=int(
+                app.config.get("WRITE_QUEUE_MAX_BATCH", WRITE_QUEUE_MAX_BATCH)
+            ),
+            timeout=float(app.config.get("WRITE_QUEUE_TIMEOUT", WRITE_QUEUE_TIMEOUT)),
+            store=self,
+        )
+        self.payload_cache = PayloadCache(max_entries=STORE_PAYLOAD_CACHE_ENTRIES)
+        self.coherence = CoherenceMonitor(self.engine)
+        # Requests currently using the store; only idle stores are closed
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    def __repr__(self) -> str:
+        return f"<Store(name='{self.name}', active={self.active})>"
+
+    def close(self) -> None:
+        """Finish queued writes and close the pooled connections."""
+        self.write_queue.close()
+        self.coherence.close()
+        self.engine.dispose()
+
+
+class StoreRegistry:
+    """Opens store databases on demand and closes idle ones (LRU)."""
+
+    def __init__(
+        self,
+        app: Flask,
+        directory: Path,
+        max_open: int = STORES_MAX_OPEN,
+        idle_minutes: float = STORES_IDLE_MINUTES,
+        share_forms: bool = False,
+    ) -> None:
+        self.app = app
+        self.directory = directory
+        self.max_open = max_open
+        self.idle_seconds = idle_minutes * 60
+        self.share_forms = share_forms
+        self._open: OrderedDict[str, Store] = OrderedDict()
+        # Stores being opened, set once the opening request is done
+        self._opening: dict[str, threading.Event] = {}
+        # Stores whose schema and indexes were checked by this process
+        self._prepared: set[str] = set()
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> Path:
+        if not valid_store_name(name):
+            raise UnknownStore(name)
+        return self.directory / f"{name}.db"
+
+    def names(self) -> list[str]:
+        """Names of all store databases in the directory."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path.stem
+            for path in self.directory.glob("*.db")
+            if valid_store_name(path.stem)
+        )
+
+    def open_names(self) -> list[str]:
+        """Names of the stores that are open, least recently used first."""
+        with self._lock:
+            return list(self._open)
+
+    def acquire(self, name: str) -> Store:
+        """Open store name (if needed) for a request; pair with release().
+
+        A store is opened and prepared outside the registry lock, so a slow
+        first open does not hold up requests for other stores. Concurrent
+        requests for the same store wait for the one that is opening it.
+
+        Raises:
+            UnknownStore: No database file for that store.
+        """
+        while True:
+            with self._lock:
+                store = self._open.get(name)
+                if store is not None:
+                    closing = self._use(store)
+                    break
+                opening = self._opening.get(name)
+                if opening is None:
+                    path = self.path_for(name)
+                    if not path.is_file():
+                        raise UnknownStore(name)
+                    opening = self._opening[name] = threading.Event()
+                    opener = True
+                else:
+                    opener = False
+            if not opener:
+                # Look again once it is open; if opening failed, try ourselves
+                opening.wait()
+                continue
+            try:
+                store = self._open_store(name, path)
+            except BaseException:
+                with self._lock:
+                    del self._opening[name]
+                opening.set()
+                raise
+            with self._lock:
+                del self._opening[name]
+                self._open[name] = store
+                closing = self._use(store)
+            opening.set()
+            break
+        for idle in closing:
+            self._close(idle)
+        return store
+
+    def release(self, store: Store) -> None:
+        with self._lock:
+            store.active -= 1
+            store.last_used = time.monotonic()
+
+    def create(self, name: str) -> Path:
+        """Create an empty store database; returns its path.
+
+        Raises:
+            ValueError: Invalid name or the store exists.
+        """
+        if not valid_store_name(name):
+            raise ValueError(
+                f"Invalid store name {name!r}: use lowercase letters, digits, - and _"
+            )
+        path = self.path_for(name)
+        if path.exists():
+            raise ValueError(f"Store {name!r} already exists")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        # Opening creates the schema
+        self.release(self.acquire(name))
+        return path
+
+    def close_all(self) -> None:
+        with self._lock:
+            stores = list(self._open.values())
+            self._open.clear()
+        for store in stores:
+            self._close(store)
+
+    def _use(self, store: Store) -> list[Store]:
+        """Count a request on an open store; returns the stores to close.
+
+        The caller holds the lock.
+        """
+        self._open.move_to_end(store.name)
+        store.active += 1
+        store.last_used = time.monotonic()
+        return self._evict()
+
+    def _evict(self) -> list[Store]:
+        """Remove stores over the limit or idle too long (caller holds the lock)."""
+        now = time.monotonic()
+        evicted: list[Store] = []
+        for name, store in list(self._open.items()):
+            over_limit = len(self._open) > self.max_open
+            if store.active == 0 and (
+                over_limit or now - store.last_used > self.idle_seconds
+            ):
+                del self._open[name]
+                evicted.append(store)
+        return evicted
+
+    def _close(self, store: Store) -> None:
+        store.close()
+        logger.info(f"Closed store {store.name}")
+
+    def _open_store(self, name: str, path: Path) -> Store:
+        store = Store(self.app, name, path)
+        if name not in self._prepared:
+            try:
+                self._prepare(store)
+            except Exception:
+                store.close()
+                raise
+            self._prepared.add(name)
+        logger.info(f"Opened store {name} ({path})")
+        return store
+
+    def _prepare(self, store: Store) -> None:
+        """Create or upgrade the schema and indexes of a store database."""
+        db.metadata.create_all(store.engine)
+        with store.engine.begin() as connection:
+            upgrade_schema(connection, db.metadata)
+            ensure_search_index(connection)
+            ensure_change_log(connection)
+            ensure_cache_epochs(connection)
+        with self.app.app_context():
+            base_forms = self._base_forms() if self.share_forms else []
+            use_store(store)
+            index_missing_labels()
+            if base_forms:
+                store.write_queue.submit(lambda: sync_forms(base_forms))
+
+    def _base_forms(self) -> list[FormDict]:
+        with db.engine.connect() as connection:
+            return [
+                FormDict(name=name, short_name=short_name, unit=unit)
+                for name, short_name, unit in connection.execute(
+                    select(Form.name, Form.short_name, Form.unit)
+                )
+            ]
+
+    def sync_forms_to_all(self) -> dict[str, int]:
+        """Copy the default database's forms into every store."""
+        with self.app.app_context():
+            base_forms = self._base_forms()
+        synced: dict[str, int] = {}
+        for name in self.names():
+            store = self.acquire(name)
+            try:
+                synced[name] = store.write_queue.submit(lambda: sync_forms(base_forms))
+            finally:
+                self.release(store)
+        return synced
+
+
+def sync_forms(forms: Iterable[FormDict]) -> int:
+    """Add missing forms and update changed units in the current database.
+
+    Forms are matched by short name (what labels refer to). Forms only the
+    store has are kept; a form whose name is taken by another short name in
+    the store is skipped. Runs inside a write transaction.
+
+    Returns:
+        Number of added or updated forms.
+    """
+    existing = {
+        short_name: (name, unit)
+        for name, short_name, unit in db.session.execute(
+            select(Form.name, Form.short_name, Form.unit)
+        )
+    }
+    names = {name for name, _unit in existing.values()}
+    added: list[dict[str, str]] = []
+    changed: list[dict[str, str]] = []
+    for form in forms:
+        current = existing.get(form["short_name"])
+        if current is None:
+            if form["name"] not in names:
+                names.add(form["name"])
+                added.append(
+                    {
+                        "name": form["name"],
+                        "short_name": form["short_name"],
+                        "unit": form["unit"],
+                    }
+                )
+        elif current[1] != form["unit"]:
+            changed.append({"b_short_name": form["short_name"], "b_unit": form["unit"]})
+    if added:
+        db.session.execute(insert(Form), added)
+    if changed:
+        db.session.execute(_UPDATE_UNIT, changed)
+        refresh_layouts(Label.form.in_([form["b_short_name"] for form in changed]))
+    if added or changed:
+        logger.info(f"Synced forms: {len(added)} added, {len(changed)} units changed")
+    return len(added) + len(changed)
+
+
+class StorePrefixMiddleware:
+    """Moves ``/s/<name>`` from the path into SCRIPT_NAME and remembers the store.
+
+    url_for() then builds links inside the same store, and templates prefix
+    hard-coded paths with ``request.script_root``.
+    """
+
+    def __init__(self, wsgi_app: Callable[..., Any]) -> None:
+        self.wsgi_app = wsgi_app
+
+    def __call__(
+        self, environ: dict[str, Any], start_response: Callable[..., Any]
+    ) -> Any:
+        path: str = environ.get("PATH_INFO", "")
+        if path.startswith(STORE_PREFIX):
+            name, _, rest = path[len(STORE_PREFIX) :].partition("/")
+            if name:
+                environ[_ENVIRON_KEY] = name
+                environ["SCRIPT_NAME"] = (
+                    f"{environ.get('SCRIPT_NAME', '')}{STORE_PREFIX}{name}"
+                )
+                environ["PATH_INFO"] = f"/{rest}"
+        return self.wsgi_app(environ, start_response)
+
+
+def requested_store() -> str | None:
+    """Store named by the request's URL prefix or header, if any."""
+    name = request.environ.get(_ENVIRON_KEY) or request.headers.get(STORE_HEADER)
+    return name.strip().lower() if name else None
+
+
+def create_registry(app: Flask) -> StoreRegistry | None:
+    """Store registry configured for app, or None when STORES_DIR is not set."""
+    configured = app.config.get("STORES_DIR") or ""
+    if not configured:
+        return None
+    return StoreRegistry(
+        app,
+        Path(configured),
+        max_open=int(app.config.get("STORES_MAX_OPEN", STORES_MAX_OPEN)),
+        idle_minutes=float(app.config.get("STORES_IDLE_MINUTES", STORES_IDLE_MINUTES)),
+        share_forms=bool(app.config.get("STORES_SHARE_FORMS", False)),
+    )
+
+
+def init_stores(app: Flask) -> None:
+    """Select the store of each request and register ``flask stores``."""
+    app.extensions["stores"] = create_registry(app)
+    app.wsgi_app = StorePrefixMiddleware(app.wsgi_app)  # type: ignore[method-assign]
+
+    def registry() -> StoreRegistry | None:
+        found: StoreRegistry | None = app.extensions.get("stores")
+        return found
+
+    @app.before_request
+    def select_store() -> ResponseReturnValue | None:
+        name = requested_store()
+        if name is None:
+            return None
+        stores = registry()
+        if stores is None:
+            return jsonify({"error": "Stores are not configured (STORES_DIR)"}), 404
+        try:
+            store = stores.acquire(name)
+        except UnknownStore:
+            return jsonify({"error": f"Unknown store: {name}"}), 404
+        use_store(store)
+        return None
+
+    @app.teardown_request
+    def release_store(exc: BaseException | None) -> None:
+        store = current_store()
+        if store is None:
+            return
+        # The session is bound to the store's connections
+        db.session.remove()
+        use_store(None)
+        stores = registry()
+        if stores is not None:
+            stores.release(store)
+
+    def configured() -> StoreRegistry:
+        stores = registry()
+        if stores is None:
+            raise click.ClickException("Set STORES_DIR to use stores.")
+        return stores
+
+    @click.group("stores")
+    def stores_group() -> None:
+        """Create and list store databases."""
+
+    @stores_group.command("list")
+    def list_command() -> None:
+        """List store databases."""
+        stores = configured()
+        for name in stores.names():
+            size = stores.path_for(name).stat().st_size / 1024
+            click.echo(f"{name}  {size:.0f} KiB")
+
+    @stores_group.command("create")
+    @click.argument("name")
+    def create_command(name: str) -> None:
+        """Create an empty store database."""
+        try:
+            path = configured().create(name)
+        except ValueError as e:
+            raise click.ClickException(str(e)) from e
+        click.echo(f"Created store {name} at {path}.")
+
+    @stores_group.command("sync-forms")
+    def sync_forms_command() -> None:
+        """Copy the default database's forms into every store."""
+        for name, count in configured().sync_forms_to_all().items():
+            click.echo(f"{name}: {count} forms added or updated")
+
+    app.cli.add_command(stores_group)
@@ -0,0 +1,1096 @@
+"""Change-log replication between LabelMaker instances (branch sync).
+
+Triggers record every write to ``label`` and ``form`` in ``change_log``, whatever
+the write path (ORM, Core bulk statements, raw SQL). The log keeps one row per
+label uid / form name: a newer change replaces the older row and gets a new
+``seq``. A peer that has seen everything up to seq N needs only the rows above
+N, and ten edits of one label ship as one change.
+
+Instances exchange gzip-compressed JSON batches over HTTP (``/api/sync``):
+
+- pull: fetch the peer's changes above the cursor kept for it in
+  ``sync_cursor`` and apply them;
+- push: ask the peer how far it got with our changes and send the rest.
+
+A batch carries the current values of each changed label and form, the
+instance that made the change and when (UTC). Applying is idempotent and the
+last writer wins. A change is applied only when its (changed_at, origin) is
+newer than the local log row for the same key. A repeated or out-of-date batch
+therefore changes nothing. Labels are identified by ``Label.uid``. A label
+created on two instances with the same product name, form and amount is taken
+as one label. ``Label.version`` is not compared: it also counts local print
+mark toggles and stays each instance's optimistic-locking counter. Changes are
+never sent back to the instance they came from.
+
+Print marks, print history and layouts are local. Applied label changes mark
+the label for printing, like price-file ingestion does.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import math
+import threading
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import Any, NamedTuple, Protocol, TypedDict
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from uuid import uuid4
+
+import click
+from flask import Flask
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.compression import compress
+from app.db import db
+from app.duplicates import index_label, name_trigrams
+from app.form_writes import rename_form
+from app.label_layout import refresh_layouts
+from app.models import ChangeLog, Form, Label, LabelTrigram, SyncCursor, SyncNode
+from app.utils import calculate_unit_price
+from app.write_queue import run_write
+
+logger = logging.getLogger(__name__)
+
+SYNC_FORMAT = 1
+SYNC_BATCH_SIZE = 5000
+SYNC_BATCH_MAX = 20000
+SYNC_TOKEN_HEADER = "X-LabelMaker-Sync-Token"
+SYNC_TIMEOUT_SECONDS = 60.0
+SYNC_INTERVAL_SECONDS = 300.0
+MAX_REPORTED_ERRORS = 100
+
+OPS = ("upsert", "delete")
+
+# Keys per IN (...) lookup of log rows
+_KEY_CHUNK = 500
+
+# Changes made before the log existed are older than any logged change
+_EPOCH = "1970-01-01T00:00:00.000Z"
+
+_label_table = Label.__table__
+_log_table = ChangeLog.__table__
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS label_log_ai AFTER INSERT ON label BEGIN
+        UPDATE label SET uid = lower(hex(randomblob(16)))
+        WHERE id = new.id AND uid IS NULL;
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        SELECT 'label', uid, 'upsert', '', {_NOW} FROM label WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS label_log_au
+    AFTER UPDATE OF product_name, form, amount, price, barcode ON label
+    WHEN new.uid IS NOT NULL AND (
+        old.product_name IS NOT new.product_name OR old.form IS NOT new.form
+        OR old.amount IS NOT new.amount OR old.price IS NOT new.price
+        OR old.barcode IS NOT new.barcode
+    )
+    BEGIN
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('label', new.uid, 'upsert', '', {_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS label_log_uid AFTER UPDATE OF uid ON label
+    WHEN old.uid IS NOT NULL AND new.uid IS NOT NULL AND old.uid != new.uid
+    BEGIN
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('label', old.uid, 'delete', '', {_NOW});
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('label', new.uid, 'upsert', '', {_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS label_log_ad AFTER DELETE ON label
+    WHEN old.uid IS NOT NULL
+    BEGIN
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('label', old.uid, 'delete', '', {_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS form_log_ai AFTER INSERT ON form BEGIN
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('form', new.name, 'upsert', '', {_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS form_log_au AFTER UPDATE OF name, short_name, unit
+    ON form
+    WHEN old.name IS NOT new.name OR old.short_name IS NOT new.short_name
+        OR old.unit IS NOT new.unit
+    BEGIN
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        SELECT 'form', old.name, 'delete', '', {_NOW} WHERE old.name != new.name;
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('form', new.name, 'upsert', '', {_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS form_log_ad AFTER DELETE ON form BEGIN
+        INSERT OR REPLACE INTO change_log(entity, entity_key, op, origin, changed_at)
+        VALUES ('form', old.name, 'delete', '', {_NOW});
+    END
+    """,
+)
+
+# Rows written before the triggers existed (older databases, restored copies)
+_BACKFILL = (
+    "UPDATE label SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL",
+    """
+    INSERT INTO change_log(entity, entity_key, op, origin, changed_at)
+    SELECT 'label', uid, 'upsert', '',
+        coalesce(strftime('%Y-%m-%dT%H:%M:%fZ', coalesce(updated_at, created_at)),
+            :epoch)
+    FROM label
+    WHERE NOT EXISTS (
+        SELECT 1 FROM change_log
+        WHERE entity = 'label' AND entity_key = label.uid
+    )
+    """,
+    """
+    INSERT INTO change_log(entity, entity_key, op, origin, changed_at)
+    SELECT 'form', name, 'upsert', '', :epoch FROM form
+    WHERE NOT EXISTS (
+        SELECT 1 FROM change_log
+        WHERE entity = 'form' AND entity_key = form.name
+    )
+    """,
+)
+
+_APPLY_LABEL = (
+    update(_label_table)
+    .where(_label_table.c.id == bindparam("b_id"))
+    .values(
+        uid=bindparam("b_uid"),
+        product_name=bindparam("b_product_name"),
+        form=bindparam("b_form"),
+        amount=bindparam("b_amount"),
+        price=bindparam("b_price"),
+        barcode=bindparam("b_barcode"),
+        unit_price=bindparam("b_unit_price"),
+        marked_to_print=True,
+        updated_at=bindparam("b_updated_at"),
+        # Recomputed below for every changed label at once
+        layout_json=None,
+        version=_label_table.c.version + 1,
+    )
+)
+
+_log_upsert = sqlite_insert(_log_table)
+_LOG_CHANGE = _log_upsert.on_conflict_do_update(
+    index_elements=[_log_table.c.entity, _log_table.c.entity_key],
+    set_={
+        "op": _log_upsert.excluded.op,
+        "origin": _log_upsert.excluded.origin,
+        "changed_at": _log_upsert.excluded.changed_at,
+    },
+)
+
+
+class SyncError(Exception):
+    """A peer could not be reached or refused a request."""
+
+
+# Errors that fail one sync run; the background worker logs them and retries
+SYNC_ERRORS = (SyncError, OSError, ValueError, SQLAlchemyError)
+
+
+class FormSyncDict(TypedDict):
+    """Replicated state of one form; values are None for a delete."""
+
+    name: str
+    short_name: str | None
+    unit: str | None
+    op: str
+    origin: str
+    changed_at: str
+
+
+class LabelSyncDict(TypedDict):
+    """Replicated state of one label; values are None for a delete."""
+
+    uid: str
+    product_name: str | None
+    form: str | None
+    amount: float | None
+    price: float | None
+    barcode: str | None
+    op: str
+    origin: str
+    changed_at: str
+
+
+class ChangeBatchDict(TypedDict):
+    """Changes of one instance above a change-log position."""
+
+    format: int
+    instance: str
+    since: int
+    next: int
+    more: bool
+    forms: list[FormSyncDict]
+    labels: list[LabelSyncDict]
+
+
+class SyncInfoDict(TypedDict):
+    """What an instance tells a peer before a sync."""
+
+    instance: str
+    last_seq: int
+    # Position of the asking peer's changes received so far
+    received: int
+
+
+class SyncReportDict(TypedDict):
+    """Outcome of applying one batch."""
+
+    instance: str
+    next: int
+    forms: int
+    labels: int
+    deleted: int
+    unchanged: int
+    stale: int
+    conflicts: int
+    errors: list[str]
+
+
+class _LabelState(NamedTuple):
+    id: int
+    uid: str
+    product_name: str
+    form: str
+    amount: float
+    price: float
+    barcode: str | None
+
+
+# ── Log and instance identity ─────────────────────────────────────────────────
+
+
+def ensure_change_log(connection: Connection) -> None:
+    """Create the change-log triggers and log rows written without them.
+
+    Args:
+        connection: Connection to the application database, after
+            ``create_all`` and ``upgrade_schema``.
+    """
+    for statement in _DDL:
+        connection.execute(text(statement))
+    for statement in _BACKFILL:
+        connection.execute(text(statement), {"epoch": _EPOCH})
+    connection.execute(
+        insert(SyncNode).from_select(
+            ["id", "instance_id"],
+            select(1, func.lower(func.hex(func.randomblob(16)))).where(
+                ~select(SyncNode.id).exists()
+            ),
+        )
+    )
+
+
+def _create_instance_id() -> str:
+    found: str | None = db.session.scalar(select(SyncNode.instance_id))
+    if found is None:
+        found = uuid4().hex
+        db.session.execute(insert(SyncNode).values(id=1, instance_id=found))
+    return found
+
+
+def instance_id() -> str:
+    """Random id naming this database to its sync peers."""
+    found: str | None = db.session.scalar(select(SyncNode.instance_id))
+    return found if found is not None else run_write(_create_instance_id)
+
+
+def received_seq(peer: str) -> int:
+    """Position of peer's change log received so far (0 for a new peer)."""
+    seq: int | None = db.session.scalar(
+        select(SyncCursor.received_seq).where(SyncCursor.instance_id == peer)
+    )
+    return seq or 0
+
+
+def sync_info(peer: str = "") -> SyncInfoDict:
+    last_seq: int | None = db.session.scalar(select(func.max(ChangeLog.seq)))
+    return SyncInfoDict(
+        instance=instance_id(),
+        last_seq=last_seq or 0,
+        received=received_seq(peer) if peer else 0,
+    )
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+
+
+def export_changes(
+    since: int, exclude: str = "", limit: int = SYNC_BATCH_SIZE
+) -> ChangeBatchDict:
+    """Changes logged after seq since, oldest first, with current values.
+
+    Args:
+        since: Change-log position the receiver already has.
+        exclude: Instance id of the receiver; its own changes are left out.
+        limit: Most changes in the batch; ``more`` tells whether there are others.
+    """
+    me = instance_id()
+    stmt = (
+        select(
+            ChangeLog.seq,
+            ChangeLog.entity,
+            ChangeLog.entity_key,
+            ChangeLog.op,
+            ChangeLog.origin,
+            ChangeLog.changed_at,
+            Label.product_name,
+            Label.form,
+            Label.amount,
+            Label.price,
+            Label.barcode,
+            Form.short_name,
+            Form.unit,
+        )
+        .outerjoin(
+            Label, and_(ChangeLog.entity == "label", Label.uid == ChangeLog.entity_key)
+        )
+        .outerjoin(
+            Form, and_(ChangeLog.entity == "form", Form.name == ChangeLog.entity_key)
+        )
+        .where(ChangeLog.seq > since)
+        .order_by(ChangeLog.seq)
+        .limit(limit)
+    )
+    if exclude:
+        stmt = stmt.where(ChangeLog.origin != exclude)
+    rows = db.session.execute(stmt).all()
+
+    forms: list[FormSyncDict] = []
+    labels: list[LabelSyncDict] = []
+    for row in rows:
+        origin = row.origin or me
+        deleted = row.op == "delete"
+        if not deleted and row.short_name is None and row.product_name is None:
+            # Row removed outside the triggers' view (edited by hand)
+            continue
+        if row.entity == "form":
+            forms.append(
+                FormSyncDict(
+                    name=row.entity_key,
+                    short_name=None if deleted else row.short_name,
+                    unit=None if deleted else row.unit,
+                    op=row.op,
+                    origin=origin,
+                    changed_at=row.changed_at,
+                )
+            )
+        else:
+            labels.append(
+                LabelSyncDict(
+                    uid=row.entity_key,
+                    product_name=None if deleted else row.product_name,
+                    form=None if deleted else row.form,
+                    amount=None if deleted else row.amount,
+                    price=None if deleted else row.price,
+                    barcode=None if deleted else row.barcode,
+                    op=row.op,
+                    origin=origin,
+                    changed_at=row.changed_at,
+                )
+            )
+
+    more = len(rows) == limit
+    if more:
+        next_seq = rows[-1].seq
+    else:
+        # Skipped changes of the receiver count as received too
+        last_seq: int | None = db.session.scalar(select(func.max(ChangeLog.seq)))
+        next_seq = max(since, last_seq or 0)
+    return ChangeBatchDict(
+        format=SYNC_FORMAT,
+        instance=me,
+        since=since,
+        next=next_seq,
+        more=more,
+        forms=forms,
+        labels=labels,
+    )
+
+
+def encode_batch(batch: ChangeBatchDict) -> bytes:
+    """Gzip-compressed JSON of a batch, as sent over HTTP."""
+    body = json.dumps(batch, ensure_ascii=False, separators=(",", ":"))
+    return compress(body.encode(), "gzip")
+
+
+def decode_body(body: bytes, encoding: str | None) -> Any:
+    """JSON from a request or response body, gunzipped when needed.
+
+    Raises:
+        ValueError: Not (gzip-compressed) JSON.
+    """
+    try:
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body)
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        raise ValueError(f"Unreadable sync payload: {e}") from e
+
+
+def _text(item: dict[str, Any], field: str, optional: bool = False) -> str | None:
+    value = item.get(field)
+    if value is None and optional:
+        return None
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"{field} must be a non-empty string")
+    return value
+
+
+def _number(item: dict[str, Any], field: str) -> float:
+    value = item.get(field)
+    if isinstance(value, bool) or not isinstance(value, int | float):
+        raise ValueError(f"{field} must be a number")
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f"{field} must be greater than 0")
+    return float(value)
+
+
+def _change(item: Any) -> tuple[dict[str, Any], str, str, str]:
+    if not isinstance(item, dict):
+        raise ValueError("Every change must be an object")
+    op = item.get("op")
+    if op not in OPS:
+        raise ValueError(f"op must be one of {', '.join(OPS)}")
+    origin = _text(item, "origin")
+    changed_at = _text(item, "changed_at")
+    assert origin is not None and changed_at is not None
+    return item, op, origin, changed_at
+
+
+def parse_batch(data: Any) -> ChangeBatchDict:
+    """Validate a batch received from a peer.
+
+    Raises:
+        ValueError: Not a batch of this format.
+    """
+    if not isinstance(data, dict) or data.get("format") != SYNC_FORMAT:
+        raise ValueError(f"Not a sync batch of format {SYNC_FORMAT}")
+    instance = _text(data, "instance")
+    since, next_seq, more = data.get("since"), data.get("next"), data.get("more")
+    if not isinstance(since, int) or not isinstance(next_seq, int):
+        raise ValueError("since and next must be integers")
+    if not isinstance(more, bool):
+        raise ValueError("more must be true or false")
+    raw_forms, raw_labels = data.get("forms"), data.get("labels")
+    if not isinstance(raw_forms, list) or not isinstance(raw_labels, list):
+        raise ValueError("forms and labels must be lists")
+
+    forms: list[FormSyncDict] = []
+    for raw in raw_forms:
+        item, op, origin, changed_at = _change(raw)
+        upsert = op == "upsert"
+        forms.append(
+            FormSyncDict(
+                name=str(_text(item, "name")),
+                short_name=_text(item, "short_name") if upsert else None,
+                unit=_text(item, "unit") if upsert else None,
+                op=op,
+                origin=origin,
+                changed_at=changed_at,
+            )
+        )
+    labels: list[LabelSyncDict] = []
+    for raw in raw_labels:
+        item, op, origin, changed_at = _change(raw)
+        upsert = op == "upsert"
+        labels.append(
+            LabelSyncDict(
+                uid=str(_text(item, "uid")),
+                product_name=_text(item, "product_name") if upsert else None,
+                form=_text(item, "form") if upsert else None,
+                amount=_number(item, "amount") if upsert else None,
+                price=_number(item, "price") if upsert else None,
+                barcode=_text(item, "barcode", optional=True) if upsert else None,
+                op=op,
+                origin=origin,
+                changed_at=changed_at,
+            )
+        )
+    return ChangeBatchDict(
+        format=SYNC_FORMAT,
+        instance=str(instance),
+        since=since,
+        next=next_seq,
+        more=more,
+        forms=forms,
+        labels=labels,
+    )
+
+
+# ── Apply ─────────────────────────────────────────────────────────────────────
+
+
+def _logged(entity: str, keys: Sequence[str], me: str) -> dict[str, tuple[str, str]]:
+    """(changed_at, origin) of the local log row of each key."""
+    logged: dict[str, tuple[str, str]] = {}
+    for start in range(0, len(keys), _KEY_CHUNK):
+        chunk = keys[start : start + _KEY_CHUNK]
+        for key, changed_at, origin in db.session.execute(
+            select(ChangeLog.entity_key, ChangeLog.changed_at, ChangeLog.origin).where(
+                ChangeLog.entity == entity, ChangeLog.entity_key.in_(chunk)
+            )
+        ):
+            logged[key] = (changed_at, origin or me)
+    return logged
+
+
+def _is_newer(
+    change: FormSyncDict | LabelSyncDict, local: tuple[str, str] | None
+) -> bool:
+    # The instance id breaks ties, so every instance picks the same winner
+    return local is None or (change["changed_at"], change["origin"]) > local
+
+
+def _log_row(
+    entity: str, key: str, change: FormSyncDict | LabelSyncDict
+) -> dict[str, str]:
+    return {
+        "entity": entity,
+        "entity_key": key,
+        "op": change["op"],
+        "origin": change["origin"],
+        "changed_at": change["changed_at"],
+    }
+
+
+def _conflict(report: SyncReportDict, message: str) -> None:
+    report["conflicts"] += 1
+    report["errors"].append(message)
+
+
+def _upsert_form(change: FormSyncDict, report: SyncReportDict) -> bool:
+    """Create or update one form; False when it conflicts with a local form."""
+    name, short_name, unit = change["name"], change["short_name"], change["unit"]
+    assert short_name is not None and unit is not None
+    rows = db.session.execute(
+        select(Form.name, Form.short_name, Form.unit).where(
+            or_(Form.name == name, Form.short_name == short_name)
+        )
+    ).all()
+    current = next((row for row in rows if row.name == name), None)
+    holder = next((row for row in rows if row.name != name), None)
+    if current is None and holder is not None:
+        # Renamed on the peer; labels refer to the short name, which stays
+        db.session.execute(
+            update(Form)
+            .where(Form.name == holder.name)
+            .values(name=name)
+            .execution_options(synchronize_session=False)
+        )
+        current, holder = holder, None
+        report["forms"] += 1
+    if holder is not None:
+        _conflict(
+            report, f"Form {name}: short name {short_name} belongs to {holder.name}"
+        )
+        return False
+
+    if current is None:
+        db.session.execute(
+            insert(Form).values(name=name, short_name=short_name, unit=unit)
+        )
+        report["forms"] += 1
+    elif (current.short_name, current.unit) != (short_name, unit):
+        # Moves the labels along and recomputes their layouts
+        rename_form(name, short_name, unit)
+        report["forms"] += 1
+    else:
+        report["unchanged"] += 1
+    return True
+
+
+def _delete_form(change: FormSyncDict, report: SyncReportDict) -> bool:
+    short_name = db.session.scalar(
+        select(Form.short_name).where(Form.name == change["name"])
+    )
+    if short_name is None:
+        return True
+    used = db.session.scalar(select(Label.id).where(Label.form == short_name).limit(1))
+    if used is not None:
+        _conflict(report, f"Form {change['name']} is still used by labels")
+        return False
+    db.session.execute(delete(Form).where(Form.name == change["name"]))
+    report["deleted"] += 1
+    return True
+
+
+def _label_states() -> tuple[dict[str, _LabelState], dict[tuple[str, str, float], str]]:
+    """Local labels by uid, and uids by product name, form and amount."""
+    states: dict[str, _LabelState] = {}
+    by_name: dict[tuple[str, str, float], str] = {}
+    for row in db.session.execute(
+        select(
+            Label.id,
+            Label.uid,
+            Label.product_name,
+            Label.form,
+            Label.amount,
+            Label.price,
+            Label.barcode,
+        ).where(Label.uid.is_not(None))
+    ):
+        state = _LabelState(*row)
+        states[state.uid] = state
+        by_name[(state.product_name, state.form, state.amount)] = state.uid
+    return states, by_name
+
+
+def _apply_labels(
+    changes: Sequence[LabelSyncDict],
+    logged: dict[str, tuple[str, str]],
+    report: SyncReportDict,
+    log_rows: list[dict[str, str]],
+) -> None:
+    states, by_name = _label_states()
+    forms = set(db.session.scalars(select(Form.short_name)))
+    now = datetime.now(UTC)
+
+    deletes: list[int] = []
+    updates: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    renamed: list[tuple[int, str]] = []
+    for change in changes:
+        uid = change["uid"]
+        label = states.get(uid)
+        if change["op"] == "delete":
+            if not _is_newer(change, logged.get(uid)):
+                report["stale"] += 1
+                continue
+            if label is not None:
+                deletes.append(label.id)
+                del states[uid]
+                del by_name[(label.product_name, label.form, label.amount)]
+                report["deleted"] += 1
+            log_rows.append(_log_row("label", uid, change))
+            continue
+
+        product_name, form = change["product_name"], change["form"]
+        amount, price = change["amount"], change["price"]
+        assert product_name is not None and form is not None
+        assert amount is not None and price is not None
+        key = (product_name, form, amount)
+        if label is None and key in by_name:
+            # Created on both instances; from now on it is one label
+            label = states[by_name[key]]
+        if not _is_newer(change, logged.get(label.uid if label else uid)):
+            report["stale"] += 1
+            continue
+        if form not in forms:
+            _conflict(report, f"Label {product_name}: form {form} does not exist")
+            continue
+        taken = by_name.get(key)
+        if taken is not None and (label is None or taken != label.uid):
+            _conflict(
+                report,
+                f"Label {product_name}: another label has the same form and amount",
+            )
+            continue
+
+        values = (product_name, form, amount, price, change["barcode"])
+        if label is None:
+            inserts.append(
+                {
+                    "uid": uid,
+                    "product_name": product_name,
+                    "form": form,
+                    "amount": amount,
+                    "price": price,
+                    "barcode": change["barcode"],
+                    "unit_price": calculate_unit_price(amount, price),
+                    "marked_to_print": True,
+                    "created_at": now,
+                    "updated_at": now,
+                    "version": 1,
+                }
+            )
+            report["labels"] += 1
+        elif label.uid == uid and values == label[2:]:
+            report["unchanged"] += 1
+        else:
+            updates.append(
+                {
+                    "b_id": label.id,
+                    "b_uid": uid,
+                    "b_product_name": product_name,
+                    "b_form": form,
+                    "b_amount": amount,
+                    "b_price": price,
+                    "b_barcode": change["barcode"],
+                    "b_unit_price": calculate_unit_price(amount, price),
+                    "b_updated_at": now,
+                }
+            )
+            if product_name != label.product_name:
+                renamed.append((label.id, product_name))
+            del states[label.uid]
+            del by_name[(label.product_name, label.form, label.amount)]
+            report["labels"] += 1
+        states[uid] = _LabelState(label.id if label else 0, uid, *values)
+        by_name[key] = uid
+        log_rows.append(_log_row("label", uid, change))
+
+    for start in range(0, len(deletes), _KEY_CHUNK):
+        chunk = deletes[start : start + _KEY_CHUNK]
+        db.session.execute(delete(Label).where(Label.id.in_(chunk)))
+    if updates:
+        db.session.execute(_APPLY_LABEL, updates)
+    connection = db.session.connection()
+    if inserts:
+        created = db.session.execute(
+            insert(_label_table).returning(
+                _label_table.c.id, _label_table.c.product_name
+            ),
+            inserts,
+        ).all()
+        postings = [
+            {"trigram": gram, "label_id": label_id}
+            for label_id, product_name in created
+            for gram in name_trigrams(product_name)
+        ]
+        if postings:
+            connection.execute(insert(LabelTrigram.__table__), postings)
+    for label_id, product_name in renamed:
+        index_label(connection, label_id, product_name)
+    if updates or inserts:
+        refresh_layouts(Label.layout_json.is_(None))
+
+
+def _store_cursor(peer: str, seq: int) -> None:
+    stmt = sqlite_insert(SyncCursor).values(
+        instance_id=peer, received_seq=seq, synced_at=datetime.now(UTC)
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SyncCursor.instance_id],
+            set_={
+                "received_seq": func.max(
+                    SyncCursor.received_seq, stmt.excluded.received_seq
+                ),
+                "synced_at": stmt.excluded.synced_at,
+            },
+        )
+    )
+
+
+def apply_changes(batch: ChangeBatchDict) -> SyncReportDict:
+    """Apply a peer's batch in the current write transaction (``run_write``).
+
+    Forms are created and updated first, so labels can refer to them, and
+    deleted last, after their labels moved away.
+
+    Raises:
+        ValueError: The batch comes from this instance.
+    """
+    me = instance_id()
+    if batch["instance"] == me:
+        raise ValueError("The batch comes from this instance")
+    report = SyncReportDict(
+        instance=batch["instance"],
+        next=batch["next"],
+        forms=0,
+        labels=0,
+        deleted=0,
+        unchanged=0,
+        stale=0,
+        conflicts=0,
+        errors=[],
+    )
+    # Read before writing: the triggers log this batch's own writes as new
+    forms_logged = _logged("form", [change["name"] for change in batch["forms"]], me)
+    keys = [change["uid"] for change in batch["labels"]]
+    if batch["labels"]:
+        # Twins (same name, form and amount) are compared by their local uid
+        states, by_name = _label_states()
+        keys += [
+            by_name[key]
+            for key in (
+                (change["product_name"], change["form"], change["amount"])
+                for change in batch["labels"]
+                if change["uid"] not in states
+            )
+            if key in by_name
+        ]
+    labels_logged = _logged("label", keys, me)
+    log_rows: list[dict[str, str]] = []
+
+    form_deletes: list[FormSyncDict] = []
+    for form_change in batch["forms"]:
+        if not _is_newer(form_change, forms_logged.get(form_change["name"])):
+            report["stale"] += 1
+        elif form_change["op"] == "delete":
+            form_deletes.append(form_change)
+        elif _upsert_form(form_change, report):
+            log_rows.append(_log_row("form", form_change["name"], form_change))
+    if batch["labels"]:
+        _apply_labels(batch["labels"], labels_logged, report, log_rows)
+    for form_change in form_deletes:
+        if _delete_form(form_change, report):
+            log_rows.append(_log_row("form", form_change["name"], form_change))
+
+    if log_rows:
+        # Replaces the rows the triggers just wrote with the original change
+        db.session.execute(_LOG_CHANGE, log_rows)
+    _store_cursor(batch["instance"], batch["next"])
+    report["errors"] = report["errors"][:MAX_REPORTED_ERRORS]
+    logger.info(f"Applied sync batch from {batch['instance']}: {summarize(report)}")
+    return report
+
+
+def summarize(report: SyncReportDict) -> str:
+    return (
+        f"{report['forms']} forms and {report['labels']} labels changed, "
+        f"{report['deleted']} deleted, {report['unchanged']} unchanged, "
+        f"{report['stale']} stale, {report['conflicts']} conflicts"
+    )
+
+
+# ── Peers ─────────────────────────────────────────────────────────────────────
+
+
+class Peer(Protocol):
+    """Another LabelMaker instance to sync with."""
+
+    def info(self, instance: str) -> SyncInfoDict: ...
+
+    def fetch(self, since: int, instance: str, limit: int) -> ChangeBatchDict: ...
+
+    def send(self, batch: ChangeBatchDict) -> SyncReportDict: ...
+
+
+class HttpPeer:
+    """Peer reached over its ``/api/sync`` endpoints."""
+
+    def __init__(
+        self, base_url: str, token: str, timeout: float = SYNC_TIMEOUT_SECONDS
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def __repr__(self) -> str:
+        return f"<HttpPeer(base_url='{self.base_url}')>"
+
+    def _request(
+        self, path: str, query: dict[str, Any] | None = None, body: bytes | None = None
+    ) -> Any:
+        url = f"{self.base_url}/api/sync{path}"
+        if query:
+            url = f"{url}?{urlencode(query)}"
+        request = Request(url, data=body, method="GET" if body is None else "POST")
+        request.add_header(SYNC_TOKEN_HEADER, self.token)
+        request.add_header("Accept-Encoding", "gzip")
+        if body is not None:
+            request.add_header("Content-Type", "application/json")
+            request.add_header("Content-Encoding", "gzip")
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                encoding = response.headers.get("Content-Encoding")
+                return decode_body(response.read(), encoding)
+        except HTTPError as e:
+            try:
+                data = decode_body(e.read(), e.headers.get("Content-Encoding"))
+            except ValueError:
+                data = None
+            message = data.get("error") if isinstance(data, dict) else e.reason
+            raise SyncError(f"{url}: {e.code} {message}") from e
+
+    def info(self, instance: str) -> SyncInfoDict:
+        info: SyncInfoDict = self._request("", {"peer": instance})
+        return info
+
+    def fetch(self, since: int, instance: str, limit: int) -> ChangeBatchDict:
+        data = self._request(
+            "/changes", {"since": since, "peer": instance, "limit": limit}
+        )
+        return parse_batch(data)
+
+    def send(self, batch: ChangeBatchDict) -> SyncReportDict:
+        report: SyncReportDict = self._request("/changes", body=encode_batch(batch))
+        return report
+
+
+def pull(peer: Peer, batch_size: int = SYNC_BATCH_SIZE) -> list[SyncReportDict]:
+    """Apply the peer's changes that this instance has not received yet."""
+    me = instance_id()
+    remote = peer.info(me)["instance"]
+    since = received_seq(remote)
+    reports: list[SyncReportDict] = []
+    while True:
+        batch = peer.fetch(since, me, batch_size)
+        if batch["instance"] != remote:
+            raise SyncError(f"Peer changed its instance id to {batch['instance']}")
+        reports.append(run_write(lambda: apply_changes(batch)))
+        if not batch["more"]:
+            return reports
+        since = batch["next"]
+
+
+def push(peer: Peer, batch_size: int = SYNC_BATCH_SIZE) -> list[SyncReportDict]:
+    """Send the changes the peer has not received yet."""
+    me = instance_id()
+    info = peer.info(me)
+    since = info["received"]
+    reports: list[SyncReportDict] = []
+    while True:
+        batch = export_changes(since, exclude=info["instance"], limit=batch_size)
+        if batch["next"] == since and not batch["forms"] and not batch["labels"]:
+            return reports
+        reports.append(peer.send(batch))
+        if not batch["more"]:
+            return reports
+        since = batch["next"]
+
+
+def sync_with(peer: Peer, batch_size: int = SYNC_BATCH_SIZE) -> list[SyncReportDict]:
+    """Pull the peer's changes, then push ours."""
+    return pull(peer, batch_size) + push(peer, batch_size)
+
+
+def _configured_peer(app: Flask, url: str | None = None) -> HttpPeer | None:
+    url = url or app.config.get("SYNC_PEER_URL") or ""
+    if not url:
+        return None
+    return HttpPeer(url, str(app.config.get("SYNC_TOKEN") or ""))
+
+
+class SyncWorker:
+    """Syncs with the configured peer on a daemon thread."""
+
+    def __init__(
+        self, app: Flask, peer: Peer, interval_seconds: float = SYNC_INTERVAL_SECONDS
+    ) -> None:
+        self.app = app
+        self.peer = peer
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="branch-sync", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop syncing; a batch being applied finishes first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_now(self) -> list[SyncReportDict]:
+        """Sync once; failures (peer offline) are logged and retried later."""
+        with self._lock:
+            try:
+                with self.app.app_context():
+                    return sync_with(self.peer)
+            except SYNC_ERRORS as e:
+                logger.warning(f"Sync with {self.peer!r} failed: {e}")
+                return []
+
+    def _run(self) -> None:
+        while True:
+            self.run_now()
+            if self._stop.wait(self.interval_seconds):
+                return
+
+
+def create_sync_worker(app: Flask) -> SyncWorker | None:
+    """Worker for SYNC_PEER_URL, or None when no peer is configured."""
+    peer = _configured_peer(app)
+    if peer is None:
+        return None
+    return SyncWorker(
+        app,
+        peer,
+        interval_seconds=float(
+            app.config.get("SYNC_INTERVAL_SECONDS", SYNC_INTERVAL_SECONDS)
+        ),
+    )
+
+
+def init_sync(app: Flask) -> None:
+    """Set up the change log and register the ``flask sync`` CLI commands.
+
+    Must be called inside an application context after ``db.create_all()``.
+    """
+    if db.engine.dialect.name == "sqlite":
+        with db.engine.begin() as connection:
+            ensure_change_log(connection)
+
+    def peer_for(url: str | None) -> HttpPeer:
+        peer = _configured_peer(app, url)
+        if peer is None:
+            raise click.ClickException("Give a peer URL or set SYNC_PEER_URL.")
+        return peer
+
+    def report(reports: list[SyncReportDict], direction: str) -> None:
+        if not reports:
+            click.echo(f"{direction}: nothing to do.")
+        for batch_report in reports:
+            click.echo(f"{direction}: {summarize(batch_report)}.")
+            for message in batch_report["errors"]:
+                click.echo(f"  {message}")
+
+    @click.group("sync")
+    def sync_group() -> None:
+        """Replicate labels and forms between LabelMaker instances."""
+
+    @sync_group.command("status")
+    def status_command() -> None:
+        """Show this instance's id, change-log position and peers."""
+        info = sync_info()
+        click.echo(f"Instance {info['instance']}, change log at {info['last_seq']}.")
+        for cursor in db.session.scalars(
+            select(SyncCursor).order_by(SyncCursor.instance_id)
+        ):
+            click.echo(
+                f"  from {cursor.instance_id}: up to {cursor.received_seq} "
+                f"({cursor.synced_at:%Y-%m-%d %H:%M})"
+            )
+
+    @sync_group.command("run")
+    @click.argument("url", required=False)
+    @click.option(
+        "--direction",
+        type=click.Choice(["both", "pull", "push"]),
+        default="both",
+        show_default=True,
+    )
+    @click.option("--batch-size", type=int, default=SYNC_BATCH_SIZE, show_default=True)
+    def run_command(url: str | None, direction: str, batch_size: int) -> None:
+        """Sync with the instance at URL (default SYNC_PEER_URL)."""
+        peer = peer_for(url)
+        try:
+            if direction in ("both", "pull"):
+                report(pull(peer, batch_size), "pull")
+            if direction in ("both", "push"):
+                report(push(peer, batch_size), "push")
+        except SYNC_ERRORS as e:
+            raise click.ClickException(str(e)) from e
+
+    app.cli.add_command(sync_group)
@@ -0,0 +1,214 @@
+"""Print preview thumbnails packed into per-page sprite sheets.
+
+The print page previews marked labels one A4 sheet (32 labels) at a time and
+loads further sheets while the user scrolls. Each sheet is a single PNG sprite
+of label thumbnails, rasterized from the same placements as the PDF
+(``LabelPDFGenerator.place_label``) with the raster backend's renderer.
+
+Thumbnails are cached by label content plus font settings, so a sprite is only
+re-encoded for the labels that actually changed. Sprite URLs carry a version
+key derived from their thumbnails; a matching key is served as immutable.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TypedDict
+
+from PIL import Image, ImageDraw
+from sqlalchemy import func, select
+
+from app.db import db
+from app.label_output import render_label_image
+from app.label_snapshot import LabelRow, load_label_rows
+from app.models import Label
+from app.pdf_generator import LabelPDFGenerator, build_layout, fit_key, layout_key
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DPI = 96
+# One preview page is one printed A4 sheet (4 x 8 labels)
+PREVIEW_COLUMNS = 4
+PREVIEW_PAGE_SIZE = 32
+THUMBNAIL_CACHE_SIZE = 1024
+SPRITE_CACHE_SIZE = 64
+
+_BORDER_COLOR = 178  # Light gray cutting guide, as in the PDF
+
+
+class PreviewLabel(TypedDict):
+    """A label entry of a preview page manifest."""
+
+    id: int
+    product_name: str
+    form: str
+    price: float
+    price_text: str
+
+
+@dataclass(frozen=True)
+class PreviewPage:
+    """Labels of one preview page and the version key of their sprite."""
+
+    page: int
+    rows: list[LabelRow]
+    keys: list[str]
+    sprite_key: str
+
+
+def thumbnail_key(row: LabelRow, price_font_size: int, text_font_size: int) -> str:
+    """Identify a thumbnail by the label content and the font settings."""
+    source = "\x1e".join(
+        (
+            layout_key(
+                row.product_name,
+                row.form,
+                row.amount,
+                row.price,
+                row.unit_price,
+                row.unit,
+            ),
+            fit_key(price_font_size, text_font_size),
+            row.barcode or "",
+            str(THUMBNAIL_DPI),
+        )
+    )
+    return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+class ThumbnailCache:
+    """Thread-safe LRU caches of label thumbnails and encoded sprite sheets."""
+
+    def __init__(
+        self,
+        max_thumbnails: int = THUMBNAIL_CACHE_SIZE,
+        max_sprites: int = SPRITE_CACHE_SIZE,
+    ) -> None:
+        self.max_thumbnails = max_thumbnails
+        self.max_sprites = max_sprites
+        self._thumbnails: OrderedDict[str, Image.Image] = OrderedDict()
+        self._sprites: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.scale = THUMBNAIL_DPI / 72
+        self.tile_width = round(LabelPDFGenerator.LABEL_WIDTH * self.scale)
+        self.tile_height = round(LabelPDFGenerator.LABEL_HEIGHT * self.scale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._thumbnails.clear()
+            self._sprites.clear()
+
+    def thumbnail(
+        self, row: LabelRow, key: str, generator: LabelPDFGenerator
+    ) -> Image.Image:
+        """Return the cached thumbnail for key, rendering row on a miss."""
+        with self._lock:
+            image = self._thumbnails.get(key)
+            if image is not None:
+                self._thumbnails.move_to_end(key)
+                return image
+
+        image = render_label_image(
+            generator.place_label(row),
+            self.scale,
+            mode="L",
+            barcode=generator.place_barcode(row),
+        )
+        ImageDraw.Draw(image).rectangle(
+            (0, 0, image.width - 1, image.height - 1), outline=_BORDER_COLOR
+        )
+        with self._lock:
+            self._thumbnails[key] = image
+            while len(self._thumbnails) > self.max_thumbnails:
+                self._thumbnails.popitem(last=False)
+        return image
+
+    def sprite(
+        self, page: PreviewPage, price_font_size: int, text_font_size: int
+    ) -> bytes:
+        """Return the PNG sprite sheet of a page, tiles in row-major order."""
+        with self._lock:
+            body = self._sprites.get(page.sprite_key)
+            if body is not None:
+                self._sprites.move_to_end(page.sprite_key)
+                return body
+
+        generator = LabelPDFGenerator(price_font_size, text_font_size)
+        rows = max(1, math.ceil(len(page.rows) / PREVIEW_COLUMNS))
+        sheet = Image.new(
+            "L", (self.tile_width * PREVIEW_COLUMNS, self.tile_height * rows), "white"
+        )
+        for index, (row, key) in enumerate(zip(page.rows, page.keys)):
+            column, line = index % PREVIEW_COLUMNS, index // PREVIEW_COLUMNS
+            sheet.paste(
+                self.thumbnail(row, key, generator),
+                (column * self.tile_width, line * self.tile_height),
+            )
+        buffer = BytesIO()
+        sheet.save(buffer, format="PNG")
+        body = buffer.getvalue()
+        logger.debug(f"Rendered preview sprite for page {page.page}: {len(body)} B")
+
+        with self._lock:
+            self._sprites[page.sprite_key] = body
+            while len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        return body
+
+
+# Process-wide cache shared by all app instances in this process
+thumbnail_cache = ThumbnailCache()
+
+
+def count_preview_pages() -> tuple[int, int]:
+    """Return (marked label count, preview page count)."""
+    stmt = (
+        select(func.count()).select_from(Label).where(Label.marked_to_print.is_(True))
+    )
+    count = db.session.execute(stmt).scalar_one()
+    return count, math.ceil(count / PREVIEW_PAGE_SIZE)
+
+
+def load_preview_page(
+    page: int, price_font_size: int, text_font_size: int
+) -> PreviewPage:
+    """Load the marked labels of a preview page in print (PDF) order.
+
+    Args:
+        page: Zero-based page number; pages past the end are empty.
+        price_font_size: Price font size the thumbnails are rendered with.
+        text_font_size: Text font size the thumbnails are rendered with.
+    """
+    rows = load_label_rows(
+        marked_only=True, offset=page * PREVIEW_PAGE_SIZE, limit=PREVIEW_PAGE_SIZE
+    )
+    keys = [thumbnail_key(row, price_font_size, text_font_size) for row in rows]
+    sprite_key = hashlib.blake2b("|".join(keys).encode(), digest_size=8).hexdigest()
+    return PreviewPage(page=page, rows=rows, keys=keys, sprite_key=sprite_key)
+
+
+def preview_labels(page: PreviewPage) -> list[PreviewLabel]:
+    """Manifest entries of a page, in the sprite's tile order."""
+    return [
+        PreviewLabel(
+            id=row.id,
+            product_name=row.product_name,
+            form=row.form,
+            price=row.price,
+            price_text=build_layout(
+                row.product_name,
+                row.form,
+                row.amount,
+                row.price,
+                row.unit_price,
+                row.unit,
+            )["price_text"],
+        )
+        for row in page.rows
+    ]
@@ -29,6 +29,10 @@ _ERROR_PATTERNS: list[Tuple[str, str]] = [
 
 _FALLBACK_MESSAGE = "Došlo k neočekávané chybě. Zkuste to prosím znovu."
 
+# Lock contention outlasted the busy timeout; the write can simply be retried
+_BUSY_PATTERN = r"database (table )?is locked"
+_BUSY_MESSAGE = "Databáze je právě zaneprázdněná. Zkuste to prosím za okamžik znovu."
+
 # Font size bounds — imported from constants, re-exported for backwards compatibility
 from app.constants import (  # noqa: E402
     PRICE_FONT_SIZE_MAX,
@@ -51,6 +55,8 @@ def translate_db_error(error: Exception) -> Tuple[str, int]:
     for pattern, message in _ERROR_PATTERNS:
         if re.search(pattern, error_str):
             return message, 409
+    if re.search(_BUSY_PATTERN, error_str):
+        return _BUSY_MESSAGE, 503
     return _FALLBACK_MESSAGE, 500
 
 
@@ -0,0 +1,200 @@
+"""Single-writer queue that serializes database writes with group commit.
+
+SQLite allows one writer at a time. When every request thread commits on its
+own, concurrent writes queue up on the database lock and eventually fail with
+"database is locked". Instead, routes hand their mutation to the app's write
+queue as a function. One writer thread runs the queued functions in arrival
+order; everything that queued up while the previous transaction was committing
+runs in the next transaction (group commit). Each function runs inside its own
+savepoint, so a failing write is rolled back alone and its exception is raised
+only in the request that submitted it.
+
+Reads are not queued. They run on the request threads, and WAL journaling (see
+``app.db``) lets them proceed while the writer commits.
+
+Write functions run in the writer's application context, not the request's:
+they use ``db.session`` but must not touch ``request``, and they should return
+plain values (dicts, ids) rather than ORM objects.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from flask import Flask, current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import current_store, db, use_store
+
+if TYPE_CHECKING:
+    from app.stores import Store
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WRITE_QUEUE_MAX_BATCH = 64
+WRITE_QUEUE_TIMEOUT = 30.0
+
+
+class WriteQueueTimeout(SQLAlchemyError):
+    """The writer did not get to a write in time; reported like a locked database."""
+
+
+@dataclass
+class _WriteJob:
+    work: Callable[[], Any]
+    future: Future[Any]
+
+
+class WriteQueue:
+    """Runs write functions on one thread, committing queued writes together."""
+
+    def __init__(
+        self,
+        app: Flask,
+        max_batch: int = WRITE_QUEUE_MAX_BATCH,
+        timeout: float = WRITE_QUEUE_TIMEOUT,
+        store: Store | None = None,
+    ) -> None:
+        self.app = app
+        # Database the writer commits to; None is the app's default database
+        self.store = store
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.batches = 0
+        self.writes = 0
+        self._jobs: queue.SimpleQueue[_WriteJob | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of writes waiting for the writer thread."""
+        return self._jobs.qsize()
+
+    def submit(self, work: Callable[[], T]) -> T:
+        """Run work in the next write transaction and return its result.
+
+        Raises:
+            Exception: Whatever work raised, or the commit error of its batch.
+            WriteQueueTimeout: The write did not start within ``timeout``.
+        """
+        if threading.current_thread() is self._thread:
+            # Called from a queued write: already inside the transaction
+            return work()
+        self._ensure_started()
+        future: Future[T] = Future()
+        self._jobs.put(_WriteJob(work, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise WriteQueueTimeout(
+                    "database is locked: write queue did not answer in time"
+                ) from None
+            # Already running; it finishes within the busy timeout
+            return future.result()
+
+    def close(self) -> None:
+        """Stop the writer thread after the writes queued so far."""
+        thread = self._thread
+        if thread is not None:
+            self._jobs.put(None)
+            thread.join()
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                name = (
+                    "db-writer"
+                    if self.store is None
+                    else f"db-writer-{self.store.name}"
+                )
+                self._thread = threading.Thread(
+                    target=self._run, name=name, daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            use_store(self.store)
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                batch = [job]
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        # Stop once this batch is committed
+                        self._jobs.put(None)
+                        break
+                    batch.append(job)
+                self._commit_batch(batch)
+
+    def _commit_batch(self, batch: list[_WriteJob]) -> None:
+        jobs = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        results: list[tuple[_WriteJob, Any]] = []
+        try:
+            # Take the write lock up front so lock waits use the busy timeout
+            db.session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            for job in jobs:
+                try:
+                    with db.session.begin_nested():
+                        value = job.work()
+                except Exception as e:
+                    job.future.set_exception(e)
+                else:
+                    results.append((job, value))
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Write batch of {len(jobs)} failed: {e}", exc_info=True)
+            db.session.rollback()
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
+        else:
+            self.batches += 1
+            self.writes += len(results)
+            logger.debug(f"Committed {len(results)} of {len(jobs)} queued writes")
+            for job, value in results:
+                job.future.set_result(value)
+        finally:
+            db.session.remove()
+
+
+def init_write_queue(app: Flask) -> None:
+    """Attach the write queue to app; its writer thread starts on first use."""
+    app.extensions["write_queue"] = WriteQueue(
+        app,
+        max_batch=int(app.config.get("WRITE_QUEUE_MAX_BATCH", WRITE_QUEUE_MAX_BATCH)),
+        timeout=float(app.config.get("WRITE_QUEUE_TIMEOUT", WRITE_QUEUE_TIMEOUT)),
+    )
+
+
+def run_write(work: Callable[[], T]) -> T:
+    """Run work through the write queue of the current store's database.
+
+    Without a selected store (see ``app.stores``) that is the app's own queue.
+    See ``WriteQueue.submit``.
+    """
+    store = current_store()
+    write_queue: WriteQueue = (
+        store.write_queue
+        if store is not None
+        else current_app.extensions["write_queue"]
+    )
+    return write_queue.submit(work)
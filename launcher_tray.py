@@ -24,6 +24,9 @@ if TYPE_CHECKING:
     from flask import Flask
     from PIL import Image
 
+    from app.backup import BackupScheduler
+    from app.sync import SyncWorker
+
 logging.basicConfig(
     level=logging.INFO,
     format="[%(asctime)s] %(levelname)-8s %(message)s",
@@ -187,6 +190,18 @@ def _open_browser() -> None:
     webbrowser.open_new(URL)
 
 
+def _back_up_now(backups: "BackupScheduler | None") -> None:
+    """Take a database snapshot in the background (tray menu action)."""
+    if backups is not None:
+        Thread(target=backups.run_now, daemon=True).start()
+
+
+def _sync_now(sync: "SyncWorker | None") -> None:
+    """Sync with the head office instance in the background (tray menu action)."""
+    if sync is not None:
+        Thread(target=sync.run_now, daemon=True).start()
+
+
 def main() -> None:
     """Start LabelMaker 2.0 with system tray icon."""
     logger.info("Starting LabelMaker 2.0...")
@@ -211,6 +226,30 @@ def main() -> None:
         # Open browser immediately
         _open_browser()
 
+        # Periodic online snapshots of the database (app/backup.py)
+        from app.backup import create_scheduler
+
+        backups = create_scheduler(app)
+        if backups is not None:
+            backups.start()
+            logger.info("Database backups go to %s", backups.backup_dir)
+
+        # Supplier price files dropped into INGEST_DIR (app/ingest.py)
+        from app.ingest import create_watcher
+
+        price_files = create_watcher(app)
+        if price_files is not None:
+            price_files.start()
+            logger.info("Watching %s for price files", price_files.directory)
+
+        # Change-log sync with another LabelMaker instance (app/sync.py)
+        from app.sync import create_sync_worker
+
+        sync = create_sync_worker(app)
+        if sync is not None:
+            sync.start()
+            logger.info("Syncing with %r", sync.peer)
+
         # Build system tray icon with menu
         import pystray
 
@@ -224,6 +263,16 @@ def main() -> None:
                     lambda _icon, _item: _open_browser(),
                     default=True,
                 ),
+                pystray.MenuItem(
+                    "Back Up Database Now",
+                    lambda _icon, _item: _back_up_now(backups),
+                    visible=backups is not None,
+                ),
+                pystray.MenuItem(
+                    "Sync Now",
+                    lambda _icon, _item: _sync_now(sync),
+                    visible=sync is not None,
+                ),
                 pystray.MenuItem(
                     "Quit",
                     lambda _icon, _item: _icon.stop(),
@@ -256,6 +305,12 @@ def main() -> None:
 
         # icon.run() blocks until icon.stop() is called via the Quit menu
         icon.run()
+        if sync is not None:
+            sync.stop()
+        if price_files is not None:
+            price_files.stop()
+        if backups is not None:
+            backups.stop()
 
     except Exception as e:
         logger.error("Failed to start application: %s", str(e), exc_info=True)
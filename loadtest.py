@@ -0,0 +1,551 @@
+"""
+Load generator and soak test harness for LabelMaker 2.0.
+
+Reproduces the shop-floor workload: many open browser tabs each sending
+``/heartbeat`` every 5 seconds, staff listing labels and toggling print marks,
+forms being browsed and edited, and occasional large PDF downloads.
+
+Runs fully offline, either in-process against ``create_app`` (default, using a
+throw-away SQLite database seeded with synthetic labels and a throw-away font
+settings file) or against a running server:
+
+    python loadtest.py --users 30 --duration 60
+    python loadtest.py --url http://127.0.0.1:5000 --users 50 --duration 3600 \\
+        --report-interval 60 --json soak_report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+from unittest import mock
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s] %(levelname)-8s %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL_SECONDS = 5.0
+DEFAULT_MIX = "browser=8,forms=1,print=1"
+
+
+# ── Transports ─────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Response:
+    """Minimal response view shared by all transports."""
+
+    status: int
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+
+class Transport(Protocol):
+    """Sends one HTTP request and returns the response."""
+
+    def request(
+        self, method: str, path: str, payload: Any | None = None
+    ) -> Response: ...
+
+
+class HttpTransport:
+    """Transport talking to a running server over HTTP (stdlib only)."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, payload: Any | None = None) -> Response:
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(
+            self.base_url + path,
+            method=method,
+            data=data,
+            headers={"Content-Type": "application/json"} if data else {},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return Response(resp.status, resp.read())
+        except urllib.error.HTTPError as exc:
+            return Response(exc.code, exc.read())
+
+
+class AppTransport:
+    """Transport calling a Flask app in-process through its test client."""
+
+    def __init__(self, app: "Flask") -> None:
+        # The test client is not thread-safe, so every virtual user gets one.
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, payload: Any | None = None) -> Response:
+        resp = self.client.open(path, method=method, json=payload)
+        return Response(resp.status_code, resp.get_data())
+
+
+# ── Statistics ─────────────────────────────────────────────────────────────────
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Return the pct-th percentile (nearest-rank) of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+@dataclass
+class EndpointStats:
+    """Latencies (ms) and error count for one endpoint name."""
+
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+class StatsCollector:
+    """Thread-safe per-endpoint latency and error recorder."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, EndpointStats] = {}
+        self.started = time.monotonic()
+
+    def record(self, name: str, elapsed_ms: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, EndpointStats())
+            stats.latencies_ms.append(elapsed_ms)
+            if not ok:
+                stats.errors += 1
+
+    def report(self) -> dict[str, Any]:
+        """Summarize throughput, p50/p95/p99 latency and error rate per endpoint."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        with self._lock:
+            snapshot = {
+                name: (sorted(s.latencies_ms), s.errors)
+                for name, s in self._stats.items()
+            }
+        endpoints: dict[str, Any] = {}
+        total_requests = 0
+        total_errors = 0
+        for name, (latencies, errors) in sorted(snapshot.items()):
+            count = len(latencies)
+            total_requests += count
+            total_errors += errors
+            endpoints[name] = {
+                "requests": count,
+                "rps": round(count / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+                "errors": errors,
+                "error_rate": round(errors / count, 4) if count else 0.0,
+            }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total_requests,
+            "rps": round(total_requests / elapsed, 2),
+            "errors": total_errors,
+            "error_rate": round(total_errors / total_requests, 4)
+            if total_requests
+            else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Render a report dict as a fixed-width text table."""
+    lines = [
+        f"{'endpoint':<44}{'reqs':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>8}",
+        "-" * 96,
+    ]
+    for name, s in report["endpoints"].items():
+        lines.append(
+            f"{name:<44}{s['requests']:>8}{s['rps']:>9.2f}{s['p50_ms']:>9.1f}"
+            f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['error_rate'] * 100:>8.2f}"
+        )
+    lines.append("-" * 96)
+    lines.append(
+        f"{'TOTAL':<44}{report['requests']:>8}{report['rps']:>9.2f}"
+        f"{'':>27}{report['error_rate'] * 100:>8.2f}"
+        f"   ({report['elapsed_s']:.0f}s)"
+    )
+    return "\n".join(lines)
+
+
+# ── Personas ───────────────────────────────────────────────────────────────────
+
+
+class VirtualUser:
+    """One browser tab: heartbeats on a fixed interval plus persona tasks."""
+
+    # (weight, method name) pairs picked at random between think times
+    tasks: list[tuple[int, str]] = []
+
+    def __init__(
+        self,
+        transport: Transport,
+        stats: StatsCollector,
+        rng: random.Random,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL_SECONDS,
+        think_time: tuple[float, float] = (1.0, 3.0),
+    ) -> None:
+        self.transport = transport
+        self.stats = stats
+        self.rng = rng
+        self.heartbeat_interval = heartbeat_interval
+        self.think_time = think_time
+        self.label_ids: list[int] = []
+
+    def call(
+        self, name: str, method: str, path: str, payload: Any | None = None
+    ) -> Response | None:
+        """Issue a request and record its latency under the endpoint name."""
+        start = time.perf_counter()
+        try:
+            resp = self.transport.request(method, path, payload)
+        except Exception as exc:
+            self.stats.record(name, (time.perf_counter() - start) * 1000, ok=False)
+            logger.debug("%s %s failed: %s", method, path, exc)
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats.record(name, elapsed_ms, ok=resp.status < 400)
+        return resp
+
+    def heartbeat(self) -> None:
+        self.call("POST /heartbeat", "POST", "/heartbeat", {"ts": time.time()})
+
+    def run(self, stop: threading.Event) -> None:
+        """Run tasks until stop is set, interleaving heartbeats like shared.js."""
+        self.heartbeat()
+        next_heartbeat = time.monotonic() + self.heartbeat_interval
+        weights = [w for w, _ in self.tasks]
+        while not stop.is_set():
+            task = self.rng.choices([t for _, t in self.tasks], weights)[0]
+            getattr(self, task)()
+            wake = time.monotonic() + self.rng.uniform(*self.think_time)
+            while not stop.is_set():
+                now = time.monotonic()
+                if now >= next_heartbeat:
+                    self.heartbeat()
+                    next_heartbeat = now + self.heartbeat_interval
+                if now >= wake:
+                    break
+                stop.wait(min(wake, next_heartbeat) - now)
+
+
+class LabelsBrowser(VirtualUser):
+    """Staff on /labels (list_labels.js): list, filter, toggle and edit labels."""
+
+    def open_page(self) -> None:
+        sort_by = self.rng.choice(["name", "date", "marked"])
+        self.call("GET /labels/", "GET", f"/labels/?sort={sort_by}")
+        resp = self.call(
+            "GET /labels/api/labels", "GET", f"/labels/api/labels?sort={sort_by}"
+        )
+        if resp is not None and resp.status == 200:
+            self.label_ids = [label["id"] for label in resp.json()["labels"]]
+
+    def toggle(self) -> None:
+        if not self.label_ids:
+            self.open_page()
+            return
+        label_id = self.rng.choice(self.label_ids)
+        self.call(
+            "POST /labels/api/label/<id>/toggle-print",
+            "POST",
+            f"/labels/api/label/{label_id}/toggle-print",
+        )
+
+    def edit_price(self) -> None:
+        if not self.label_ids:
+            return
+        label_id = self.rng.choice(self.label_ids)
+        self.call(
+            "PUT /labels/api/label/<id>",
+            "PUT",
+            f"/labels/api/label/{label_id}",
+            {"price": round(self.rng.uniform(19, 899), 2)},
+        )
+
+    tasks = [(3, "open_page"), (10, "toggle"), (1, "edit_price")]
+
+
+class FormsEditor(VirtualUser):
+    """Staff on /forms (forms.js): list forms and re-save one."""
+
+    def open_page(self) -> None:
+        sort_by = self.rng.choice(["name", "short"])
+        self.call("GET /forms", "GET", f"/forms?sort={sort_by}")
+        self.call("GET /api/form", "GET", f"/api/form?sort={sort_by}")
+
+    def resave_form(self) -> None:
+        resp = self.call("GET /api/form", "GET", "/api/form")
+        if resp is None or resp.status != 200 or not resp.json()["forms"]:
+            return
+        form = self.rng.choice(resp.json()["forms"])
+        self.call("PUT /api/form", "PUT", "/api/form", form)
+
+    tasks = [(5, "open_page"), (1, "resave_form")]
+
+
+class PrintOperator(VirtualUser):
+    """Staff on /labels/print: preview, adjust fonts and download the PDF."""
+
+    def open_page(self) -> None:
+        self.call("GET /labels/print", "GET", "/labels/print")
+
+    def save_fonts(self) -> None:
+        self.call(
+            "POST /labels/api/pdf-font-settings",
+            "POST",
+            "/labels/api/pdf-font-settings",
+            {"price_font_size": self.rng.randint(28, 36), "text_font_size": 14},
+        )
+
+    def download_pdf(self) -> None:
+        self.call("GET /labels/api/labels/pdf", "GET", "/labels/api/labels/pdf")
+
+    tasks = [(4, "open_page"), (1, "save_fonts"), (2, "download_pdf")]
+
+
+PERSONAS: dict[str, type[VirtualUser]] = {
+    "browser": LabelsBrowser,
+    "forms": FormsEditor,
+    "print": PrintOperator,
+}
+
+
+def parse_mix(mix: str) -> list[tuple[type[VirtualUser], int]]:
+    """Parse 'browser=8,forms=1,print=1' into persona classes with weights."""
+    result = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in PERSONAS:
+            raise ValueError(f"Unknown persona '{name}'. Choose from {list(PERSONAS)}")
+        result.append((PERSONAS[name.strip()], int(weight or 1)))
+    return result
+
+
+# ── Runner ─────────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class LoadConfig:
+    """Parameters of one load or soak run."""
+
+    users: int = 10
+    duration: float = 30.0
+    spawn_rate: float = 10.0
+    mix: str = DEFAULT_MIX
+    heartbeat_interval: float = HEARTBEAT_INTERVAL_SECONDS
+    think_time: tuple[float, float] = (1.0, 3.0)
+    report_interval: float = 0.0
+    seed: int = 27
+
+
+def run_load(
+    transport_factory: Callable[[], Transport], config: LoadConfig
+) -> dict[str, Any]:
+    """Spawn virtual users, run them for config.duration and return the report.
+
+    In-process runs (``AppTransport``) keep the font settings the print persona
+    saves in a temporary file, see ``isolated_font_settings``.
+    """
+    stats = StatsCollector()
+    stop = threading.Event()
+    mix = parse_mix(config.mix)
+    rng = random.Random(config.seed)
+    threads: list[threading.Thread] = []
+
+    logger.info(
+        "Starting %d virtual users (%s) for %.0fs",
+        config.users,
+        config.mix,
+        config.duration,
+    )
+    deadline = time.monotonic() + config.duration
+    with contextlib.ExitStack() as cleanup:
+        isolated = False
+        for i in range(config.users):
+            transport = transport_factory()
+            if isinstance(transport, AppTransport) and not isolated:
+                cleanup.enter_context(isolated_font_settings())
+                isolated = True
+            persona = rng.choices([p for p, _ in mix], [w for _, w in mix])[0]
+            user = persona(
+                transport,
+                stats,
+                random.Random(config.seed + i),
+                heartbeat_interval=config.heartbeat_interval,
+                think_time=config.think_time,
+            )
+            thread = threading.Thread(
+                target=user.run, args=(stop,), name=f"vu-{i}", daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+            if config.spawn_rate > 0 and time.monotonic() < deadline:
+                stop.wait(1.0 / config.spawn_rate)
+
+        next_report = (
+            time.monotonic() + config.report_interval
+            if config.report_interval
+            else None
+        )
+        while time.monotonic() < deadline:
+            if next_report is not None and time.monotonic() >= next_report:
+                logger.info("Interim report:\n%s", format_report(stats.report()))
+                next_report += config.report_interval
+            stop.wait(min(1.0, max(0.0, deadline - time.monotonic())))
+
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+    return stats.report()
+
+
+@contextlib.contextmanager
+def isolated_font_settings() -> Iterator[None]:
+    """Point the app's font settings file into a temporary directory.
+
+    The print persona saves random font sizes, which must not end up in the
+    real ``instance/pdf_font_settings.json`` of an in-process run.
+    """
+    from app import utils
+
+    current = utils.load_font_settings()
+    with tempfile.TemporaryDirectory(prefix="labelmaker-fonts-") as tmp:
+        with mock.patch.object(
+            utils, "FONT_SETTINGS_PATH", Path(tmp) / "pdf_font_settings.json"
+        ):
+            # Start from the real settings, so the first reads find a file
+            utils.save_font_settings(
+                current["price_font_size"], current["text_font_size"]
+            )
+            yield
+
+
+def seed_catalogue(app: "Flask", label_count: int, marked_ratio: float = 0.1) -> None:
+    """Fill an in-process database with synthetic forms and labels."""
+    from sqlalchemy import insert
+
+    from app.db import db
+    from app.models import Form, Label
+
+    forms = [("Tablety", "tbl", "ks"), ("Sirup", "sir", "ml"), ("Mast", "mst", "g")]
+    rng = random.Random(label_count)
+    with app.app_context():
+        db.session.execute(
+            insert(Form), [{"name": n, "short_name": s, "unit": u} for n, s, u in forms]
+        )
+        rows = []
+        for i in range(label_count):
+            amount = float(rng.choice([10, 20, 30, 100]))
+            price = round(rng.uniform(19, 899), 2)
+            rows.append(
+                {
+                    "product_name": f"Produkt {i}",
+                    "form": forms[i % len(forms)][1],
+                    "amount": amount,
+                    "price": price,
+                    "unit_price": round(price / amount, 2),
+                    "marked_to_print": rng.random() < marked_ratio,
+                }
+            )
+        if rows:
+            db.session.execute(insert(Label), rows)
+        db.session.commit()
+
+
+def _build_in_process_app(db_path: Path, labels: int) -> "Flask":
+    from app import create_app
+
+    app = create_app(database_uri=f"sqlite:///{db_path}", on_heartbeat=lambda: None)
+    app.config["SQLALCHEMY_ECHO"] = False
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        from app.db import db
+
+        db.engine.echo = False
+    seed_catalogue(app, labels)
+    return app
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Target a running server instead of in-process")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent browsers")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--spawn-rate", type=float, default=10.0, help="Users/second")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Persona weights")
+    parser.add_argument(
+        "--heartbeat-interval", type=float, default=HEARTBEAT_INTERVAL_SECONDS
+    )
+    parser.add_argument("--think-min", type=float, default=1.0)
+    parser.add_argument("--think-max", type=float, default=3.0)
+    parser.add_argument(
+        "--report-interval", type=float, default=0.0, help="Interim report every N s"
+    )
+    parser.add_argument(
+        "--labels", type=int, default=2000, help="Synthetic labels (in-process only)"
+    )
+    parser.add_argument("--json", type=Path, help="Write the final report as JSON")
+    parser.add_argument("--seed", type=int, default=27)
+    args = parser.parse_args(argv)
+
+    config = LoadConfig(
+        users=args.users,
+        duration=args.duration,
+        spawn_rate=args.spawn_rate,
+        mix=args.mix,
+        heartbeat_interval=args.heartbeat_interval,
+        think_time=(args.think_min, args.think_max),
+        report_interval=args.report_interval,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="labelmaker-load-") as tmp:
+        if args.url:
+            base_url = args.url
+            report = run_load(lambda: HttpTransport(base_url), config)
+        else:
+            app = _build_in_process_app(Path(tmp) / "loadtest.db", args.labels)
+            report = run_load(lambda: AppTransport(app), config)
+            with app.app_context():
+                from app.db import db
+
+                db.engine.dispose()
+
+    print(format_report(report))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        logger.info("Report written to %s", args.json)
+    return 1 if report["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+"""
+Headless batch renderer for LabelMaker 2.0 price labels.
+
+Renders labels straight through ``LabelPDFGenerator`` without starting the web
+server, so shelf-label batches can be produced by cron or Task Scheduler
+overnight. Labels come from the database (selected by print mark, form or
+change date) or from a CSV/JSON file. Large batches are split into several
+files that are rendered in parallel on all CPU cores, as A4 PDF sheets or as
+ZPL / raster jobs for thermal roll printers (``--format``).
+
+    python render_batch.py --marked -o out/
+    python render_batch.py --form tbl --form sir --since 2026-10-01 -o out/
+    python render_batch.py --changed --record-printed -o out/
+    python render_batch.py --input labels.csv --workers 4 -o out/
+    python render_batch.py --marked --format zpl --dpi 300 -o out/
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import time
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.label_snapshot import LabelRow
+    from app.pdf_generator import PdfLabelData
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="[%(asctime)s] %(levelname)-8s %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("render_batch")
+
+# 10 A4 pages of 32 labels per output file
+DEFAULT_LABELS_PER_FILE = 320
+# Same values as app.label_output (kept here so --help needs no app import)
+OUTPUT_FORMATS = ("pdf", "zpl", "raster")
+DEFAULT_DPI = 203
+
+
+@dataclass
+class Selection:
+    """Which database labels to render; all given criteria must match."""
+
+    marked: bool = False
+    forms: Sequence[str] = ()
+    since: datetime | None = None
+    changed: bool = False
+    everything: bool = False
+
+    def is_empty(self) -> bool:
+        return not (
+            self.marked or self.forms or self.since or self.changed or self.everything
+        )
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of rendering one output file."""
+
+    path: Path
+    labels: int
+    seconds: float
+
+
+# ── Label sources ─────────────────────────────────────────────────────────────
+
+
+def load_from_database(
+    database_uri: str | None, selection: Selection
+) -> tuple[list[PdfLabelData], list[LabelRow], Any]:
+    """Load selected labels from the database.
+
+    Returns:
+        (picklable label dicts for the workers, the snapshots, the Flask app).
+    """
+    from sqlalchemy import func
+
+    from app import create_app
+    from app.db import db
+    from app.label_snapshot import LabelRow, select_label_rows
+    from app.models import Label
+    from app.print_history import changed_since_print
+
+    app = create_app(database_uri=database_uri)
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        db.engine.echo = False
+        stmt = select_label_rows().order_by(Label.product_name)
+        if selection.marked:
+            stmt = stmt.where(Label.marked_to_print.is_(True))
+        if selection.forms:
+            stmt = stmt.where(Label.form.in_(selection.forms))
+        if selection.since is not None:
+            changed_at = func.coalesce(Label.updated_at, Label.created_at)
+            stmt = stmt.where(changed_at >= selection.since)
+        if selection.changed:
+            stmt = stmt.where(changed_since_print(include_unprinted=True))
+        rows = [LabelRow(*row) for row in db.session.execute(stmt)]
+    return [_row_to_pdf_data(row) for row in rows], rows, app
+
+
+def _row_to_pdf_data(row: LabelRow) -> PdfLabelData:
+    from app.pdf_generator import PdfLabelData
+
+    return PdfLabelData(
+        product_name=row.product_name,
+        form=row.form,
+        amount=row.amount,
+        price=row.price,
+        unit_price=row.unit_price,
+        unit=row.unit,
+        layout_json=row.layout_json,
+        barcode=row.barcode,
+    )
+
+
+def load_from_file(path: Path) -> list[PdfLabelData]:
+    """Read labels from a CSV or JSON file.
+
+    CSV needs a header with product_name, form, amount and price columns;
+    unit_price (computed when missing), unit (default "ks") and barcode (EAN-8
+    or EAN-13) are optional.
+    JSON may be a list of such objects or the ``{"labels": [...]}`` payload of
+    ``GET /labels/api/labels``.
+    """
+    from app.ingest import read_records
+
+    records = read_records(path)
+    return [_record_to_pdf_data(record, i) for i, record in enumerate(records, 1)]
+
+
+def _record_to_pdf_data(record: dict[str, Any], line: int) -> PdfLabelData:
+    from app.barcodes import normalize_barcode
+    from app.label_snapshot import DEFAULT_UNIT
+    from app.pdf_generator import PdfLabelData
+    from app.utils import calculate_unit_price
+
+    try:
+        amount = float(str(record["amount"]).replace(",", "."))
+        price = float(str(record["price"]).replace(",", "."))
+        unit_price_raw = record.get("unit_price")
+        unit_price = (
+            float(str(unit_price_raw).replace(",", "."))
+            if unit_price_raw not in (None, "")
+            else calculate_unit_price(amount, price)
+        )
+        return PdfLabelData(
+            product_name=str(record["product_name"]).strip(),
+            form=str(record["form"]).strip(),
+            amount=amount,
+            price=price,
+            unit_price=unit_price,
+            unit=str(record.get("unit") or DEFAULT_UNIT).strip(),
+            barcode=normalize_barcode(record.get("barcode")),
+        )
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"Record {line}: invalid or missing field {e}") from e
+
+
+# ── Rendering ─────────────────────────────────────────────────────────────────
+
+
+def chunked(labels: Sequence[PdfLabelData], size: int) -> Iterator[list[PdfLabelData]]:
+    """Split labels into consecutive chunks of at most size (all if size <= 0)."""
+    if size <= 0:
+        size = max(len(labels), 1)
+    for start in range(0, len(labels), size):
+        yield list(labels[start : start + size])
+
+
+def render_chunk(
+    labels: list[PdfLabelData],
+    path: Path,
+    price_font_size: int,
+    text_font_size: int,
+    output_format: str = "pdf",
+    dpi: int = DEFAULT_DPI,
+) -> ChunkResult:
+    """Render one output file (runs in a worker process)."""
+    from app.label_output import get_backend
+
+    started = time.perf_counter()
+    if not labels:
+        raise ValueError(f"No labels to render into {path}")
+    backend = get_backend(output_format, price_font_size, text_font_size, dpi)
+    tmp_path = path.with_name(path.name + ".part")
+    with tmp_path.open("wb") as sink:
+        backend.write(labels, sink)
+    tmp_path.replace(path)
+    return ChunkResult(path, len(labels), time.perf_counter() - started)
+
+
+def render_batch(
+    labels: Sequence[PdfLabelData],
+    output_dir: Path,
+    *,
+    prefix: str = "labels",
+    labels_per_file: int = DEFAULT_LABELS_PER_FILE,
+    workers: int = 1,
+    price_font_size: int = 32,
+    text_font_size: int = 14,
+    output_format: str = "pdf",
+    dpi: int = DEFAULT_DPI,
+    progress: bool = True,
+) -> list[ChunkResult]:
+    """Render labels into numbered output files, in parallel when workers > 1.
+
+    Args:
+        labels: Labels to render, in output order.
+        output_dir: Directory for the output files (created if missing).
+        prefix: File name prefix, files are named ``<prefix>_001.pdf`` etc.
+        labels_per_file: Labels per output file; 0 renders one single file.
+        workers: Worker processes; 1 renders in this process.
+        price_font_size: Price font size.
+        text_font_size: Text font size.
+        output_format: Backend name from ``app.label_output`` (pdf, zpl, raster).
+        dpi: Printer resolution for the thermal formats.
+        progress: Print a progress line per finished file.
+
+    Returns:
+        Results of the rendered files in file order.
+    """
+    from app.label_output import BACKENDS
+
+    extension = BACKENDS[output_format].extension
+    output_dir.mkdir(parents=True, exist_ok=True)
+    chunks = list(chunked(labels, labels_per_file))
+    width = max(3, len(str(len(chunks))))
+    jobs = [
+        (chunk, output_dir / f"{prefix}_{i:0{width}d}.{extension}")
+        for i, chunk in enumerate(chunks, 1)
+    ]
+
+    started = time.perf_counter()
+    results: list[ChunkResult] = []
+    done_labels = 0
+
+    def report(result: ChunkResult) -> None:
+        nonlocal done_labels
+        results.append(result)
+        done_labels += result.labels
+        if progress:
+            elapsed = time.perf_counter() - started
+            print(
+                f"[{len(results)}/{len(jobs)}] {result.path.name}: "
+                f"{result.labels} labels in {result.seconds:.2f} s | "
+                f"{done_labels}/{len(labels)} total, "
+                f"{done_labels / elapsed if elapsed else 0:.0f} labels/s",
+                flush=True,
+            )
+
+    if workers <= 1 or len(jobs) == 1:
+        for chunk, path in jobs:
+            report(
+                render_chunk(
+                    chunk, path, price_font_size, text_font_size, output_format, dpi
+                )
+            )
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = [
+                pool.submit(
+                    render_chunk,
+                    chunk,
+                    path,
+                    price_font_size,
+                    text_font_size,
+                    output_format,
+                    dpi,
+                )
+                for chunk, path in jobs
+            ]
+            for future in as_completed(futures):
+                report(future.result())
+
+    results.sort(key=lambda r: r.path.name)
+    return results
+
+
+# ── Command line ──────────────────────────────────────────────────────────────
+
+
+def _parse_since(value: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}") from None
+    if parsed.tzinfo is None:
+        # Stored timestamps are naive UTC
+        return parsed
+    return parsed.astimezone(UTC).replace(tzinfo=None)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    source = parser.add_argument_group("label source (database by default)")
+    source.add_argument(
+        "--input", type=Path, help="Render labels from a CSV or JSON file"
+    )
+    source.add_argument(
+        "--database", help="SQLAlchemy database URL (default: instance/labelmaker.db)"
+    )
+    select = parser.add_argument_group("database selectors (combined with AND)")
+    select.add_argument("--marked", action="store_true", help="Labels marked to print")
+    select.add_argument(
+        "--form", action="append", default=[], metavar="SHORT", help="Form (repeatable)"
+    )
+    select.add_argument(
+        "--since", type=_parse_since, metavar="DATE", help="Changed on/after ISO date"
+    )
+    select.add_argument(
+        "--changed", action="store_true", help="Changed since they were last printed"
+    )
+    select.add_argument("--all", action="store_true", help="Every label")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("-o", "--output-dir", type=Path, default=Path("batch_output"))
+    output.add_argument("--prefix", default="labels", help="Output file name prefix")
+    output.add_argument(
+        "--per-file",
+        type=int,
+        default=DEFAULT_LABELS_PER_FILE,
+        help="Labels per output file, 0 for one file (default: %(default)s)",
+    )
+    output.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="pdf",
+        help="A4 PDF sheets or thermal printer jobs (default: %(default)s)",
+    )
+    output.add_argument(
+        "--dpi",
+        type=int,
+        choices=(203, 300),
+        default=DEFAULT_DPI,
+        help="Thermal printer resolution (default: %(default)s)",
+    )
+    output.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Worker processes"
+    )
+    output.add_argument("--price-font-size", type=int, help="Default: saved setting")
+    output.add_argument("--text-font-size", type=int, help="Default: saved setting")
+    output.add_argument(
+        "--record-printed",
+        action="store_true",
+        help="Store the printed values (for --changed on the next run)",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="No progress lines")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    selection = Selection(
+        marked=args.marked,
+        forms=args.form,
+        since=args.since,
+        changed=args.changed,
+        everything=args.all,
+    )
+    if args.input and not selection.is_empty():
+        parser.error("selectors apply to the database, not to --input files")
+    if not args.input and selection.is_empty():
+        parser.error("choose labels: --marked, --form, --since, --changed or --all")
+    if args.input and args.record_printed:
+        parser.error("--record-printed only applies to database labels")
+
+    from app.constants import (
+        PRICE_FONT_SIZE_MAX,
+        PRICE_FONT_SIZE_MIN,
+        TEXT_FONT_SIZE_MAX,
+        TEXT_FONT_SIZE_MIN,
+    )
+    from app.utils import load_font_settings
+
+    settings = load_font_settings()
+    price_font_size = args.price_font_size or settings["price_font_size"]
+    text_font_size = args.text_font_size or settings["text_font_size"]
+    if not PRICE_FONT_SIZE_MIN <= price_font_size <= PRICE_FONT_SIZE_MAX:
+        parser.error(
+            f"--price-font-size must be {PRICE_FONT_SIZE_MIN}-{PRICE_FONT_SIZE_MAX}"
+        )
+    if not TEXT_FONT_SIZE_MIN <= text_font_size <= TEXT_FONT_SIZE_MAX:
+        parser.error(
+            f"--text-font-size must be {TEXT_FONT_SIZE_MIN}-{TEXT_FONT_SIZE_MAX}"
+        )
+
+    started = time.perf_counter()
+    rows: list[LabelRow] = []
+    app = None
+    try:
+        if args.input:
+            labels = load_from_file(args.input)
+        else:
+            labels, rows, app = load_from_database(args.database, selection)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    if not labels:
+        print("No labels selected, nothing to render.")
+        return 0
+    print(
+        f"Rendering {len(labels)} labels into {args.output_dir} "
+        f"({args.format}, {args.workers} workers, "
+        f"{price_font_size}/{text_font_size} pt)",
+        flush=True,
+    )
+
+    results = render_batch(
+        labels,
+        args.output_dir,
+        prefix=args.prefix,
+        labels_per_file=args.per_file,
+        workers=args.workers,
+        price_font_size=price_font_size,
+        text_font_size=text_font_size,
+        output_format=args.format,
+        dpi=args.dpi,
+        progress=not args.quiet,
+    )
+
+    if args.record_printed and app is not None:
+        from app.db import db
+        from app.print_history import record_printed
+
+        with app.app_context():
+            record_printed(rows)
+            db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Done: {len(labels)} labels in {len(results)} file(s), {elapsed:.1f} s, "
+        f"{len(labels) / elapsed:.0f} labels/s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
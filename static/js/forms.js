@@ -1,6 +1,10 @@
 // Global variables
 let currentEditingForm = null;
 let deleteFormName = null;
+let mergeFormName = null;
+let loadedForms = [];
+// ETag of the list loadedForms came from; reloads are conditional on it
+let formsEtag = null;
 
 // Load forms on page load
 document.addEventListener('DOMContentLoaded', function () {
@@ -12,37 +16,26 @@ document.addEventListener('DOMContentLoaded', function () {
         sortSelect.value = sortBy;
     }
 
-    loadForms();
+    // The page embeds the forms; the API is only asked for changes
+    const embedded = readEmbeddedPayload('formsData');
+    if (embedded) {
+        showForms(embedded);
+    } else {
+        loadForms();
+    }
 });
 
-// Load all forms from API
+// Reload the forms from the API if they changed since the last load
 async function loadForms() {
     try {
         // Get sort parameter from current URL
         const urlParams = new URLSearchParams(window.location.search);
         const sortBy = urlParams.get('sort') || 'name';
-        console.log('Loading forms with sort:', sortBy);
-
-        const response = await fetch(`/api/form?sort=${sortBy}`);
-        const data = await response.json();
 
-        const tbody = document.getElementById('formsTableBody');
-        const emptyState = document.getElementById('emptyState');
-
-        if (!data.forms || data.forms.length === 0) {
-            tbody.innerHTML = '';
-            emptyState.style.display = 'block';
-            return;
+        const payload = await fetchIfChanged(appUrl(`/api/form?sort=${sortBy}`), formsEtag);
+        if (payload.data !== null) {
+            showForms(payload);
         }
-
-        emptyState.style.display = 'none';
-        tbody.innerHTML = '';
-
-        data.forms.forEach(form => {
-            const row = createFormRow(form);
-            tbody.appendChild(row);
-        });
-
     } catch (error) {
         console.error('Error loading forms:', error);
         const tbody = document.getElementById('formsTableBody');
@@ -58,6 +51,26 @@ async function loadForms() {
     }
 }
 
+function showForms(payload) {
+    formsEtag = payload.etag;
+    loadedForms = payload.data.forms || [];
+
+    const tbody = document.getElementById('formsTableBody');
+    const emptyState = document.getElementById('emptyState');
+    tbody.innerHTML = '';
+
+    if (loadedForms.length === 0) {
+        emptyState.style.display = 'block';
+        return;
+    }
+
+    emptyState.style.display = 'none';
+    loadedForms.forEach(form => {
+        const row = createFormRow(form);
+        tbody.appendChild(row);
+    });
+}
+
 // Create table row for a form
 function createFormRow(form) {
     const tr = document.createElement('tr');
@@ -80,6 +93,9 @@ function createFormRow(form) {
                 <button class="btn btn-small btn-primary" onclick="openEditModal('${escapeHtml(form.name)}')">
                     ✏️ Upravit
                 </button>
+                <button class="btn btn-small btn-secondary" onclick="openMergeModal('${escapeHtml(form.name)}')">
+                    🔀 Sloučit
+                </button>
                 <button class="btn btn-small btn-danger" onclick="openDeleteModal('${escapeHtml(form.name)}')">
                     🗑️ Smazat
                 </button>
@@ -99,32 +115,24 @@ function openCreateModal() {
     document.getElementById('formModal').classList.add('active');
 }
 
-// Open edit modal
-async function openEditModal(formName) {
-    try {
-        const response = await fetch('/api/form');
-        const data = await response.json();
-        const form = data.forms.find(f => f.name === formName);
-
-        if (!form) {
-            alert('Forma nenalezena');
-            return;
-        }
+// Open edit modal with the form as loaded
+function openEditModal(formName) {
+    const form = loadedForms.find(f => f.name === formName);
 
-        currentEditingForm = formName;
-        document.getElementById('modalTitle').textContent = 'Upravit formu';
-        document.getElementById('submitBtn').textContent = 'Uložit změny';
+    if (!form) {
+        alert('Forma nenalezena');
+        return;
+    }
 
-        document.getElementById('formName').value = form.name;
-        document.getElementById('formShortName').value = form.short_name;
-        document.getElementById('formUnit').value = form.unit;
+    currentEditingForm = formName;
+    document.getElementById('modalTitle').textContent = 'Upravit formu';
+    document.getElementById('submitBtn').textContent = 'Uložit změny';
 
-        document.getElementById('formModal').classList.add('active');
+    document.getElementById('formName').value = form.name;
+    document.getElementById('formShortName').value = form.short_name;
+    document.getElementById('formUnit').value = form.unit;
 
-    } catch (error) {
-        console.error('Error loading form:', error);
-        alert('Chyba při načítání dat formy');
-    }
+    document.getElementById('formModal').classList.add('active');
 }
 
 // Close form modal
@@ -146,7 +154,7 @@ async function handleSubmit(event) {
 
     try {
         const method = currentEditingForm ? 'PUT' : 'POST';
-        const url = '/api/form';
+        const url = appUrl('/api/form');
 
         const response = await fetch(url, {
             method: method,
@@ -190,7 +198,7 @@ async function confirmDelete() {
     if (!deleteFormName) return;
 
     try {
-        const response = await fetch('/api/form', {
+        const response = await fetch(appUrl('/api/form'), {
             method: 'DELETE',
             headers: {
                 'Content-Type': 'application/json'
@@ -215,6 +223,64 @@ async function confirmDelete() {
     }
 }
 
+// Open merge modal with the other forms as targets
+function openMergeModal(formName) {
+    mergeFormName = formName;
+    document.getElementById('mergeFormName').textContent = formName;
+    const select = document.getElementById('mergeTarget');
+    select.innerHTML = '';
+    loadedForms.filter(f => f.name !== formName).forEach(f => {
+        const option = document.createElement('option');
+        option.value = f.name;
+        option.textContent = `${f.name} (${f.short_name})`;
+        select.appendChild(option);
+    });
+    document.getElementById('mergePolicy').value = 'fail';
+    document.getElementById('mergeModal').classList.add('active');
+}
+
+// Close merge modal
+function closeMergeModal() {
+    document.getElementById('mergeModal').classList.remove('active');
+    mergeFormName = null;
+}
+
+// Merge the form into the selected target
+async function confirmMerge(event) {
+    event.preventDefault();
+    if (!mergeFormName) return;
+
+    try {
+        const response = await fetch(appUrl('/api/form/merge'), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                source: mergeFormName,
+                target: document.getElementById('mergeTarget').value,
+                on_conflict: document.getElementById('mergePolicy').value
+            })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            closeMergeModal();
+            loadForms();
+            showNotification(`Formy sloučeny: přesunuto ${data.moved}, smazáno duplicit ${data.deleted}`, 'success');
+        } else if (response.status === 409 && data.conflicts) {
+            alert(data.error + '\n\n' + data.conflicts.join('\n'));
+        } else {
+            showNotification(data.error || 'Neznámá chyba', 'error');
+        }
+
+    } catch (error) {
+        console.error('Error merging forms:', error);
+        alert('Chyba při slučování: ' + error.message);
+    }
+}
+
 // Show notification with toast — provided by shared.js (showNotification)
 
 // Escape HTML to prevent XSS — provided by shared.js (escapeHtml)
@@ -223,6 +289,7 @@ async function confirmDelete() {
 window.onclick = function (event) {
     const formModal = document.getElementById('formModal');
     const deleteModal = document.getElementById('deleteModal');
+    const mergeModal = document.getElementById('mergeModal');
 
     if (event.target === formModal) {
         closeModal();
@@ -230,4 +297,7 @@ window.onclick = function (event) {
     if (event.target === deleteModal) {
         closeDeleteModal();
     }
+    if (event.target === mergeModal) {
+        closeMergeModal();
+    }
 }
@@ -1,29 +1,50 @@
 // Global variables
 let allLabels = [];
+// ETag of the list allLabels was loaded from; reloads are conditional on it
+let labelsEtag = null;
 let currentEditingId = null;
 let deleteLabelId = null;
+// Ranked label ids from the server-side search, null when no search is active
+let searchResultIds = null;
+let searchTimer = null;
+let searchRequestSeq = 0;
 
-// Load labels on page load
+const SEARCH_DEBOUNCE_MS = 150;
+
+// Show the labels embedded in the page; the API is only asked for changes
 document.addEventListener('DOMContentLoaded', function () {
-    loadLabels();
+    const embedded = readEmbeddedPayload('labelsData');
+    if (embedded) {
+        showLabelPayload(embedded);
+    } else {
+        loadLabels();
+    }
 
     // Add event listeners for filters
-    document.getElementById('searchInput').addEventListener('input', filterLabels);
+    document.getElementById('searchInput').addEventListener('input', scheduleSearch);
     document.getElementById('printFilter').addEventListener('change', filterLabels);
+
+    // Pick up changes made in other tabs; unchanged lists cost a 304
+    document.addEventListener('visibilitychange', function () {
+        if (document.visibilityState === 'visible') {
+            loadLabels();
+        }
+    });
 });
 
-// Load all labels from API
+function currentSort() {
+    return new URLSearchParams(window.location.search).get('sort') || 'name';
+}
+
+// Reload the labels from the API if they changed since the last load
 async function loadLabels() {
     try {
-        // Get sort parameter from current URL
-        const urlParams = new URLSearchParams(window.location.search);
-        const sortBy = urlParams.get('sort') || 'name';
-
-        const response = await fetch(`/labels/api/labels?sort=${sortBy}`);
-        const data = await response.json();
-
-        allLabels = data.labels || [];
-        displayLabels(allLabels);
+        const payload = await fetchIfChanged(
+            appUrl(`/labels/api/labels?sort=${currentSort()}`), labelsEtag
+        );
+        if (payload.data !== null) {
+            showLabelPayload(payload);
+        }
 
     } catch (error) {
         console.error('Error loading labels:', error);
@@ -31,6 +52,36 @@ async function loadLabels() {
     }
 }
 
+function showLabelPayload(payload) {
+    allLabels = payload.data.labels || [];
+    labelsEtag = payload.etag;
+    // Re-apply an active search and the print filter to the fresh data
+    runSearch();
+}
+
+// Same order as the server's sort modes (app/label_snapshot.py)
+function compareLabels(a, b) {
+    const byName = (a.product_name > b.product_name) - (a.product_name < b.product_name);
+    switch (currentSort()) {
+        case 'date':
+            return (b.created_at > a.created_at) - (b.created_at < a.created_at);
+        case 'marked':
+            return (b.marked_to_print - a.marked_to_print) || byName;
+        default:
+            return byName || a.id - b.id;
+    }
+}
+
+// Apply a label returned by a write to the loaded list instead of reloading it
+function replaceLabel(updated) {
+    const index = allLabels.findIndex(l => l.id === updated.id);
+    if (index !== -1) {
+        allLabels[index] = updated;
+        allLabels.sort(compareLabels);
+    }
+    runSearch();
+}
+
 // Display labels in table
 function displayLabels(labels) {
     const tbody = document.getElementById('labelsTableBody');
@@ -87,34 +138,102 @@ function createLabelRow(label) {
     return tr;
 }
 
+// Debounce typing, then ask the server for ranked, diacritic-insensitive matches
+function scheduleSearch() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(runSearch, SEARCH_DEBOUNCE_MS);
+}
+
+async function runSearch() {
+    const searchTerm = document.getElementById('searchInput').value.trim();
+    const requestSeq = ++searchRequestSeq;
+
+    if (!searchTerm) {
+        searchResultIds = null;
+        filterLabels();
+        return;
+    }
+
+    try {
+        const response = await fetch(
+            appUrl(`/labels/api/labels/search?q=${encodeURIComponent(searchTerm)}&limit=500`)
+        );
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || response.statusText);
+        }
+        // Ignore responses that arrive after a newer search was started
+        if (requestSeq !== searchRequestSeq) {
+            return;
+        }
+        searchResultIds = data.labels.map(label => label.id);
+    } catch (error) {
+        console.error('Error searching labels:', error);
+        searchResultIds = null;
+    }
+    filterLabels();
+}
+
 // Filter labels based on search and print status
 function filterLabels() {
     const searchTerm = document.getElementById('searchInput').value.toLowerCase();
     const printFilter = document.getElementById('printFilter').value;
 
-    let filtered = allLabels.filter(label => {
-        // Text search
-        const matchesSearch = label.product_name.toLowerCase().includes(searchTerm);
+    let candidates;
+    if (searchResultIds !== null) {
+        // Keep the server's relevance order
+        const byId = new Map(allLabels.map(label => [label.id, label]));
+        candidates = searchResultIds.map(id => byId.get(id)).filter(Boolean);
+    } else {
+        // Fallback when the search API is unavailable
+        candidates = allLabels.filter(label =>
+            label.product_name.toLowerCase().includes(searchTerm)
+        );
+    }
 
+    let filtered = candidates.filter(label => {
         // Print filter
-        let matchesPrint = true;
         if (printFilter === 'marked') {
-            matchesPrint = label.marked_to_print === true;
+            return label.marked_to_print === true;
         } else if (printFilter === 'unmarked') {
-            matchesPrint = label.marked_to_print === false;
+            return label.marked_to_print === false;
         }
-
-        return matchesSearch && matchesPrint;
+        return true;
     });
 
     displayLabels(filtered);
 }
 
+// Download the labels matching the current search, print filter and sort;
+// the server streams the file, so this works for any catalogue size
+function exportLabels(format) {
+    const params = new URLSearchParams({
+        sort: new URLSearchParams(window.location.search).get('sort') || 'name',
+        print: document.getElementById('printFilter').value,
+        q: document.getElementById('searchInput').value.trim(),
+    });
+    window.location.href = appUrl(`/labels/api/labels/export/${format}?${params}`);
+}
+
+// Version the label had when this tab loaded it; the server answers 409 when
+// someone else changed the label since (optimistic concurrency)
+function versionHeaders(labelId) {
+    const label = allLabels.find(l => l.id === labelId);
+    return label ? { 'If-Match': `"${label.version}"` } : {};
+}
+
+// Another tab or colleague changed the label: show the current data instead
+function handleVersionConflict(data) {
+    showNotification(data.error, 'error');
+    loadLabels();
+}
+
 // Toggle print mark for a label
 async function togglePrintMark(labelId) {
     try {
-        const response = await fetch(`/labels/api/label/${labelId}/toggle-print`, {
-            method: 'POST'
+        const response = await fetch(appUrl(`/labels/api/label/${labelId}/toggle-print`), {
+            method: 'POST',
+            headers: versionHeaders(labelId)
         });
 
         const data = await response.json();
@@ -124,9 +243,12 @@ async function togglePrintMark(labelId) {
             const label = allLabels.find(l => l.id === labelId);
             if (label) {
                 label.marked_to_print = data.marked_to_print;
+                label.version = data.version;
             }
             filterLabels();
             showNotification('Označení k tisku změněno', 'success');
+        } else if (response.status === 409) {
+            handleVersionConflict(data);
         } else {
             showNotification('Chyba: ' + (data.error || 'Neznámá chyba'), 'error');
         }
@@ -150,6 +272,7 @@ function openEditModal(labelId) {
     document.getElementById('editForm').value = label.form;
     document.getElementById('editAmount').value = label.amount;
     document.getElementById('editPrice').value = label.price;
+    document.getElementById('editBarcode').value = label.barcode || '';
 
     document.getElementById('editModal').classList.add('active');
 }
@@ -170,14 +293,16 @@ async function handleEditSubmit(event) {
         product_name: document.getElementById('editProductName').value.trim(),
         form: document.getElementById('editForm').value,
         amount: parseFloat(document.getElementById('editAmount').value),
-        price: parseFloat(document.getElementById('editPrice').value)
+        price: parseFloat(document.getElementById('editPrice').value),
+        barcode: document.getElementById('editBarcode').value.trim() || null
     };
 
     try {
-        const response = await fetch(`/labels/api/label/${labelId}`, {
+        const response = await fetch(appUrl(`/labels/api/label/${labelId}`), {
             method: 'PUT',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                ...versionHeaders(labelId)
             },
             body: JSON.stringify(formData)
         });
@@ -186,8 +311,11 @@ async function handleEditSubmit(event) {
 
         if (response.ok) {
             closeEditModal();
-            loadLabels();
+            replaceLabel(data.label);
             showNotification('Cenovka byl aktualizován', 'success');
+        } else if (response.status === 409) {
+            closeEditModal();
+            handleVersionConflict(data);
         } else {
             showNotification('Chyba: ' + (data.error || 'Neznámá chyba'), 'error');
         }
@@ -215,15 +343,16 @@ async function confirmDelete() {
     if (!deleteLabelId) return;
 
     try {
-        const response = await fetch(`/labels/api/label/${deleteLabelId}`, {
+        const response = await fetch(appUrl(`/labels/api/label/${deleteLabelId}`), {
             method: 'DELETE'
         });
 
         const data = await response.json();
 
         if (response.ok) {
+            allLabels = allLabels.filter(l => l.id !== deleteLabelId);
             closeDeleteModal();
-            loadLabels();
+            filterLabels();
             showNotification('Cenovka byl smazán', 'success');
         } else {
             showNotification('Chyba: ' + (data.error || 'Neznámá chyba'), 'error');
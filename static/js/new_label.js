@@ -25,11 +25,12 @@ async function handleSubmit(event) {
         form: document.getElementById('form').value,
         amount: parseFloat(document.getElementById('amount').value),
         price: parseFloat(document.getElementById('price').value),
+        barcode: document.getElementById('barcode').value.trim() || null,
         marked_to_print: document.getElementById('markedToPrint').checked
     };
 
     try {
-        const response = await fetch('/labels/api/label', {
+        const response = await fetch(appUrl('/labels/api/label'), {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -41,9 +42,14 @@ async function handleSubmit(event) {
 
         if (response.ok) {
             showNotification('Cenovka byl úspěšně vytvořen!', 'success');
+            const duplicates = data.possible_duplicates || [];
+            if (duplicates.length > 0) {
+                const names = duplicates.map(label => label.product_name).join(', ');
+                showNotification('Pozor, podobná cenovka už existuje: ' + names, 'info');
+            }
             setTimeout(() => {
-                window.location.href = '/labels/new';
-            }, 1500);
+                window.location.href = appUrl('/labels/new');
+            }, duplicates.length > 0 ? 3000 : 1500);
         } else {
             showNotification('Chyba: ' + (data.error || 'Neznámá chyba'), 'error');
         }
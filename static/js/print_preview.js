@@ -0,0 +1,93 @@
+// Print preview: each section is one A4 sheet, shown as a single sprite sheet of
+// server-rendered label thumbnails. Sections are loaded when scrolled near.
+
+const PREVIEW_ROOT_MARGIN = '800px 0px';
+
+let previewObserver = null;
+// Bumped when the font settings change so late responses for old sizes are dropped
+let previewGeneration = 0;
+
+document.addEventListener('DOMContentLoaded', function () {
+    if (!document.getElementById('printPreview')) return;
+
+    previewObserver = new IntersectionObserver(function (entries) {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                previewObserver.unobserve(entry.target);
+                loadPreviewPage(entry.target);
+            }
+        });
+    }, { rootMargin: PREVIEW_ROOT_MARGIN });
+
+    document.querySelectorAll('.preview-page').forEach(section => previewObserver.observe(section));
+
+    // Re-render the preview with the font sizes that the PDF download would use
+    document.getElementById('priceFontSize').addEventListener('change', reloadPreview);
+    document.getElementById('textFontSize').addEventListener('change', reloadPreview);
+});
+
+function previewFontQuery() {
+    const params = new URLSearchParams({
+        price_font_size: document.getElementById('priceFontSize').value,
+        text_font_size: document.getElementById('textFontSize').value
+    });
+    return params.toString();
+}
+
+async function loadPreviewPage(section) {
+    const generation = previewGeneration;
+    const page = section.dataset.page;
+
+    try {
+        const response = await fetch(appUrl(`/labels/api/print-preview?page=${page}&${previewFontQuery()}`));
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        if (generation === previewGeneration) {
+            renderPreviewPage(section, data);
+        }
+    } catch (error) {
+        console.error(`Error loading preview page ${page}:`, error);
+        section.querySelector('.preview-grid').textContent = 'Náhled se nepodařilo načíst';
+    }
+}
+
+function renderPreviewPage(section, data) {
+    const grid = section.querySelector('.preview-grid');
+    const tiles = data.labels.map((label, index) => {
+        const column = index % data.columns;
+        const row = Math.floor(index / data.columns);
+
+        const tile = document.createElement('div');
+        tile.className = 'preview-tile';
+        tile.title = `${label.product_name} – ${label.price_text}`;
+        tile.style.width = `${data.tile_width}px`;
+        tile.style.height = `${data.tile_height}px`;
+        tile.style.backgroundImage = `url("${data.sprite}")`;
+        tile.style.backgroundPosition = `-${column * data.tile_width}px -${row * data.tile_height}px`;
+
+        tile.innerHTML = `
+            <div class="preview-tile-actions">
+                <a href="${appUrl(`/labels/api/label/${label.id}/pdf`)}" class="btn btn-small btn-secondary"
+                    title="Stáhnout jen tuto cenovku">PDF</a>
+                <button class="btn btn-small btn-danger" onclick="unmarkLabel(${label.id})"
+                    title="Odebrat z tisku">Zrušit</button>
+            </div>
+        `;
+        return tile;
+    });
+
+    grid.style.gridTemplateColumns = `repeat(${data.columns}, ${data.tile_width}px)`;
+    grid.replaceChildren(...tiles);
+    section.classList.add('loaded');
+}
+
+function reloadPreview() {
+    previewGeneration++;
+    document.querySelectorAll('.preview-page').forEach(section => {
+        section.classList.remove('loaded');
+        previewObserver.unobserve(section);
+        previewObserver.observe(section);
+    });
+}
@@ -3,6 +3,53 @@
  * Provides toast notifications, HTML escaping, and modal helpers.
  */
 
+/**
+ * Build an application URL that stays inside the current store prefix.
+ * @param {string} path - Absolute application path such as '/labels'.
+ * @returns {string} The path prefixed with the store root, if any.
+ */
+function appUrl(path) {
+    return (document.body.dataset.appRoot || '') + path;
+}
+
+/**
+ * Read a list payload the server embedded in the page, so the page does not
+ * fetch the same data again on load.
+ * @param {string} id - Id of the <script type="application/json"> element.
+ * @returns {{data: Object, etag: string|null}|null} The payload and its ETag,
+ *     or null when the page has none.
+ */
+function readEmbeddedPayload(id) {
+    const element = document.getElementById(id);
+    if (!element) {
+        return null;
+    }
+    const etag = element.dataset.etag;
+    return { data: JSON.parse(element.textContent), etag: etag ? `"${etag}"` : null };
+}
+
+/**
+ * Fetch a list payload unless it is unchanged since the given ETag.
+ * @param {string} url - API URL of the list.
+ * @param {string|null} etag - ETag of the copy the page has.
+ * @returns {Promise<{data: Object|null, etag: string|null}>} data is null when
+ *     the server answered 304 Not Modified.
+ */
+async function fetchIfChanged(url, etag) {
+    const response = await fetch(url, {
+        headers: etag ? { 'If-None-Match': etag } : {},
+        cache: 'no-store',
+    });
+    if (response.status === 304) {
+        return { data: null, etag };
+    }
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || response.statusText);
+    }
+    return { data, etag: response.headers.get('ETag') };
+}
+
 /**
  * Show a toast notification.
  * @param {string} message - The message to display.
@@ -0,0 +1,218 @@
+"""Fixtures for the opt-in performance benchmark suite.
+
+The benchmarks reuse the ``app`` and ``client`` fixtures from ``tests/conftest.py``
+and add synthetic label catalogues. They are skipped unless explicitly enabled:
+
+    LABELMAKER_BENCHMARKS=1 pytest tests/benchmarks --benchmark-autosave
+    LABELMAKER_BENCHMARKS=1 pytest tests/benchmarks \\
+        --benchmark-compare --benchmark-compare-fail=mean:15%
+
+Environment variables:
+    LABELMAKER_BENCHMARKS      Set to 1 to collect the benchmark modules.
+    LABELMAKER_BENCH_SIZES     Comma separated catalogue sizes (default "1000",
+                               the full matrix is "1000,10000,100000").
+    LABELMAKER_BENCH_ROUNDS    Rounds per benchmark (default 3).
+    LABELMAKER_BENCH_TOLERANCE Allowed memory regression as a fraction (default 0.15).
+    LABELMAKER_BENCH_SAVE      Set to 1 to overwrite the stored memory baselines.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+import os
+import random
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Generator
+
+import pytest
+from flask import Flask
+from sqlalchemy import insert
+
+from app.db import db as _db
+from app.models import Form, Label
+
+_ENABLED = os.getenv("LABELMAKER_BENCHMARKS", "").lower() in ("1", "true", "yes")
+_HAS_PLUGIN = importlib.util.find_spec("pytest_benchmark") is not None
+
+# Keep the regular `pytest tests/` run fast: benchmark modules are only
+# collected on demand and when pytest-benchmark is installed.
+collect_ignore_glob = [] if (_ENABLED and _HAS_PLUGIN) else ["test_*.py"]
+
+BENCH_SIZES = [
+    int(size)
+    for size in os.getenv("LABELMAKER_BENCH_SIZES", "1000").split(",")
+    if size.strip()
+]
+BENCH_ROUNDS = int(os.getenv("LABELMAKER_BENCH_ROUNDS", "3"))
+BENCH_TOLERANCE = float(os.getenv("LABELMAKER_BENCH_TOLERANCE", "0.15"))
+BENCH_SAVE = os.getenv("LABELMAKER_BENCH_SAVE", "").lower() in ("1", "true", "yes")
+MEMORY_BASELINE_PATH = Path(
+    os.getenv(
+        "LABELMAKER_BENCH_BASELINE",
+        str(Path(__file__).parent.parent.parent / ".benchmarks" / "memory.json"),
+    )
+)
+
+# Every n-th synthetic label is marked for printing
+MARK_EVERY = 10
+
+_FORMS = [
+    ("Tablety", "tbl", "ks"),
+    ("Sirup", "sir", "ml"),
+    ("Mast", "mst", "g"),
+    ("Kapky", "kap", "ml"),
+]
+_WORDS = [
+    "Paralen",
+    "Ibalgin",
+    "Nurofen",
+    "Stoptussin",
+    "Septofort",
+    "Olynth",
+    "Panthenol",
+    "Wobenzym",
+    "Magnesium B6",
+    "Vitamin C",
+    "Kápky na kašel",
+    "Acylpyrin",
+]
+
+
+@dataclass
+class Catalogue:
+    """Synthetic label catalogue loaded into the test database."""
+
+    size: int
+    marked: int
+    forms: list[tuple[str, str, str]] = field(default_factory=lambda: list(_FORMS))
+
+
+def _synthetic_rows(size: int, seed: int = 26) -> list[dict[str, Any]]:
+    """Build deterministic label rows that satisfy the unique_label constraint."""
+    rng = random.Random(seed)
+    rows: list[dict[str, Any]] = []
+    for i in range(size):
+        amount = float(rng.choice([10, 20, 24, 30, 50, 100, 250]))
+        price = round(rng.uniform(19.0, 899.0), 2)
+        rows.append(
+            {
+                "product_name": f"{rng.choice(_WORDS)} {rng.randint(1, 1000)}mg #{i}",
+                "form": _FORMS[i % len(_FORMS)][1],
+                "amount": amount,
+                "price": price,
+                "unit_price": round(price / amount, 2),
+                "marked_to_print": i % MARK_EVERY == 0,
+            }
+        )
+    return rows
+
+
+@pytest.fixture(autouse=True)
+def _clean_tables() -> Generator[None, None, None]:
+    """Override the per-test cleanup: catalogues live for the whole session."""
+    yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _quiet_logging(app: Flask) -> Generator[None, None, None]:
+    """Silence debug logging and SQL echo so they do not dominate timings."""
+    previous = logging.getLogger().level
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        _db.engine.echo = False
+    yield
+    logging.getLogger().setLevel(previous)
+
+
+@pytest.fixture(scope="session", params=BENCH_SIZES, ids=lambda n: f"{n}labels")
+def catalogue(
+    request: pytest.FixtureRequest, app: Flask
+) -> Generator[Catalogue, None, None]:
+    """Fill the database with a synthetic catalogue of the requested size."""
+    size = int(request.param)
+    rows = _synthetic_rows(size)
+    with app.app_context():
+        _db.session.execute(
+            insert(Form),
+            [{"name": n, "short_name": s, "unit": u} for n, s, u in _FORMS],
+        )
+        for start in range(0, size, 10_000):
+            _db.session.execute(insert(Label), rows[start : start + 10_000])
+        _db.session.commit()
+
+    yield Catalogue(size=size, marked=sum(1 for r in rows if r["marked_to_print"]))
+
+    with app.app_context():
+        for table in reversed(_db.metadata.sorted_tables):
+            _db.session.execute(table.delete())
+        _db.session.commit()
+
+
+@pytest.fixture()
+def app_ctx(app: Flask) -> Generator[None, None, None]:
+    """Push an application context for benchmarks that call helpers directly."""
+    with app.app_context():
+        yield
+
+
+def measure_peak_memory(func: Callable[[], object]) -> int:
+    """Run func once under tracemalloc and return the peak allocation in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def mean_seconds(benchmark: Any) -> float:
+    """Return the mean round time recorded by pytest-benchmark."""
+    return float(benchmark.stats.stats.mean)
+
+
+class MemoryBaseline:
+    """Stored memory high-water marks with a relative regression tolerance."""
+
+    def __init__(self, path: Path, tolerance: float, overwrite: bool) -> None:
+        self.path = path
+        self.tolerance = tolerance
+        self.overwrite = overwrite
+        self._data: dict[str, int] = {}
+        if path.exists():
+            self._data = json.loads(path.read_text(encoding="utf-8"))
+        self._dirty = False
+
+    def check(self, key: str, peak_bytes: int) -> None:
+        """Record peak_bytes for key, or fail if it regressed beyond tolerance."""
+        baseline = self._data.get(key)
+        if baseline is None or self.overwrite:
+            self._data[key] = peak_bytes
+            self._dirty = True
+            return
+        limit = baseline * (1 + self.tolerance)
+        assert peak_bytes <= limit, (
+            f"Memory regression for {key}: {peak_bytes / 1024:.0f} KiB "
+            f"> baseline {baseline / 1024:.0f} KiB (+{self.tolerance:.0%})"
+        )
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps(self._data, indent=2, sort_keys=True), encoding="utf-8"
+        )
+
+
+@pytest.fixture(scope="session")
+def memory_baseline() -> Generator[MemoryBaseline, None, None]:
+    """Session-wide memory baseline store, written back at the end of the run."""
+    store = MemoryBaseline(MEMORY_BASELINE_PATH, BENCH_TOLERANCE, BENCH_SAVE)
+    yield store
+    store.save()
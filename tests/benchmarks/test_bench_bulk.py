@@ -0,0 +1,83 @@
+"""Benchmarks for print-mark toggling and bulk unmarking throughput."""
+
+from typing import Any
+
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import update
+
+from app.db import db
+from app.models import Label
+
+from .conftest import (
+    BENCH_ROUNDS,
+    MARK_EVERY,
+    Catalogue,
+    MemoryBaseline,
+    mean_seconds,
+    measure_peak_memory,
+)
+
+# Number of toggle requests issued per benchmark round
+TOGGLES_PER_ROUND = 100
+
+
+def _label_ids(app: Flask, limit: int) -> list[int]:
+    with app.app_context():
+        return [
+            row[0]
+            for row in db.session.execute(
+                db.select(Label.id).order_by(Label.id).limit(limit)
+            )
+        ]
+
+
+def _remark_catalogue(app: Flask) -> None:
+    """Restore the catalogue's original print marks between rounds."""
+    with app.app_context():
+        db.session.execute(
+            update(Label).values(marked_to_print=(Label.id % MARK_EVERY) == 1)
+        )
+        db.session.commit()
+
+
+def test_toggle_print_mark_throughput(
+    benchmark: Any, app: Flask, client: FlaskClient, catalogue: Catalogue
+) -> None:
+    ids = _label_ids(app, TOGGLES_PER_ROUND)
+
+    def toggle_batch() -> None:
+        for label_id in ids:
+            resp = client.post(f"/labels/api/label/{label_id}/toggle-print")
+            assert resp.status_code == 200
+
+    # An even number of rounds leaves every mark as it was
+    benchmark.pedantic(toggle_batch, rounds=BENCH_ROUNDS * 2)
+
+    benchmark.extra_info["toggles_per_round"] = len(ids)
+    benchmark.extra_info["toggles_per_s"] = round(len(ids) / mean_seconds(benchmark), 1)
+
+
+def test_unmark_all_throughput(
+    benchmark: Any,
+    app: Flask,
+    client: FlaskClient,
+    catalogue: Catalogue,
+    memory_baseline: MemoryBaseline,
+) -> None:
+    def unmark() -> None:
+        resp = client.post("/labels/api/labels/unmark-all")
+        assert resp.status_code == 200
+
+    benchmark.pedantic(
+        unmark, setup=lambda: _remark_catalogue(app), rounds=BENCH_ROUNDS
+    )
+
+    seconds = mean_seconds(benchmark)
+    benchmark.extra_info["unmarked"] = catalogue.marked
+    benchmark.extra_info["labels_per_s"] = round(catalogue.marked / seconds, 1)
+    _remark_catalogue(app)
+    peak = measure_peak_memory(unmark)
+    benchmark.extra_info["peak_kib"] = peak // 1024
+    memory_baseline.check(f"unmark_all[{catalogue.size}]", peak)
+    _remark_catalogue(app)
@@ -0,0 +1,38 @@
+"""Benchmarks for GET /labels/api/labels latency per sort mode."""
+
+from typing import Any
+
+import pytest
+from flask.testing import FlaskClient
+
+from .conftest import BENCH_ROUNDS, Catalogue, MemoryBaseline, measure_peak_memory
+
+
+@pytest.mark.parametrize("sort_by", ["name", "date", "marked"])
+def test_get_labels_api_latency(
+    benchmark: Any,
+    client: FlaskClient,
+    catalogue: Catalogue,
+    memory_baseline: MemoryBaseline,
+    sort_by: str,
+) -> None:
+    url = f"/labels/api/labels?sort={sort_by}"
+
+    resp = benchmark.pedantic(client.get, args=(url,), rounds=BENCH_ROUNDS)
+
+    assert resp.status_code == 200
+    assert resp.get_json()["count"] == catalogue.size
+    benchmark.extra_info["labels"] = catalogue.size
+    benchmark.extra_info["payload_kib"] = len(resp.data) // 1024
+    peak = measure_peak_memory(lambda: client.get(url))
+    benchmark.extra_info["peak_kib"] = peak // 1024
+    memory_baseline.check(f"get_labels_api[{sort_by}][{catalogue.size}]", peak)
+
+
+def test_list_labels_page_latency(
+    benchmark: Any, client: FlaskClient, catalogue: Catalogue
+) -> None:
+    resp = benchmark.pedantic(client.get, args=("/labels/",), rounds=BENCH_ROUNDS)
+
+    assert resp.status_code == 200
+    benchmark.extra_info["labels"] = catalogue.size
@@ -0,0 +1,82 @@
+"""Benchmarks for PDF rendering throughput (labels/s, pages/s) and memory."""
+
+from typing import Any, cast
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.models import Form, Label
+from app.pdf_generator import LabelPDFGenerator, PdfLabelData
+
+from .conftest import (
+    BENCH_ROUNDS,
+    Catalogue,
+    MemoryBaseline,
+    mean_seconds,
+    measure_peak_memory,
+)
+
+
+def _marked_label_data(app: Flask) -> list[PdfLabelData]:
+    """Build the PDF input for all marked labels, as the print route does."""
+    with app.app_context():
+        units = {form.short_name: form.unit for form in Form.query.all()}
+        labels = Label.query.filter_by(marked_to_print=True).all()
+        return [
+            cast(
+                PdfLabelData,
+                {
+                    **label.to_dict(),
+                    "unit": units[label.form],
+                    "price_font_size": 32,
+                    "text_font_size": 14,
+                },
+            )
+            for label in labels
+        ]
+
+
+def _record_throughput(benchmark: Any, label_count: int) -> None:
+    pages = -(-label_count // len(LabelPDFGenerator().calculate_label_positions()))
+    seconds = mean_seconds(benchmark)
+    benchmark.extra_info["labels"] = label_count
+    benchmark.extra_info["pages"] = pages
+    benchmark.extra_info["labels_per_s"] = round(label_count / seconds, 1)
+    benchmark.extra_info["pages_per_s"] = round(pages / seconds, 2)
+
+
+def test_generate_pdf_throughput(
+    benchmark: Any,
+    app: Flask,
+    catalogue: Catalogue,
+    memory_baseline: MemoryBaseline,
+) -> None:
+    data = _marked_label_data(app)
+    generator = LabelPDFGenerator()
+
+    result = benchmark.pedantic(
+        generator.generate_pdf, args=(data,), rounds=BENCH_ROUNDS, iterations=1
+    )
+
+    assert result is not None
+    _record_throughput(benchmark, len(data))
+    peak = measure_peak_memory(lambda: generator.generate_pdf(data))
+    benchmark.extra_info["peak_kib"] = peak // 1024
+    memory_baseline.check(f"generate_pdf[{catalogue.size}]", peak)
+
+
+def test_pdf_endpoint_all_marked(
+    benchmark: Any,
+    client: FlaskClient,
+    catalogue: Catalogue,
+    memory_baseline: MemoryBaseline,
+) -> None:
+    url = "/labels/api/labels/pdf?price_font_size=32&text_font_size=14"
+
+    resp = benchmark.pedantic(client.get, args=(url,), rounds=BENCH_ROUNDS)
+
+    assert resp.status_code == 200
+    _record_throughput(benchmark, catalogue.marked)
+    peak = measure_peak_memory(lambda: client.get(url))
+    benchmark.extra_info["peak_kib"] = peak // 1024
+    memory_baseline.check(f"pdf_endpoint[{catalogue.size}]", peak)
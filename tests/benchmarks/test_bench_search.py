@@ -0,0 +1,21 @@
+"""Benchmarks for GET /labels/api/labels/search (FTS5 prefix search)."""
+
+from typing import Any
+
+import pytest
+from flask.testing import FlaskClient
+
+from .conftest import BENCH_ROUNDS, Catalogue
+
+
+@pytest.mark.parametrize("query", ["paralen", "kap", "vitamin c", "ibalgin 5"])
+def test_search_latency(
+    benchmark: Any, client: FlaskClient, catalogue: Catalogue, query: str
+) -> None:
+    url = f"/labels/api/labels/search?q={query}"
+
+    resp = benchmark.pedantic(client.get, args=(url,), rounds=BENCH_ROUNDS)
+
+    assert resp.status_code == 200
+    assert resp.get_json()["count"] > 0
+    benchmark.extra_info["labels"] = catalogue.size
@@ -0,0 +1,82 @@
+"""Benchmarks: ORM to_dict()/PdfLabelData path vs compact LabelRow snapshots."""
+
+from typing import Any, cast
+
+from flask import Flask, json
+
+from app.label_snapshot import dumps_label_list, load_label_rows
+from app.models import Form, Label
+from app.pdf_generator import PdfLabelData
+
+from .conftest import (
+    BENCH_ROUNDS,
+    Catalogue,
+    MemoryBaseline,
+    mean_seconds,
+    measure_peak_memory,
+)
+
+
+def _orm_list_payload() -> str:
+    labels = Label.query.order_by(Label.product_name).all()
+    data = [label.to_dict() for label in labels]
+    return json.dumps({"count": len(data), "labels": data})
+
+
+def _orm_pdf_input() -> list[PdfLabelData]:
+    units = {form.short_name: form.unit for form in Form.query.all()}
+    return [
+        cast(PdfLabelData, {**label.to_dict(), "unit": units[label.form]})
+        for label in Label.query.filter_by(marked_to_print=True).all()
+    ]
+
+
+def _record(benchmark: Any, catalogue: Catalogue, peak: int) -> None:
+    benchmark.extra_info["rows_per_s"] = round(
+        catalogue.size / mean_seconds(benchmark), 1
+    )
+    benchmark.extra_info["peak_kib"] = peak // 1024
+
+
+def test_list_payload_orm(
+    benchmark: Any, app: Flask, app_ctx: None, catalogue: Catalogue
+) -> None:
+    benchmark.group = f"list-payload-{catalogue.size}"
+    benchmark.pedantic(_orm_list_payload, rounds=BENCH_ROUNDS)
+    _record(benchmark, catalogue, measure_peak_memory(_orm_list_payload))
+
+
+def test_list_payload_snapshot(
+    benchmark: Any,
+    app: Flask,
+    app_ctx: None,
+    catalogue: Catalogue,
+    memory_baseline: MemoryBaseline,
+) -> None:
+    def build() -> str:
+        return dumps_label_list(load_label_rows("name"))
+
+    benchmark.group = f"list-payload-{catalogue.size}"
+    benchmark.pedantic(build, rounds=BENCH_ROUNDS)
+    peak = measure_peak_memory(build)
+    _record(benchmark, catalogue, peak)
+    memory_baseline.check(f"snapshot_list_payload[{catalogue.size}]", peak)
+
+
+def test_pdf_input_orm(
+    benchmark: Any, app: Flask, app_ctx: None, catalogue: Catalogue
+) -> None:
+    benchmark.group = f"pdf-input-{catalogue.size}"
+    benchmark.pedantic(_orm_pdf_input, rounds=BENCH_ROUNDS)
+    _record(benchmark, catalogue, measure_peak_memory(_orm_pdf_input))
+
+
+def test_pdf_input_snapshot(
+    benchmark: Any, app: Flask, app_ctx: None, catalogue: Catalogue
+) -> None:
+    def build() -> object:
+        return load_label_rows(marked_only=True)
+
+    benchmark.group = f"pdf-input-{catalogue.size}"
+    benchmark.pedantic(build, rounds=BENCH_ROUNDS)
+    _record(benchmark, catalogue, measure_peak_memory(build))
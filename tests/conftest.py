@@ -2,12 +2,14 @@
 
 from __future__ import annotations
 
-from typing import Generator, cast
+from pathlib import Path
+from typing import Any, Generator, Protocol, cast
 
 import pytest
 from flask import Flask
 from flask.testing import FlaskClient
 
+from app import utils as app_utils
 from app.app import create_app
 from app.db import db as _db
 from app.models import FormDict, LabelDict
@@ -31,6 +33,12 @@ def app() -> Generator[Flask, None, None]:
         _db.drop_all()
 
 
+@pytest.fixture(autouse=True)
+def _font_settings_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep font setting changes out of the shared instance/ file."""
+    monkeypatch.setattr(app_utils, "FONT_SETTINGS_PATH", tmp_path / "fonts.json")
+
+
 @pytest.fixture(autouse=True)
 def _clean_tables(app: Flask) -> Generator[None, None, None]:
     """Delete all row data after each test while keeping the schema."""
@@ -65,17 +73,45 @@ def seed_form(client: FlaskClient) -> FormDict:
     return cast(FormDict, resp.get_json()["form"])
 
 
+class LabelFactory(Protocol):
+    """Signature of the ``make_label`` fixture."""
+
+    def __call__(
+        self,
+        name: str = ...,
+        /,
+        *,
+        client: FlaskClient | None = None,
+        **fields: Any,
+    ) -> LabelDict: ...
+
+
 @pytest.fixture()
-def seed_label(client: FlaskClient, seed_form: FormDict) -> LabelDict:
+def make_label(client: FlaskClient) -> LabelFactory:
+    """Factory creating a label through the API and returning its dict.
+
+    The label is a 24 tbl pack for 89.50 unless fields override that; the
+    ``tbl`` form must exist. Pass client to create it through another app.
+    """
+    default_client = client
+
+    def factory(
+        name: str = "Paralen 500mg",
+        /,
+        *,
+        client: FlaskClient | None = None,
+        **fields: Any,
+    ) -> LabelDict:
+        data = {"product_name": name, "form": "tbl", "amount": 24, "price": 89.50}
+        data.update(fields)
+        resp = (client or default_client).post("/labels/api/label", json=data)
+        assert resp.status_code == 201, resp.get_json()
+        return cast(LabelDict, resp.get_json()["label"])
+
+    return factory
+
+
+@pytest.fixture()
+def seed_label(make_label: LabelFactory, seed_form: FormDict) -> LabelDict:
     """Create a default label and return its dict."""
-    resp = client.post(
-        "/labels/api/label",
-        json={
-            "product_name": "Paralen 500mg",
-            "form": "tbl",
-            "amount": 24,
-            "price": 89.50,
-        },
-    )
-    assert resp.status_code == 201
-    return cast(LabelDict, resp.get_json()["label"])
+    return make_label()
@@ -0,0 +1,82 @@
+"""Tests for admission control of heavy render requests."""
+
+import threading
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.admission import RenderGate, RenderRejected
+from app.models import LabelDict
+
+
+class TestRenderGate:
+    def test_waiting_render_gets_freed_slot(self) -> None:
+        gate = RenderGate(slots=1, queue_size=1, timeout=5)
+        gate.acquire()
+        started = threading.Event()
+
+        def render() -> None:
+            gate.acquire()
+            started.set()
+            gate.release(0.1)
+
+        thread = threading.Thread(target=render)
+        thread.start()
+        assert not started.wait(0.05)
+        assert gate.stats()["waiting"] == 1
+        gate.release(0.1)
+        assert started.wait(5)
+        thread.join()
+        assert gate.stats() == {"slots": 1, "active": 0, "waiting": 0, "rejected": 0}
+
+    def test_full_queue_is_refused(self) -> None:
+        gate = RenderGate(slots=1, queue_size=0)
+        gate.acquire()
+        with pytest.raises(RenderRejected) as rejected:
+            gate.acquire()
+        assert rejected.value.status == 429
+        assert rejected.value.retry_after >= 1
+
+    def test_queue_wait_times_out(self) -> None:
+        gate = RenderGate(slots=1, queue_size=1, timeout=0.05)
+        gate.acquire()
+        gate.release(30)
+        gate.acquire()
+        with pytest.raises(RenderRejected) as rejected:
+            gate.acquire()
+        assert rejected.value.status == 503
+        # Estimated from the previous render's 30 s
+        assert rejected.value.retry_after > 1
+        assert gate.stats()["waiting"] == 0
+
+
+def test_light_endpoints_skip_busy_renders(
+    app: Flask,
+    client: FlaskClient,
+    seed_label: LabelDict,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    gate = RenderGate(slots=1, queue_size=0)
+    monkeypatch.setitem(app.extensions, "render_gate", gate)
+    client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+    gate.acquire()
+
+    resp = client.get("/labels/api/labels/pdf")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert client.post("/labels/api/labels/print-job").status_code == 429
+
+    assert client.post("/heartbeat").status_code == 200
+    health = client.get("/health").get_json()
+    assert health["renders"]["active"] == 1
+    assert health["renders"]["rejected"] == 2
+    toggled = client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+    assert toggled.status_code == 200
+
+    gate.release(0.5)
+    client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+    resp = client.get("/labels/api/labels/pdf")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/pdf"
+    assert gate.stats()["active"] == 0
@@ -0,0 +1,209 @@
+"""Tests for online database snapshots, rotation and restore."""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from app.backup import (
+    BackupError,
+    BackupScheduler,
+    create_backup,
+    database_path,
+    list_backups,
+    restore_backup,
+    rotate_backups,
+    verify_snapshot,
+)
+
+
+def _count(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return int(conn.execute("SELECT count(*) FROM item").fetchone()[0])
+    finally:
+        conn.close()
+
+
+@pytest.fixture()
+def live_db(tmp_path: Path) -> Path:
+    """A WAL database with a parent/child foreign key, like the app's."""
+    path = tmp_path / "labelmaker.db"
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE form (short_name TEXT PRIMARY KEY)")
+    conn.execute(
+        "CREATE TABLE item (id INTEGER PRIMARY KEY, "
+        "form TEXT REFERENCES form(short_name), name TEXT)"
+    )
+    conn.execute("INSERT INTO form VALUES ('tbl')")
+    conn.executemany(
+        "INSERT INTO item (form, name) VALUES ('tbl', ?)",
+        [(f"Produkt {i} " + "x" * 200,) for i in range(2000)],
+    )
+    conn.close()
+    return path
+
+
+class TestCreateBackup:
+    def test_snapshot_is_verified_single_file(
+        self, live_db: Path, tmp_path: Path
+    ) -> None:
+        backup_dir = tmp_path / "backups"
+        snapshot = create_backup(live_db, backup_dir, pages=8, step_sleep=0)
+
+        assert snapshot.parent == backup_dir
+        assert [p.name for p in backup_dir.iterdir()] == [snapshot.name]
+        verify_snapshot(snapshot)
+        assert _count(snapshot) == 2000
+        conn = sqlite3.connect(snapshot)
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+        conn.close()
+
+    def test_concurrent_writes_do_not_block_or_tear(
+        self, live_db: Path, tmp_path: Path
+    ) -> None:
+        stop = threading.Event()
+        written: list[float] = []
+
+        def writer() -> None:
+            conn = sqlite3.connect(live_db, isolation_level=None, timeout=5)
+            while not stop.is_set():
+                started = time.perf_counter()
+                conn.execute("INSERT INTO item (form, name) VALUES ('tbl', 'new')")
+                written.append(time.perf_counter() - started)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            snapshot = create_backup(
+                live_db, tmp_path / "backups", pages=4, step_sleep=0.001
+            )
+        finally:
+            stop.set()
+            thread.join()
+
+        verify_snapshot(snapshot)
+        assert 2000 <= _count(snapshot) <= 2000 + len(written)
+        assert written and max(written) < 1.0
+
+    def test_missing_database(self, tmp_path: Path) -> None:
+        with pytest.raises(BackupError):
+            create_backup(tmp_path / "missing.db", tmp_path / "backups")
+        assert not (tmp_path / "backups").exists()
+
+    def test_rotation_keeps_newest(self, live_db: Path, tmp_path: Path) -> None:
+        backup_dir = tmp_path / "backups"
+        created = [create_backup(live_db, backup_dir, keep=None) for _ in range(4)]
+        assert len({p.name for p in created}) == 4
+        (backup_dir / "notes.txt").write_text("kept")
+
+        removed = rotate_backups(backup_dir, keep=2)
+        assert sorted(removed) == sorted(created[:2])
+        assert list_backups(backup_dir) == created[:1:-1]
+        assert (backup_dir / "notes.txt").exists()
+
+        create_backup(live_db, backup_dir, keep=2)
+        assert len(list_backups(backup_dir)) == 2
+
+
+class TestVerify:
+    def test_damaged_snapshot_is_rejected(self, live_db: Path, tmp_path: Path) -> None:
+        snapshot = create_backup(live_db, tmp_path / "backups")
+        data = bytearray(snapshot.read_bytes())
+        data[8192:12288] = b"\xff" * 4096
+        snapshot.write_bytes(bytes(data))
+        with pytest.raises(BackupError):
+            verify_snapshot(snapshot)
+
+    def test_not_a_database(self, tmp_path: Path) -> None:
+        path = tmp_path / "labelmaker-20260101-000000.db"
+        path.write_text("hello")
+        with pytest.raises(BackupError, match="not a readable database"):
+            verify_snapshot(path)
+
+
+class TestRestore:
+    def test_restore_swaps_contents_for_open_connections(
+        self, live_db: Path, tmp_path: Path
+    ) -> None:
+        backup_dir = tmp_path / "backups"
+        snapshot = create_backup(live_db, backup_dir)
+        reader = sqlite3.connect(live_db, isolation_level=None)
+        reader.execute("DELETE FROM item WHERE id > 10")
+        assert reader.execute("SELECT count(*) FROM item").fetchone() == (10,)
+
+        safety = restore_backup(snapshot, live_db, backup_dir)
+
+        assert reader.execute("SELECT count(*) FROM item").fetchone() == (2000,)
+        assert reader.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        reader.close()
+        assert safety.name.endswith("-pre-restore.db")
+        assert _count(safety) == 10
+
+    def test_damaged_snapshot_leaves_database_alone(
+        self, live_db: Path, tmp_path: Path
+    ) -> None:
+        bad = tmp_path / "labelmaker-20260101-000000.db"
+        bad.write_bytes(b"\x00" * 4096)
+        with pytest.raises(BackupError):
+            restore_backup(bad, live_db, tmp_path / "backups")
+        assert _count(live_db) == 2000
+        assert list_backups(tmp_path / "backups") == []
+
+
+class TestScheduler:
+    def test_due_after_interval(self, live_db: Path, tmp_path: Path) -> None:
+        scheduler = BackupScheduler(live_db, tmp_path / "backups", interval_hours=1)
+        assert scheduler.seconds_until_due() == 0
+        assert scheduler.run_now() is not None
+        assert 3590 < scheduler.seconds_until_due() <= 3600
+
+    def test_runs_on_its_thread(self, live_db: Path, tmp_path: Path) -> None:
+        scheduler = BackupScheduler(
+            live_db, tmp_path / "backups", interval_hours=1, start_delay=0
+        )
+        scheduler.start()
+        try:
+            deadline = time.monotonic() + 5
+            while not list_backups(scheduler.backup_dir):
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+        finally:
+            scheduler.stop()
+        assert len(list_backups(scheduler.backup_dir)) == 1
+
+    def test_failure_is_logged_not_raised(self, tmp_path: Path) -> None:
+        scheduler = BackupScheduler(tmp_path / "missing.db", tmp_path / "backups")
+        assert scheduler.run_now() is None
+
+
+def test_database_path() -> None:
+    assert database_path("sqlite:///C:/data/labelmaker.db") == Path(
+        "C:/data/labelmaker.db"
+    )
+    assert database_path("sqlite:///:memory:") is None
+    assert database_path("postgresql://localhost/labels") is None
+
+
+def test_cli_create_list_verify(
+    app: Flask, live_db: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(app.config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{live_db}")
+    monkeypatch.setitem(app.config, "BACKUP_DIR", str(tmp_path))
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["backup", "create"])
+    assert result.exit_code == 0, result.output
+    name = list_backups(tmp_path)[0].name
+    assert name in result.output
+
+    assert name in runner.invoke(args=["backup", "list"]).output
+    verified = runner.invoke(args=["backup", "verify", name])
+    assert verified.exit_code == 0
+    assert "is OK" in verified.output
+    assert runner.invoke(args=["backup", "verify", "nope.db"]).exit_code == 1
@@ -0,0 +1,153 @@
+"""Tests for EAN barcodes: validation, API, PDF form reuse and thermal output."""
+
+import re
+
+import pytest
+from flask.testing import FlaskClient
+
+from app.barcodes import barcode_bars, normalize_barcode
+from app.label_output import RasterBackend, ZplBackend
+from app.models import FormDict, LabelDict
+from app.pdf_generator import LabelPDFGenerator, PdfLabelData
+
+
+def _label(barcode: str | None, name: str = "Paralen 500mg") -> PdfLabelData:
+    return PdfLabelData(
+        product_name=name,
+        form="tbl",
+        amount=24.0,
+        price=89.5,
+        unit_price=3.73,
+        unit="ks",
+        barcode=barcode,
+    )
+
+
+def _form_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Subtype /Form", pdf))
+
+
+class TestNormalizeBarcode:
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            ("859400000001", "8594000000013"),
+            ("8594000000013", "8594000000013"),
+            ("8594 0000 0001 3", "8594000000013"),
+            ("9638507", "96385074"),
+            ("96385074", "96385074"),
+        ],
+    )
+    def test_completes_check_digit(self, value: str, expected: str) -> None:
+        assert normalize_barcode(value) == expected
+
+    @pytest.mark.parametrize("value", [None, "", "   "])
+    def test_empty_means_no_barcode(self, value: str | None) -> None:
+        assert normalize_barcode(value) is None
+
+    def test_wrong_check_digit(self) -> None:
+        with pytest.raises(ValueError, match="kontrolní"):
+            normalize_barcode("8594000000014")
+
+    @pytest.mark.parametrize("value", ["12345", "85940000000a3", "12345678901234"])
+    def test_not_an_ean(self, value: str) -> None:
+        with pytest.raises(ValueError, match="EAN"):
+            normalize_barcode(value)
+
+    def test_bars_are_encoded_once(self) -> None:
+        bars = barcode_bars("8594000000013")
+        assert barcode_bars("8594000000013") is bars
+        modules, runs = bars
+        assert modules == 95
+        assert runs[0] == (0, 1)
+
+
+class TestPdfBarcodes:
+    def test_repeated_code_is_one_form(self) -> None:
+        generator = LabelPDFGenerator(34, 10)
+        labels = [_label("8594000000013", f"Lék {i}") for i in range(40)]
+        pdf = generator.generate_pdf(labels)
+        assert pdf is not None
+        assert _form_count(pdf.getvalue()) == 1
+
+    def test_single_codes_are_drawn_inline(self) -> None:
+        generator = LabelPDFGenerator(34, 10)
+        labels = [_label("8594000000013"), _label("96385074"), _label(None)]
+        pdf = generator.generate_pdf(labels)
+        assert pdf is not None
+        assert _form_count(pdf.getvalue()) == 0
+
+    def test_barcode_moves_price_up(self) -> None:
+        generator = LabelPDFGenerator(34, 10)
+        plain = generator.place_label(_label(None))
+        with_code = generator.place_label(_label("8594000000013"))
+        assert with_code[-1].baseline > plain[-1].baseline
+        barcode = generator.place_barcode(_label("8594000000013"))
+        assert barcode is not None
+        assert barcode.y + barcode.height < with_code[-1].baseline
+
+
+class TestThermalBarcodes:
+    def test_zpl_uses_native_ean(self) -> None:
+        job = ZplBackend().render([_label("8594000000013"), _label("96385074")])
+        assert b"^BEN," in job
+        assert b"^FD859400000001^FS" in job
+        assert b"^B8N," in job
+        assert b"^FD9638507^FS" in job
+
+    def test_raster_draws_bars_in_bottom_zone(self) -> None:
+        backend = RasterBackend(dpi=203)
+        generator = backend.generator
+        label = _label("8594000000013")
+        image = backend.label_image(
+            generator.place_label(label), generator.place_barcode(label)
+        )
+        bottom = image.crop(
+            (0, int(backend.height * 0.8), backend.width, backend.height - 5)
+        )
+        assert bottom.histogram()[0] > 0
+
+
+class TestBarcodeApi:
+    def test_create_with_barcode(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        resp = client.post(
+            "/labels/api/label",
+            json={
+                "product_name": "Ibalgin 400",
+                "form": "tbl",
+                "amount": 10,
+                "price": 59,
+                "barcode": "859400000001",
+            },
+        )
+        assert resp.status_code == 201
+        labels = client.get("/labels/api/labels").get_json()
+        assert labels["labels"][0]["barcode"] == "8594000000013"
+
+    def test_create_rejects_invalid_barcode(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        resp = client.post(
+            "/labels/api/label",
+            json={
+                "product_name": "Ibalgin 400",
+                "form": "tbl",
+                "amount": 10,
+                "price": 59,
+                "barcode": "8594000000014",
+            },
+        )
+        assert resp.status_code == 400
+
+    def test_update_sets_and_clears_barcode(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        url = f"/labels/api/label/{seed_label['id']}"
+        resp = client.put(url, json={"barcode": "96385074"})
+        assert resp.status_code == 200
+        assert resp.get_json()["label"]["barcode"] == "96385074"
+        assert client.put(url, json={"barcode": "123"}).status_code == 400
+        cleared = client.put(url, json={"barcode": ""}).get_json()
+        assert cleared["label"]["barcode"] is None
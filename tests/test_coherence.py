@@ -0,0 +1,100 @@
+"""Tests for cache coherence with writes made by other processes."""
+
+import sqlite3
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import create_engine
+
+from app.coherence import CoherenceMonitor, check_coherence
+from app.db import db
+from app.models import LabelDict
+from app.payload_cache import payload_cache
+from app.stores import StoreRegistry
+
+
+@pytest.fixture()
+def other_process(app: Flask) -> Generator[sqlite3.Connection, None, None]:
+    """A connection of its own to the app's database, like another worker's."""
+    connection = sqlite3.connect(str(db.engine.url.database))
+    yield connection
+    connection.close()
+
+
+def _prices(client: FlaskClient, url: str = "/labels/api/labels") -> list[float]:
+    return [label["price"] for label in client.get(url).get_json()["labels"]]
+
+
+def test_write_by_other_process_invalidates(
+    client: FlaskClient, seed_label: LabelDict, other_process: sqlite3.Connection
+) -> None:
+    assert _prices(client) == [89.5]
+    etag = client.get("/labels/api/labels").headers["ETag"]
+    client.get("/api/form")
+    assert payload_cache.get(("forms", "name")) is not None
+
+    other_process.execute(
+        "UPDATE label SET price = 95 WHERE id = ?", (seed_label["id"],)
+    )
+    other_process.commit()
+
+    resp = client.get("/labels/api/labels", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["labels"][0]["price"] == 95
+    # Only payloads read from the changed table were dropped
+    assert payload_cache.get(("forms", "name")) is not None
+
+    other_process.execute("UPDATE form SET unit = 'tbl'")
+    other_process.commit()
+    assert client.get("/api/form").get_json()["forms"][0]["unit"] == "tbl"
+    assert payload_cache.get(("labels", "name")) is not None
+
+
+def test_unchanged_database_is_not_reread(
+    app: Flask, client: FlaskClient, seed_label: LabelDict
+) -> None:
+    monitor = CoherenceMonitor(db.engine)
+    try:
+        assert monitor.changed_tables() == {"label", "form"}
+        assert monitor.changed_tables() == set()
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        assert monitor.changed_tables() == {"label"}
+    finally:
+        monitor.close()
+
+    with app.test_request_context():
+        check_coherence()
+        assert check_coherence() == set()
+
+
+def test_memory_database_is_not_monitored() -> None:
+    monitor = CoherenceMonitor(create_engine("sqlite://"))
+    assert not monitor.enabled
+    assert monitor.changed_tables() == set()
+
+
+def test_store_cache_follows_other_process(
+    app: Flask, client: FlaskClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stores = StoreRegistry(app, tmp_path, share_forms=False)
+    monkeypatch.setitem(app.extensions, "stores", stores)
+    try:
+        path = stores.create("praha")
+        client.post(
+            "/s/praha/api/form",
+            json={"name": "Tablety", "short_name": "tbl", "unit": "ks"},
+        )
+        client.post(
+            "/s/praha/labels/api/label",
+            json={"product_name": "Brufen", "form": "tbl", "amount": 24, "price": 90},
+        )
+        assert _prices(client, "/s/praha/labels/api/labels") == [90]
+
+        with sqlite3.connect(path) as connection:
+            connection.execute("UPDATE label SET price = 99")
+        assert _prices(client, "/s/praha/labels/api/labels") == [99]
+    finally:
+        stores.close_all()
@@ -0,0 +1,56 @@
+"""Tests for app/compression.py — gzip of JSON/HTML responses above the size threshold."""
+
+import gzip
+
+from flask.testing import FlaskClient
+
+from app.models import FormDict, LabelDict
+
+
+class TestResponseCompression:
+    def test_html_page_is_gzipped(self, client: FlaskClient) -> None:
+        resp = client.get("/labels/", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert b"Seznam cenovek" in gzip.decompress(resp.data)
+
+    def test_small_json_is_not_compressed(self, client: FlaskClient) -> None:
+        resp = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in resp.headers
+
+    def test_no_compression_without_accept_encoding(self, client: FlaskClient) -> None:
+        resp = client.get("/labels/")
+        assert "Content-Encoding" not in resp.headers
+
+    def test_cached_list_payload_is_gzipped_with_weak_etag(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        for i in range(30):
+            client.post(
+                "/labels/api/label",
+                json={
+                    "product_name": f"Lék {i}",
+                    "form": "tbl",
+                    "amount": 10,
+                    "price": 9,
+                },
+            )
+        resp = client.get("/labels/api/labels", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["ETag"].startswith('W/"')
+        assert b'"count":30' in gzip.decompress(resp.data)
+
+        again = client.get(
+            "/labels/api/labels",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers["ETag"]},
+        )
+        assert again.status_code == 304
+
+    def test_pdf_download_is_not_compressed(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.get(
+            f"/labels/api/label/{seed_label['id']}/pdf",
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert resp.status_code == 200
+        assert "Content-Encoding" not in resp.headers
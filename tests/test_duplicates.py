@@ -0,0 +1,168 @@
+"""Tests for app/duplicates.py — trigram near-duplicate detection and merging."""
+
+from typing import Any
+
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import func, insert, select
+
+from app.db import db
+from app.duplicates import (
+    dice,
+    index_missing_labels,
+    name_trigrams,
+    normalize_name,
+)
+from app.models import FormDict, Label, LabelDict, LabelTrigram
+
+
+def _create(
+    client: FlaskClient, name: str, amount: float = 24, marked: bool = False
+) -> dict[str, Any]:
+    resp = client.post(
+        "/labels/api/label",
+        json={
+            "product_name": name,
+            "form": "tbl",
+            "amount": amount,
+            "price": 89.5,
+            "marked_to_print": marked,
+        },
+    )
+    assert resp.status_code == 201
+    return dict(resp.get_json())
+
+
+class TestNormalization:
+    def test_spacing_case_and_diacritics_fold(self) -> None:
+        assert normalize_name("Paralen 500 mg") == normalize_name("PARALEN 500mg")
+        assert normalize_name("Kápky na kašel") == "kapkynakasel"
+
+    def test_dice(self) -> None:
+        assert (
+            dice(name_trigrams("Paralen 500mg"), name_trigrams("Paralen 500 mg")) == 1
+        )
+        assert dice(name_trigrams("Paralen"), name_trigrams("Ibalgin")) < 0.2
+        assert dice(set(), name_trigrams("x")) == 0
+
+
+class TestCreateWarning:
+    def test_near_duplicate_is_reported(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        data = _create(client, "Paralen 500 mg")
+        assert [d["id"] for d in data["possible_duplicates"]] == [seed_label["id"]]
+        assert data["possible_duplicates"][0]["similarity"] == 1.0
+
+    def test_typo_is_reported(self, client: FlaskClient, seed_label: LabelDict) -> None:
+        data = _create(client, "Paralenn 500mg")
+        assert len(data["possible_duplicates"]) == 1
+
+    def test_different_strength_is_not_a_duplicate(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert _create(client, "Paralen 125mg")["possible_duplicates"] == []
+
+    def test_different_amount_is_not_a_duplicate(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert _create(client, "Paralen 500 mg", amount=12)["possible_duplicates"] == []
+
+    def test_renamed_label_is_reindexed(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.put(
+            f"/labels/api/label/{seed_label['id']}",
+            json={
+                "product_name": "Ibalgin 400",
+                "form": "tbl",
+                "amount": 24,
+                "price": 1,
+            },
+        )
+        assert _create(client, "Paralen 500 mg")["possible_duplicates"] == []
+        assert len(_create(client, "IBALGIN 400")["possible_duplicates"]) == 1
+
+
+class TestDuplicateClusters:
+    def test_clusters_group_near_duplicates(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        _create(client, "Paralen 500 mg")
+        _create(client, "PARALEN 500mg.")
+        _create(client, "Ibalgin 400")
+        _create(client, "Ibalgin 400", amount=10)
+
+        data = client.get("/labels/api/labels/duplicates").get_json()
+        assert data["count"] == 1
+        names = {label["product_name"] for label in data["clusters"][0]["labels"]}
+        assert names == {"Paralen 500mg", "Paralen 500 mg", "PARALEN 500mg."}
+
+    def test_invalid_threshold(self, client: FlaskClient) -> None:
+        resp = client.get("/labels/api/labels/duplicates?threshold=2")
+        assert resp.status_code == 400
+
+
+class TestMerge:
+    def test_merge_keeps_one_label_and_print_mark(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        dup = _create(client, "Paralen 500 mg", marked=True)["label"]
+        resp = client.post(
+            "/labels/api/labels/merge",
+            json={"keep_id": seed_label["id"], "merge_ids": [dup["id"]]},
+        )
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["merged"] == 1
+        assert data["label"]["marked_to_print"] is True
+        assert client.get(f"/labels/api/label/{dup['id']}").status_code == 404
+        assert client.get("/labels/api/labels/duplicates").get_json()["count"] == 0
+
+    def test_merge_unknown_label(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.post(
+            "/labels/api/labels/merge",
+            json={"keep_id": seed_label["id"], "merge_ids": [999999]},
+        )
+        assert resp.status_code == 404
+
+    def test_merge_requires_ids(self, client: FlaskClient) -> None:
+        resp = client.post("/labels/api/labels/merge", json={"keep_id": 1})
+        assert resp.status_code == 400
+
+
+class TestIndexMaintenance:
+    def test_core_inserts_are_indexed_on_catch_up(
+        self, app: Flask, seed_form: FormDict
+    ) -> None:
+        with app.app_context():
+            db.session.execute(
+                insert(Label),
+                [
+                    {
+                        "product_name": "Olynth 0,1%",
+                        "form": "tbl",
+                        "amount": 1,
+                        "price": 1,
+                    }
+                ],
+            )
+            db.session.commit()
+            assert index_missing_labels() == 1
+            assert index_missing_labels() == 0
+            count = db.session.execute(
+                select(func.count()).select_from(LabelTrigram)
+            ).scalar_one()
+            assert count == len(name_trigrams("Olynth 0,1%"))
+
+    def test_postings_are_removed_with_label(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.delete(f"/labels/api/label/{seed_label['id']}")
+        with app.app_context():
+            count = db.session.execute(
+                select(func.count()).select_from(LabelTrigram)
+            ).scalar_one()
+            assert count == 0
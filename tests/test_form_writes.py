@@ -0,0 +1,204 @@
+"""Tests for set-based form rename and merge."""
+
+import json
+from typing import Any, cast
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.db import db
+from app.form_writes import merge_forms
+from app.models import Form, FormDict, Label, LabelDict
+from app.pdf_generator import layout_key
+from app.write_queue import run_write
+from tests.conftest import LabelFactory
+
+
+def _labels(client: FlaskClient) -> dict[int, LabelDict]:
+    labels = client.get("/labels/api/labels").get_json()["labels"]
+    return {label["id"]: label for label in labels}
+
+
+@pytest.fixture()
+def second_form(client: FlaskClient, seed_form: FormDict) -> FormDict:
+    resp = client.post(
+        "/api/form",
+        json={"name": "Tbl. obalené", "short_name": "tbl obal", "unit": "ks"},
+    )
+    assert resp.status_code == 201
+    return cast(FormDict, resp.get_json()["form"])
+
+
+def _merge(client: FlaskClient, **body: str) -> Any:
+    body.setdefault("source", "Tbl. obalené")
+    body.setdefault("target", "Tablety")
+    return client.post("/api/form/merge", json=body)
+
+
+class TestRenameForm:
+    def test_short_name_in_use_moves_labels(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.put(
+            "/api/form", json={"name": "Tablety", "short_name": "tab", "unit": "ks"}
+        )
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["form"]["short_name"] == "tab"
+        assert data["moved"] == 1
+
+        label = _labels(client)[seed_label["id"]]
+        assert label["form"] == "tab"
+        assert label["version"] == seed_label["version"] + 1
+        with app.app_context():
+            stored = db.session.scalar(
+                select(Label.layout_json).where(Label.id == seed_label["id"])
+            )
+        assert stored is not None
+        assert json.loads(stored)["key"] == layout_key(
+            "Paralen 500mg", "tab", 24.0, 89.5, label["unit_price"], "ks"
+        )
+
+    def test_unit_change_keeps_labels_and_versions(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.put(
+            "/api/form", json={"name": "Tablety", "short_name": "tbl", "unit": "bal"}
+        )
+        assert resp.status_code == 200
+        assert resp.get_json()["moved"] == 0
+        assert _labels(client)[seed_label["id"]]["version"] == seed_label["version"]
+
+    def test_short_name_of_other_form_is_rejected(
+        self, client: FlaskClient, second_form: FormDict, seed_label: LabelDict
+    ) -> None:
+        resp = client.put(
+            "/api/form",
+            json={"name": "Tablety", "short_name": "tbl obal", "unit": "ks"},
+        )
+        assert resp.status_code == 409
+        assert _labels(client)[seed_label["id"]]["form"] == "tbl"
+
+    def test_foreign_keys_are_checked_immediately_afterwards(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        def write() -> None:
+            from app.form_writes import rename_form
+
+            rename_form("Tablety", "tab", "ks")
+            db.session.add(Label(product_name="X", form="missing", amount=1, price=1.0))
+            db.session.flush()
+
+        with app.app_context(), pytest.raises(IntegrityError):
+            run_write(write)
+        # The failed write was rolled back as a whole
+        assert _labels(client)[seed_label["id"]]["form"] == "tbl"
+
+
+class TestMergeForms:
+    def test_moves_labels_and_deletes_source(
+        self,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        second_form: FormDict,
+        seed_label: LabelDict,
+    ) -> None:
+        moved = make_label("Ibalgin 400", form="tbl obal")
+
+        resp = _merge(client)
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert (data["moved"], data["deleted"]) == (1, 0)
+        assert data["form"]["short_name"] == "tbl"
+
+        labels = _labels(client)
+        assert labels[moved["id"]]["form"] == "tbl"
+        assert labels[moved["id"]]["version"] == moved["version"] + 1
+        assert labels[seed_label["id"]]["version"] == seed_label["version"]
+        forms = client.get("/api/form").get_json()["forms"]
+        assert [f["name"] for f in forms] == ["Tablety"]
+
+    def test_collision_fails_by_default(
+        self,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        second_form: FormDict,
+        seed_label: LabelDict,
+    ) -> None:
+        make_label(form="tbl obal")
+
+        resp = _merge(client)
+        assert resp.status_code == 409
+        assert resp.get_json()["conflicts"] == ["Paralen 500mg"]
+        assert len(_labels(client)) == 2
+        assert len(client.get("/api/form").get_json()["forms"]) == 2
+
+    @pytest.mark.parametrize(
+        ("policy", "keep"),
+        [("keep_target", "target"), ("keep_source", "source"), ("newest", "source")],
+    )
+    def test_collision_policies(
+        self,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        second_form: FormDict,
+        seed_label: LabelDict,
+        policy: str,
+        keep: str,
+    ) -> None:
+        source = make_label(form="tbl obal", price=99.0)
+
+        resp = _merge(client, on_conflict=policy)
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["deleted"] == 1
+        assert data["moved"] == (1 if keep == "source" else 0)
+
+        labels = _labels(client)
+        kept = source if keep == "source" else seed_label
+        assert list(labels) == [kept["id"]]
+        assert labels[kept["id"]]["form"] == "tbl"
+        assert labels[kept["id"]]["price"] == kept["price"]
+
+    def test_kept_label_inherits_print_mark(
+        self,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        second_form: FormDict,
+        seed_label: LabelDict,
+    ) -> None:
+        source = make_label(form="tbl obal")
+        client.post(f"/labels/api/label/{source['id']}/toggle-print")
+
+        resp = _merge(client, on_conflict="keep_target")
+        assert resp.status_code == 200
+        label = _labels(client)[seed_label["id"]]
+        assert label["marked_to_print"] is True
+        assert label["version"] == seed_label["version"] + 1
+
+    def test_unknown_policy_and_missing_form(
+        self, client: FlaskClient, second_form: FormDict
+    ) -> None:
+        assert _merge(client, on_conflict="random").status_code == 400
+        assert _merge(client, target="Tbl. obalené").status_code == 400
+        assert _merge(client, target="Sirup").status_code == 404
+        assert client.post("/api/form/merge", json={"source": "x"}).status_code == 400
+
+    def test_merge_through_write_queue(
+        self, app: Flask, make_label: LabelFactory, second_form: FormDict
+    ) -> None:
+        for i in range(20):
+            make_label(f"Lék {i}", form="tbl obal")
+
+        with app.app_context():
+            result = run_write(lambda: merge_forms("Tbl. obalené", "Tablety"))
+            assert result is not None
+            assert result["moved"] == 20
+            remaining = db.session.scalars(
+                select(Label.form).where(Label.form != "tbl")
+            ).all()
+            assert remaining == []
+            assert db.session.get(Form, "Tbl. obalené") is None
@@ -0,0 +1,242 @@
+"""Tests for supplier price-file ingestion and the watch folder."""
+
+import json
+from pathlib import Path
+from typing import cast
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.db import db
+from app.ingest import IngestReportDict, IngestWatcher, ingest_file, parse_rows
+from app.models import FormDict, Label, LabelDict
+from app.write_queue import WriteQueueTimeout
+from tests.conftest import LabelFactory
+
+HEADER = "product_name;form;amount;price;barcode\n"
+
+
+def _label(client: FlaskClient, label_id: int) -> LabelDict:
+    return cast(LabelDict, client.get(f"/labels/api/label/{label_id}").get_json())
+
+
+def _write(path: Path, *rows: str) -> Path:
+    path.write_text(HEADER + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+    return path
+
+
+@pytest.fixture()
+def labels(make_label: LabelFactory, seed_form: FormDict) -> list[LabelDict]:
+    return [
+        make_label("Acylpyrin"),
+        make_label("Brufen", price=120),
+        make_label("Coldrex", barcode="8594000000013"),
+    ]
+
+
+class TestIngestFile:
+    def test_only_changed_rows_are_written(
+        self, client: FlaskClient, labels: list[LabelDict], tmp_path: Path
+    ) -> None:
+        path = _write(
+            tmp_path / "dodavatel.csv",
+            "Acylpyrin;tbl;24;89,5;",
+            "Brufen;tbl;24;99,9;",
+            ";;24;89,5;8594000000013",
+            "Ibalgin;tbl;24;50;",
+            "Nurofen;tbl;;50;",
+        )
+        report = ingest_file(path)
+
+        assert report is not None
+        assert report["rows"] == 5
+        assert (report["updated"], report["unchanged"], report["seen"]) == (1, 2, 0)
+        assert (report["unmatched"], report["invalid"]) == (1, 1)
+        assert report["label_ids"] == [labels[1]["id"]]
+        assert report["errors"] == ["Record 5: missing amount"]
+
+        brufen = _label(client, labels[1]["id"])
+        assert brufen["price"] == 99.9
+        assert brufen["unit_price"] == pytest.approx(99.9 / 24, abs=0.01)
+        assert brufen["marked_to_print"] is True
+        assert brufen["version"] == labels[1]["version"] + 1
+        label = db.session.get(Label, labels[1]["id"])
+        assert label is not None and "99,90" in label.layout_json
+        acylpyrin = _label(client, labels[0]["id"])
+        assert acylpyrin["version"] == labels[0]["version"]
+        assert acylpyrin["marked_to_print"] is False
+        # The list payload cache sees the change
+        listed = client.get("/labels/api/labels").get_json()["labels"]
+        assert {row["product_name"]: row["price"] for row in listed}["Brufen"] == 99.9
+
+    def test_same_contents_are_skipped(
+        self, labels: list[LabelDict], tmp_path: Path
+    ) -> None:
+        path = _write(tmp_path / "a.csv", "Brufen;tbl;24;99,9;")
+        assert ingest_file(path) is not None
+        assert ingest_file(path) is None
+        copy = tmp_path / "copy.csv"
+        copy.write_bytes(path.read_bytes())
+        assert ingest_file(copy) is None
+
+    def test_rows_seen_before_are_skipped(
+        self, client: FlaskClient, labels: list[LabelDict], tmp_path: Path
+    ) -> None:
+        rows = ["Acylpyrin;tbl;24;89,5;", "Brufen;tbl;24;120;", "Ibalgin;tbl;24;50;"]
+        assert ingest_file(_write(tmp_path / "v1.csv", *rows)) is not None
+        # Changed by hand after the first list
+        client.put(f"/labels/api/label/{labels[0]['id']}", json={"price": 79})
+
+        rows[1] = "Brufen;tbl;24;125;"
+        report = ingest_file(_write(tmp_path / "v2.csv", *rows))
+
+        assert report is not None
+        assert (report["seen"], report["updated"], report["unmatched"]) == (1, 1, 1)
+        assert _label(client, labels[0]["id"])["price"] == 79
+        assert _label(client, labels[1]["id"])["price"] == 125
+
+    def test_amount_change_by_barcode(
+        self,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        labels: list[LabelDict],
+        tmp_path: Path,
+    ) -> None:
+        make_label("Coldrex", amount=12)
+        path = _write(
+            tmp_path / "a.csv",
+            ";;48;150;8594000000013",
+            f"{labels[0]['id']};;12;89,5;",
+        )
+        path.write_text(
+            path.read_text().replace("product_name", "id", 1), encoding="utf-8"
+        )
+        report = ingest_file(path)
+
+        assert report is not None
+        assert (report["updated"], report["conflicts"]) == (2, 0)
+        assert _label(client, labels[0]["id"])["amount"] == 12
+        coldrex = _label(client, labels[2]["id"])
+        assert (coldrex["amount"], coldrex["price"]) == (48, 150)
+
+        # Would collide with the 12-piece Coldrex created above
+        conflict = _write(tmp_path / "b.csv", ";;12;150;8594000000013")
+        report = ingest_file(conflict)
+        assert report is not None
+        assert (report["updated"], report["conflicts"]) == (0, 1)
+        assert "already has it" in report["errors"][0]
+        assert _label(client, labels[2]["id"])["amount"] == 48
+
+    def test_edited_export_round_trip(
+        self, client: FlaskClient, labels: list[LabelDict], tmp_path: Path
+    ) -> None:
+        exported = client.get("/labels/api/labels/export/csv").get_data().decode()
+        path = tmp_path / "labels.csv"
+        path.write_text(exported.replace(";120;", ";110;"), encoding="utf-8")
+
+        report = ingest_file(path)
+
+        assert report is not None
+        assert report["updated"] == 1
+        assert report["unchanged"] == 2
+        assert _label(client, labels[1]["id"])["price"] == 110
+
+    def test_json_file(self, labels: list[LabelDict], tmp_path: Path) -> None:
+        path = tmp_path / "a.json"
+        path.write_text(
+            json.dumps({"labels": [{"id": labels[0]["id"], "amount": 24, "price": 1}]})
+        )
+        report = ingest_file(path)
+        assert report is not None and report["label_ids"] == [labels[0]["id"]]
+
+
+def test_parse_rows() -> None:
+    rows, errors = parse_rows(
+        [
+            {"product_name": "A", "form": "tbl", "amount": "24", "price": "1 234,50"},
+            {"product_name": "A", "form": "tbl", "amount": "24", "price": "1"},
+            {"product_name": "B", "form": "tbl", "amount": "0", "price": "1"},
+            {"amount": "1", "price": "1"},
+            {"id": "x", "amount": "1", "price": "1"},
+        ]
+    )
+    assert [row.price for row in rows] == [1234.5]
+    assert errors == [
+        "Record 2: same label as record 1",
+        "Record 3: amount must be greater than 0",
+        "Record 4: needs id, barcode, or product_name and form",
+        "Record 5: invalid id 'x'",
+    ]
+
+
+def test_watcher_applies_new_files_once(
+    app: Flask, client: FlaskClient, labels: list[LabelDict], tmp_path: Path
+) -> None:
+    _write(tmp_path / "cenik.csv", "Brufen;tbl;24;99;")
+    (tmp_path / "~$cenik.csv").write_text("lock")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    assert IngestWatcher(app, tmp_path, settle_seconds=3600).scan_now() == []
+
+    watcher = IngestWatcher(app, tmp_path, settle_seconds=0)
+    reports = watcher.scan_now()
+    assert [report["file"] for report in reports] == ["cenik.csv"]
+    saved = list((tmp_path / "reports").glob("cenik-*.json"))
+    assert len(saved) == 1
+    assert json.loads(saved[0].read_text())["updated"] == 1
+    assert watcher.scan_now() == []
+    assert _label(client, labels[1]["id"])["price"] == 99
+
+
+def test_watcher_survives_bad_files(
+    app: Flask, labels: list[LabelDict], tmp_path: Path
+) -> None:
+    (tmp_path / "broken.json").write_text("{")
+    _write(tmp_path / "cenik.csv", "Brufen;tbl;24;99;")
+    watcher = IngestWatcher(app, tmp_path, settle_seconds=0)
+    reports = watcher.scan_now()
+    assert [report["file"] for report in reports] == ["cenik.csv"]
+    # A broken file is not parsed again until it changes
+    assert watcher.scan_now() == []
+    assert tmp_path / "broken.json" in watcher._handled
+
+
+def test_watcher_retries_failed_writes(
+    app: Flask,
+    client: FlaskClient,
+    labels: list[LabelDict],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    _write(tmp_path / "cenik.csv", "Brufen;tbl;24;99;")
+    attempts: list[Path] = []
+
+    def locked_once(path: Path) -> IngestReportDict | None:
+        attempts.append(path)
+        if len(attempts) == 1:
+            raise WriteQueueTimeout("database is locked")
+        return ingest_file(path)
+
+    monkeypatch.setattr("app.ingest.ingest_file", locked_once)
+    watcher = IngestWatcher(app, tmp_path, settle_seconds=0)
+
+    assert watcher.scan_now() == []
+    assert _label(client, labels[1]["id"])["price"] == 120
+    # The file is unchanged, yet the next poll applies it
+    assert [report["updated"] for report in watcher.scan_now()] == [1]
+    assert _label(client, labels[1]["id"])["price"] == 99
+    assert watcher.scan_now() == []
+    assert len(attempts) == 2
+
+
+def test_cli(app: Flask, labels: list[LabelDict], tmp_path: Path) -> None:
+    path = _write(tmp_path / "cenik.csv", "Brufen;tbl;24;99;", "Ibalgin;tbl;1;1;")
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["ingest", str(path)])
+    assert result.exit_code == 0, result.output
+    assert "1 updated" in result.output
+    assert "1 unmatched" in result.output
+    again = runner.invoke(args=["ingest", str(path)])
+    assert "already ingested" in again.output
@@ -0,0 +1,40 @@
+"""Tests for app/json_provider.py — orjson/stdlib encoders behave the same."""
+
+import importlib.util
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from app.json_provider import FastJSONProvider
+
+_HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+
+
+@pytest.mark.parametrize(
+    "use_orjson",
+    [
+        False,
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(not _HAS_ORJSON, reason="orjson not installed"),
+        ),
+    ],
+)
+def test_encoders_round_trip(app: Flask, use_orjson: bool) -> None:
+    provider = FastJSONProvider(app, use_orjson=use_orjson)
+    data = {"b": 1, "a": "Kápky", "when": datetime(2026, 3, 1, 12, 0)}
+
+    decoded = provider.loads(provider.dumps_bytes(data))
+
+    assert decoded["a"] == "Kápky"
+    assert decoded["b"] == 1
+    assert decoded["when"] == "Sun, 01 Mar 2026 12:00:00 GMT"
+    assert provider.dumps_bytes({"b": 1, "a": 2}).startswith(b'{"a"')
+
+
+def test_jsonify_uses_installed_provider(app: Flask) -> None:
+    assert isinstance(app.json, FastJSONProvider)
+    with app.test_request_context():
+        resp = app.json.response({"status": "ok"})
+    assert resp.get_json() == {"status": "ok"}
@@ -0,0 +1,233 @@
+"""Tests for bulk delete, the label archive and restore."""
+
+from datetime import datetime
+from typing import Any, cast
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import func, select, update
+
+from app.db import db
+from app.models import FormDict, Label, LabelArchive, LabelDict, LabelTrigram
+from tests.conftest import LabelFactory
+
+
+def _label_names(client: FlaskClient) -> list[str]:
+    labels = client.get("/labels/api/labels").get_json()["labels"]
+    return [label["product_name"] for label in labels]
+
+
+def _archive(client: FlaskClient) -> dict[str, Any]:
+    return cast(dict[str, Any], client.get("/labels/api/archive").get_json())
+
+
+@pytest.fixture()
+def labels(make_label: LabelFactory, seed_form: FormDict) -> list[LabelDict]:
+    return [make_label(name) for name in ("Acylpyrin", "Brufen", "Coldrex")]
+
+
+def _set_updated_at(app: Flask, label_id: int, value: datetime) -> None:
+    with app.app_context():
+        db.session.execute(
+            update(Label).where(Label.id == label_id).values(updated_at=value)
+        )
+        db.session.commit()
+
+
+class TestBulkDelete:
+    def test_delete_by_ids(
+        self, app: Flask, client: FlaskClient, labels: list[LabelDict]
+    ) -> None:
+        ids = [labels[0]["id"], labels[2]["id"]]
+        resp = client.post("/labels/api/labels/delete", json={"ids": ids})
+        assert resp.status_code == 200
+        assert resp.get_json()["count"] == 2
+        assert _label_names(client) == ["Brufen"]
+        with app.app_context():
+            indexed = db.session.scalars(select(LabelTrigram.label_id).distinct())
+            assert set(indexed) == {labels[1]["id"]}
+        # Deleted names are gone from the search index as well
+        found = client.get("/labels/api/labels/search?q=acyl").get_json()
+        assert found["labels"] == []
+
+    def test_delete_by_filter(
+        self,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        labels: list[LabelDict],
+        seed_form: FormDict,
+    ) -> None:
+        client.post(
+            "/api/form", json={"name": "Sirup", "short_name": "sir", "unit": "ml"}
+        )
+        make_label("Stoptussin", form="sir")
+
+        resp = client.post("/labels/api/labels/delete", json={"form": "tbl"})
+        assert resp.get_json()["count"] == 3
+        assert _label_names(client) == ["Stoptussin"]
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {},
+            {"ids": []},
+            {"ids": ["1"]},
+            {"ids": True},
+            {"form": ""},
+            {"not_updated_since": "yesterday"},
+        ],
+    )
+    def test_invalid_selection(
+        self, client: FlaskClient, labels: list[LabelDict], body: dict[str, Any]
+    ) -> None:
+        resp = client.post("/labels/api/labels/delete", json=body)
+        assert resp.status_code == 400
+        assert len(_label_names(client)) == 3
+
+
+class TestArchive:
+    def test_archive_stale_labels(
+        self, app: Flask, client: FlaskClient, labels: list[LabelDict]
+    ) -> None:
+        _set_updated_at(app, labels[0]["id"], datetime(2020, 1, 1))
+        _set_updated_at(app, labels[1]["id"], datetime(2020, 6, 1))
+
+        resp = client.post(
+            "/labels/api/labels/archive", json={"not_updated_since": "2021-01-01"}
+        )
+        assert resp.status_code == 200
+        assert resp.get_json()["count"] == 2
+        assert _label_names(client) == ["Coldrex"]
+
+        archive = _archive(client)
+        assert archive["total"] == 2
+        assert {a["label_id"] for a in archive["labels"]} == {
+            labels[0]["id"],
+            labels[1]["id"],
+        }
+        entry = next(a for a in archive["labels"] if a["product_name"] == "Brufen")
+        assert (entry["form"], entry["amount"], entry["price"]) == ("tbl", 24, 89.5)
+
+    def test_marked_labels_stay(
+        self, client: FlaskClient, labels: list[LabelDict]
+    ) -> None:
+        client.post(f"/labels/api/label/{labels[0]['id']}/toggle-print")
+        resp = client.post("/labels/api/labels/archive", json={"form": "tbl"})
+        assert resp.get_json()["count"] == 2
+        assert _label_names(client) == ["Acylpyrin"]
+
+    def test_search_archive(self, client: FlaskClient, labels: list[LabelDict]) -> None:
+        client.post("/labels/api/labels/archive", json={"form": "tbl"})
+        found = client.get("/labels/api/archive?q=bru").get_json()["labels"]
+        assert [a["product_name"] for a in found] == ["Brufen"]
+        assert client.get("/labels/api/archive?q=xyz").get_json()["labels"] == []
+
+
+class TestRestore:
+    def test_restore_keeps_id_and_bumps_version(
+        self, app: Flask, client: FlaskClient, labels: list[LabelDict]
+    ) -> None:
+        client.post("/labels/api/labels/archive", json={"ids": [labels[1]["id"]]})
+        archived = _archive(client)["labels"][0]
+
+        resp = client.post(
+            "/labels/api/archive/restore", json={"ids": [archived["id"]]}
+        )
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["restored"] == 1
+        assert data["label_ids"] == [labels[1]["id"]]
+        assert data["skipped"] == []
+        assert _archive(client)["total"] == 0
+
+        restored = client.get(f"/labels/api/label/{labels[1]['id']}").get_json()
+        assert restored["product_name"] == "Brufen"
+        assert restored["version"] == labels[1]["version"] + 1
+        assert restored["marked_to_print"] is False
+        with app.app_context():
+            label = db.session.get(Label, labels[1]["id"])
+            assert label is not None and label.layout_json is not None
+            postings = db.session.scalar(
+                select(func.count()).where(LabelTrigram.label_id == label.id)
+            )
+            assert postings
+        found = client.get("/labels/api/labels/search?q=brufen").get_json()
+        assert [label["id"] for label in found["labels"]] == [labels[1]["id"]]
+
+    def test_restore_gets_new_id_when_old_one_was_reused(
+        self, client: FlaskClient, make_label: LabelFactory, labels: list[LabelDict]
+    ) -> None:
+        last = labels[2]
+        client.post("/labels/api/labels/archive", json={"ids": [last["id"]]})
+        # SQLite reuses the highest free rowid
+        reused = make_label("Dymista")
+        assert reused["id"] == last["id"]
+
+        archived = _archive(client)["labels"][0]
+        data = client.post(
+            "/labels/api/archive/restore", json={"ids": [archived["id"]]}
+        ).get_json()
+        assert data["restored"] == 1
+        assert data["label_ids"][0] > reused["id"]
+        assert sorted(_label_names(client)) == [
+            "Acylpyrin",
+            "Brufen",
+            "Coldrex",
+            "Dymista",
+        ]
+
+    def test_skipped_labels_are_reported(
+        self, client: FlaskClient, make_label: LabelFactory, labels: list[LabelDict]
+    ) -> None:
+        client.post("/labels/api/labels/archive", json={"form": "tbl"})
+        by_name = {a["product_name"]: a["id"] for a in _archive(client)["labels"]}
+        make_label("Brufen")
+
+        data = client.post(
+            "/labels/api/archive/restore",
+            json={"ids": [by_name["Acylpyrin"], by_name["Brufen"], 999999]},
+        ).get_json()
+        assert data["restored"] == 1
+        assert sorted((s["id"], s["reason"]) for s in data["skipped"]) == sorted(
+            [(by_name["Brufen"], "exists"), (999999, "not_found")]
+        )
+        assert _archive(client)["total"] == 2
+
+    def test_form_rename_follows_archive(
+        self, app: Flask, client: FlaskClient, labels: list[LabelDict]
+    ) -> None:
+        client.post("/labels/api/labels/archive", json={"ids": [labels[0]["id"]]})
+        client.put(
+            "/api/form", json={"name": "Tablety", "short_name": "tab", "unit": "ks"}
+        )
+
+        archived = _archive(client)["labels"][0]
+        assert archived["form"] == "tab"
+        data = client.post(
+            "/labels/api/archive/restore", json={"ids": [archived["id"]]}
+        ).get_json()
+        assert data["restored"] == 1
+
+    def test_missing_form_is_skipped(
+        self, app: Flask, client: FlaskClient, labels: list[LabelDict]
+    ) -> None:
+        client.post("/labels/api/labels/archive", json={"form": "tbl"})
+        assert client.delete("/api/form", json={"name": "Tablety"}).status_code == 200
+        ids = [a["id"] for a in _archive(client)["labels"]]
+
+        data = client.post("/labels/api/archive/restore", json={"ids": ids}).get_json()
+        assert data["restored"] == 0
+        assert {s["reason"] for s in data["skipped"]} == {"form_missing"}
+
+
+def test_purge_archived(
+    app: Flask, client: FlaskClient, labels: list[LabelDict]
+) -> None:
+    client.post("/labels/api/labels/archive", json={"form": "tbl"})
+    ids = [a["id"] for a in _archive(client)["labels"]]
+
+    resp = client.post("/labels/api/archive/delete", json={"ids": ids[:2]})
+    assert resp.get_json()["count"] == 2
+    with app.app_context():
+        assert db.session.scalar(select(func.count(LabelArchive.id))) == 1
@@ -0,0 +1,131 @@
+"""Tests for the streaming CSV and XLSX label export."""
+
+import csv
+import io
+import re
+import zipfile
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.label_export import (
+    EXPORT_COLUMNS,
+    iter_export_chunks,
+    select_export_rows,
+    stream_csv,
+)
+from app.models import FormDict
+from render_batch import load_from_file
+from tests.conftest import LabelFactory
+
+
+def _csv_rows(client: FlaskClient, query: str = "") -> list[list[str]]:
+    resp = client.get(f"/labels/api/labels/export/csv{query}")
+    assert resp.status_code == 200
+    text = resp.get_data().decode()
+    assert text.startswith("\ufeff")
+    return list(csv.reader(io.StringIO(text[1:]), delimiter=";"))
+
+
+@pytest.fixture()
+def labels(
+    client: FlaskClient, make_label: LabelFactory, seed_form: FormDict
+) -> list[int]:
+    ids = [
+        make_label("Coldrex", price=120.0)["id"],
+        make_label("Acylpyrin 500", amount=10, price=35.9)["id"],
+        make_label("Brufen; sirup", barcode="8594000000013")["id"],
+    ]
+    client.post(f"/labels/api/label/{ids[1]}/toggle-print")
+    return ids
+
+
+class TestCsv:
+    def test_rows_and_header(self, client: FlaskClient, labels: list[int]) -> None:
+        resp = client.get("/labels/api/labels/export/csv")
+        assert resp.is_streamed
+        assert resp.mimetype == "text/csv"
+        assert "attachment" in resp.headers["Content-Disposition"]
+
+        rows = _csv_rows(client)
+        assert tuple(rows[0]) == EXPORT_COLUMNS
+        assert [row[1] for row in rows[1:]] == [
+            "Acylpyrin 500",
+            "Brufen; sirup",
+            "Coldrex",
+        ]
+        acylpyrin = dict(zip(EXPORT_COLUMNS, rows[1], strict=True))
+        assert acylpyrin["id"] == str(labels[1])
+        assert (acylpyrin["form"], acylpyrin["unit"]) == ("tbl", "ks")
+        assert (acylpyrin["amount"], acylpyrin["price"]) == ("10", "35,9")
+        assert acylpyrin["marked_to_print"] == "1"
+        assert re.fullmatch(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d", acylpyrin["created_at"])
+        assert rows[2][7] == "8594000000013"
+
+    def test_filters_and_sort(self, client: FlaskClient, labels: list[int]) -> None:
+        marked = _csv_rows(client, "?print=marked")
+        assert [row[1] for row in marked[1:]] == ["Acylpyrin 500"]
+        unmarked = _csv_rows(client, "?print=unmarked&sort=date")
+        assert [row[1] for row in unmarked[1:]] == ["Brufen; sirup", "Coldrex"]
+        found = _csv_rows(client, "?q=bruf")
+        assert [row[1] for row in found[1:]] == ["Brufen; sirup"]
+        assert _csv_rows(client, "?q=xyz")[1:] == []
+
+    def test_empty_catalogue(self, client: FlaskClient) -> None:
+        assert _csv_rows(client) == [list(EXPORT_COLUMNS)]
+
+
+def test_xlsx_workbook(client: FlaskClient, labels: list[int]) -> None:
+    resp = client.get("/labels/api/labels/export/xlsx?sort=marked")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.headers["Content-Disposition"].endswith('filename="labels.xlsx"')
+
+    with zipfile.ZipFile(io.BytesIO(resp.get_data())) as workbook:
+        assert workbook.testzip() is None
+        assert "xl/workbook.xml" in workbook.namelist()
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+    names = re.findall(r"<c t=\"inlineStr\"><is><t[^>]*>([^<]*)</t>", sheet)
+    assert sheet.count("<row>") == 4
+    assert "Brufen; sirup" in names
+    # Marked labels first, like the list sorted by "marked"
+    assert names.index("Acylpyrin 500") < names.index("Coldrex")
+    assert "<v>35.9</v>" in sheet
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/labels/api/labels/export/pdf", "/labels/api/labels/export/csv?print=some"],
+)
+def test_bad_request(client: FlaskClient, url: str) -> None:
+    assert client.get(url).status_code == 400
+
+
+def test_rows_come_in_chunks(
+    app: Flask, make_label: LabelFactory, seed_form: FormDict
+) -> None:
+    for i in range(7):
+        make_label(f"Produkt {i}")
+    with app.app_context():
+        chunks = list(iter_export_chunks(select_export_rows(), chunk_rows=3))
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        encoded = list(stream_csv(chunks))
+    assert len(encoded) == 4
+    assert b"Produkt 6" in encoded[-1]
+
+
+def test_csv_feeds_batch_rendering(
+    client: FlaskClient, labels: list[int], tmp_path: Path
+) -> None:
+    path = tmp_path / "labels.csv"
+    path.write_bytes(client.get("/labels/api/labels/export/csv").get_data())
+
+    loaded = load_from_file(path)
+    assert [(label["product_name"], label["price"]) for label in loaded] == [
+        ("Acylpyrin 500", 35.9),
+        ("Brufen; sirup", 89.5),
+        ("Coldrex", 120.0),
+    ]
+    assert loaded[1]["barcode"] == "8594000000013"
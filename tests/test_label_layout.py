@@ -0,0 +1,147 @@
+"""Tests for precomputed label layouts — storage, refresh on writes, rendering."""
+
+import json
+from io import BytesIO
+from typing import Any
+
+from flask import Flask
+from flask.testing import FlaskClient
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas as pdf_canvas
+
+from app.db import db
+from app.label_layout import MAX_FIT_VARIANTS, compute_layout_json
+from app.models import Label, LabelDict
+from app.pdf_generator import LabelPDFGenerator, PdfLabelData, fit_key
+from app.utils import FontSettings
+from tests.conftest import LabelFactory
+
+
+def _stored_layout(app: Flask, label_id: int) -> dict[str, Any]:
+    with app.app_context():
+        label = db.session.get(Label, label_id)
+        assert label is not None and label.layout_json
+        return dict(json.loads(label.layout_json))
+
+
+def _render(label: PdfLabelData) -> bytes:
+    buf = BytesIO()
+    c = pdf_canvas.Canvas(buf, pagesize=A4, invariant=1)
+    LabelPDFGenerator(32, 14).draw_label(c, 10, 10, label)
+    c.save()
+    return buf.getvalue()
+
+
+class TestStoredLayout:
+    def test_create_stores_layout_for_current_settings(
+        self, app: Flask, seed_label: LabelDict
+    ) -> None:
+        layout = _stored_layout(app, seed_label["id"])
+        assert layout["lines"] == ["Paralen 500mg", "tbl 24 ks"]
+        assert layout["price_text"] == "89,50 Kč"
+        assert layout["unit_price_text"] == "1 ks = 3,73 Kč"
+        assert list(layout["fits"]) == [fit_key(32, 14)]
+
+    def test_update_label_refreshes_layout(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.put(f"/labels/api/label/{seed_label['id']}", json={"price": 120})
+        assert _stored_layout(app, seed_label["id"])["price_text"] == "120,- Kč"
+
+    def test_update_form_refreshes_its_labels(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.put(
+            "/api/form", json={"name": "Tablety", "short_name": "tbl", "unit": "tbl"}
+        )
+        layout = _stored_layout(app, seed_label["id"])
+        assert layout["lines"][1] == "tbl 24 tbl"
+        assert layout["unit_price_text"].startswith("1 tbl =")
+
+    def test_font_change_leaves_stored_layouts(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.post(
+            "/labels/api/pdf-font-settings",
+            json={"price_font_size": 40, "text_font_size": 10},
+        )
+        assert resp.status_code == 200
+        fits = _stored_layout(app, seed_label["id"])["fits"]
+        assert list(fits) == [fit_key(32, 14)]
+
+    def test_print_adds_fit_to_printed_labels_only(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        seed_label: LabelDict,
+    ) -> None:
+        other = make_label("Ibalgin 400")
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+
+        resp = client.get("/labels/api/labels/pdf?price_font_size=40&text_font_size=10")
+        assert resp.status_code == 200
+        fits = _stored_layout(app, seed_label["id"])["fits"]
+        assert list(fits) == [fit_key(32, 14), fit_key(40, 10)]
+        assert list(_stored_layout(app, other["id"])["fits"]) == [fit_key(32, 14)]
+
+
+class TestComputeLayout:
+    args = ("Paralen 500mg", "tbl", 24.0, 89.5, 3.73, "ks")
+
+    def test_fit_variants_are_bounded(self) -> None:
+        layout_json = None
+        for size in range(20, 20 + MAX_FIT_VARIANTS + 2):
+            settings = FontSettings(price_font_size=size, text_font_size=10)
+            layout_json = compute_layout_json(
+                *self.args, previous_json=layout_json, font_settings=settings
+            )
+        assert layout_json is not None
+        fits = json.loads(layout_json)["fits"]
+        assert len(fits) == MAX_FIT_VARIANTS
+        assert list(fits)[-1] == fit_key(20 + MAX_FIT_VARIANTS + 1, 10)
+
+    def test_changed_values_discard_old_fits(self) -> None:
+        settings = FontSettings(price_font_size=30, text_font_size=10)
+        old = compute_layout_json(*self.args, font_settings=settings)
+        new_settings = FontSettings(price_font_size=34, text_font_size=10)
+        new = compute_layout_json(
+            "Paralen 500mg", "tbl", 24.0, 99.0, 4.13, "ks", old, new_settings
+        )
+        assert list(json.loads(new)["fits"]) == [fit_key(34, 10)]
+
+
+class TestRenderWithLayout:
+    label = PdfLabelData(
+        product_name="Stoptussin kapky 25 ml perorální roztok",
+        form="kap",
+        amount=25,
+        price=149.9,
+        unit_price=6.0,
+        unit="ml",
+    )
+
+    def test_stored_layout_renders_identically(self) -> None:
+        settings = FontSettings(price_font_size=32, text_font_size=14)
+        with_layout = PdfLabelData(
+            **self.label,
+            layout_json=compute_layout_json(
+                "Stoptussin kapky 25 ml perorální roztok",
+                "kap",
+                25,
+                149.9,
+                6.0,
+                "ml",
+                font_settings=settings,
+            ),
+        )
+        assert _render(with_layout) == _render(self.label)
+
+    def test_stale_layout_is_ignored(self) -> None:
+        settings = FontSettings(price_font_size=32, text_font_size=14)
+        stale = compute_layout_json(
+            "Něco jiného", "kap", 25, 1.0, 0.04, "ml", font_settings=settings
+        )
+        assert _render(PdfLabelData(**self.label, layout_json=stale)) == _render(
+            self.label
+        )
@@ -0,0 +1,216 @@
+"""Tests for the label output backends (PDF, ZPL, raster) and print job sinks."""
+
+import socket
+import threading
+from collections.abc import Generator
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from PIL import Image
+
+from app.db import db
+from app.label_output import (
+    BACKENDS,
+    RasterBackend,
+    ZplBackend,
+    get_backend,
+    open_sink,
+)
+from app.models import Label, LabelDict
+from app.pdf_generator import LabelPDFGenerator, PdfLabelData
+from render_batch import render_batch
+
+
+def _label(name: str = "Paralen 500mg", price: float = 89.5) -> PdfLabelData:
+    return PdfLabelData(
+        product_name=name,
+        form="tbl",
+        amount=24.0,
+        price=price,
+        unit_price=3.73,
+        unit="ks",
+    )
+
+
+class DummyPrinter:
+    """TCP listener that collects one raw print job, like port 9100 of a printer."""
+
+    def __init__(self) -> None:
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.received = b""
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        connection, _address = self.server.accept()
+        with connection:
+            while chunk := connection.recv(65536):
+                self.received += chunk
+
+    def wait(self) -> bytes:
+        self._thread.join(timeout=5)
+        return self.received
+
+    @property
+    def url(self) -> str:
+        return f"tcp://127.0.0.1:{self.port}"
+
+
+@pytest.fixture()
+def printer() -> Generator[DummyPrinter, None, None]:
+    dummy = DummyPrinter()
+    yield dummy
+    dummy.server.close()
+
+
+class TestSharedLayout:
+    def test_placements_follow_the_three_zones(self) -> None:
+        generator = LabelPDFGenerator(34, 10)
+        *lines, price, unit_price = generator.place_label(_label())
+        assert [line.text for line in lines] == ["Paralen 500mg", "tbl 24 ks"]
+        assert price.text == "89,50 Kč"
+        assert unit_price.text == "1 ks = 3,73 Kč"
+        height = LabelPDFGenerator.LABEL_HEIGHT
+        assert all(line.baseline > height * 0.70 for line in lines)
+        assert height * 0.30 < price.baseline < height * 0.70
+        assert unit_price.baseline < height * 0.30
+
+    def test_all_backends_print_the_same_strings(self) -> None:
+        zpl = get_backend("zpl").render([_label()]).decode("utf-8")
+        for text in ("Paralen 500mg", "tbl 24 ks", "89,50 Kč", "1 ks = 3,73 Kč"):
+            assert f"^FD{text}^FS" in zpl
+
+
+class TestZplBackend:
+    def test_one_format_per_label(self) -> None:
+        job = ZplBackend().render([_label(), _label("Ibalgin 400")])
+        assert job.count(b"^XA") == job.count(b"^XZ") == 2
+
+    @pytest.mark.parametrize(("dpi", "width"), [(203, 384), (300, 567)])
+    def test_label_width_in_dots(self, dpi: int, width: int) -> None:
+        job = ZplBackend(dpi=dpi).render([_label()])
+        assert f"^PW{width}".encode() in job
+
+    def test_control_characters_are_escaped(self) -> None:
+        job = ZplBackend().render([_label("Krém ^XZ ~JA")]).decode("utf-8")
+        assert "^FDKrém _5EXZ _7EJA" in job
+        assert job.count("^XZ") == 1
+
+    def test_unsupported_dpi(self) -> None:
+        with pytest.raises(ValueError, match="600 dpi"):
+            get_backend("zpl", dpi=600)
+
+
+class TestRasterBackend:
+    def test_frames_are_one_bit_pbm(self) -> None:
+        backend = RasterBackend(dpi=203)
+        job = backend.render([_label(), _label()])
+        frame_size = len(job) // 2
+        image = Image.open(BytesIO(job[:frame_size]))
+        assert image.mode == "1"
+        assert image.size == (backend.width, backend.height) == (384, 280)
+
+    def test_price_zone_is_inked(self) -> None:
+        backend = RasterBackend(dpi=300)
+        image = backend.label_image(backend.generator.place_label(_label()))
+        price_band = image.crop(
+            (0, int(backend.height * 0.3), backend.width, int(backend.height * 0.7))
+        )
+        # histogram()[0] counts black dots: ink in the middle zone, none in the margin
+        assert price_band.histogram()[0] > 0
+        assert image.crop((0, 0, 5, backend.height)).histogram()[0] == 0
+
+
+class TestBackendRegistry:
+    def test_registered_formats(self) -> None:
+        assert set(BACKENDS) == {"pdf", "zpl", "raster"}
+
+    def test_pdf_backend_wraps_generator(self) -> None:
+        assert get_backend("pdf").render([_label()]).startswith(b"%PDF")
+
+    def test_unknown_format(self) -> None:
+        with pytest.raises(ValueError, match="Unknown output format"):
+            get_backend("epl")
+
+
+class TestSinks:
+    def test_file_sink(self, tmp_path: Path) -> None:
+        path = tmp_path / "job.zpl"
+        with open_sink(str(path)) as sink:
+            ZplBackend().write([_label()], sink)
+        assert path.read_bytes().startswith(b"^XA")
+
+    def test_socket_sink_streams_to_listener(self, printer: DummyPrinter) -> None:
+        with open_sink(printer.url) as sink:
+            count = ZplBackend().write([_label()] * 3, sink)
+        assert count == 3
+        assert printer.wait().count(b"^XZ") == 3
+
+    def test_unreachable_printer(self) -> None:
+        with socket.create_server(("127.0.0.1", 0)) as probe:
+            port = probe.getsockname()[1]
+        with pytest.raises(OSError), open_sink(f"tcp://127.0.0.1:{port}", timeout=1):
+            pass
+
+
+class TestOutputRoutes:
+    def test_download_zpl(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        resp = client.get("/labels/api/labels/output/zpl?dpi=300")
+        assert resp.status_code == 200
+        assert resp.mimetype == "application/vnd.zebra-zpl"
+        assert b"^PW567" in resp.data
+        with app.app_context():
+            label = db.session.get(Label, seed_label["id"])
+            assert label is not None
+            assert label.printed_at is not None
+
+    def test_download_rejects_unknown_format(self, client: FlaskClient) -> None:
+        assert client.get("/labels/api/labels/output/epl").status_code == 400
+        assert client.get("/labels/api/labels/output/zpl?dpi=150").status_code == 400
+
+    def test_print_job_to_dummy_printer(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        seed_label: LabelDict,
+        printer: DummyPrinter,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setitem(app.config, "LABEL_PRINTER_URL", printer.url)
+        monkeypatch.setitem(app.config, "LABEL_PRINTER_FORMAT", "raster")
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        resp = client.post("/labels/api/labels/print-job")
+        assert resp.status_code == 200
+        assert resp.get_json() == {"printed": 1, "format": "raster"}
+        assert printer.wait().startswith(b"P4\n384 280\n")
+
+    def test_print_job_without_printer(
+        self, app: Flask, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setitem(app.config, "LABEL_PRINTER_URL", "")
+        resp = client.post("/labels/api/labels/print-job")
+        assert resp.status_code == 400
+
+
+class TestBatchFormats:
+    def test_batch_writes_zpl_files(self, tmp_path: Path) -> None:
+        results = render_batch(
+            [_label(f"Lék {i}") for i in range(5)],
+            tmp_path,
+            labels_per_file=2,
+            output_format="zpl",
+            progress=False,
+        )
+        assert [r.path.name for r in results] == [
+            "labels_001.zpl",
+            "labels_002.zpl",
+            "labels_003.zpl",
+        ]
+        assert results[0].path.read_bytes().count(b"^XA") == 2
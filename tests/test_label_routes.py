@@ -220,7 +220,10 @@ class TestPrintPageAndPdfPersistence:
 
         resp = client.get("/labels/print")
         assert resp.status_code == 200
-        assert b"89,50 K\xc4\x8d" in resp.data
+
+        # Prices are shown by the lazily loaded preview pages
+        preview = client.get("/labels/api/print-preview?page=0").get_json()
+        assert preview["labels"][0]["price_text"] == "89,50 Kč"
 
     def test_generate_pdf_all_marked_persists_query_font_settings(
         self, client: FlaskClient, seed_label: LabelDict
@@ -0,0 +1,68 @@
+"""Tests for app/label_snapshot.py — compact rows, JSON payload and PDF input."""
+
+import json
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.db import db
+from app.label_snapshot import dumps_label_list, load_label_row, load_label_rows
+from app.models import FormDict, Label, LabelDict
+from app.pdf_generator import generate_labels_pdf
+
+
+class TestLoadLabelRows:
+    def test_row_json_matches_to_dict(self, app: Flask, seed_label: LabelDict) -> None:
+        with app.app_context():
+            row = load_label_row(seed_label["id"])
+            label = db.session.get(Label, seed_label["id"])
+            assert row is not None and label is not None
+            assert json.loads(row.to_json()) == label.to_dict()
+
+    def test_unit_comes_from_form(self, app: Flask, seed_label: LabelDict) -> None:
+        with app.app_context():
+            row = load_label_row(seed_label["id"])
+            assert row is not None
+            assert row.unit == "ks"
+
+    def test_marked_only(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        with app.app_context():
+            assert load_label_rows(marked_only=True) == []
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        with app.app_context():
+            rows = load_label_rows(marked_only=True)
+            assert [r.id for r in rows] == [seed_label["id"]]
+
+    def test_missing_label_returns_none(self, app: Flask) -> None:
+        with app.app_context():
+            assert load_label_row(99999) is None
+
+
+class TestDumpsLabelList:
+    def test_payload_shape(self, app: Flask, seed_label: LabelDict) -> None:
+        with app.app_context():
+            payload = json.loads(dumps_label_list(load_label_rows()))
+        assert payload["count"] == 1
+        assert payload["labels"][0]["product_name"] == "Paralen 500mg"
+
+    def test_escapes_non_ascii_and_quotes(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        name = 'Kápky "na" kašel'
+        client.post(
+            "/labels/api/label",
+            json={"product_name": name, "form": "tbl", "amount": 10, "price": 5},
+        )
+        resp = client.get("/labels/api/labels")
+        assert resp.get_json()["labels"][0]["product_name"] == name
+
+
+class TestRenderFromRows:
+    def test_generate_pdf_from_rows(self, app: Flask, seed_label: LabelDict) -> None:
+        with app.app_context():
+            rows = load_label_rows()
+        pdf = generate_labels_pdf(rows, 32, 14)
+        assert pdf is not None
+        assert pdf.read(4) == b"%PDF"
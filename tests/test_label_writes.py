@@ -0,0 +1,137 @@
+"""Tests for label versions, If-Match checks and single-statement writes."""
+
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import event, select
+
+from app.db import db
+from app.duplicates import find_similar_labels
+from app.label_writes import VersionConflict, toggle_print_mark
+from app.models import Label, LabelDict
+
+
+@pytest.fixture()
+def statements(app: Flask) -> Generator[list[str], None, None]:
+    """SQL statements sent to the database while the fixture is active."""
+    sent: list[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        sent.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield sent
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _url(label: LabelDict) -> str:
+    return f"/labels/api/label/{label['id']}"
+
+
+class TestVersions:
+    def test_new_label_starts_at_version_one(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert seed_label["version"] == 1
+        resp = client.get(_url(seed_label))
+        assert resp.get_etag() == ("1", False)
+        listed = client.get("/labels/api/labels").get_json()["labels"][0]
+        assert listed["version"] == 1
+
+    def test_every_write_bumps_the_version(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        toggled = client.post(f"{_url(seed_label)}/toggle-print").get_json()
+        assert toggled["version"] == 2
+        updated = client.put(_url(seed_label), json={"price": 99}).get_json()
+        assert updated["label"]["version"] == 3
+        client.post("/labels/api/labels/unmark-all")
+        assert client.get(_url(seed_label)).get_json()["version"] == 4
+
+
+class TestIfMatch:
+    def test_stale_update_is_rejected(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.put(_url(seed_label), json={"price": 95, "version": 1})
+        resp = client.put(_url(seed_label), json={"price": 80, "version": 1})
+        assert resp.status_code == 409
+        assert resp.get_json()["version"] == 2
+        assert client.get(_url(seed_label)).get_json()["price"] == 95
+
+    def test_matching_header_updates(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.put(
+            _url(seed_label), json={"price": 80}, headers={"If-Match": '"1"'}
+        )
+        assert resp.status_code == 200
+        assert resp.get_etag() == ("2", False)
+        assert resp.get_json()["label"]["unit_price"] == 3.33
+
+    def test_stale_toggle_is_rejected(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        url = f"{_url(seed_label)}/toggle-print"
+        assert client.post(url, headers={"If-Match": '"1"'}).status_code == 200
+        resp = client.post(url, headers={"If-Match": '"1"'})
+        assert resp.status_code == 409
+        assert client.get(_url(seed_label)).get_json()["marked_to_print"] is True
+
+    def test_star_and_missing_header_skip_the_check(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        url = f"{_url(seed_label)}/toggle-print"
+        assert client.post(url, headers={"If-Match": "*"}).status_code == 200
+        assert client.post(url).status_code == 200
+
+    @pytest.mark.parametrize("header", ['"abc"', '"1", "2"'])
+    def test_malformed_header(
+        self, client: FlaskClient, seed_label: LabelDict, header: str
+    ) -> None:
+        resp = client.put(
+            _url(seed_label), json={"price": 1}, headers={"If-Match": header}
+        )
+        assert resp.status_code == 400
+
+    def test_unknown_label_is_not_a_conflict(self, client: FlaskClient) -> None:
+        resp = client.put("/labels/api/label/999", json={"price": 1, "version": 1})
+        assert resp.status_code == 404
+
+
+class TestSingleStatementWrites:
+    def test_toggle_is_one_update_returning(
+        self, app: Flask, seed_label: LabelDict, statements: list[str]
+    ) -> None:
+        with app.app_context():
+            assert toggle_print_mark(seed_label["id"], expected_version=1) == (True, 2)
+            db.session.commit()
+        writes = [sql for sql in statements if not sql.startswith(("BEGIN", "COMMIT"))]
+        assert len(writes) == 1
+        assert writes[0].startswith("UPDATE label") and "RETURNING" in writes[0]
+
+    def test_conflict_writes_nothing(self, app: Flask, seed_label: LabelDict) -> None:
+        with app.app_context():
+            with pytest.raises(VersionConflict) as excinfo:
+                toggle_print_mark(seed_label["id"], expected_version=7)
+            db.session.rollback()
+            assert excinfo.value.current_version == 1
+            label = db.session.get(Label, seed_label["id"])
+            assert label is not None and not label.marked_to_print
+
+    def test_rename_keeps_duplicate_index_current(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.put(_url(seed_label), json={"product_name": "Ibalgin 400"})
+        with app.app_context():
+            similar = find_similar_labels("Ibalgin 400", "tbl", 24)
+            stored = db.session.scalar(
+                select(Label.layout_json).where(Label.id == seed_label["id"])
+            )
+        assert [item["id"] for item in similar] == [seed_label["id"]]
+        assert stored is not None and "Ibalgin 400" in stored
@@ -0,0 +1,57 @@
+"""Tests for the loadtest.py harness — percentiles, persona mix and a short run."""
+
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.models import LabelDict
+from loadtest import AppTransport, LoadConfig, parse_mix, percentile, run_load
+
+
+class TestPercentile:
+    def test_nearest_rank(self) -> None:
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+
+    def test_empty_list(self) -> None:
+        assert percentile([], 95) == 0.0
+
+
+class TestParseMix:
+    def test_unknown_persona_rejected(self) -> None:
+        with pytest.raises(ValueError):
+            parse_mix("browser=1,robot=2")
+
+
+class TestRunLoad:
+    def test_short_in_process_run_reports_endpoints(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        seed_label: LabelDict,
+        tmp_path: Path,
+    ) -> None:
+        # conftest points the app at this file for every test
+        font_settings = tmp_path / "fonts.json"
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        config = LoadConfig(
+            users=3,
+            duration=0.6,
+            spawn_rate=0,
+            mix="forms=1,print=2",
+            heartbeat_interval=0.1,
+            think_time=(0.01, 0.02),
+        )
+        report = run_load(lambda: AppTransport(app), config)
+
+        assert report["requests"] > 0
+        assert report["errors"] == 0
+        assert "POST /heartbeat" in report["endpoints"]
+        assert report["endpoints"]["POST /heartbeat"]["p99_ms"] >= 0
+        # run_load kept the print persona's font sizes in a file of its own
+        assert "POST /labels/api/pdf-font-settings" in report["endpoints"]
+        assert not font_settings.exists()
@@ -0,0 +1,145 @@
+"""Tests for app/payload_cache.py — versioned payload cache, ETag/304, invalidation."""
+
+import json
+import re
+from typing import Any
+
+from flask.testing import FlaskClient
+
+from app.models import FormDict, LabelDict
+from app.payload_cache import PayloadCache
+
+
+class TestPayloadCache:
+    def test_bump_invalidates_entries(self) -> None:
+        cache = PayloadCache()
+        cache.put("k", cache.version, b"{}")
+        assert cache.get("k") is not None
+        cache.bump()
+        assert cache.get("k") is None
+
+    def test_stale_build_is_not_stored(self) -> None:
+        cache = PayloadCache()
+        version = cache.version
+        cache.bump()  # a write committed while the payload was being built
+        entry = cache.put("k", version, b"{}")
+        assert entry.body == b"{}"
+        assert cache.get("k") is None
+
+    def test_table_bump_keeps_other_tables(self) -> None:
+        cache = PayloadCache()
+        cache.put("labels", cache.version, b"{}", ("label",))
+        version = cache.version
+        cache.put("forms", version, b"{}", ("form",))
+        cache.put("all", version, b"{}")
+        cache.bump(["label"])
+        assert cache.get("labels") is None
+        assert cache.get("all") is None
+        assert cache.get("forms") is not None
+        # A labels build that started before the bump is not kept
+        cache.put("labels", version, b"{}", ("label",))
+        assert cache.get("labels") is None
+
+    def test_lru_eviction(self) -> None:
+        cache = PayloadCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, cache.version, b"{}")
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+
+class TestLabelListConditionalRequests:
+    def test_etag_and_not_modified(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        first = client.get("/labels/api/labels")
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        second = client.get("/labels/api/labels", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.data == b""
+
+    def test_write_changes_etag(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        etag = client.get("/labels/api/labels").headers["ETag"]
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+
+        resp = client.get("/labels/api/labels", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+        assert resp.get_json()["labels"][0]["marked_to_print"] is True
+
+    def test_sort_modes_are_cached_separately(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        by_name = client.get("/labels/api/labels?sort=name").headers["ETag"]
+        by_date = client.get("/labels/api/labels?sort=date").headers["ETag"]
+        assert (
+            client.get(
+                "/labels/api/labels?sort=name", headers={"If-None-Match": by_name}
+            ).status_code
+            == 304
+        )
+        assert by_date
+
+
+class TestFormListConditionalRequests:
+    def test_create_form_invalidates_cache(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        first = client.get("/api/form")
+        assert len(first.get_json()["forms"]) == 1
+
+        client.post(
+            "/api/form", json={"name": "Sirup", "short_name": "sir", "unit": "ml"}
+        )
+        resp = client.get("/api/form", headers={"If-None-Match": first.headers["ETag"]})
+        assert resp.status_code == 200
+        assert len(resp.get_json()["forms"]) == 2
+
+
+def _embedded(html: str, element_id: str) -> tuple[str, Any]:
+    """ETag and parsed JSON of a payload embedded in a page."""
+    match = re.search(
+        rf'<script type="application/json" id="{element_id}" '
+        r'data-etag="([^"]+)">(.*?)</script>',
+        html,
+        re.S,
+    )
+    assert match is not None
+    return match.group(1), json.loads(match.group(2))
+
+
+class TestEmbeddedPayloads:
+    def test_label_page_embeds_api_payload(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        client.post(
+            "/labels/api/label",
+            json={
+                "product_name": "Sirup </script><b>&",
+                "form": "tbl",
+                "amount": 1,
+                "price": 10,
+            },
+        )
+        html = client.get("/labels/?sort=date").get_data(as_text=True)
+        etag, data = _embedded(html, "labelsData")
+
+        assert data["labels"][0]["product_name"] == "Sirup </script><b>&"
+        assert "</script><b>" not in html
+        # The script's first reload is answered from the same cached payload
+        resp = client.get(
+            "/labels/api/labels?sort=date", headers={"If-None-Match": f'"{etag}"'}
+        )
+        assert resp.status_code == 304
+
+    def test_forms_page_embeds_api_payload(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        etag, data = _embedded(client.get("/forms").get_data(as_text=True), "formsData")
+        assert data == client.get("/api/form").get_json()
+        resp = client.get("/api/form", headers={"If-None-Match": f'"{etag}"'})
+        assert resp.status_code == 304
@@ -0,0 +1,146 @@
+"""Tests for last-printed snapshots, the mark-changed selector and schema upgrades."""
+
+from pathlib import Path
+
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import MetaData, create_engine, inspect, text
+
+from app.db import db
+from app.models import Label, LabelDict
+from app.schema import upgrade_schema
+
+
+def _mark_changed(client: FlaskClient, **options: bool) -> int:
+    resp = client.post("/labels/api/labels/mark-changed", json=options)
+    assert resp.status_code == 200
+    return int(resp.get_json()["count"])
+
+
+def _marked_ids(client: FlaskClient) -> list[int]:
+    labels = client.get("/labels/api/labels").get_json()["labels"]
+    return [label["id"] for label in labels if label["marked_to_print"]]
+
+
+def _print_single(client: FlaskClient, label_id: int) -> None:
+    assert client.get(f"/labels/api/label/{label_id}/pdf").status_code == 200
+
+
+class TestRecordPrinted:
+    def test_single_pdf_records_snapshot(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        _print_single(client, seed_label["id"])
+        with app.app_context():
+            label = db.session.get(Label, seed_label["id"])
+            assert label is not None
+            assert label.printed_price == 89.5
+            assert label.printed_amount == 24
+            assert label.printed_form == "tbl"
+            assert label.printed_unit == "ks"
+            assert label.printed_at is not None
+
+    def test_marked_pdf_records_all_printed_labels(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        assert client.get("/labels/api/labels/pdf").status_code == 200
+        with app.app_context():
+            label = db.session.get(Label, seed_label["id"])
+            assert label is not None
+            assert label.printed_at is not None
+
+
+class TestMarkChanged:
+    def test_unprinted_labels_count_as_changed(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert _mark_changed(client) == 1
+        assert _mark_changed(client, include_unprinted=False) == 0
+
+    def test_repeated_call_leaves_marked_labels_alone(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert _mark_changed(client) == 1
+        version = client.get(f"/labels/api/label/{seed_label['id']}").get_json()[
+            "version"
+        ]
+        assert _mark_changed(client) == 0
+        assert _mark_changed(client, replace=True) == 0
+        label = client.get(f"/labels/api/label/{seed_label['id']}").get_json()
+        assert label["marked_to_print"] is True
+        assert label["version"] == version
+
+    def test_only_changed_labels_are_marked(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        other = client.post(
+            "/labels/api/label",
+            json={"product_name": "Ibalgin", "form": "tbl", "amount": 10, "price": 50},
+        ).get_json()["label"]
+        _print_single(client, seed_label["id"])
+        _print_single(client, other["id"])
+        assert _mark_changed(client) == 0
+
+        client.put(
+            f"/labels/api/label/{other['id']}",
+            json={"product_name": "Ibalgin", "form": "tbl", "amount": 10, "price": 55},
+        )
+        assert _mark_changed(client) == 1
+        assert _marked_ids(client) == [other["id"]]
+
+    def test_form_unit_change_is_detected(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        _print_single(client, seed_label["id"])
+        client.put(
+            "/api/form", json={"name": "Tablety", "short_name": "tbl", "unit": "tbl"}
+        )
+        assert _mark_changed(client) == 1
+
+    def test_replace_clears_unchanged_marks(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        _print_single(client, seed_label["id"])
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        assert _marked_ids(client) == [seed_label["id"]]
+
+        assert _mark_changed(client) == 0
+        assert _marked_ids(client) == [seed_label["id"]]
+        assert _mark_changed(client, replace=True) == 0
+        assert _marked_ids(client) == []
+
+
+class TestUpgradeSchema:
+    def test_adds_missing_columns_to_existing_table(self, tmp_path: Path) -> None:
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TABLE label (id INTEGER PRIMARY KEY, product_name VARCHAR(255) "
+                    "NOT NULL, form VARCHAR(50) NOT NULL, amount FLOAT NOT NULL, price "
+                    "FLOAT NOT NULL, unit_price FLOAT, marked_to_print BOOLEAN, "
+                    "created_at DATETIME)"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO label (product_name, form, amount, price) "
+                    "VALUES ('Paralen', 'tbl', 24, 89.5)"
+                )
+            )
+            added = upgrade_schema(conn, db.metadata)
+            assert "label.printed_price" in added
+            assert "label.printed_at" in added
+            assert upgrade_schema(conn, db.metadata) == []
+
+        columns = {c["name"] for c in inspect(engine).get_columns("label")}
+        assert {"printed_price", "printed_unit", "printed_at"} <= columns
+        engine.dispose()
+
+    def test_ignores_tables_that_do_not_exist(self, tmp_path: Path) -> None:
+        engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+        with engine.begin() as conn:
+            assert upgrade_schema(conn, MetaData()) == []
+            assert upgrade_schema(conn, db.metadata) == []
+        engine.dispose()
@@ -0,0 +1,135 @@
+"""Tests for the render_batch.py CLI — label sources, selectors and chunked output."""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.db import db
+from app.models import LabelDict
+from app.pdf_generator import PdfLabelData
+from render_batch import (
+    Selection,
+    chunked,
+    load_from_database,
+    load_from_file,
+    main,
+    render_batch,
+)
+
+
+def _pdf_data(count: int) -> list[PdfLabelData]:
+    return [
+        PdfLabelData(
+            product_name=f"Lék {i}",
+            form="tbl",
+            amount=10.0,
+            price=50.0,
+            unit_price=5.0,
+            unit="ks",
+        )
+        for i in range(count)
+    ]
+
+
+def _database_uri(app: Flask) -> str:
+    with app.app_context():
+        return db.engine.url.render_as_string(hide_password=False)
+
+
+class TestSources:
+    def test_csv_with_semicolons_and_decimal_commas(self, tmp_path: Path) -> None:
+        path = tmp_path / "labels.csv"
+        path.write_text(
+            "product_name;form;amount;price;unit\nParalen 500mg;tbl;24;89,50;ks\n",
+            encoding="utf-8",
+        )
+        [label] = load_from_file(path)
+        assert label["price"] == 89.5
+        assert label["unit_price"] == 3.73
+
+    def test_json_api_payload(self, tmp_path: Path) -> None:
+        path = tmp_path / "labels.json"
+        payload = {"count": 1, "labels": _pdf_data(1)}
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        assert load_from_file(path)[0]["product_name"] == "Lék 0"
+
+    def test_missing_field_is_reported(self, tmp_path: Path) -> None:
+        path = tmp_path / "labels.json"
+        path.write_text(json.dumps([{"product_name": "X"}]), encoding="utf-8")
+        with pytest.raises(ValueError, match="Record 1"):
+            load_from_file(path)
+
+    def test_database_selectors(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        uri = _database_uri(app)
+        client.post(
+            "/labels/api/label",
+            json={"product_name": "Ibalgin", "form": "tbl", "amount": 10, "price": 1},
+        )
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+
+        def names(selection: Selection) -> list[str]:
+            labels, _rows, _app = load_from_database(uri, selection)
+            return [label["product_name"] for label in labels]
+
+        assert names(Selection(everything=True)) == ["Ibalgin", "Paralen 500mg"]
+        assert names(Selection(marked=True)) == ["Paralen 500mg"]
+        assert names(Selection(forms=["sir"])) == []
+        tomorrow = datetime.now() + timedelta(days=1)
+        assert names(Selection(everything=True, since=tomorrow)) == []
+
+
+class TestRender:
+    def test_chunked(self) -> None:
+        assert [len(c) for c in chunked(_pdf_data(5), 2)] == [2, 2, 1]
+        assert [len(c) for c in chunked(_pdf_data(5), 0)] == [5]
+
+    def test_render_numbered_files(self, tmp_path: Path) -> None:
+        results = render_batch(
+            _pdf_data(5), tmp_path, labels_per_file=2, progress=False
+        )
+        assert [r.path.name for r in results] == [
+            "labels_001.pdf",
+            "labels_002.pdf",
+            "labels_003.pdf",
+        ]
+        assert all(r.path.read_bytes().startswith(b"%PDF") for r in results)
+        assert not list(tmp_path.glob("*.part"))
+
+    def test_render_in_worker_processes(self, tmp_path: Path) -> None:
+        results = render_batch(
+            _pdf_data(4), tmp_path, labels_per_file=2, workers=2, progress=False
+        )
+        assert sum(r.labels for r in results) == 4
+
+
+class TestMain:
+    def test_input_file_end_to_end(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        source = tmp_path / "labels.json"
+        source.write_text(json.dumps(_pdf_data(3)), encoding="utf-8")
+        out = tmp_path / "out"
+        code = main(["--input", str(source), "-o", str(out), "--workers", "1"])
+        assert code == 0
+        assert (out / "labels_001.pdf").exists()
+        assert "Done: 3 labels" in capsys.readouterr().out
+
+    def test_requires_a_selector(self) -> None:
+        with pytest.raises(SystemExit):
+            main([])
+
+    def test_record_printed_clears_changed(
+        self, app: Flask, seed_label: LabelDict, tmp_path: Path
+    ) -> None:
+        uri = _database_uri(app)
+        args = ["--database", uri, "--changed", "-o", str(tmp_path), "-q"]
+        assert main([*args, "--record-printed"]) == 0
+        assert (tmp_path / "labels_001.pdf").exists()
+        labels, _rows, _app = load_from_database(uri, Selection(changed=True))
+        assert labels == []
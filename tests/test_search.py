@@ -0,0 +1,113 @@
+"""Tests for app/search.py — FTS5 product search, diacritic folding, sync triggers."""
+
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import text
+
+from app.db import db
+from app.models import FormDict, LabelDict
+from app.search import build_match_query, ensure_search_index
+
+
+def _create(client: FlaskClient, name: str, amount: float = 10) -> int:
+    resp = client.post(
+        "/labels/api/label",
+        json={"product_name": name, "form": "tbl", "amount": amount, "price": 50},
+    )
+    assert resp.status_code == 201
+    return int(resp.get_json()["label"]["id"])
+
+
+def _search(client: FlaskClient, query: str) -> list[str]:
+    resp = client.get("/labels/api/labels/search", query_string={"q": query})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["count"] == len(data["labels"])
+    return [label["product_name"] for label in data["labels"]]
+
+
+class TestBuildMatchQuery:
+    def test_terms_become_quoted_prefixes(self) -> None:
+        assert build_match_query("para 500") == '"para"* "500"*'
+
+    def test_operators_are_neutralised(self) -> None:
+        assert build_match_query('NEAR(" -x:') == '"NEAR"* "x"*'
+
+    def test_empty_query(self) -> None:
+        assert build_match_query("  -- ") is None
+
+
+class TestSearchApi:
+    def test_prefix_and_case_insensitive(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert _search(client, "paralen") == ["Paralen 500mg"]
+        assert _search(client, "PARA") == ["Paralen 500mg"]
+        assert _search(client, "500") == ["Paralen 500mg"]
+
+    def test_diacritics_are_folded_both_ways(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        _create(client, "Kápky na kašel")
+        _create(client, "Kapky do nosu")
+        assert sorted(_search(client, "kapky")) == ["Kapky do nosu", "Kápky na kašel"]
+        assert sorted(_search(client, "kápky")) == ["Kapky do nosu", "Kápky na kašel"]
+        assert _search(client, "kasel") == ["Kápky na kašel"]
+
+    def test_all_terms_must_match(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        _create(client, "Ibalgin 400")
+        _create(client, "Ibalgin 200")
+        assert _search(client, "ibal 4") == ["Ibalgin 400"]
+
+    def test_better_match_ranks_first(
+        self, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        _create(client, "Vitamin C s příchutí pomeranče a extraktem ze šípků")
+        _create(client, "Vitamin C")
+        assert _search(client, "vitamin")[0] == "Vitamin C"
+
+    def test_index_follows_update_and_delete(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        label_id = seed_label["id"]
+        resp = client.put(
+            f"/labels/api/label/{label_id}",
+            json={"product_name": "Panadol", "form": "tbl", "amount": 24, "price": 90},
+        )
+        assert resp.status_code == 200
+        assert _search(client, "paralen") == []
+        assert _search(client, "panadol") == ["Panadol"]
+
+        client.delete(f"/labels/api/label/{label_id}")
+        assert _search(client, "panadol") == []
+
+    def test_empty_query_returns_nothing(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        assert _search(client, "") == []
+
+    def test_limit(self, client: FlaskClient, seed_form: FormDict) -> None:
+        for i in range(5):
+            _create(client, f"Olynth {i}")
+        resp = client.get("/labels/api/labels/search?q=olynth&limit=2")
+        assert resp.get_json()["count"] == 2
+
+
+class TestIndexMaintenance:
+    def test_out_of_sync_index_is_rebuilt(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        with app.app_context(), db.engine.begin() as conn:
+            conn.execute(text("INSERT INTO label_fts(label_fts) VALUES ('delete-all')"))
+        assert _search(client, "paralen") == []
+
+        with app.app_context(), db.engine.begin() as conn:
+            assert ensure_search_index(conn) is True
+        assert _search(client, "paralen") == ["Paralen 500mg"]
+
+    def test_rebuild_cli_command(self, app: Flask, seed_label: LabelDict) -> None:
+        result = app.test_cli_runner().invoke(args=["rebuild-search"])
+        assert result.exit_code == 0
+        assert "1 labels" in result.output
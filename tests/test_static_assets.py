@@ -0,0 +1,85 @@
+"""Tests for app/static_assets.py — fingerprinted URLs, immutable caching, precompression."""
+
+import gzip
+import os
+import re
+from pathlib import Path
+
+from flask.testing import FlaskClient
+
+from app.static_assets import StaticAssets
+
+
+def _asset_urls(client: FlaskClient) -> list[str]:
+    html = client.get("/labels/").get_data(as_text=True)
+    return re.findall(r'(?:href|src)="(/static/[^"]+)"', html)
+
+
+class TestFingerprintedUrls:
+    def test_base_template_uses_hashed_names(self, client: FlaskClient) -> None:
+        urls = _asset_urls(client)
+        assert any(
+            re.fullmatch(r"/static/css/main\.[0-9a-f]{10}\.css", u) for u in urls
+        )
+        assert any(
+            re.fullmatch(r"/static/js/shared\.[0-9a-f]{10}\.js", u) for u in urls
+        )
+
+    def test_hashed_url_is_immutable(self, client: FlaskClient) -> None:
+        css_url = next(u for u in _asset_urls(client) if u.endswith(".css"))
+        resp = client.get(css_url)
+        assert resp.status_code == 200
+        assert resp.cache_control.immutable
+        assert resp.cache_control.max_age == 365 * 24 * 3600
+
+    def test_stale_hash_serves_current_file_without_immutable(
+        self, client: FlaskClient
+    ) -> None:
+        resp = client.get("/static/css/main.0000000000.css")
+        assert resp.status_code == 200
+        assert not resp.cache_control.immutable
+        assert resp.cache_control.no_cache
+
+    def test_plain_name_still_served(self, client: FlaskClient) -> None:
+        resp = client.get("/static/js/shared.js")
+        assert resp.status_code == 200
+        assert b"showNotification" in resp.data
+
+    def test_missing_file_is_404(self, client: FlaskClient) -> None:
+        assert client.get("/static/js/nope.js").status_code == 404
+
+    def test_edited_file_gets_new_fingerprint(self, tmp_path: Path) -> None:
+        script = tmp_path / "app.js"
+        script.write_text("let a = 1;")
+        assets = StaticAssets(str(tmp_path))
+        first = assets.get("app.js")
+        assert first is not None
+        assert assets.get("app.js") is first
+
+        script.write_text("let a = 22;")
+        os.utime(script, ns=(0, first.signature[1] + 1))
+        second = assets.get("app.js")
+        assert second is not None
+        assert second.digest != first.digest
+        assert second.body == b"let a = 22;"
+        assert gzip.decompress(second.encoded["gzip"]) == b"let a = 22;"
+
+        script.unlink()
+        assert assets.get("app.js") is None
+
+
+class TestPrecompressedAssets:
+    def test_gzip_variant_when_accepted(self, client: FlaskClient) -> None:
+        resp = client.get("/static/css/main.css", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert b".sidebar" in gzip.decompress(resp.data)
+        assert "Accept-Encoding" in resp.headers["Vary"]
+
+    def test_identity_without_accept_encoding(self, client: FlaskClient) -> None:
+        resp = client.get("/static/css/main.css")
+        assert "Content-Encoding" not in resp.headers
+
+    def test_conditional_request(self, client: FlaskClient) -> None:
+        etag = client.get("/static/js/shared.js").headers["ETag"]
+        resp = client.get("/static/js/shared.js", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
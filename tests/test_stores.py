@@ -0,0 +1,210 @@
+"""Tests for per-store databases behind one server."""
+
+import threading
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import text
+
+from app.models import FormDict
+from app.stores import STORE_HEADER, Store, StoreRegistry
+
+LABEL = {"product_name": "Brufen", "form": "tbl", "amount": 24, "price": 89.5}
+
+
+@pytest.fixture()
+def stores(
+    app: Flask, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Generator[StoreRegistry, None, None]:
+    registry = StoreRegistry(app, tmp_path / "stores", share_forms=True)
+    monkeypatch.setitem(app.extensions, "stores", registry)
+    yield registry
+    registry.close_all()
+
+
+def _names(client: FlaskClient, url: str, **headers: str) -> list[str]:
+    resp = client.get(url, headers=headers)
+    assert resp.status_code == 200
+    return [label["product_name"] for label in resp.get_json()["labels"]]
+
+
+def _count(registry: StoreRegistry, name: str, table: str) -> int:
+    store = registry.acquire(name)
+    try:
+        with store.engine.connect() as connection:
+            count: int = connection.execute(
+                text(f"SELECT COUNT(*) FROM {table}")
+            ).scalar_one()
+    finally:
+        registry.release(store)
+    return count
+
+
+class TestSelection:
+    def test_stores_are_isolated(
+        self, client: FlaskClient, stores: StoreRegistry, seed_form: FormDict
+    ) -> None:
+        stores.create("praha")
+        stores.create("brno")
+        # Forms are copied from the default database when a store opens
+        assert _count(stores, "praha", "form") == 1
+
+        resp = client.post("/s/praha/labels/api/label", json=LABEL)
+        assert resp.status_code == 201
+        resp = client.post(
+            "/labels/api/label",
+            json={**LABEL, "product_name": "Coldrex"},
+            headers={STORE_HEADER: "brno"},
+        )
+        assert resp.status_code == 201
+
+        assert _names(client, "/s/praha/labels/api/labels") == ["Brufen"]
+        assert _names(client, "/labels/api/labels", **{STORE_HEADER: "praha"}) == [
+            "Brufen"
+        ]
+        assert _names(client, "/s/brno/labels/api/labels") == ["Coldrex"]
+        assert _names(client, "/labels/api/labels") == []
+        assert _count(stores, "brno", "label") == 1
+
+    def test_links_stay_in_store(
+        self, client: FlaskClient, stores: StoreRegistry
+    ) -> None:
+        stores.create("praha")
+        page = client.get("/s/praha/labels/").get_data(as_text=True)
+        assert 'data-app-root="/s/praha"' in page
+        assert 'href="/s/praha/labels/new"' in page
+
+    def test_unknown_store(self, client: FlaskClient, stores: StoreRegistry) -> None:
+        assert client.get("/s/nowhere/labels/api/labels").status_code == 404
+        resp = client.get("/labels/api/labels", headers={STORE_HEADER: "../x"})
+        assert resp.status_code == 404
+
+    def test_not_configured(self, client: FlaskClient) -> None:
+        resp = client.get("/s/praha/labels/api/labels")
+        assert resp.status_code == 404
+        assert "STORES_DIR" in resp.get_json()["error"]
+
+
+def test_payload_cache_is_per_store(
+    client: FlaskClient, stores: StoreRegistry, seed_form: FormDict
+) -> None:
+    stores.create("praha")
+    stores.create("brno")
+    assert _names(client, "/s/praha/labels/api/labels") == []
+    assert _names(client, "/s/brno/labels/api/labels") == []
+
+    client.post("/s/praha/labels/api/label", json=LABEL)
+
+    assert _names(client, "/s/praha/labels/api/labels") == ["Brufen"]
+    assert _names(client, "/s/brno/labels/api/labels") == []
+
+
+def test_idle_stores_are_closed(app: Flask, tmp_path: Path) -> None:
+    registry = StoreRegistry(app, tmp_path, max_open=1)
+    try:
+        registry.create("a")
+        registry.create("b")
+        assert registry.open_names() == ["b"]
+
+        a = registry.acquire("a")
+        b = registry.acquire("b")
+        # Both are in use, so neither may be closed yet
+        assert registry.open_names() == ["a", "b"]
+        registry.release(a)
+        registry.release(b)
+        registry.release(registry.acquire("b"))
+        assert registry.open_names() == ["b"]
+        assert a.write_queue.pending == 0
+        assert registry.names() == ["a", "b"]
+    finally:
+        registry.close_all()
+
+
+def test_slow_open_does_not_block_other_stores(
+    app: Flask, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    registry = StoreRegistry(app, tmp_path)
+    try:
+        registry.create("fast")
+        registry.create("slow")
+        registry.close_all()
+        registry._prepared.discard("slow")
+        fast = registry.acquire("fast")
+        registry.release(fast)
+
+        preparing = threading.Event()
+        finish = threading.Event()
+        prepare = registry._prepare
+        prepared: list[str] = []
+
+        def slow_prepare(store: Store) -> None:
+            prepared.append(store.name)
+            preparing.set()
+            assert finish.wait(10)
+            prepare(store)
+
+        monkeypatch.setattr(registry, "_prepare", slow_prepare)
+        opened: list[Store] = []
+        openers = [
+            threading.Thread(target=lambda: opened.append(registry.acquire("slow")))
+            for _ in range(2)
+        ]
+        openers[0].start()
+        assert preparing.wait(10)
+        openers[1].start()
+
+        # The open store stays usable while "slow" is being prepared
+        other = threading.Thread(
+            target=lambda: registry.release(registry.acquire("fast"))
+        )
+        other.start()
+        other.join(5)
+        assert not other.is_alive()
+        assert registry.open_names() == ["fast"]
+
+        finish.set()
+        for opener in openers:
+            opener.join(10)
+        assert prepared == ["slow"]
+        assert len(opened) == 2 and opened[0] is opened[1]
+        assert opened[0].active == 2
+    finally:
+        finish.set()
+        registry.close_all()
+
+
+def test_writes_use_the_store_writer(
+    client: FlaskClient, stores: StoreRegistry, seed_form: FormDict
+) -> None:
+    stores.create("praha")
+    store = stores.acquire("praha")
+    try:
+        client.post("/s/praha/labels/api/label", json=LABEL)
+        writers = {thread.name for thread in threading.enumerate()}
+        assert "db-writer-praha" in writers
+    finally:
+        stores.release(store)
+
+
+def test_cli(app: Flask, client: FlaskClient, stores: StoreRegistry) -> None:
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["stores", "create", "ostrava"])
+    assert result.exit_code == 0, result.output
+    assert (stores.directory / "ostrava.db").is_file()
+    assert "ostrava" in runner.invoke(args=["stores", "list"]).output
+
+    again = runner.invoke(args=["stores", "create", "ostrava"])
+    assert again.exit_code != 0
+    assert "already exists" in again.output
+    bad = runner.invoke(args=["stores", "create", "Bad Name"])
+    assert "Invalid store name" in bad.output
+
+    # Forms added to the default database later reach the store
+    client.post("/api/form", json={"name": "Sirup", "short_name": "sir", "unit": "ml"})
+    synced = runner.invoke(args=["stores", "sync-forms"])
+    assert "ostrava: 1 forms added or updated" in synced.output
+    assert _count(stores, "ostrava", "form") == 1
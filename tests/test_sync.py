@@ -0,0 +1,335 @@
+"""Tests for change-log replication between two local instances."""
+
+import threading
+import time
+from collections.abc import Generator
+from pathlib import Path
+from typing import Literal, cast
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import insert, select
+from werkzeug.serving import make_server
+
+from app.app import create_app
+from app.db import db
+from app.models import ChangeLog, FormDict, Label, LabelDict
+from app.sync import (
+    SYNC_TOKEN_HEADER,
+    ChangeBatchDict,
+    HttpPeer,
+    SyncError,
+    SyncInfoDict,
+    SyncReportDict,
+    decode_body,
+    encode_batch,
+    export_changes,
+    parse_batch,
+    pull,
+    push,
+    sync_with,
+)
+from tests.conftest import LabelFactory
+
+TOKEN = "branch-secret"
+HEADERS = {SYNC_TOKEN_HEADER: TOKEN}
+TABLETY = {"name": "Tablety", "short_name": "tbl", "unit": "ks"}
+
+
+class ClientPeer:
+    """The sync endpoints of another app, reached through its test client."""
+
+    def __init__(self, client: FlaskClient) -> None:
+        self.client = client
+
+    def info(self, instance: str) -> SyncInfoDict:
+        resp = self.client.get(
+            "/api/sync", query_string={"peer": instance}, headers=HEADERS
+        )
+        assert resp.status_code == 200, resp.get_json()
+        return cast(SyncInfoDict, resp.get_json())
+
+    def fetch(self, since: int, instance: str, limit: int) -> ChangeBatchDict:
+        resp = self.client.get(
+            "/api/sync/changes",
+            query_string={"since": since, "peer": instance, "limit": limit},
+            headers={**HEADERS, "Accept-Encoding": "gzip"},
+        )
+        assert resp.status_code == 200, resp.get_data()
+        body = decode_body(resp.get_data(), resp.headers.get("Content-Encoding"))
+        return parse_batch(body)
+
+    def send(self, batch: ChangeBatchDict) -> SyncReportDict:
+        resp = self.client.post(
+            "/api/sync/changes",
+            data=encode_batch(batch),
+            headers={**HEADERS, "Content-Encoding": "gzip"},
+            content_type="application/json",
+        )
+        assert resp.status_code == 200, resp.get_json()
+        return cast(SyncReportDict, resp.get_json())
+
+
+@pytest.fixture()
+def branch(
+    app: Flask, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Generator[Flask, None, None]:
+    """A second instance with its own database file."""
+    monkeypatch.setitem(app.config, "SYNC_TOKEN", TOKEN)
+    other = create_app(database_uri=f"sqlite:///{tmp_path / 'branch.db'}")
+    other.config.update({"TESTING": True, "SYNC_TOKEN": TOKEN})
+    yield other
+    other.extensions["write_queue"].close()
+    with other.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture()
+def branch_client(branch: Flask) -> FlaskClient:
+    return branch.test_client()
+
+
+def _labels(client: FlaskClient) -> dict[str, LabelDict]:
+    labels = client.get("/labels/api/labels").get_json()["labels"]
+    return {label["product_name"]: label for label in labels}
+
+
+def _uid(app: Flask, label_id: int) -> str | None:
+    with app.app_context():
+        uid: str | None = db.session.scalar(
+            select(Label.uid).where(Label.id == label_id)
+        )
+    return uid
+
+
+def _changed(
+    reports: list[SyncReportDict],
+    field: Literal["forms", "labels", "deleted", "stale"],
+) -> int:
+    return sum(report[field] for report in reports)
+
+
+def test_writes_are_logged(
+    client: FlaskClient, make_label: LabelFactory, seed_form: FormDict
+) -> None:
+    label = make_label("Brufen")
+    logged = db.session.execute(
+        select(ChangeLog.entity, ChangeLog.op, ChangeLog.seq).order_by(ChangeLog.seq)
+    ).all()
+    assert [(row.entity, row.op) for row in logged] == [
+        ("form", "upsert"),
+        ("label", "upsert"),
+    ]
+
+    client.post(f"/labels/api/label/{label['id']}/toggle-print")
+    assert (
+        db.session.scalar(select(ChangeLog.seq).where(ChangeLog.entity == "label"))
+        == logged[1].seq
+    )
+
+    client.put(f"/labels/api/label/{label['id']}", json={"price": 99})
+    client.delete(f"/labels/api/label/{label['id']}")
+    rows = db.session.execute(
+        select(ChangeLog.op, ChangeLog.seq).where(ChangeLog.entity == "label")
+    ).all()
+    # One row per label, renumbered by every change
+    assert len(rows) == 1
+    assert rows[0].op == "delete"
+    assert rows[0].seq > logged[1].seq
+
+
+class TestTwoInstances:
+    def test_round_trip(
+        self,
+        app: Flask,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        branch: Flask,
+        branch_client: FlaskClient,
+    ) -> None:
+        client.post("/api/form", json=TABLETY)
+        make_label("Acylpyrin")
+        brufen = make_label("Brufen", price=120, barcode="8594000000013")
+        peer = ClientPeer(branch_client)
+
+        reports = sync_with(peer)
+        assert _changed(reports, "forms") == 1
+        assert _changed(reports, "labels") == 2
+        at_branch = _labels(branch_client)
+        assert set(at_branch) == {"Acylpyrin", "Brufen"}
+        assert at_branch["Brufen"]["price"] == 120
+        assert at_branch["Brufen"]["barcode"] == "8594000000013"
+        # New at the branch, so its shelf label needs printing
+        assert at_branch["Brufen"]["marked_to_print"] is True
+        assert _uid(branch, at_branch["Brufen"]["id"]) == _uid(app, brufen["id"])
+
+        branch_client.put(
+            f"/labels/api/label/{at_branch['Brufen']['id']}", json={"price": 99.9}
+        )
+        reports = sync_with(peer)
+        assert _changed(reports, "labels") == 1
+        here = client.get(f"/labels/api/label/{brufen['id']}").get_json()
+        assert here["price"] == 99.9
+        assert here["unit_price"] == pytest.approx(99.9 / 24, abs=0.01)
+        assert here["version"] > brufen["version"]
+        label = db.session.get(Label, brufen["id"])
+        assert label is not None and "99,90" in label.layout_json
+
+        # Nothing new on either side; the branch's own change is not echoed
+        reports = sync_with(peer)
+        assert _changed(reports, "labels") == _changed(reports, "forms") == 0
+
+    def test_replayed_batch_changes_nothing(
+        self, client: FlaskClient, make_label: LabelFactory, branch_client: FlaskClient
+    ) -> None:
+        client.post("/api/form", json=TABLETY)
+        make_label("Acylpyrin")
+        batch = export_changes(0)
+        peer = ClientPeer(branch_client)
+
+        first = peer.send(batch)
+        again = peer.send(batch)
+        assert (first["forms"], first["labels"]) == (1, 1)
+        assert (again["forms"], again["labels"], again["stale"]) == (0, 0, 2)
+        assert len(_labels(branch_client)) == 1
+
+    def test_last_writer_wins(
+        self, client: FlaskClient, make_label: LabelFactory, branch_client: FlaskClient
+    ) -> None:
+        client.post("/api/form", json=TABLETY)
+        label = make_label("Brufen")
+        peer = ClientPeer(branch_client)
+        sync_with(peer)
+        remote_id = _labels(branch_client)["Brufen"]["id"]
+
+        client.put(f"/labels/api/label/{label['id']}", json={"price": 100})
+        time.sleep(0.01)
+        branch_client.put(f"/labels/api/label/{remote_id}", json={"price": 110})
+        pushed = push(peer)
+        pulled = pull(peer)
+
+        assert client.get(f"/labels/api/label/{label['id']}").get_json()["price"] == 110
+        assert _labels(branch_client)["Brufen"]["price"] == 110
+        # Our older edit lost at the branch, the branch's one won here
+        assert (_changed(pushed, "stale"), _changed(pushed, "labels")) == (1, 0)
+        assert (_changed(pulled, "stale"), _changed(pulled, "labels")) == (0, 1)
+
+    def test_same_label_created_on_both(
+        self,
+        app: Flask,
+        branch: Flask,
+        client: FlaskClient,
+        make_label: LabelFactory,
+        branch_client: FlaskClient,
+    ) -> None:
+        client.post("/api/form", json=TABLETY)
+        branch_client.post("/api/form", json=TABLETY)
+        here = make_label("Brufen", price=100)
+        time.sleep(0.01)
+        there = make_label("Brufen", client=branch_client, price=105)
+
+        sync_with(ClientPeer(branch_client))
+
+        assert [label["price"] for label in _labels(client).values()] == [105]
+        assert [label["price"] for label in _labels(branch_client).values()] == [105]
+        assert _uid(app, here["id"]) == _uid(branch, there["id"])
+
+    def test_form_rename_and_delete(
+        self, client: FlaskClient, make_label: LabelFactory, branch_client: FlaskClient
+    ) -> None:
+        client.post("/api/form", json=TABLETY)
+        client.post(
+            "/api/form", json={"name": "Sirup", "short_name": "sir", "unit": "ml"}
+        )
+        make_label("Brufen")
+        gone = make_label("Acylpyrin")
+        peer = ClientPeer(branch_client)
+        sync_with(peer)
+
+        client.put("/api/form", json={**TABLETY, "short_name": "tbl.", "unit": "tbl"})
+        client.delete(f"/labels/api/label/{gone['id']}")
+        client.delete("/api/form", json={"name": "Sirup"})
+        reports = sync_with(peer)
+
+        assert _changed(reports, "deleted") == 2
+        forms = branch_client.get("/api/form").get_json()["forms"]
+        assert [(form["name"], form["short_name"], form["unit"]) for form in forms] == [
+            ("Tablety", "tbl.", "tbl")
+        ]
+        assert [
+            (label["product_name"], label["form"])
+            for label in _labels(branch_client).values()
+        ] == [("Brufen", "tbl.")]
+
+    def test_batches_and_http(
+        self, app: Flask, client: FlaskClient, branch: Flask, branch_client: FlaskClient
+    ) -> None:
+        client.post("/api/form", json=TABLETY)
+        db.session.execute(
+            insert(Label),
+            [
+                {
+                    "product_name": f"Produkt {i}",
+                    "form": "tbl",
+                    "amount": 10,
+                    "price": i + 1,
+                }
+                for i in range(1200)
+            ],
+        )
+        db.session.commit()
+
+        server = make_server("127.0.0.1", 0, branch, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            peer = HttpPeer(f"http://127.0.0.1:{server.server_port}", TOKEN)
+            reports = push(peer, batch_size=500)
+            assert len(reports) == 3
+            assert _changed(reports, "labels") == 1200
+            assert push(peer, batch_size=500) == []
+
+            with pytest.raises(SyncError, match="403"):
+                pull(HttpPeer(peer.base_url, "wrong"))
+        finally:
+            server.shutdown()
+            thread.join()
+
+        labels = _labels(branch_client)
+        assert len(labels) == 1200
+        assert labels["Produkt 7"]["price"] == 8
+        assert (
+            branch_client.get("/labels/api/labels/search?q=produkt").status_code == 200
+        )
+
+
+def test_token_required(
+    app: Flask, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert client.get("/api/sync", headers=HEADERS).status_code == 403
+    monkeypatch.setitem(app.config, "SYNC_TOKEN", TOKEN)
+    assert client.get("/api/sync").status_code == 403
+    resp = client.get("/api/sync", headers=HEADERS)
+    assert resp.status_code == 200
+    assert len(resp.get_json()["instance"]) == 32
+
+
+def test_bad_batch(
+    app: Flask, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(app.config, "SYNC_TOKEN", TOKEN)
+    resp = client.post("/api/sync/changes", json={"format": 1}, headers=HEADERS)
+    assert resp.status_code == 400
+    batch = export_changes(0)
+    resp = client.post("/api/sync/changes", json=batch, headers=HEADERS)
+    assert resp.status_code == 400
+    assert "this instance" in resp.get_json()["error"]
+
+
+def test_cli_status(app: Flask, client: FlaskClient, seed_form: FormDict) -> None:
+    result = app.test_cli_runner().invoke(args=["sync", "status"])
+    assert result.exit_code == 0, result.output
+    assert "change log at" in result.output
+    missing = app.test_cli_runner().invoke(args=["sync", "run"])
+    assert "SYNC_PEER_URL" in missing.output
@@ -0,0 +1,147 @@
+"""Tests for print preview thumbnails, sprite sheets and the paged preview API."""
+
+from collections.abc import Generator
+from io import BytesIO
+from typing import Any
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from PIL import Image
+from sqlalchemy import insert
+
+from app.db import db
+from app.models import FormDict, Label, LabelDict
+from app.pdf_generator import LabelPDFGenerator
+from app.static_assets import IMMUTABLE_MAX_AGE
+from app.thumbnails import (
+    PREVIEW_PAGE_SIZE,
+    ThumbnailCache,
+    load_preview_page,
+    thumbnail_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache() -> Generator[None, None, None]:
+    thumbnail_cache.clear()
+    yield
+    thumbnail_cache.clear()
+
+
+def _mark_many(app: Flask, count: int) -> None:
+    with app.app_context():
+        db.session.execute(
+            insert(Label),
+            [
+                {
+                    "product_name": f"Lék {i:03d}",
+                    "form": "tbl",
+                    "amount": 10,
+                    "price": 50 + i,
+                    "unit_price": 5,
+                    "marked_to_print": True,
+                }
+                for i in range(count)
+            ],
+        )
+        db.session.commit()
+
+
+def _manifest(client: FlaskClient, page: int = 0, query: str = "") -> dict[str, Any]:
+    resp = client.get(f"/labels/api/print-preview?page={page}{query}")
+    assert resp.status_code == 200
+    return dict(resp.get_json())
+
+
+class TestPreviewPages:
+    def test_pages_follow_a4_sheets(
+        self, app: Flask, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        _mark_many(app, PREVIEW_PAGE_SIZE + 5)
+        first = _manifest(client, 0)
+        last = _manifest(client, 1)
+        assert first["pages"] == 2
+        assert first["count"] == PREVIEW_PAGE_SIZE + 5
+        assert len(first["labels"]) == PREVIEW_PAGE_SIZE
+        assert [label["product_name"] for label in last["labels"]] == [
+            f"Lék {i:03d}" for i in range(PREVIEW_PAGE_SIZE, PREVIEW_PAGE_SIZE + 5)
+        ]
+
+    def test_print_page_renders_placeholders_only(
+        self, app: Flask, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        _mark_many(app, 70)
+        html = client.get("/labels/print").get_data(as_text=True)
+        assert html.count('class="preview-page"') == 3
+        assert "Lék 000" not in html
+
+    def test_empty_page_has_no_sprite(self, client: FlaskClient) -> None:
+        manifest = _manifest(client, 5)
+        assert manifest["labels"] == []
+        assert manifest["sprite"] is None
+        assert client.get("/labels/api/print-preview/5.png").status_code == 404
+
+
+class TestSpriteSheets:
+    def test_sprite_holds_one_tile_per_label(
+        self, app: Flask, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        _mark_many(app, 6)
+        manifest = _manifest(client)
+        resp = client.get(manifest["sprite"])
+        assert resp.status_code == 200
+        assert resp.mimetype == "image/png"
+        sheet = Image.open(BytesIO(resp.data))
+        assert sheet.size == (
+            manifest["columns"] * manifest["tile_width"],
+            2 * manifest["tile_height"],
+        )
+
+    def test_current_key_is_immutable(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        sprite_url = _manifest(client)["sprite"]
+        resp = client.get(sprite_url)
+        assert resp.cache_control.immutable
+        assert resp.cache_control.max_age == IMMUTABLE_MAX_AGE
+
+        revalidated = client.get(
+            sprite_url, headers={"If-None-Match": resp.get_etag()[0]}
+        )
+        assert revalidated.status_code == 304
+
+        outdated = client.get("/labels/api/print-preview/0.png?v=stale")
+        assert outdated.status_code == 200
+        assert outdated.cache_control.no_cache
+        assert not outdated.cache_control.immutable
+
+    def test_key_follows_label_content_and_fonts(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        original = _manifest(client)["sprite"]
+        assert _manifest(client)["sprite"] == original
+
+        fonts = _manifest(client, query="&price_font_size=20&text_font_size=9")
+        assert fonts["sprite"] != original
+
+        client.put(f"/labels/api/label/{seed_label['id']}", json={"price": 99})
+        assert _manifest(client)["sprite"] != original
+
+
+class TestThumbnailCache:
+    def test_thumbnails_are_reused_across_sprites(
+        self, app: Flask, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        client.post(f"/labels/api/label/{seed_label['id']}/toggle-print")
+        cache = ThumbnailCache(max_thumbnails=1)
+        with app.app_context():
+            page = load_preview_page(0, 34, 10)
+        generator = LabelPDFGenerator(34, 10)
+        tile = cache.thumbnail(page.rows[0], page.keys[0], generator)
+        assert cache.thumbnail(page.rows[0], page.keys[0], generator) is tile
+        assert tile.size == (cache.tile_width, cache.tile_height)
+        # Dark text pixels somewhere in the thumbnail
+        assert sum(tile.histogram()[:64]) > 0
@@ -41,6 +41,12 @@ class TestTranslateDbError:
         assert code == 409
         assert "neexistuje" in msg
 
+    def test_locked_database_is_retryable(self) -> None:
+        exc = Exception("(sqlite3.OperationalError) database is locked")
+        msg, code = translate_db_error(exc)
+        assert code == 503
+        assert "zaneprázdněná" in msg
+
     def test_unknown_error_returns_fallback(self) -> None:
         exc = Exception("something completely unexpected")
         msg, code = translate_db_error(exc)
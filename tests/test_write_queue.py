@@ -0,0 +1,166 @@
+"""Tests for the single-writer queue: group commit, savepoints and concurrency."""
+
+import threading
+import time
+from collections.abc import Generator
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.db import db
+from app.models import Form, FormDict, Label, LabelDict
+from app.write_queue import WriteQueue, WriteQueueTimeout
+
+
+@pytest.fixture()
+def write_queue(app: Flask) -> Generator[WriteQueue, None, None]:
+    queue = WriteQueue(app)
+    yield queue
+    queue.close()
+
+
+def _add_form(name: str, short_name: str) -> str:
+    db.session.add(Form(name=name, short_name=short_name, unit="ks"))
+    db.session.flush()
+    return short_name
+
+
+def _form_count(app: Flask) -> int:
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(Form)) or 0
+
+
+class TestGroupCommit:
+    def test_queued_writes_share_a_transaction(
+        self, app: Flask, write_queue: WriteQueue
+    ) -> None:
+        started, release = threading.Event(), threading.Event()
+
+        def blocker() -> None:
+            started.set()
+            release.wait(timeout=5)
+
+        first = threading.Thread(target=write_queue.submit, args=(blocker,))
+        first.start()
+        assert started.wait(timeout=5)
+
+        # These queue up behind the running batch and are committed together
+        results: list[str] = []
+        threads = [
+            threading.Thread(
+                target=lambda i=i: results.append(
+                    write_queue.submit(lambda: _add_form(f"Forma {i}", f"f{i}"))
+                )
+            )
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        while write_queue.pending < len(threads):
+            time.sleep(0.001)
+        release.set()
+        for thread in [first, *threads]:
+            thread.join(timeout=5)
+
+        assert sorted(results) == sorted(f"f{i}" for i in range(8))
+        assert write_queue.writes == 9
+        assert write_queue.batches == 2
+        assert _form_count(app) == 8
+
+    def test_failing_write_is_rolled_back_alone(
+        self, app: Flask, write_queue: WriteQueue
+    ) -> None:
+        write_queue.submit(lambda: _add_form("Tablety", "tbl"))
+        with pytest.raises(IntegrityError):
+            write_queue.submit(lambda: _add_form("Tablety 2", "tbl"))
+        assert write_queue.submit(lambda: _add_form("Kapky", "kap")) == "kap"
+        assert _form_count(app) == 2
+
+    def test_nested_submit_runs_inline(
+        self, app: Flask, write_queue: WriteQueue
+    ) -> None:
+        def outer() -> str:
+            return write_queue.submit(lambda: _add_form("Tablety", "tbl"))
+
+        assert write_queue.submit(outer) == "tbl"
+        assert _form_count(app) == 1
+
+    def test_timeout_cancels_queued_write(self, app: Flask) -> None:
+        write_queue = WriteQueue(app, timeout=0.05)
+        release = threading.Event()
+        blocked = threading.Thread(
+            target=write_queue.submit, args=(lambda: release.wait(timeout=5),)
+        )
+        blocked.start()
+        try:
+            with pytest.raises(WriteQueueTimeout, match="database is locked"):
+                write_queue.submit(lambda: _add_form("Tablety", "tbl"))
+        finally:
+            release.set()
+            blocked.join(timeout=5)
+            write_queue.close()
+        assert _form_count(app) == 0
+
+
+class TestSqliteSettings:
+    def test_wal_and_busy_timeout(self, app: Flask) -> None:
+        with app.app_context():
+            assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+class TestConcurrentRoutes:
+    def test_parallel_toggles_all_succeed(
+        self, app: Flask, client: FlaskClient, seed_form: FormDict
+    ) -> None:
+        ids: list[int] = []
+        for i in range(12):
+            resp = client.post(
+                "/labels/api/label",
+                json={
+                    "product_name": f"Lék {i}",
+                    "form": "tbl",
+                    "amount": 1,
+                    "price": 9,
+                },
+            )
+            ids.append(resp.get_json()["label"]["id"])
+
+        statuses: list[int] = []
+
+        def toggle(label_id: int) -> None:
+            with app.test_client() as tab:
+                for _ in range(3):
+                    resp = tab.post(f"/labels/api/label/{label_id}/toggle-print")
+                    statuses.append(resp.status_code)
+
+        threads = [threading.Thread(target=toggle, args=(i,)) for i in ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        assert statuses == [200] * 36
+        with app.app_context():
+            marked = db.session.scalar(
+                select(func.count()).where(Label.marked_to_print.is_(True))
+            )
+        assert marked == 12
+
+    def test_duplicate_create_reports_conflict(
+        self, client: FlaskClient, seed_label: LabelDict
+    ) -> None:
+        resp = client.post(
+            "/labels/api/label",
+            json={
+                "product_name": "Paralen 500mg",
+                "form": "tbl",
+                "amount": 24,
+                "price": 1,
+            },
+        )
+        assert resp.status_code == 409
+        assert client.get(f"/labels/api/label/{seed_label['id']}").status_code == 200